@@ -18,9 +18,17 @@ This script:
         cohort (e.g. ``lovac-2025``) who own a ``lovac-2026`` housing.
   - Uses **keyset pagination** (``WHERE o.id > :last_id``) instead of re-scanning
     from the start each batch — O(N) over the cohort, not O(N²).
-  - Geocodes chunks in **parallel** against the public BAN API.
-  - Is **resumable**: the cursor (last processed owner id) is persisted to disk,
-    so Ctrl-C / crash / re-run picks up where it stopped.
+  - Geocodes chunks in **parallel** against the public BAN API, each distinct
+    address once per batch, reusing the fresh results of ``ban_geocode_cache``
+    (``--no-geocode-cache`` to bypass it). With ``--geocoder local``, the BAN
+    export files in ``--local-addresses-dir`` answer first and only the rows
+    they leave not found or scored below ``--local-min-score`` go to the API.
+  - **Overlaps** the stages: the next DB page (``--prefetch``) is read on a
+    second connection while the current ones are geocoded, and each slice is
+    upserted and committed as soon as BAN answers it, in completion order.
+  - Is **resumable**: the cursor (last owner id of the last page written, with
+    every page before it) is persisted to disk, so Ctrl-C / crash / re-run
+    picks up where it stopped.
 
 Cursor files are isolated per mode, data-source, and optional housing scope, so
 annual, establishment, and commune runs never share a resume position.
@@ -42,6 +50,9 @@ From ``analytics/dagster/`` with the same Postgres + BAN env as Dagster:
     uv run python scripts/backfill_ban_owners.py --data-source lovac-2025
     uv run python scripts/backfill_ban_owners.py --limit 50000    # stop after N
     uv run python scripts/backfill_ban_owners.py --reset          # ignore cursor
+    uv run python scripts/backfill_ban_owners.py --country-cache countries.sqlite  # warm
+    uv run python scripts/backfill_ban_owners.py --geocoder local \
+        --local-addresses-dir ban/ --local-departments 38,69    # adresses-38.csv.gz...
 
     # housing-lovac mode: geocode owners linked to any lovac-2026 housing,
     # regardless of the owner's own data_source. First run builds a persistent
@@ -71,7 +82,8 @@ import os
 import re
 import signal
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from collections import Counter
 from pathlib import Path
 
 import pandas as pd
@@ -87,12 +99,17 @@ _SRC = Path(__file__).resolve().parent.parent / "src" / "assets" / "ban"
 def _load(mod_name: str, path: Path):
     spec = importlib.util.spec_from_file_location(mod_name, path)
     mod = importlib.util.module_from_spec(spec)
+    # Registered first: dataclasses resolve annotations through sys.modules.
+    sys.modules[mod_name] = mod
     spec.loader.exec_module(mod)
     return mod
 
 
 _client = _load("_ban_client", _SRC / "_client.py")
 _upsert = _load("_ban_upsert", _SRC / "_upsert.py")
+_cache = _load("_ban_cache", _SRC / "_cache.py")
+_local = _load("_ban_local", _SRC / "_local.py")
+_pipeline = _load("_ban_pipeline", _SRC / "_pipeline.py")
 
 call_ban_api = _client.call_ban_api
 BanApiFatalError = _client.BanApiFatalError
@@ -100,6 +117,18 @@ create_temp_table = _upsert.create_temp_table
 prepare_valid = _upsert.prepare_valid
 prepare_not_found = _upsert.prepare_not_found
 copy_upsert = _upsert.copy_upsert
+GeocodeCache = _cache.GeocodeCache
+DeduplicatedBatch = _cache.DeduplicatedBatch
+run_stages = _pipeline.run_stages
+LocalGeocoder = _local.LocalGeocoder
+LocalThenApi = _local.LocalThenApi
+
+# The country cache shared with the owner-housing location run, loaded the
+# same way from src/owner_housing_locations/.
+_LOCATIONS = Path(__file__).resolve().parent.parent / "src" / "owner_housing_locations"
+_country_detector = _load("_country_detector", _LOCATIONS / "country_detector.py")
+_country_cache = _load("_country_cache", _LOCATIONS / "country_cache.py")
+COUNTRY_DETECTOR = _country_detector.CountryDetector()
 
 # ---------------------------------------------------------------------------
 # owner-cohort mode (default)
@@ -429,38 +458,45 @@ def fetch_batch(
     )
 
 
-def next_fetch_limit(fetch_batch: int, *, limit: int, processed: int) -> int:
-    if limit <= 0:
-        return fetch_batch
-    return min(fetch_batch, max(limit - processed, 0))
+def make_geocoder(args: argparse.Namespace, api_url: str):
+    """The geocoder of the run: the BAN API, or the local BAN export first."""
 
+    def call_api(request: pd.DataFrame) -> pd.DataFrame:
+        return call_ban_api(request, api_url)
+
+    if args.geocoder == "api":
+        return call_api
+    local = LocalGeocoder.load(
+        args.local_addresses_dir, _local.parse_departments(args.local_departments)
+    )
+    LOG.info("Local BAN index: %d addresses", len(local.numbers))
+    return LocalThenApi(local, call_api, min_score=args.local_min_score)
+
+
+def open_country_cache(path: str | None):
+    """The persistent country cache at `path`, loaded, or None without one."""
+    if not path:
+        return None
+    cache = _country_cache.CountryCache(path, COUNTRY_DETECTOR.get_version())
+    LOG.info("Country cache: %d addresses from %s", cache.load(), path)
+    return cache
 
-def geocode_parallel(
-    df: pd.DataFrame, chunk: int, workers: int, api_url: str
-) -> pd.DataFrame:
-    """Split df into `chunk`-sized slices, geocode them concurrently, concat."""
-    slices = [df.iloc[i : i + chunk] for i in range(0, len(df), chunk)]
-    results: list[pd.DataFrame] = []
-    with ThreadPoolExecutor(max_workers=workers) as pool:
-        futures = {
-            pool.submit(call_ban_api, s, api_url): i for i, s in enumerate(slices)
-        }
-        for fut in as_completed(futures):
-            i = futures[fut]
-            try:
-                results.append(fut.result())
-            except BanApiFatalError:
-                raise  # 4xx config error — abort, retrying won't help
-            except Exception as error:
-                LOG.exception(
-                    "slice %d failed after retries: %s — aborting batch", i, error
-                )
-                raise
-    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+def warm_country_cache(cache, api: pd.DataFrame) -> int:
+    """Detect and save the countries of the addresses BAN did not match.
+
+    Their rows keep the DGFiP address without coordinates, which the
+    location run classifies from its text: it then finds them cached.
+    """
+    not_found = api.loc[api["result_status"] != "ok", "address_dgfip"]
+    for address in not_found.dropna().unique():
+        _country_cache.detect_country(address, COUNTRY_DETECTOR, cache)
+    return cache.save()
 
 
 def _run_batches(
     conn,
+    read_conn,
     candidates_sql: str,
     args: argparse.Namespace,
     *,
@@ -468,57 +504,132 @@ def _run_batches(
     establishment_id: str | None,
     geo_codes: tuple[str, ...],
     last_id: str,
-    stop: dict[str, bool],
-) -> None:
-    processed = ok = nf = 0
+    stop: threading.Event,
+    country_cache=None,
+) -> Counter:
+    """Backfill the candidates after `last_id` in three overlapping stages:
+    keyset batches read ahead on `read_conn`, their distinct addresses
+    geocoded in `--chunk` slices by `--workers` threads, and each slice
+    upserted on `conn` as it completes (see _pipeline.run_stages)."""
+    written: Counter = Counter()
+    dedup: Counter = Counter()
     by = args.by
+    geocode = make_geocoder(args, api_url)
     data_source = args.data_source
 
     with conn.cursor() as write_cur:
         create_temp_table(write_cur)
+        geocode_cache = None
+        if args.geocode_cache:
+            geocode_cache = GeocodeCache(
+                write_cur,
+                ttl_not_found_days=args.ttl_not_found_days,
+                ttl_low_score_days=args.ttl_low_score_days,
+            )
+            geocode_cache.create_table()
         conn.commit()
 
-        while not stop["flag"]:
-            if args.limit and processed >= args.limit:
-                LOG.info("Reached --limit %d — stopping.", args.limit)
-                break
-
-            fetch_limit = next_fetch_limit(
-                args.fetch_batch,
-                limit=args.limit,
-                processed=processed,
-            )
-            if fetch_limit <= 0:
-                break
-            frame = fetch_batch(conn, candidates_sql, data_source, last_id, fetch_limit)
-            if frame.empty:
-                LOG.info(
-                    "No more candidates — mode %s / cohort %s fully geocoded.",
-                    by,
-                    data_source,
-                )
-                break
+        def fetch(after: str, limit: int) -> pd.DataFrame:
+            return fetch_batch(read_conn, candidates_sql, data_source, after, limit)
 
-            api = geocode_parallel(frame, args.chunk, args.workers, api_url)
+        def upsert(api: pd.DataFrame) -> dict:
+            counts = {"ok": 0, "not_found": 0}
             if not api.empty:
-                ok += copy_upsert(write_cur, prepare_valid(api, "Owner"))
-                nf += copy_upsert(write_cur, prepare_not_found(api, "Owner"))
-                conn.commit()
-
-            last_id = str(frame["ref_id"].iloc[-1])
-            save_cursor(by, data_source, last_id, establishment_id, geo_codes)
-            processed += len(frame)
+                counts["ok"] = copy_upsert(write_cur, prepare_valid(api, "Owner"))
+                counts["not_found"] = copy_upsert(
+                    write_cur, prepare_not_found(api, "Owner")
+                )
+                if country_cache is not None:
+                    warm_country_cache(country_cache, api)
+            # Also commits the cache rows stored by the batch.
+            conn.commit()
+            written.update(counts)
+            return counts
+
+        def prepare(frame: pd.DataFrame):
+            batch = DeduplicatedBatch(frame, geocode_cache)
+            stats = batch.stats()
+            stats.pop("dedup_ratio")
+            dedup.update(stats)
+            upsert(batch.resolve_cached())
+            requests = [
+                batch.request.iloc[i : i + args.chunk]
+                for i in range(0, len(batch.request), args.chunk)
+            ]
+            return requests, lambda api: upsert(batch.resolve_slice(api))
+
+        def checkpoint(batch_last_id: str) -> None:
+            save_cursor(by, data_source, batch_last_id, establishment_id, geo_codes)
+
+        def on_batch(number: int, frame: pd.DataFrame, totals: Counter) -> None:
             LOG.info(
-                "batch: in=%d ok_total=%d nf_total=%d processed=%d/%s cursor=%s",
+                "batch %d: in=%d ok_total=%d nf_total=%d addresses=%d "
+                "cache_hits=%d geocoded=%d processed=%d cursor=%s",
+                number,
                 len(frame),
-                ok,
-                nf,
-                processed,
-                "?",
-                last_id,
+                written["ok"],
+                written["not_found"],
+                dedup["addresses"],
+                dedup["cache_hits"],
+                dedup["geocoded"],
+                totals["read"],
+                frame["ref_id"].iloc[-1],
             )
 
-    LOG.info("Done. processed=%d ok=%d not_found=%d", processed, ok, nf)
+        try:
+            totals = run_stages(
+                fetch,
+                prepare,
+                geocode,
+                workers=args.workers,
+                fetch_size=args.fetch_batch,
+                limit=args.limit,
+                after=last_id,
+                prefetch=args.prefetch,
+                checkpoint=checkpoint,
+                on_batch=on_batch,
+                stop=stop,
+            )
+        except BanApiFatalError:
+            raise  # 4xx config error — abort, retrying won't help
+        except Exception as error:
+            LOG.exception("slice failed after retries: %s — aborting", error)
+            raise
+
+    if stop.is_set():
+        LOG.info("Stopped — resume from the saved cursor.")
+    elif args.limit and totals["read"] >= args.limit:
+        LOG.info("Reached --limit %d — stopping.", args.limit)
+    else:
+        LOG.info(
+            "No more candidates — mode %s / cohort %s fully geocoded.", by, data_source
+        )
+    LOG.info(
+        "Done. processed=%d ok=%d not_found=%d",
+        totals["read"],
+        written["ok"],
+        written["not_found"],
+    )
+    if dedup["rows"]:
+        LOG.info(
+            "Geocoding: %d rows, %d distinct addresses (dedup ratio %.1f%%), "
+            "%d cached, %d rows not sent to BAN",
+            dedup["rows"],
+            dedup["addresses"],
+            100 * (1 - dedup["addresses"] / dedup["rows"]),
+            dedup["cache_hits"],
+            dedup["api_rows_saved"],
+        )
+    if isinstance(geocode, LocalThenApi):
+        LOG.info(
+            "Backends: %d addresses geocoded locally, %d by the API",
+            geocode.counts["local"],
+            geocode.counts["api"],
+        )
+    if country_cache is not None:
+        LOG.info("Country cache: %s", json.dumps(country_cache.statistics()))
+    # `written` also counts the cached rows, written outside the slices.
+    return Counter({**totals, **written})
 
 
 def run(args: argparse.Namespace) -> None:
@@ -559,16 +670,21 @@ def run(args: argparse.Namespace) -> None:
         if args.reset or args.rebuild_targets
         else load_cursor(by, ds, establishment_id, geo_codes)
     )
-    stop = {"flag": False}
+    stop = threading.Event()
 
-    def _handle(signum, frame):  # graceful Ctrl-C: stop after current batch
-        LOG.warning("Signal %s — stopping after current batch.", signum)
-        stop["flag"] = True
+    def _handle(signum, frame):  # graceful Ctrl-C: stop after the batches taken
+        LOG.warning("Signal %s — stopping after the current batches.", signum)
+        stop.set()
 
     signal.signal(signal.SIGINT, _handle)
     signal.signal(signal.SIGTERM, _handle)
+    # The batches are read ahead on a connection of their own, outside any
+    # transaction, while the writes commit on `conn`.
+    read_conn = connect()
+    read_conn.autocommit = True
     _run_batches(
         conn,
+        read_conn,
         candidates_sql,
         args,
         api_url=api_url,
@@ -576,7 +692,9 @@ def run(args: argparse.Namespace) -> None:
         geo_codes=geo_codes,
         last_id=last_id,
         stop=stop,
+        country_cache=open_country_cache(args.country_cache),
     )
+    read_conn.close()
     conn.close()
 
 
@@ -624,6 +742,12 @@ def main() -> None:
         "--chunk", type=int, default=500, help="addresses per BAN API request"
     )
     p.add_argument("--workers", type=int, default=8, help="concurrent BAN requests")
+    p.add_argument(
+        "--prefetch",
+        type=int,
+        default=1,
+        help="DB pages read ahead while the previous ones are geocoded",
+    )
     p.add_argument("--limit", type=int, default=0, help="stop after N owners (0 = all)")
     p.add_argument(
         "--count", action="store_true", help="print remaining count and exit"
@@ -636,7 +760,61 @@ def main() -> None:
         action="store_true",
         help="housing-lovac: force a rebuild of the ban_backfill_targets_<tag> table",
     )
+    p.add_argument(
+        "--no-geocode-cache",
+        dest="geocode_cache",
+        action="store_false",
+        help="geocode every distinct address of a batch, without ban_geocode_cache",
+    )
+    p.add_argument(
+        "--ttl-not-found-days",
+        type=int,
+        default=int(os.environ.get("BAN_TTL_NOT_FOUND_DAYS", "90")),
+        help="days a cached not-found result is reused (BAN_TTL_NOT_FOUND_DAYS)",
+    )
+    p.add_argument(
+        "--ttl-low-score-days",
+        type=int,
+        default=int(os.environ.get("BAN_TTL_LOW_SCORE_DAYS", "90")),
+        help="days a cached result scored below 1 is reused (BAN_TTL_LOW_SCORE_DAYS)",
+    )
+    p.add_argument(
+        "--country-cache",
+        default=os.environ.get("OWNER_COUNTRY_CACHE"),
+        help=(
+            "SQLite country cache of the location run (defaults to "
+            "OWNER_COUNTRY_CACHE): detect the countries of unmatched addresses "
+            "while geocoding"
+        ),
+    )
+    p.add_argument(
+        "--geocoder",
+        choices=["api", "local"],
+        default=os.environ.get("BAN_GEOCODER", "api"),
+        help=(
+            "'api': the BAN API only. 'local': the BAN export of "
+            "--local-addresses-dir first, the API for the rest (BAN_GEOCODER)"
+        ),
+    )
+    p.add_argument(
+        "--local-addresses-dir",
+        default=os.environ.get("BAN_LOCAL_ADDRESSES_DIR", ""),
+        help="directory of the adresses-<department>.csv.gz or .parquet files",
+    )
+    p.add_argument(
+        "--local-departments",
+        default=os.environ.get("BAN_LOCAL_DEPARTMENTS", ""),
+        help="comma-separated departments to load (default: every file there)",
+    )
+    p.add_argument(
+        "--local-min-score",
+        type=float,
+        default=float(os.environ.get("BAN_LOCAL_MIN_SCORE", "0.8")),
+        help="local results scored below it are geocoded by the API",
+    )
     args = p.parse_args()
+    if args.geocoder == "local" and not args.local_addresses_dir:
+        p.error("--geocoder local needs --local-addresses-dir")
 
     logging.basicConfig(
         level=logging.INFO,
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""A local stand-in for the BAN /search/csv endpoint, to test and benchmark
+the BAN clients offline.
+
+Answers like BAN: the rows of the posted CSV (plain or chunked body), each
+followed by the result columns. An address containing "INCONNU" is not
+found; any other gets a deterministic result, scored 1 when it starts with
+a house number. `latency` delays each response; `statuses` are answered,
+in order, before the first real response (e.g. [429, 503]). GET /stats
+returns the requests and TCP connections served so far.
+
+Usage: python scripts/ban_stub_server.py [--port 8765] [--latency 0.05]
+       BAN_API_URL=http://127.0.0.1:8765/search/csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESULT_COLUMNS = [
+    "latitude",
+    "longitude",
+    "result_label",
+    "result_score",
+    "result_type",
+    "result_id",
+    "result_housenumber",
+    "result_name",
+    "result_street",
+    "result_postcode",
+    "result_city",
+    "result_context",
+    "result_citycode",
+    "result_oldcitycode",
+    "result_oldcity",
+    "result_district",
+    "result_status",
+]
+
+
+def geocode_row(address: str, citycode: str | None) -> list[str]:
+    """The stub result columns of `address`."""
+    if not address.strip() or "INCONNU" in address.upper():
+        return [""] * (len(RESULT_COLUMNS) - 1) + ["not-found"]
+    digest = hashlib.sha1(address.encode()).digest()
+    number, _, street = address.partition(" ")
+    numbered = number.isdigit()
+    citycode = citycode or f"{75101 + digest[0] % 20}"
+    return [
+        f"{43 + digest[1] / 64:.6f}",
+        f"{-1 + digest[2] / 32:.6f}",
+        address.title(),
+        "1.0" if numbered else f"{0.4 + digest[3] / 512:.4f}",
+        "housenumber" if numbered else "street",
+        f"{citycode}_{digest.hex()[:5]}_{number if numbered else '00000'}",
+        number if numbered else "",
+        (street if numbered else address).title(),
+        (street if numbered else address).title(),
+        f"{citycode[:2]}000",
+        "Ville",
+        f"{citycode[:2]}, Département",
+        citycode,
+        "",
+        "",
+        "",
+        "ok",
+    ]
+
+
+def _form(content_type: str, body: bytes) -> dict[str, bytes]:
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    return {
+        part.get_param("name", header="content-disposition"): part.get_payload(
+            decode=True
+        )
+        for part in message.iter_parts()
+    }
+
+
+def answer(form: dict[str, bytes]) -> bytes:
+    """The /search/csv response to a parsed multipart `form`."""
+    address_column = form["columns"].decode()
+    citycode_column = form.get("citycode", b"").decode() or None
+    reader = csv.reader(io.StringIO(form["data"].decode("utf-8-sig")))
+    header = next(reader)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(header + RESULT_COLUMNS)
+    address_index = header.index(address_column)
+    citycode_index = header.index(citycode_column) if citycode_column else None
+    for row in reader:
+        citycode = row[citycode_index] if citycode_index is not None else None
+        writer.writerow(row + geocode_row(row[address_index], citycode))
+    return out.getvalue().encode()
+
+
+class BanStubServer(ThreadingHTTPServer):
+    """The stub, served from a background thread while used as a context
+    manager. Counts the requests and the TCP connections they came on."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, *, latency: float = 0.0, statuses=()):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.statuses = list(statuses)
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/search/csv"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/stats":
+            return self._send(404, b"Not Found", "text/plain")
+        with self.server.lock:
+            stats = {
+                "requests": self.server.requests,
+                "connections": self.server.connections,
+            }
+        self._send(200, json.dumps(stats).encode(), "application/json")
+
+    def do_POST(self):
+        body = self._body()
+        with self.server.lock:
+            self.server.requests += 1
+            status = self.server.statuses.pop(0) if self.server.statuses else 200
+        if self.path.split("?")[0] != "/search/csv":
+            return self._send(404, b"Not Found", "text/plain")
+        if status != 200:
+            return self._send(status, f"stub status {status}".encode(), "text/plain")
+        try:
+            response = answer(_form(self.headers["Content-Type"], body))
+        except (KeyError, ValueError, StopIteration) as error:
+            return self._send(400, f"bad request: {error!r}".encode(), "text/plain")
+        time.sleep(self.server.latency)
+        self._send(200, response, "text/csv; charset=utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    server = BanStubServer(args.port, latency=args.latency)
+    print(f"BAN stub on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Owner backfill rate against the local stub BAN server, offline.
+
+Backfills `--owners` synthetic owners of a scratch schema of `--database-url`
+(TEST_DATABASE_URL by default) twice, from an empty ban_addresses:
+
+- `sequential`: the loop before the stages, each DB page fetched, then all
+  its slices geocoded, then upserted and committed before the next page;
+- `staged`: `_run_batches` of scripts/backfill_ban_owners.py, the pages read
+  ahead and each slice written as it completes.
+
+The stub (scripts/ban_stub_server.py) runs in its own process and answers
+after `--latency` seconds.
+
+Usage: python scripts/benchmark_ban_backfill.py [--owners 40000] \\
+    [--fetch-batch 5000] [--chunk 500] [--workers 8] [--latency 0.2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import psycopg2
+
+SCRIPTS = Path(__file__).resolve().parent
+SCHEMA = "ban_backfill_benchmark"
+
+SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.owners (
+  id UUID PRIMARY KEY,
+  address_dgfip TEXT[],
+  data_source TEXT
+);
+CREATE TABLE {SCHEMA}.ban_addresses (
+  ref_id UUID NOT NULL, house_number TEXT, address TEXT, street TEXT,
+  postal_code TEXT, city TEXT, city_code TEXT, latitude FLOAT,
+  longitude FLOAT, score FLOAT, ban_id TEXT, address_kind TEXT NOT NULL,
+  last_updated_at TIMESTAMP,
+  UNIQUE (ref_id, address_kind)
+);
+INSERT INTO {SCHEMA}.owners
+SELECT gen_random_uuid(),
+       ARRAY[(n %% 150 + 1) || ' RUE DE LA GARE', (38000 + n %% 700) || ' VILLE ' || n],
+       'lovac-2026'
+FROM generate_series(1, %(owners)s) AS n;
+"""
+
+
+def _load(mod_name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(mod_name, path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+backfill = _load("_backfill_ban_owners", SCRIPTS / "backfill_ban_owners.py")
+
+
+def connect(database_url: str):
+    return psycopg2.connect(database_url, options=f"-c search_path={SCHEMA}")
+
+
+def sequential(conn, read_conn, args: argparse.Namespace, api_url: str) -> int:
+    """The loop before the stages, without the cache, cursor or country
+    cache: fetch a page, geocode all its slices, upsert, commit."""
+
+    def geocode(request: pd.DataFrame) -> pd.DataFrame:
+        slices = [
+            request.iloc[i : i + args.chunk]
+            for i in range(0, len(request), args.chunk)
+        ]
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            results = list(
+                pool.map(lambda part: backfill.call_ban_api(part, api_url), slices)
+            )
+        return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+    processed, last_id = 0, backfill.ZERO_UUID
+    with conn.cursor() as write_cur:
+        backfill.create_temp_table(write_cur)
+        while True:
+            frame = backfill.fetch_batch(
+                conn,
+                backfill.OWNER_COHORT_CANDIDATES_SQL,
+                args.data_source,
+                last_id,
+                args.fetch_batch,
+            )
+            if frame.empty:
+                return processed
+            api, _ = backfill._cache.geocode_deduplicated(frame, geocode)
+            backfill.copy_upsert(write_cur, backfill.prepare_valid(api, "Owner"))
+            backfill.copy_upsert(write_cur, backfill.prepare_not_found(api, "Owner"))
+            conn.commit()
+            last_id = str(frame["ref_id"].iloc[-1])
+            processed += len(frame)
+
+
+def staged(conn, read_conn, args: argparse.Namespace, api_url: str) -> int:
+    totals = backfill._run_batches(
+        conn,
+        read_conn,
+        backfill.OWNER_COHORT_CANDIDATES_SQL,
+        args,
+        api_url=api_url,
+        establishment_id=None,
+        geo_codes=(),
+        last_id=backfill.ZERO_UUID,
+        stop=backfill.threading.Event(),
+    )
+    return totals["read"]
+
+
+def measure(label: str, run, args: argparse.Namespace) -> None:
+    conn, read_conn = connect(args.database_url), connect(args.database_url)
+    read_conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE ban_addresses")
+    conn.commit()
+    stub = subprocess.Popen(
+        [
+            sys.executable,
+            str(SCRIPTS / "ban_stub_server.py"),
+            "--port",
+            "0",
+            "--latency",
+            str(args.latency),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        api_url = stub.stdout.readline().split()[-1]
+        started = time.perf_counter()
+        owners = run(conn, read_conn, args, api_url)
+        elapsed = time.perf_counter() - started
+    finally:
+        stub.terminate()
+        stub.wait()
+        conn.close()
+        read_conn.close()
+    assert owners == args.owners, f"{label} backfilled {owners}/{args.owners}"
+    print(f"{label:>10}: {elapsed:7.2f}s, {owners / elapsed * 3600:12,.0f} owners/hour")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--database-url", default=os.environ.get("TEST_DATABASE_URL")
+    )
+    parser.add_argument("--owners", type=int, default=40_000)
+    parser.add_argument("--fetch-batch", type=int, default=5_000)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--prefetch", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or TEST_DATABASE_URL is required")
+    # What _run_batches reads from the backfill options.
+    args.by, args.data_source, args.limit = "owner-cohort", "lovac-2026", 0
+    args.geocoder, args.geocode_cache = "api", False
+
+    setup = psycopg2.connect(args.database_url)
+    with setup, setup.cursor() as cur:
+        cur.execute(SCHEMA_SQL, {"owners": args.owners})
+    setup.close()
+    backfill.logging.disable(backfill.logging.INFO)
+    # The staged run saves its cursor file in the working directory.
+    os.chdir(tempfile.mkdtemp())
+    try:
+        measure("sequential", sequential, args)
+        measure("staged", staged, args)
+    finally:
+        cleanup = psycopg2.connect(args.database_url)
+        with cleanup, cleanup.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cleanup.close()
+
+
+if __name__ == "__main__":
+    main()
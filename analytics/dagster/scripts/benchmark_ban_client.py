@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Throughput of the BAN clients against the local stub server, offline.
+
+Geocodes `--rows` synthetic addresses in `--chunk`-row requests, `--workers`
+at a time, through:
+
+- `post`: the previous client, a bare `requests.post` per chunk (a new
+  connection each) parsed with `pandas.read_csv`;
+- `call_ban_api`: one kept-alive requests session per worker thread;
+- `AsyncBanClient`: one httpx pool, streamed bodies, Arrow parsing.
+
+The stub (scripts/ban_stub_server.py) runs in its own process and answers
+after `--latency` seconds; the client CPU time is the benchmark's own.
+
+Usage: python scripts/benchmark_ban_client.py [--rows 50000] [--chunk 500] \\
+    [--workers 8] [--latency 0.05]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+SCRIPTS = Path(__file__).resolve().parent
+
+
+def _load(mod_name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(mod_name, path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+_client = _load("_ban_client", SCRIPTS.parent / "src" / "assets" / "ban" / "_client.py")
+
+
+def synthetic_frames(rows: int, chunk: int) -> list[pd.DataFrame]:
+    df = pd.DataFrame(
+        {
+            "address_dgfip": [
+                f"{index % 120 + 1} RUE DE LA GARE {index // 120}" for index in range(rows)
+            ],
+            "geo_code": [f"{38000 + index % 500:05d}" for index in range(rows)],
+        }
+    )
+    return [df.iloc[start : start + chunk] for start in range(0, rows, chunk)]
+
+
+def post(df: pd.DataFrame, api_url: str) -> pd.DataFrame:
+    """The client before the session and the async client."""
+    buffer = StringIO()
+    df.to_csv(buffer, index=False)
+    buffer.seek(0)
+    response = requests.post(
+        api_url,
+        files={"data": ("chunk.csv", buffer, "text/csv")},
+        data={"columns": "address_dgfip", "citycode": "geo_code"},
+        timeout=120,
+    )
+    response.raise_for_status()
+    return pd.read_csv(BytesIO(response.content))
+
+
+def threaded(geocode, workers: int):
+    def run(frames, api_url):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda df: geocode(df, api_url), frames))
+
+    return run
+
+
+def measure(label: str, run, frames: list[pd.DataFrame], latency: float) -> None:
+    stub = subprocess.Popen(
+        [
+            sys.executable,
+            str(SCRIPTS / "ban_stub_server.py"),
+            "--port",
+            "0",
+            "--latency",
+            str(latency),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        api_url = stub.stdout.readline().split()[-1]
+        started, cpu = time.perf_counter(), time.process_time()
+        responses = run(frames, api_url)
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu
+        stats = requests.get(api_url.replace("/search/csv", "/stats")).json()
+    finally:
+        stub.terminate()
+        stub.wait()
+    rows = sum(len(api) for api in responses)
+    assert rows == sum(len(df) for df in frames), f"{label} lost rows"
+    print(
+        f"{label:>14}: {elapsed:7.2f}s, {rows / elapsed:10,.0f} rows/s, "
+        f"client CPU {cpu:5.2f}s, {stats['connections'] - 1} connections"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.rows, args.chunk)
+    measure("post", threaded(post, args.workers), frames, args.latency)
+    measure(
+        "call_ban_api",
+        threaded(_client.call_ban_api, args.workers),
+        frames,
+        args.latency,
+    )
+    measure(
+        "AsyncBanClient",
+        lambda frames, api_url: _client.geocode_frames(
+            frames, api_url, max_connections=args.workers
+        ),
+        frames,
+        args.latency,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Throughput of the owner-housing classification, per pair versus per batch.
+
+Builds a synthetic batch shaped like a scoped LOVAC run (most addresses
+geocoded, a few foreign or unknown owners) and classifies it with
+`process_single_pair` in a loop, then with `build_pair_batch` and
+`classify_pair_batch`. No database is needed.
+
+Usage: python scripts/owner-housing-distances/benchmark_classification.py [--pairs 50000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+DAGSTER_ROOT = Path(__file__).resolve().parents[2]
+if str(DAGSTER_ROOT) not in sys.path:
+    sys.path.insert(0, str(DAGSTER_ROOT))
+
+from src.owner_housing_locations.calculator import DistanceCalculator  # noqa: E402
+
+COMMUNES = [
+    ("75102", "75002", 48.868, 2.341),
+    ("59350", "59000", 50.630, 3.057),
+    ("59512", "59100", 50.690, 3.181),
+    ("62041", "62000", 50.291, 2.777),
+    ("13201", "13001", 43.300, 5.381),
+    ("69381", "69001", 45.767, 4.834),
+    ("2A004", "20000", 41.919, 8.738),
+    ("97105", "97100", 15.998, -61.726),
+    ("97411", "97400", -20.882, 55.450),
+]
+FOREIGN_ADDRESSES = [
+    "221B Baker Street London United Kingdom",
+    "Rue de la Loi 16 1000 Bruxelles Belgique",
+    "BP 12 Casablanca MAROC",
+]
+
+
+def synthetic_batch(pairs: int, seed: int = 0) -> tuple[list[dict], dict]:
+    rng = random.Random(seed)
+    address_cache = {}
+    housing_geo_codes = {}
+    for index in range(pairs):
+        geo_code, postal, latitude, longitude = rng.choice(COMMUNES)
+        housing_geo_codes[f"housing-{index}"] = geo_code
+        address_cache[(f"housing-{index}", "Housing")] = (
+            postal, f"{index} rue de la Gare {postal}",
+            latitude + rng.uniform(-0.05, 0.05), longitude + rng.uniform(-0.05, 0.05),
+            None, f"{geo_code}_{index:04}_00001",
+        )
+    for index in range(pairs // 2):
+        roll = rng.random()
+        if roll < 0.05:
+            address = rng.choice(FOREIGN_ADDRESSES) + f" {index}"
+            address_cache[(f"owner-{index}", "Owner")] = (None, address, None, None, None, None)
+        elif roll < 0.08:
+            address_cache[(f"owner-{index}", "Owner")] = (None, f"Lieu-dit {index}", None, None, None, None)
+        elif roll < 0.98:
+            geo_code, postal, latitude, longitude = rng.choice(COMMUNES)
+            address_cache[(f"owner-{index}", "Owner")] = (
+                postal, f"{index} avenue Foch {postal}",
+                latitude + rng.uniform(-0.05, 0.05), longitude + rng.uniform(-0.05, 0.05),
+                geo_code, f"{geo_code}_{index:04}_00002",
+            )
+    pair_list = [
+        {
+            "owner_id": f"owner-{rng.randrange(pairs // 2)}",
+            "housing_id": f"housing-{index}",
+            "housing_geo_code": housing_geo_codes[f"housing-{index}"],
+        }
+        for index in range(pairs)
+    ]
+    return pair_list, address_cache
+
+
+def measure(label: str, pairs: int, classify) -> float:
+    started = time.perf_counter()
+    classify()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>7}: {elapsed:7.3f}s, {pairs / elapsed:12,.0f} pairs/s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=50_000)
+    args = parser.parse_args()
+
+    pairs, address_cache = synthetic_batch(args.pairs)
+    # Warm a shared country cache so both modes measure classification only.
+    warm = DistanceCalculator("postgresql://unused")
+    warm.build_pair_batch(pairs, address_cache)
+
+    scalar = DistanceCalculator("postgresql://unused")
+    scalar.country_cache = warm.country_cache
+    single = measure(
+        "scalar",
+        args.pairs,
+        lambda: [
+            scalar.process_single_pair(
+                pair["owner_id"], pair["housing_id"], address_cache, pair["housing_geo_code"]
+            )
+            for pair in pairs
+        ],
+    )
+    vectorized = DistanceCalculator("postgresql://unused")
+    vectorized.country_cache = warm.country_cache
+    batch = measure(
+        "batch",
+        args.pairs,
+        lambda: vectorized.classify_pair_batch(
+            vectorized.build_pair_batch(pairs, address_cache)
+        ),
+    )
+    print(f"speedup: {single / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
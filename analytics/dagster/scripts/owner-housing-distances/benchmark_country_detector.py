@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Throughput of the owner country detection, term by term versus compiled.
+
+Builds `--addresses` synthetic owner addresses shaped like the ones a
+location run detects (no BAN coordinates: French street addresses, a few
+explicit countries, overseas territories and street names containing a
+country), then classifies them with the previous term-by-term loop and with
+`CountryDetector.classify_many`. Both must give the same reasons. No
+database is needed.
+
+Usage: python scripts/owner-housing-distances/benchmark_country_detector.py [--addresses 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+DAGSTER_ROOT = Path(__file__).resolve().parents[2]
+if str(DAGSTER_ROOT) not in sys.path:
+    sys.path.insert(0, str(DAGSTER_ROOT))
+
+from src.owner_housing_locations.country_detector import (  # noqa: E402
+    FOREIGN_COUNTRY_TERMS,
+    FRANCE_TERMS,
+    FRENCH_OVERSEAS_TERMS,
+    STREET_OR_BUILDING_TERMS,
+    CountryDetector,
+)
+
+STREETS = ["rue", "avenue", "boulevard", "chemin", "impasse", "place", "allée"]
+NAMES = ["de la Gare", "Foch", "du Général Leclerc", "des Lilas", "Jean Jaurès"]
+CITIES = [("75002", "PARIS"), ("59000", "LILLE"), ("13001", "MARSEILLE")]
+FOREIGN = [
+    "221B Baker Street, London, United Kingdom",
+    "Rue de la Loi 16 1000 Bruxelles Belgique",
+    "BP 12 Casablanca MAROC",
+    "Via Roma 3 00184 Roma Italia",
+    "10115 Berlin Allemagne",
+]
+OVERSEAS = ["97110 Pointe-à-Pitre Guadeloupe", "98713 Papeete Polynésie française"]
+STREET_COUNTRIES = ["12 rue d'Italie 75013 Paris", "Avenue de l'Angleterre 06000 Nice"]
+
+
+def synthetic_addresses(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    addresses = []
+    for index in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            addresses.append(f"{rng.choice(FOREIGN)} {index}")
+        elif roll < 0.07:
+            addresses.append(f"{index} {rng.choice(OVERSEAS)}")
+        elif roll < 0.09:
+            addresses.append(f"{index} {rng.choice(STREET_COUNTRIES)}")
+        elif roll < 0.12:
+            addresses.append(f"LIEU DIT LES {index} CHAMPS")
+        else:
+            postal, city = rng.choice(CITIES)
+            separator = rng.choice([" ", ", "])
+            addresses.append(
+                f"{index} {rng.choice(STREETS)} {rng.choice(NAMES)}"
+                f"{separator}{postal} {city}"
+            )
+    return addresses
+
+
+def _normalize(text: str) -> str:
+    without_accents = "".join(
+        char
+        for char in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(char)
+    )
+    normalized = re.sub(r"[^a-z0-9]+", " ", without_accents.lower())
+    return re.sub(r"\s+", " ", normalized).strip()
+
+
+def term_by_term(address: str, terms: tuple[str, ...]) -> str | None:
+    """The detection replaced by the compiled matchers, kept as the baseline."""
+    normalized = _normalize(address)
+    if not normalized:
+        return None
+    components = tuple(
+        component
+        for component in (_normalize(part) for part in re.split(r"[,;\n\r|]+", address))
+        if component
+    )
+    last_component = components[-1] if components else ""
+    has_separator = len(components) > 1
+    street_terms = "|".join(re.escape(token) for token in STREET_OR_BUILDING_TERMS)
+
+    for term in sorted(terms, key=len, reverse=True):
+        normalized_term = _normalize(term)
+        if normalized == normalized_term:
+            return term
+        if has_separator and last_component == normalized_term:
+            return term
+        embedded = (
+            rf"\b(?:{street_terms})\s+"
+            rf"(?:(?:de|du|des|d|l|la|le|les)\s+){{0,2}}"
+            rf"{re.escape(normalized_term)}\b"
+        )
+        if re.search(embedded, normalized):
+            continue
+        if any(char.isdigit() for char in normalized) and (
+            normalized == normalized_term or normalized.endswith(f" {normalized_term}")
+        ):
+            return term
+    return None
+
+
+def term_by_term_reason(address: str) -> str:
+    term = term_by_term(address, FRANCE_TERMS + FRENCH_OVERSEAS_TERMS)
+    if term:
+        return f"explicit_france:{term}"
+    term = term_by_term(address, FOREIGN_COUNTRY_TERMS)
+    if term:
+        return f"explicit_foreign_country:{term}"
+    return "no_explicit_country"
+
+
+def measure(label: str, addresses: list[str], classify) -> tuple[float, list[str]]:
+    started = time.perf_counter()
+    reasons = classify(addresses)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>9}: {elapsed:7.3f}s, {len(addresses) / elapsed:12,.0f} addresses/s")
+    return elapsed, reasons
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--addresses", type=int, default=10_000)
+    args = parser.parse_args()
+
+    addresses = synthetic_addresses(args.addresses)
+    detector = CountryDetector()
+    baseline, expected = measure(
+        "terms",
+        addresses,
+        lambda batch: [term_by_term_reason(address) for address in batch],
+    )
+    single, reasons = measure(
+        "compiled",
+        addresses,
+        lambda batch: [detector.classify_address(address).reason for address in batch],
+    )
+    assert reasons == expected, "compiled matchers disagree with the term loop"
+    _, batch_reasons = measure(
+        "many",
+        addresses,
+        lambda batch: [result.reason for result in detector.classify_many(batch)],
+    )
+    assert batch_reasons == expected, "classify_many disagrees with the term loop"
+    print(f"speedup: {baseline / single:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of postal code to region lookups, one by one versus batched.
+
+Usage: python scripts/owner-housing-distances/benchmark_geography.py [--lookups 10000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+DAGSTER_ROOT = Path(__file__).resolve().parents[2]
+if str(DAGSTER_ROOT) not in sys.path:
+    sys.path.insert(0, str(DAGSTER_ROOT))
+
+from src.owner_housing_locations import geography  # noqa: E402
+from src.owner_housing_locations.calculator import DistanceCalculator  # noqa: E402
+
+
+def measure(label: str, lookups: int, lookup) -> None:
+    started = time.perf_counter()
+    lookup()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>10}: {elapsed:7.2f}s, {lookups / elapsed:14,.0f} lookups/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    codes = np.char.zfill(rng.integers(1_000, 98_000, args.lookups).astype(str), 5)
+    code_list = codes.tolist()
+
+    calculator = DistanceCalculator("postgresql://unused")
+    measure(
+        "calculator",
+        args.lookups,
+        lambda: [calculator.get_region_from_postal_code(code) for code in code_list],
+    )
+    measure(
+        "single",
+        args.lookups,
+        lambda: [geography.region_of_postal_code(code) for code in code_list],
+    )
+    measure("batch", args.lookups, lambda: geography.regions_of_postal_codes(codes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Throughput of the owner-housing location writers on a local PostgreSQL.
+
+Builds `owners_housing` with `--rows` rows in its own schema, then writes
+location results for two disjoint `--updates` key ranges: one with the
+previous writer (a connection per batch, `execute_values` pages with
+`RETURNING 1`), one with the COPY writer through the write pool. The table
+is vacuumed between the two, and the schema is dropped at the end.
+
+Usage: python scripts/owner-housing-distances/benchmark_writer.py --dsn postgresql://... \\
+    [--rows 5000000] [--updates 500000] [--num-workers 1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extensions import make_dsn
+from psycopg2.extras import execute_values
+
+DAGSTER_ROOT = Path(__file__).resolve().parents[2]
+if str(DAGSTER_ROOT) not in sys.path:
+    sys.path.insert(0, str(DAGSTER_ROOT))
+
+from src.owner_housing_locations.calculator import (  # noqa: E402
+    DistanceCalculator,
+    _distance_meters,
+    _execute_update_batches,
+    _update_batches,
+)
+
+SCHEMA = "owner_housing_writer_bench"
+
+
+def execute(dsn: str, sql: str) -> None:
+    connection = psycopg2.connect(dsn)
+    connection.autocommit = True
+    try:
+        connection.cursor().execute(sql)
+    finally:
+        connection.close()
+
+
+def create_table(dsn: str, rows: int) -> None:
+    execute(dsn, f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+    execute(
+        dsn,
+        f"""
+        CREATE TABLE {SCHEMA}.owners_housing (
+          owner_id uuid NOT NULL,
+          housing_id uuid NOT NULL,
+          housing_geo_code text NOT NULL,
+          rank integer NOT NULL DEFAULT 1,
+          locprop_distance_ban integer,
+          locprop_relative_ban integer,
+          PRIMARY KEY (owner_id, housing_id, housing_geo_code)
+        );
+        INSERT INTO {SCHEMA}.owners_housing (owner_id, housing_id, housing_geo_code)
+        SELECT md5('owner' || i)::uuid, md5('housing' || i)::uuid,
+               lpad((i % 95 + 1)::text, 2, '0') || '001'
+        FROM generate_series(1, {rows}) i;
+        """,
+    )
+    execute(dsn, f"VACUUM ANALYZE {SCHEMA}.owners_housing")
+
+
+def location_updates(dsn: str, offset: int, count: int) -> list[dict]:
+    """`count` results for the pairs from `offset` in key order, as a run
+    produces them."""
+    with psycopg2.connect(dsn) as connection, connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT owner_id::text, housing_id::text, housing_geo_code
+            FROM {SCHEMA}.owners_housing
+            ORDER BY owner_id, housing_id, housing_geo_code
+            OFFSET %s LIMIT %s
+            """,
+            (offset, count),
+        )
+        return [
+            {
+                "owner_id": owner_id,
+                "housing_id": housing_id,
+                "housing_geo_code": geo_code,
+                "distance": None if index % 10 == 0 else index % 500 / 7,
+                "classification": index % 8,
+            }
+            for index, (owner_id, housing_id, geo_code) in enumerate(cursor)
+        ]
+
+
+def values_batch_worker(batch_data: tuple) -> tuple[int, int, str | None]:
+    """The writer replaced by the COPY writer, kept here as the baseline."""
+    batch_id, batch, db_url = batch_data
+    conn = psycopg2.connect(db_url)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET synchronous_commit = off")
+        updated_rows = execute_values(
+            cursor,
+            """
+            UPDATE owners_housing AS oh
+            SET
+              locprop_distance_ban = CASE
+                WHEN data.distance IS NULL THEN NULL
+                ELSE data.distance::integer
+              END,
+              locprop_relative_ban = data.classification::integer
+            FROM (VALUES %s) AS data(
+              distance, classification, owner_id, housing_id, housing_geo_code
+            )
+            WHERE oh.owner_id = data.owner_id::uuid
+              AND oh.housing_id = data.housing_id::uuid
+              AND oh.housing_geo_code = data.housing_geo_code::text
+            RETURNING 1
+            """,
+            [
+                (
+                    _distance_meters(update["distance"]),
+                    update["classification"],
+                    update["owner_id"],
+                    update["housing_id"],
+                    update["housing_geo_code"],
+                )
+                for update in batch
+            ],
+            page_size=1000,
+            fetch=True,
+        )
+        conn.commit()
+        return (batch_id, len(updated_rows), None)
+    finally:
+        conn.close()
+
+
+class ValuesWriter:
+    _update_batch_worker = staticmethod(values_batch_worker)
+
+
+def measure(label: str, calculator, updates: list[dict], dsn: str, workers: int):
+    started = time.perf_counter()
+    written = sum(
+        result[1]
+        for _, result, _ in _execute_update_batches(
+            calculator, _update_batches(updates, dsn), workers
+        )
+    )
+    elapsed = time.perf_counter() - started
+    assert written == len(updates), f"{label} wrote {written} of {len(updates)}"
+    print(f"{label:>6}: {elapsed:7.2f}s, {written / elapsed:10,.0f} rows/s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--updates", type=int, default=500_000)
+    parser.add_argument("--num-workers", type=int, default=1)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+
+    dsn = make_dsn(args.dsn, options=f"-c search_path={SCHEMA}")
+    print(f"Creating {args.rows:,} owners_housing rows...")
+    create_table(args.dsn, args.rows)
+    try:
+        values = measure(
+            "values",
+            ValuesWriter(),
+            location_updates(dsn, 0, args.updates),
+            dsn,
+            args.num_workers,
+        )
+        execute(args.dsn, f"VACUUM ANALYZE {SCHEMA}.owners_housing")
+
+        copy = DistanceCalculator(dsn)
+        copy._open_write_pool(args.num_workers)
+        try:
+            pooled = measure(
+                "copy",
+                copy,
+                location_updates(dsn, args.updates, args.updates),
+                dsn,
+                args.num_workers,
+            )
+        finally:
+            copy._close_write_pool()
+        print(f"speedup: {values / pooled:.1f}x")
+    finally:
+        execute(args.dsn, f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == "__main__":
+    main()
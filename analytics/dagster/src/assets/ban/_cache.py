@@ -0,0 +1,243 @@
+"""BAN geocoding results cached by address, shared by every BAN sync.
+
+Candidate batches often repeat an address: co-owners, SCIs, the housings of
+one building. `geocode_deduplicated` sends each distinct address and
+citycode once, reuses the results of `ban_geocode_cache` while they are
+fresh, and fans the results back out to every row of the batch.
+
+Freshness mirrors the daily sync predicates: a not-found result expires
+after `ttl_not_found_days`, a result scored below 1 after
+`ttl_low_score_days`, and a result scored 1 never expires.
+
+Leaf module: scripts/backfill_ban_owners.py loads it by path.
+"""
+
+import math
+from typing import Callable, Optional
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+KEY_COLUMNS = ["address_key", "citycode"]
+RESULT_COLUMNS = [
+    "result_status",
+    "result_housenumber",
+    "result_label",
+    "result_street",
+    "result_postcode",
+    "result_city",
+    "result_citycode",
+    "result_score",
+    "result_id",
+    "latitude",
+    "longitude",
+]
+FLOAT_COLUMNS = frozenset({"result_score", "latitude", "longitude"})
+# Other statuses (skipped, error) are not results worth keeping.
+CACHED_STATUSES = ("ok", "not-found")
+
+CACHE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS ban_geocode_cache (
+  address_key TEXT NOT NULL,
+  citycode TEXT NOT NULL,
+  result_status TEXT NOT NULL,
+  result_housenumber TEXT,
+  result_label TEXT,
+  result_street TEXT,
+  result_postcode TEXT,
+  result_city TEXT,
+  result_citycode TEXT,
+  result_score DOUBLE PRECISION,
+  result_id TEXT,
+  latitude DOUBLE PRECISION,
+  longitude DOUBLE PRECISION,
+  geocoded_at TIMESTAMP NOT NULL,
+  PRIMARY KEY (address_key, citycode)
+);
+"""
+
+CACHE_LOOKUP_SQL = f"""
+SELECT c.address_key, c.citycode, {", ".join(f"c.{column}" for column in RESULT_COLUMNS)}
+FROM ban_geocode_cache c
+JOIN unnest(%(address_keys)s::text[], %(citycodes)s::text[]) AS k(address_key, citycode)
+  ON k.address_key = c.address_key AND k.citycode = c.citycode
+WHERE CASE
+  WHEN c.result_status <> 'ok' THEN c.geocoded_at
+    >= now() AT TIME ZONE 'UTC' - make_interval(days => %(ttl_not_found)s)
+  WHEN c.result_score < 1 THEN c.geocoded_at
+    >= now() AT TIME ZONE 'UTC' - make_interval(days => %(ttl_low_score)s)
+  ELSE TRUE
+END;
+"""
+
+CACHE_UPSERT_SQL = f"""
+INSERT INTO ban_geocode_cache (
+  address_key, citycode, {", ".join(RESULT_COLUMNS)}, geocoded_at
+)
+VALUES %s
+ON CONFLICT (address_key, citycode) DO UPDATE SET
+  {", ".join(f"{column} = EXCLUDED.{column}" for column in RESULT_COLUMNS)},
+  geocoded_at = EXCLUDED.geocoded_at;
+"""
+CACHE_UPSERT_TEMPLATE = (
+    "(" + ", ".join(["%s"] * (2 + len(RESULT_COLUMNS))) + ", now() AT TIME ZONE 'UTC')"
+)
+
+
+def address_key(address) -> str:
+    """The cache key of an address: BAN ignores case and spacing."""
+    return " ".join(str(address).split()).upper()
+
+
+def _value(column: str, value):
+    """`value` as stored: None for missing values, text outside FLOAT_COLUMNS."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if column in FLOAT_COLUMNS:
+        return float(value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class GeocodeCache:
+    """`ban_geocode_cache` through `cursor`. Writes are left to the caller's
+    commit, with the ban_addresses rows they come with."""
+
+    def __init__(self, cursor, *, ttl_not_found_days: int, ttl_low_score_days: int):
+        self.cursor = cursor
+        self.ttl_not_found_days = ttl_not_found_days
+        self.ttl_low_score_days = ttl_low_score_days
+
+    def create_table(self) -> None:
+        self.cursor.execute(CACHE_TABLE_SQL)
+
+    def lookup(self, keys: pd.DataFrame) -> pd.DataFrame:
+        """The fresh results of `keys`, as KEY_COLUMNS + RESULT_COLUMNS."""
+        self.cursor.execute(
+            CACHE_LOOKUP_SQL,
+            {
+                "address_keys": keys["address_key"].tolist(),
+                "citycodes": keys["citycode"].tolist(),
+                "ttl_not_found": self.ttl_not_found_days,
+                "ttl_low_score": self.ttl_low_score_days,
+            },
+        )
+        return pd.DataFrame(
+            self.cursor.fetchall(), columns=KEY_COLUMNS + RESULT_COLUMNS
+        )
+
+    def store(self, results: pd.DataFrame) -> int:
+        """Upsert the ok and not-found rows of `results`."""
+        results = results[results["result_status"].isin(CACHED_STATUSES)]
+        if results.empty:
+            return 0
+        columns = KEY_COLUMNS + RESULT_COLUMNS
+        execute_values(
+            self.cursor,
+            CACHE_UPSERT_SQL,
+            [
+                tuple(_value(column, value) for column, value in zip(columns, row))
+                for row in results[columns].itertuples(index=False, name=None)
+            ],
+            template=CACHE_UPSERT_TEMPLATE,
+            page_size=1000,
+        )
+        return len(results)
+
+
+class DeduplicatedBatch:
+    """The distinct addresses of the `address_dgfip` (and `geo_code`) rows of
+    `df`, and those of them `cache` does not hold fresh as `request`.
+
+    Split in two so that a pipeline can send `request` to BAN from another
+    thread, while the cache is only read and written by `cache`'s cursor.
+    """
+
+    def __init__(self, df: pd.DataFrame, cache: Optional[GeocodeCache] = None):
+        self.cache = cache
+        self.rows = df.copy()
+        self.rows["address_key"] = self.rows["address_dgfip"].map(address_key)
+        if "geo_code" in self.rows.columns:
+            self.rows["citycode"] = self.rows["geo_code"].fillna("").astype(str)
+        else:
+            self.rows["citycode"] = ""
+        self.unique = self.rows.drop_duplicates(KEY_COLUMNS, ignore_index=True)
+
+        if cache is not None and not self.unique.empty:
+            self.cached = cache.lookup(self.unique[KEY_COLUMNS])
+        else:
+            self.cached = pd.DataFrame(columns=KEY_COLUMNS + RESULT_COLUMNS)
+        misses = self.unique.merge(
+            self.cached[KEY_COLUMNS], on=KEY_COLUMNS, how="left", indicator=True
+        )
+        self.misses = misses[misses["_merge"] == "left_only"].reset_index(drop=True)
+
+        self.request = self.misses[
+            [column for column in ("address_dgfip", "geo_code") if column in df]
+        ].copy()
+        # Echoed back by BAN: ties each result to its key whatever the order
+        # of the response, without parsing the key itself.
+        self.request["geocode_row"] = range(len(self.request))
+
+    def resolve(self, api: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+        """The rows of `df` with their results, cached or from `api` (the
+        response to `request`), and the statistics of the batch."""
+        results = pd.concat(
+            [frame for frame in (self.cached, self._fresh(api)) if not frame.empty]
+            or [pd.DataFrame(columns=KEY_COLUMNS + RESULT_COLUMNS)],
+            ignore_index=True,
+        )
+        return self._rows_of(results), self.stats()
+
+    def resolve_cached(self) -> pd.DataFrame:
+        """The rows of `df` whose results were cached."""
+        return self._rows_of(self.cached)
+
+    def resolve_slice(self, api: pd.DataFrame) -> pd.DataFrame:
+        """The rows of `df` answered by `api`, the response to a slice of
+        `request`: written as each slice comes back, with resolve_cached."""
+        return self._rows_of(self._fresh(api))
+
+    def stats(self) -> dict:
+        rows = len(self.rows)
+        return {
+            "rows": rows,
+            "addresses": len(self.unique),
+            "cache_hits": len(self.cached),
+            "geocoded": len(self.misses),
+            "api_rows_saved": rows - len(self.misses),
+            "dedup_ratio": 1 - len(self.unique) / rows if rows else 0.0,
+        }
+
+    def _fresh(self, api: pd.DataFrame) -> pd.DataFrame:
+        """The results of `api` by key, stored in the cache."""
+        fresh = pd.DataFrame(columns=KEY_COLUMNS + RESULT_COLUMNS)
+        if not self.misses.empty:
+            if not api.empty:
+                results = api.set_index("geocode_row").reindex(columns=RESULT_COLUMNS)
+                fresh = self.misses[KEY_COLUMNS].join(results, how="inner")
+            if self.cache is not None:
+                self.cache.store(fresh)
+        return fresh
+
+    def _rows_of(self, results: pd.DataFrame) -> pd.DataFrame:
+        return self.rows.merge(results, on=KEY_COLUMNS, how="inner").drop(
+            columns=KEY_COLUMNS
+        )
+
+
+def geocode_deduplicated(
+    df: pd.DataFrame,
+    geocode: Callable[[pd.DataFrame], pd.DataFrame],
+    cache: Optional[GeocodeCache] = None,
+) -> tuple[pd.DataFrame, dict]:
+    """Geocode the `address_dgfip` (and `geo_code`) rows of `df` through
+    `geocode`, once per distinct address.
+
+    Returns the rows of `df` with their results, as `geocode` returns them,
+    and the statistics of the batch.
+    """
+    batch = DeduplicatedBatch(df, cache)
+    api = geocode(batch.request) if not batch.request.empty else pd.DataFrame()
+    return batch.resolve(api)
@@ -1,9 +1,27 @@
-"""BAN API client with retry/backoff."""
+"""BAN API client with retry/backoff.
+
+Two transports over the same retry semantics: `call_ban_api` (requests, one
+kept-alive session per thread) and `AsyncBanClient` (asyncio on httpx: one
+connection pool, streamed request bodies, responses parsed into Arrow as
+they arrive).
+"""
+import asyncio
+import codecs
+import csv
+import threading
+import uuid
+from contextlib import contextmanager
 from io import BytesIO, StringIO
+from typing import AsyncIterator, Optional
 
+import httpx
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import requests
 from tenacity import (
+    AsyncRetrying,
+    Retrying,
     retry,
     retry_if_exception_type,
     stop_after_attempt,
@@ -19,17 +37,22 @@ class BanApiFatalError(Exception):
     """Raised for non-retryable BAN API failures (4xx other than 429)."""
 
 
-@retry(
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=2, min=2, max=60),
-    retry=retry_if_exception_type((BanApiError, requests.RequestException)),
-    reraise=True,
-)
-def call_ban_api(df: pd.DataFrame, api_url: str, timeout: int = 120) -> pd.DataFrame:
-    """POST a CSV batch to the BAN /search/csv endpoint and return parsed response.
+TRANSIENT_ERRORS = (BanApiError, requests.RequestException)
+ASYNC_TRANSIENT_ERRORS = (BanApiError, httpx.TransportError)
 
-    Retries on transient errors (5xx, 429, network). Does not retry on 4xx.
-    """
+_sessions = threading.local()
+
+
+def _session() -> requests.Session:
+    """This thread's session, whose connections to BAN are kept alive."""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
+
+
+def post_ban_csv(df: pd.DataFrame, api_url: str, timeout: int = 120) -> pd.DataFrame:
+    """POST a CSV batch to the BAN /search/csv endpoint once, without retry."""
     csv_buffer = StringIO()
     df.to_csv(csv_buffer, index=False)
     csv_buffer.seek(0)
@@ -39,7 +62,7 @@ def call_ban_api(df: pd.DataFrame, api_url: str, timeout: int = 120) -> pd.DataF
         data["citycode"] = "geo_code"
 
     files = {"data": ("chunk.csv", csv_buffer, "text/csv")}
-    response = requests.post(api_url, files=files, data=data, timeout=timeout)
+    response = _session().post(api_url, files=files, data=data, timeout=timeout)
 
     if response.status_code == 429 or response.status_code >= 500:
         raise BanApiError(f"BAN transient status {response.status_code}")
@@ -49,3 +72,299 @@ def call_ban_api(df: pd.DataFrame, api_url: str, timeout: int = 120) -> pd.DataF
         )
 
     return pd.read_csv(BytesIO(response.content))
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=2, min=2, max=60),
+    retry=retry_if_exception_type(TRANSIENT_ERRORS),
+    reraise=True,
+)
+def call_ban_api(df: pd.DataFrame, api_url: str, timeout: int = 120) -> pd.DataFrame:
+    """POST a CSV batch to the BAN /search/csv endpoint and return parsed response.
+
+    Retries on transient errors (5xx, 429, network). Does not retry on 4xx.
+    """
+    return post_ban_csv(df, api_url, timeout)
+
+
+class AdaptiveConcurrency:
+    """How many BAN requests may be in flight, adapted to how BAN copes.
+
+    Additive increase, multiplicative decrease: a transient failure (429,
+    5xx, network) halves the limit, a full window of successes raises it by
+    one, up to `maximum`.
+    """
+
+    def __init__(self, maximum: int, *, minimum: int = 1):
+        if maximum < minimum:
+            raise ValueError("maximum must be >= minimum")
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = maximum
+        self.throttled = 0
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the `limit` request slots."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def succeeded(self) -> None:
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def backoff(self) -> None:
+        with self._condition:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+            self.throttled += 1
+
+
+def call_ban_api_adaptive(
+    df: pd.DataFrame,
+    api_url: str,
+    concurrency: AdaptiveConcurrency,
+    *,
+    max_attempts: int = 5,
+    max_wait: float = 60,
+    timeout: int = 120,
+) -> pd.DataFrame:
+    """`call_ban_api` within the slots of `concurrency`, reporting each
+    attempt to it. The slot is released while waiting to retry."""
+    retrying = Retrying(
+        stop=stop_after_attempt(max_attempts),
+        wait=wait_exponential(multiplier=2, min=min(2, max_wait), max=max_wait),
+        retry=retry_if_exception_type(TRANSIENT_ERRORS),
+        reraise=True,
+    )
+    for attempt in retrying:
+        with attempt:
+            with concurrency.slot():
+                try:
+                    api = post_ban_csv(df, api_url, timeout)
+                except TRANSIENT_ERRORS:
+                    concurrency.backoff()
+                    raise
+            concurrency.succeeded()
+    return api
+
+
+# BAN echoes the posted columns, then its result columns. The Arrow parser
+# reads them all as text but these, so citycodes, postcodes and house
+# numbers keep their digits as BAN wrote them.
+ARROW_COLUMN_TYPES = {
+    "result_score": pa.float64(),
+    "latitude": pa.float64(),
+    "longitude": pa.float64(),
+    "geocode_row": pa.int64(),
+}
+
+
+class CsvStreamParser:
+    """A CSV parsed into Arrow as its bytes arrive, one block of complete
+    lines at a time."""
+
+    def __init__(self):
+        self._pending = b""
+        self._names: Optional[list[str]] = None
+        self._schema: Optional[pa.Schema] = None
+        self._tables: list[pa.Table] = []
+
+    def feed(self, data: bytes) -> None:
+        self._pending += data
+        end = self._complete_lines_end()
+        if end:
+            block, self._pending = self._pending[:end], self._pending[end:]
+            self._parse(block)
+
+    def finish(self) -> pd.DataFrame:
+        if self._pending.strip():
+            self._parse(self._pending.rstrip(b"\r\n") + b"\n")
+        self._pending = b""
+        if self._names is None:
+            return pd.DataFrame()
+        if not self._tables:
+            return self._schema.empty_table().to_pandas()
+        return pa.concat_tables(self._tables).to_pandas()
+
+    def _complete_lines_end(self) -> int:
+        """The length of the pending complete lines: up to the last newline
+        outside a quoted field."""
+        end = self._pending.rfind(b"\n")
+        while end >= 0 and self._pending.count(b'"', 0, end) % 2:
+            end = self._pending.rfind(b"\n", 0, end)
+        return end + 1
+
+    def _parse(self, block: bytes) -> None:
+        if self._names is None:
+            header, _, block = block.removeprefix(codecs.BOM_UTF8).partition(b"\n")
+            self._names = next(csv.reader([header.decode().rstrip("\r")]))
+            self._schema = pa.schema(
+                [(name, ARROW_COLUMN_TYPES.get(name, pa.string())) for name in self._names]
+            )
+        if not block.strip():
+            return
+        self._tables.append(
+            pacsv.read_csv(
+                pa.BufferReader(block),
+                read_options=pacsv.ReadOptions(
+                    column_names=self._names, use_threads=False
+                ),
+                convert_options=pacsv.ConvertOptions(
+                    column_types=self._schema, strings_can_be_null=True
+                ),
+            )
+        )
+
+
+async def _multipart(
+    df: pd.DataFrame, fields: dict[str, str], boundary: str, rows_per_part: int
+) -> AsyncIterator[bytes]:
+    """The /search/csv form of `df`, its CSV encoded `rows_per_part` rows at a
+    time as the body is sent."""
+    for name, value in fields.items():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        ).encode()
+    yield (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="data"; filename="chunk.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode()
+    for start in range(0, max(len(df), 1), rows_per_part):
+        part = df.iloc[start : start + rows_per_part]
+        yield part.to_csv(index=False, header=start == 0).encode()
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+class AsyncBanClient:
+    """The BAN /search/csv endpoint over one pool of kept-alive connections.
+
+    Use as an async context manager. `http2` needs the h2 package
+    (httpx[http2]). Retries follow `call_ban_api`: BanApiError and network
+    errors are retried with exponential backoff, BanApiFatalError is not.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        *,
+        max_connections: int = 8,
+        http2: bool = False,
+        timeout: float = 120,
+        max_attempts: int = 5,
+        max_wait: float = 60,
+        rows_per_part: int = 1000,
+    ):
+        self.api_url = api_url
+        self.max_connections = max_connections
+        self.http2 = http2
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.max_wait = max_wait
+        self.rows_per_part = rows_per_part
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+        self._client = None
+
+    async def post(self, df: pd.DataFrame) -> pd.DataFrame:
+        """POST `df` once, without retry."""
+        fields = {"columns": "address_dgfip"}
+        if "geo_code" in df.columns:
+            fields["citycode"] = "geo_code"
+        boundary = uuid.uuid4().hex
+        async with self._client.stream(
+            "POST",
+            self.api_url,
+            content=_multipart(df, fields, boundary, self.rows_per_part),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        ) as response:
+            if response.status_code == 429 or response.status_code >= 500:
+                raise BanApiError(f"BAN transient status {response.status_code}")
+            if response.status_code != 200:
+                text = (await response.aread()).decode(errors="replace")
+                raise BanApiFatalError(
+                    f"BAN non-retryable status {response.status_code}: {text[:200]}"
+                )
+            parser = CsvStreamParser()
+            async for data in response.aiter_bytes():
+                parser.feed(data)
+        return parser.finish()
+
+    async def geocode(self, df: pd.DataFrame) -> pd.DataFrame:
+        """`post`, retried on transient errors."""
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait_exponential(
+                multiplier=2, min=min(2, self.max_wait), max=self.max_wait
+            ),
+            retry=retry_if_exception_type(ASYNC_TRANSIENT_ERRORS),
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                api = await self.post(df)
+        return api
+
+    async def geocode_many(self, frames: list[pd.DataFrame]) -> list[pd.DataFrame]:
+        """The responses to `frames`, in order, `max_connections` in flight.
+        The first failure cancels the other requests."""
+        slots = asyncio.Semaphore(self.max_connections)
+
+        async def geocode(df):
+            async with slots:
+                return await self.geocode(df)
+
+        tasks = [asyncio.create_task(geocode(df)) for df in frames]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+def geocode_frames(
+    frames: list[pd.DataFrame], api_url: str, **options
+) -> list[pd.DataFrame]:
+    """`AsyncBanClient.geocode_many` from synchronous code."""
+    responses = []
+
+    # Not returned by the main task: on exit, Python 3.11's asyncio.run
+    # formats its SIGINT handler, which would repr every response.
+    async def run():
+        async with AsyncBanClient(api_url, **options) as client:
+            responses.extend(await client.geocode_many(frames))
+
+    asyncio.run(run())
+    return responses
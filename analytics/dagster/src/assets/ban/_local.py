@@ -0,0 +1,483 @@
+"""Offline geocoding against the BAN national export.
+
+A geocoder is any `(request) -> response` callable over DataFrames shaped
+like /search/csv: the request rows (`address_dgfip`, optional `geo_code`,
+anything else echoed back) followed by the result columns. `call_ban_api`
+is the API backend; `LocalGeocoder` is the local one, built from the BAN
+address files of some departments (adresses-<department>.csv.gz or
+.parquet, from https://adresse.data.gouv.fr/data/ban/adresses/latest/):
+
+- number, street and commune found: a housenumber result, scored 1;
+- street found, number not (or none given): the street at the centroid of
+  its numbers, scored STREET_SCORE;
+- otherwise the street of the commune closest by trigram similarity, if
+  at least MIN_SIMILARITY, scored by that similarity (times STREET_SCORE
+  without its number);
+- else not-found.
+
+The commune is the `geo_code` of the row, or the communes of the postcode
+found in the address. `LocalThenApi` sends the rows the local index leaves
+not found or scored below `min_score` to the API backend.
+
+Leaf module: scripts/backfill_ban_owners.py loads it by path.
+"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import duckdb
+import pandas as pd
+
+Geocoder = Callable[[pd.DataFrame], pd.DataFrame]
+
+STREET_SCORE = 0.6
+MIN_SIMILARITY = 0.5
+# The BAN number of the toponyms without one (lieux-dits).
+NO_NUMBER = "99999"
+
+STREET_TYPE_ABBREVIATIONS = {
+    "ALL": "ALLEE",
+    "AV": "AVENUE",
+    "AVE": "AVENUE",
+    "BD": "BOULEVARD",
+    "BLD": "BOULEVARD",
+    "CAR": "CARREFOUR",
+    "CHE": "CHEMIN",
+    "CHEM": "CHEMIN",
+    "CHS": "CHAUSSEE",
+    "CRS": "COURS",
+    "DOM": "DOMAINE",
+    "ESP": "ESPLANADE",
+    "FBG": "FAUBOURG",
+    "FG": "FAUBOURG",
+    "HAM": "HAMEAU",
+    "IMP": "IMPASSE",
+    "LOT": "LOTISSEMENT",
+    "MTE": "MONTEE",
+    "PAS": "PASSAGE",
+    "PL": "PLACE",
+    "PROM": "PROMENADE",
+    "QU": "QUAI",
+    "R": "RUE",
+    "RES": "RESIDENCE",
+    "RTE": "ROUTE",
+    "SEN": "SENTIER",
+    "SQ": "SQUARE",
+    "TRA": "TRAVERSE",
+    "VLA": "VILLA",
+}
+ABBREVIATIONS = STREET_TYPE_ABBREVIATIONS | {
+    "DR": "DOCTEUR",
+    "GAL": "GENERAL",
+    "GD": "GRAND",
+    "GDE": "GRANDE",
+    "MAL": "MARECHAL",
+    "PDT": "PRESIDENT",
+    "ST": "SAINT",
+    "STE": "SAINTE",
+}
+STREET_TYPES = frozenset(STREET_TYPE_ABBREVIATIONS.values()) | {
+    "CITE",
+    "CLOS",
+    "COUR",
+    "LD",
+    "LIEU",
+    "PARVIS",
+    "RUELLE",
+    "VOIE",
+}
+# Dropped from the street keys: DGFiP and BAN do not agree on them.
+IGNORED = frozenset(
+    {"A", "AU", "AUX", "D", "DE", "DES", "DU", "ET", "L", "LA", "LE", "LES"}
+    | {"DIT", "LD", "LIEU"}
+)
+REPETITIONS = {
+    "B": "BIS",
+    "BIS": "BIS",
+    "T": "TER",
+    "TER": "TER",
+    "Q": "QUATER",
+    "QUATER": "QUATER",
+    "QUINQUIES": "QUINQUIES",
+}
+# Also single letters after a number: 12 A RUE ...
+REPETITION_TOKENS = frozenset(REPETITIONS) | frozenset("ACDEFGH")
+NUMBER_PATTERN = re.compile(r"(\d{1,4})([A-Z]?)")
+POSTCODE_PATTERN = re.compile(r"\d{5}")
+
+EXPORT_COLUMNS = (
+    "id",
+    "numero",
+    "rep",
+    "nom_voie",
+    "code_postal",
+    "code_insee",
+    "nom_commune",
+    "lon",
+    "lat",
+)
+RESULT_COLUMNS = [
+    "latitude",
+    "longitude",
+    "result_label",
+    "result_score",
+    "result_type",
+    "result_id",
+    "result_housenumber",
+    "result_street",
+    "result_postcode",
+    "result_city",
+    "result_citycode",
+    "result_status",
+]
+
+
+def _tokens(text) -> list[str]:
+    without_accents = "".join(
+        char
+        for char in unicodedata.normalize("NFKD", str(text))
+        if not unicodedata.combining(char)
+    )
+    return re.sub(r"[^A-Z0-9]+", " ", without_accents.upper()).split()
+
+
+def _street_key(tokens: Iterable[str]) -> str:
+    return " ".join(
+        expanded
+        for token in tokens
+        if (expanded := ABBREVIATIONS.get(token, token)) not in IGNORED
+    )
+
+
+def street_key(name) -> str:
+    """The key of a street name: accents, case, articles, lieu-dit and
+    common abbreviations aside."""
+    return _street_key(_tokens(name))
+
+
+def number_key(number, repetition=None) -> Optional[str]:
+    """The key of a house number and its repetition index (bis, ter, a...)."""
+    if number is None or pd.isna(number) or str(number).strip() == "":
+        return None
+    key = str(int(float(number)))
+    if repetition is not None and not pd.isna(repetition) and str(repetition).strip():
+        repetition = str(repetition).strip().upper()
+        key += " " + REPETITIONS.get(repetition, repetition)
+    return key
+
+
+def parse_address(address) -> tuple[Optional[str], str, Optional[str]]:
+    """The number key, street key and postcode of a DGFiP address.
+
+    The number is the last one followed by a street type (after an optional
+    repetition index), or the leading one; the street runs from there to
+    the postcode.
+    """
+    tokens = _tokens(address)
+    postcode = None
+    for index in range(len(tokens) - 1, -1, -1):
+        if POSTCODE_PATTERN.fullmatch(tokens[index]):
+            postcode = tokens[index]
+            tokens = tokens[:index]
+            break
+
+    number = None
+    start = 0
+    for index, token in enumerate(tokens):
+        match = NUMBER_PATTERN.fullmatch(token)
+        if not match:
+            continue
+        repetition = match.group(2) or None
+        street = index + 1
+        if (
+            street < len(tokens) - 1
+            and repetition is None
+            and tokens[street] in REPETITION_TOKENS
+        ):
+            repetition = tokens[street]
+            street += 1
+        following = tokens[street] if street < len(tokens) else ""
+        if ABBREVIATIONS.get(following, following) in STREET_TYPES or (
+            index == 0 and number is None
+        ):
+            number = number_key(match.group(1), repetition)
+            start = street
+    if number is None:
+        start = next(
+            (
+                index
+                for index, token in enumerate(tokens)
+                if ABBREVIATIONS.get(token, token) in STREET_TYPES
+            ),
+            0,
+        )
+    return number, _street_key(tokens[start:]), postcode
+
+
+def trigrams(key: str) -> frozenset:
+    """The trigrams of the words of `key`, padded like pg_trgm."""
+    return frozenset(
+        padded[index : index + 3]
+        for word in key.split()
+        for padded in (f"  {word} ",)
+        for index in range(len(padded) - 2)
+    )
+
+
+def parse_departments(value: str) -> Optional[list[str]]:
+    """The departments of a comma-separated setting, None (all) if empty."""
+    departments = [department.strip() for department in value.split(",")]
+    return [department for department in departments if department] or None
+
+
+def export_paths(directory, departments: Optional[Iterable[str]] = None) -> list[Path]:
+    """The BAN export files of `departments` in `directory`, or all of them."""
+    directory = Path(directory)
+    patterns = (
+        [f"adresses-{department}.*" for department in departments]
+        if departments
+        else ["adresses-*"]
+    )
+    paths = sorted(
+        path
+        for pattern in patterns
+        for path in directory.glob(pattern)
+        if path.name.endswith((".csv", ".csv.gz", ".parquet"))
+    )
+    if not paths:
+        raise FileNotFoundError(
+            f"No BAN export (adresses-<department>.csv.gz or .parquet) in "
+            f"{directory} for {sorted(departments) if departments else 'any department'}"
+        )
+    return paths
+
+
+def _sql_list(paths: Iterable) -> str:
+    return "[" + ", ".join("'" + str(path).replace("'", "''") + "'" for path in paths) + "]"
+
+
+def read_export(paths: Iterable) -> pd.DataFrame:
+    """The EXPORT_COLUMNS of the BAN export files at `paths`, read by DuckDB."""
+    paths = list(paths)
+    csv_paths = [path for path in paths if not str(path).endswith(".parquet")]
+    parquet_paths = [path for path in paths if str(path).endswith(".parquet")]
+    sources = []
+    if csv_paths:
+        # Quotes set: left to the sniffer, the apostrophes of the street
+        # names ("Place de l'Église") can be taken for quotes.
+        sources.append(
+            f"read_csv({_sql_list(csv_paths)}, delim=';', quote='\"', escape='\"', "
+            "header=true, all_varchar=true)"
+        )
+    if parquet_paths:
+        sources.append(f"read_parquet({_sql_list(parquet_paths)})")
+    select = ", ".join(
+        f"TRY_CAST({column} AS DOUBLE) AS {column}"
+        if column in ("lon", "lat")
+        else f"CAST({column} AS VARCHAR) AS {column}"
+        for column in EXPORT_COLUMNS
+    )
+    query = " UNION ALL ".join(f"SELECT {select} FROM {source}" for source in sources)
+    with duckdb.connect() as connection:
+        return connection.execute(query).df()
+
+
+class LocalGeocoder:
+    """A geocoder over an in-memory index of BAN export rows (EXPORT_COLUMNS).
+
+    Read-only once built: one instance can serve several threads.
+    """
+
+    def __init__(self, addresses: pd.DataFrame):
+        addresses = addresses.dropna(subset=["nom_voie", "code_insee", "lon", "lat"])
+        keys = {name: street_key(name) for name in addresses["nom_voie"].unique()}
+        addresses = addresses.assign(
+            street_key=addresses["nom_voie"].map(keys),
+            citycode=addresses["code_insee"],
+            postcode=addresses["code_postal"],
+            city=addresses["nom_commune"],
+            street=addresses["nom_voie"],
+            latitude=addresses["lat"],
+            longitude=addresses["lon"],
+        )
+
+        numbered = addresses[addresses["numero"] != NO_NUMBER]
+        rep = numbered["rep"].fillna("").astype(str)
+        self.numbers = numbered.assign(
+            number_key=[
+                number_key(number, repetition)
+                for number, repetition in zip(numbered["numero"], numbered["rep"])
+            ],
+            housenumber=numbered["numero"].astype(str) + rep.str.lower(),
+            result_id=numbered["id"],
+        ).drop_duplicates(["citycode", "street_key", "number_key"])[
+            [
+                "citycode",
+                "street_key",
+                "number_key",
+                "housenumber",
+                "street",
+                "postcode",
+                "city",
+                "result_id",
+                "latitude",
+                "longitude",
+            ]
+        ]
+        self.streets = (
+            addresses.assign(result_id=addresses["id"].str.rsplit("_", n=1).str[0])
+            .groupby(["citycode", "street_key"], as_index=False)
+            .agg(
+                street=("street", "first"),
+                postcode=("postcode", "first"),
+                city=("city", "first"),
+                result_id=("result_id", "first"),
+                latitude=("latitude", "mean"),
+                longitude=("longitude", "mean"),
+            )
+        )
+        self.postcodes = addresses[["postcode", "citycode"]].drop_duplicates()
+        self._commune_streets = defaultdict(list)
+        for citycode, key in zip(self.streets["citycode"], self.streets["street_key"]):
+            self._commune_streets[citycode].append((key, trigrams(key)))
+
+    @classmethod
+    def load(cls, directory, departments: Optional[Iterable[str]] = None):
+        """The index of the BAN export of `departments` in `directory`."""
+        return cls(read_export(export_paths(directory, departments)))
+
+    def closest_street(self, citycode: str, key: str) -> tuple[Optional[str], float]:
+        """The street of `citycode` closest to `key`, and their similarity."""
+        wanted = trigrams(key)
+        best, similarity = None, 0.0
+        if not wanted:
+            return best, similarity
+        for candidate, candidate_trigrams in self._commune_streets.get(citycode, ()):
+            shared = len(wanted & candidate_trigrams)
+            score = shared / (len(wanted) + len(candidate_trigrams) - shared)
+            if score > similarity:
+                best, similarity = candidate, score
+        return best, similarity
+
+    def _candidates(self, request: pd.DataFrame) -> pd.DataFrame:
+        parsed = pd.DataFrame(
+            [parse_address(address) for address in request["address_dgfip"].fillna("")],
+            columns=["number_key", "street_key", "postcode"],
+        )
+        parsed["row"] = range(len(request))
+        if "geo_code" in request.columns:
+            parsed["citycode"] = request["geo_code"].astype(object).to_numpy()
+            parsed.loc[parsed["citycode"].isna(), "citycode"] = None
+        else:
+            parsed["citycode"] = None
+        by_postcode = (
+            parsed[parsed["citycode"].isna() & parsed["postcode"].notna()]
+            .drop(columns="citycode")
+            .merge(self.postcodes, on="postcode")
+        )
+        candidates = pd.concat(
+            [parsed[parsed["citycode"].notna()], by_postcode], ignore_index=True
+        ).drop(columns="postcode")
+        return candidates[candidates["street_key"] != ""]
+
+    def _matches(self, candidates: pd.DataFrame, similarity=None) -> pd.DataFrame:
+        numbers = candidates.merge(
+            self.numbers, on=["citycode", "street_key", "number_key"]
+        ).assign(result_score=1.0, result_type="housenumber")
+        streets = candidates.merge(self.streets, on=["citycode", "street_key"]).assign(
+            result_score=STREET_SCORE, result_type="street", housenumber=None
+        )
+        matches = pd.concat([numbers, streets], ignore_index=True)
+        if similarity is not None:
+            matches["result_score"] *= matches["row"].map(similarity)
+        return matches
+
+    def __call__(self, request: pd.DataFrame) -> pd.DataFrame:
+        candidates = self._candidates(request)
+        matches = self._matches(candidates)
+
+        unresolved = candidates[~candidates["row"].isin(matches["row"])]
+        fuzzy, similarity = [], {}
+        for row, citycode, key, number in zip(
+            unresolved["row"],
+            unresolved["citycode"],
+            unresolved["street_key"],
+            unresolved["number_key"],
+        ):
+            closest, score = self.closest_street(citycode, key)
+            if closest is not None and score >= MIN_SIMILARITY:
+                fuzzy.append((row, citycode, closest, number))
+                similarity[row] = max(score, similarity.get(row, 0.0))
+        if fuzzy:
+            fuzzy = pd.DataFrame(
+                fuzzy, columns=["row", "citycode", "street_key", "number_key"]
+            )
+            matches = pd.concat(
+                [matches, self._matches(fuzzy, similarity)], ignore_index=True
+            )
+
+        best = (
+            matches.sort_values(["row", "result_score"], ascending=[True, False])
+            .drop_duplicates("row")
+            .set_index("row")
+            .reindex(range(len(request)))
+        )
+        found = best["result_score"].notna().to_numpy()
+        label = (
+            best["housenumber"].fillna("").astype(str)
+            + " "
+            + best["street"].fillna("").astype(str)
+            + " "
+            + best["postcode"].fillna("").astype(str)
+            + " "
+            + best["city"].fillna("").astype(str)
+        ).str.strip()
+        results = pd.DataFrame(
+            {
+                "latitude": best["latitude"].to_numpy(),
+                "longitude": best["longitude"].to_numpy(),
+                "result_label": label.where(found, None).to_numpy(),
+                "result_score": best["result_score"].to_numpy(),
+                "result_type": best["result_type"].to_numpy(),
+                "result_id": best["result_id"].to_numpy(),
+                "result_housenumber": best["housenumber"].to_numpy(),
+                "result_street": best["street"].to_numpy(),
+                "result_postcode": best["postcode"].to_numpy(),
+                "result_city": best["city"].to_numpy(),
+                "result_citycode": best["citycode"].to_numpy(),
+                "result_status": ["ok" if hit else "not-found" for hit in found],
+            },
+            index=request.index,
+        )
+        return pd.concat([request, results], axis=1)
+
+
+class LocalThenApi:
+    """`local` first; the rows it leaves not found or scored below
+    `min_score` go to `api`. Counts the rows each backend answered."""
+
+    def __init__(self, local: Geocoder, api: Geocoder, *, min_score: float = 0.8):
+        self.local = local
+        self.api = api
+        self.min_score = min_score
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, request: pd.DataFrame) -> pd.DataFrame:
+        out = self.local(request)
+        residual = (
+            (out["result_status"] != "ok") | (out["result_score"] < self.min_score)
+        ).to_numpy()
+        with self._lock:
+            self.counts["local"] += int((~residual).sum())
+            self.counts["api"] += int(residual.sum())
+        if not residual.any():
+            return out
+        api = self.api(request[residual])
+        # BAN answers the rows in the order they were sent.
+        api.index = out.index[residual]
+        return pd.concat([out[~residual], api]).sort_index()
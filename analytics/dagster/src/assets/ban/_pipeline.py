@@ -0,0 +1,248 @@
+"""Keyset-paginated BAN sync with a bounded window of in-flight requests.
+
+`run_pipeline` (the daily syncs): only the BAN requests run in worker
+threads. Reading the candidates, the geocode cache and the upserts stay on
+the caller's thread, so on its single connection: a chunk is read
+(`ref_id > after`), prepared, sent, and written then committed as soon as
+its response comes back, in any order, while up to `window` others are in
+flight.
+
+`run_stages` (the backfill): the same with the reads moved to a fetch
+thread, on a connection of its own, that prefetches the next batches into
+a bounded queue, and batches split into slices written as they complete.
+
+Leaf module: scripts/backfill_ban_owners.py loads it by path.
+"""
+
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+import pandas as pd
+
+# Sorts before every UUID: the keyset start of a full pass.
+KEYSET_START = "00000000-0000-0000-0000-000000000000"
+
+Write = Callable[[pd.DataFrame], dict]
+
+
+def run_pipeline(
+    read: Callable[[str, int], pd.DataFrame],
+    prepare: Callable[[pd.DataFrame], tuple[pd.DataFrame, Write]],
+    geocode: Callable[[pd.DataFrame], pd.DataFrame],
+    *,
+    window: int,
+    chunk_size: int,
+    cap: int,
+    after: str = KEYSET_START,
+    on_batch: Optional[Callable[[int, pd.DataFrame, dict, Counter], None]] = None,
+    on_error: Optional[Callable[[int, pd.DataFrame, Exception], None]] = None,
+) -> Counter:
+    """Geocode and write up to `cap` candidates, `chunk_size` at a time.
+
+    - `read(after, limit)`: the next candidates by `ref_id`, after `after`.
+    - `prepare(chunk)`: the request to send to BAN for `chunk` (possibly
+      empty, then not sent) and the `write(api)` of its response, which
+      returns the counts of the batch.
+    - `geocode(request)`: the BAN response, from a worker thread.
+
+    A failed request is reported to `on_error`, which may raise to stop the
+    run (pending requests are cancelled); otherwise its chunk counts as
+    failed and the keyset moves past it, so the next run retries it.
+
+    Returns the totals: `read`, `failed`, `batches` and the sum of the
+    counts of every write.
+    """
+    totals: Counter = Counter()
+    pending = {}
+    exhausted = False
+    batch = 0
+    pool = ThreadPoolExecutor(max_workers=window, thread_name_prefix="ban")
+    try:
+        while True:
+            while not exhausted and len(pending) < window and totals["read"] < cap:
+                chunk = read(after, min(chunk_size, cap - totals["read"]))
+                if chunk.empty:
+                    exhausted = True
+                    break
+                after = str(chunk["ref_id"].iloc[-1])
+                totals["read"] += len(chunk)
+                batch += 1
+                request, write = prepare(chunk)
+                if request.empty:
+                    future = pool.submit(pd.DataFrame)
+                else:
+                    future = pool.submit(geocode, request)
+                pending[future] = (batch, chunk, write)
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda future: pending[future][0]):
+                number, chunk, write = pending.pop(future)
+                try:
+                    api = future.result()
+                except Exception as error:
+                    if on_error is not None:
+                        on_error(number, chunk, error)
+                    totals["failed"] += len(chunk)
+                    continue
+                counts = write(api)
+                totals.update(counts)
+                totals["batches"] += 1
+                if on_batch is not None:
+                    on_batch(number, chunk, counts, totals)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return totals
+
+
+def _fetch_batches(
+    fetch: Callable[[str, int], pd.DataFrame],
+    batches: queue.Queue,
+    halt: threading.Event,
+    *,
+    after: str,
+    fetch_size: int,
+    limit: int,
+) -> None:
+    """Put the keyset batches of `fetch` on `batches`, then None, or the
+    error that stopped it; until `halt` is set."""
+
+    def put(item) -> bool:
+        while not halt.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    read = 0
+    try:
+        while not halt.is_set():
+            size = min(fetch_size, limit - read) if limit else fetch_size
+            if size <= 0:
+                break
+            frame = fetch(after, size)
+            if frame.empty:
+                break
+            after = str(frame["ref_id"].iloc[-1])
+            read += len(frame)
+            if not put(frame):
+                return
+        put(None)
+    except Exception as error:
+        put(error)
+
+
+def run_stages(
+    fetch: Callable[[str, int], pd.DataFrame],
+    prepare: Callable[[pd.DataFrame], tuple[list[pd.DataFrame], Write]],
+    geocode: Callable[[pd.DataFrame], pd.DataFrame],
+    *,
+    workers: int,
+    fetch_size: int,
+    limit: int = 0,
+    after: str = KEYSET_START,
+    prefetch: int = 1,
+    window: int = 2,
+    checkpoint: Optional[Callable[[str], None]] = None,
+    on_batch: Optional[Callable[[int, pd.DataFrame, Counter], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> Counter:
+    """Geocode and write the candidates of `fetch`, up to `limit` (0: all).
+
+    - `fetch(after, limit)`: the next candidates by `ref_id`, called from
+      the fetch thread, up to `prefetch` batches ahead.
+    - `prepare(batch)`: the slices of requests to send to BAN for `batch`
+      and the `write(api)` of the response to each, which returns its
+      counts. `prepare` may write what needs no request itself.
+    - `geocode(request)`: the BAN response, from one of `workers` threads.
+
+    The slices of up to `window` batches are in flight at once, written in
+    the order they complete. `checkpoint(ref_id)` gets the last id of each
+    batch once it and every batch before it are written, so that resuming
+    from it skips no candidate. A failed slice stops the run, as does
+    `stop`, after the batches taken so far are written.
+
+    Returns the totals: `read`, `batches`, `slices` and the sum of the
+    counts of every write.
+    """
+    stop = stop or threading.Event()
+    halt = threading.Event()
+    batches: queue.Queue = queue.Queue(maxsize=prefetch)
+    fetcher = threading.Thread(
+        target=_fetch_batches,
+        args=(fetch, batches, halt),
+        kwargs={"after": after, "fetch_size": fetch_size, "limit": limit},
+        name="ban-fetch",
+        daemon=True,
+    )
+    totals: Counter = Counter()
+    pending = {}
+    # Batch number -> [slices left to write, its last ref_id, the batch].
+    open_batches: dict[int, list] = {}
+    order: deque = deque()
+    exhausted = False
+    number = 0
+
+    def finished(number: int) -> None:
+        open_batches[number][0] = 0
+        while order and open_batches[order[0]][0] == 0:
+            done = order.popleft()
+            _, last_id, batch = open_batches.pop(done)
+            totals["batches"] += 1
+            if checkpoint is not None:
+                checkpoint(last_id)
+            if on_batch is not None:
+                on_batch(done, batch, totals)
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ban")
+    fetcher.start()
+    try:
+        while True:
+            while not exhausted and not stop.is_set() and len(open_batches) < window:
+                try:
+                    batch = batches.get(block=not pending, timeout=0.1)
+                except queue.Empty:
+                    break
+                if batch is None:
+                    exhausted = True
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                number += 1
+                totals["read"] += len(batch)
+                requests, write = prepare(batch)
+                requests = [request for request in requests if not request.empty]
+                open_batches[number] = [len(requests), str(batch["ref_id"].iloc[-1]), batch]
+                order.append(number)
+                for request in requests:
+                    pending[pool.submit(geocode, request)] = (number, write)
+                if not requests:
+                    finished(number)
+            if not pending:
+                if exhausted or stop.is_set():
+                    break
+                continue
+
+            # With room for another batch, look for one as it is fetched.
+            room = not exhausted and not stop.is_set() and len(open_batches) < window
+            done, _ = wait(
+                pending, timeout=0.05 if room else None, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                number_done, write = pending.pop(future)
+                totals.update(write(future.result()))
+                totals["slices"] += 1
+                open_batches[number_done][0] -= 1
+                if open_batches[number_done][0] == 0:
+                    finished(number_done)
+    finally:
+        halt.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        fetcher.join()
+    return totals
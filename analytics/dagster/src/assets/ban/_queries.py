@@ -7,8 +7,11 @@ Candidate selection rules:
 - Stale low score: score < 1 AND last_updated_at < now() - ttl_low_score.
 - Healthy (ban_id NOT NULL AND score = 1): never retry.
 
-ORDER BY id + LIMIT gives stable pagination: each upsert refreshes
-last_updated_at so processed rows exit the predicate naturally.
+Keyset pagination (`id > after_id`, ORDER BY id + LIMIT) reads ahead while
+earlier chunks are still being geocoded, and steps over the chunks whose BAN
+requests failed: the predicate still holds for them, so the next run
+retries them. Each upsert refreshes last_updated_at so processed rows exit
+the predicate.
 """
 
 OWNERS_DAILY_SQL = """
@@ -17,7 +20,8 @@ SELECT o.id AS ref_id,
 FROM owners o
 LEFT JOIN ban_addresses ba
   ON ba.ref_id = o.id AND ba.address_kind = 'Owner'
-WHERE o.address_dgfip IS NOT NULL
+WHERE o.id > %(after_id)s::uuid
+  AND o.address_dgfip IS NOT NULL
   AND (
     ba.ref_id IS NULL
     OR (ba.ban_id IS NULL AND ba.score = 1)
@@ -41,7 +45,8 @@ SELECT fh.id AS ref_id,
 FROM fast_housing fh
 LEFT JOIN ban_addresses ba
   ON ba.ref_id = fh.id AND ba.address_kind = 'Housing'
-WHERE fh.address_dgfip IS NOT NULL
+WHERE fh.id > %(after_id)s::uuid
+  AND fh.address_dgfip IS NOT NULL
   AND (
     ba.ref_id IS NULL
     OR (
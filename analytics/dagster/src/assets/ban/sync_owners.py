@@ -5,6 +5,11 @@ Replaces the legacy trio:
   - populate_missing_ban_addresses_for_owners
   - process_and_update_edited_owners
 
+Candidates are read by keyset and geocoded by up to `max_concurrency` BAN
+requests at once (see _pipeline.py); a single writer upserts each response.
+With geocoder="local", the BAN export is tried first and only the rows it
+leaves not found or below local_min_score go to the API (see _local.py).
+
 Idempotent: each upserted row refreshes last_updated_at and exits the predicate.
 Not-found rows get a sentinel (ban_id=NULL, score=0) so they aren't retried
 until the TTL elapses.
@@ -12,7 +17,10 @@ until the TTL elapses.
 import pandas as pd
 from dagster import AssetExecutionContext, MetadataValue, Output, asset
 
-from ._client import BanApiFatalError, call_ban_api
+from ._cache import DeduplicatedBatch, GeocodeCache
+from ._client import AdaptiveConcurrency, BanApiFatalError, call_ban_api_adaptive
+from ._local import LocalGeocoder, LocalThenApi, parse_departments
+from ._pipeline import run_pipeline
 from ._queries import OWNERS_DAILY_SQL
 from ._upsert import copy_upsert, create_temp_table, prepare_not_found, prepare_valid
 
@@ -27,58 +35,112 @@ from ._upsert import copy_upsert, create_temp_table, prepare_not_found, prepare_
 )
 def sync_owners_ban_addresses(context: AssetExecutionContext):
     config = context.resources.ban_config
-    chunk = config.chunk_size
     cap = config.daily_max_records
-    total_ok = total_nf = total_failed = total_processed = 0
-    batch = 1
+    concurrency = AdaptiveConcurrency(config.max_concurrency)
 
     with context.resources.psycopg2_connection as conn, conn.cursor() as cursor:
         create_temp_table(cursor)
-        while total_processed < cap:
-            limit = min(chunk, cap - total_processed)
-            df = pd.read_sql_query(
+        geocode_cache = None
+        if config.geocode_cache:
+            geocode_cache = GeocodeCache(
+                cursor,
+                ttl_not_found_days=config.ttl_not_found_days,
+                ttl_low_score_days=config.ttl_low_score_days,
+            )
+            geocode_cache.create_table()
+        conn.commit()
+
+        def read(after_id, limit):
+            return pd.read_sql_query(
                 OWNERS_DAILY_SQL,
                 conn,
                 params={
                     "ttl_not_found": config.ttl_not_found_days,
                     "ttl_low_score": config.ttl_low_score_days,
+                    "after_id": after_id,
                     "limit": limit,
                 },
             )
-            if df.empty:
-                context.log.info("No more owner candidates — done.")
-                break
-
-            try:
-                api = call_ban_api(df, config.api_url)
-            except BanApiFatalError as e:
-                context.log.error(f"batch {batch} fatal BAN error: {e}")
-                raise
-            except Exception as e:
-                context.log.error(f"batch {batch} BAN failed after retries: {e}")
-                total_failed += len(df)
-                batch += 1
-                continue
-
-            valid = prepare_valid(api, "Owner")
-            nf = prepare_not_found(api, "Owner")
-            ok_count = copy_upsert(cursor, valid)
-            nf_count = copy_upsert(cursor, nf)
-            conn.commit()
-
-            total_ok += ok_count
-            total_nf += nf_count
-            total_processed += len(df)
+
+        def prepare(chunk):
+            batch = DeduplicatedBatch(chunk, geocode_cache)
+
+            def write(api):
+                out, stats = batch.resolve(api)
+                ok_count = copy_upsert(cursor, prepare_valid(out, "Owner"))
+                nf_count = copy_upsert(cursor, prepare_not_found(out, "Owner"))
+                conn.commit()
+                stats.pop("dedup_ratio")
+                return {"ok": ok_count, "not_found": nf_count, **stats}
+
+            return batch.request, write
+
+        def call_api(request):
+            return call_ban_api_adaptive(
+                request,
+                config.api_url,
+                concurrency,
+                max_attempts=config.max_attempts,
+                max_wait=config.retry_max_wait,
+            )
+
+        geocode = call_api
+        if config.geocoder == "local":
+            geocode = LocalThenApi(
+                LocalGeocoder.load(
+                    config.local_addresses_dir,
+                    parse_departments(config.local_departments),
+                ),
+                call_api,
+                min_score=config.local_min_score,
+            )
+            context.log.info(f"Local BAN index: {len(geocode.local.numbers)} addresses")
+
+        def on_batch(number, chunk, counts, totals):
             context.log.info(
-                f"batch {batch}: in={len(df)} ok={ok_count} not_found={nf_count} "
-                f"processed_total={total_processed}/{cap}"
+                f"batch {number}: in={len(chunk)} ok={counts['ok']} "
+                f"not_found={counts['not_found']} addresses={counts['addresses']} "
+                f"cache_hits={counts['cache_hits']} geocoded={counts['geocoded']} "
+                f"concurrency={concurrency.limit} read_total={totals['read']}/{cap}"
             )
-            batch += 1
 
+        def on_error(number, chunk, error):
+            if isinstance(error, BanApiFatalError):
+                context.log.error(f"batch {number} fatal BAN error: {error}")
+                raise error
+            context.log.error(f"batch {number} BAN failed after retries: {error}")
+
+        totals = run_pipeline(
+            read,
+            prepare,
+            geocode,
+            window=config.max_concurrency,
+            chunk_size=config.chunk_size,
+            cap=cap,
+            on_batch=on_batch,
+            on_error=on_error,
+        )
+        if totals["read"] < cap:
+            context.log.info("No more owner candidates — done.")
+
+    # Rows answered by each backend; all by the API unless geocoder="local".
+    backends = geocode.counts if config.geocoder == "local" else {"api": totals["geocoded"]}
+    local_rows, api_rows = backends.get("local", 0), backends.get("api", 0)
+    total_ok, total_nf, total_failed = (
+        totals["ok"],
+        totals["not_found"],
+        totals["failed"],
+    )
     summary = (
         f"{total_ok} ok, {total_nf} not_found, {total_failed} failed "
-        f"(processed {total_processed}, cap {cap})"
+        f"(read {totals['read']}, cap {cap}); "
+        f"{totals['addresses']} distinct addresses, {totals['cache_hits']} cached, "
+        f"{totals['api_rows_saved']} rows not sent to BAN; "
+        f"{local_rows} geocoded locally, {api_rows} by the API; "
+        f"{concurrency.throttled} throttled requests, "
+        f"final concurrency {concurrency.limit}/{config.max_concurrency}"
     )
+    dedup_ratio = 1 - totals["addresses"] / totals["rows"] if totals["rows"] else 0.0
     context.log.info(summary)
     return Output(
         value={"ok": total_ok, "not_found": total_nf, "failed": total_failed},
@@ -87,5 +149,12 @@ def sync_owners_ban_addresses(context: AssetExecutionContext):
             "ok": MetadataValue.int(total_ok),
             "not_found": MetadataValue.int(total_nf),
             "failed": MetadataValue.int(total_failed),
+            "distinct_addresses": MetadataValue.int(totals["addresses"]),
+            "cache_hits": MetadataValue.int(totals["cache_hits"]),
+            "api_rows_saved": MetadataValue.int(totals["api_rows_saved"]),
+            "dedup_ratio": MetadataValue.float(dedup_ratio),
+            "throttled_requests": MetadataValue.int(concurrency.throttled),
+            "local_rows": MetadataValue.int(local_rows),
+            "api_rows": MetadataValue.int(api_rows),
         },
     )
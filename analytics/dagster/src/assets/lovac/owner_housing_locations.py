@@ -149,6 +149,17 @@ LOVAC_SCOPE_CONFIG = {
         description="Required opt-in for a full cohort run without establishment/geo_codes.",
     ),
 }
+COUNTRY_CACHE_CONFIG = {
+    "country_cache_path": Field(
+        String,
+        default_value="",
+        description=(
+            "Optional SQLite file caching owner address countries across runs. "
+            "The backfill fills it for unmatched addresses, the location run "
+            "reads and extends it."
+        ),
+    ),
+}
 
 
 @asset(
@@ -159,6 +170,7 @@ LOVAC_SCOPE_CONFIG = {
     ),
     config_schema={
         **LOVAC_SCOPE_CONFIG,
+        **COUNTRY_CACHE_CONFIG,
         "dry_run": Field(Bool, default_value=True),
         "rebuild_targets": Field(
             Bool,
@@ -214,6 +226,8 @@ def lovac_owner_ban_backfill(context: AssetExecutionContext):
         command.extend(["--geo-code", geo_code])
     if config["rebuild_targets"]:
         command.extend(["--rebuild-targets", "--reset"])
+    if config["country_cache_path"]:
+        command.extend(["--country-cache", config["country_cache_path"]])
 
     context.log.info("Running %s", " ".join(command))
     result = subprocess.run(
@@ -255,11 +269,45 @@ def lovac_owner_ban_backfill(context: AssetExecutionContext):
     ),
     config_schema={
         **LOVAC_SCOPE_CONFIG,
+        **COUNTRY_CACHE_CONFIG,
         "dry_run": Field(Bool, default_value=True),
         "force": Field(Bool, default_value=False),
+        "incremental": Field(
+            Bool,
+            default_value=False,
+            description=(
+                "Also recalculate the pairs whose owner or housing BAN address "
+                "changed since the last forced or incremental run of the scope."
+            ),
+        ),
         "limit": Field(Int, default_value=0, description="0 means no limit."),
         "batch_size": Field(Int, default_value=50_000),
         "num_workers": Field(Int, default_value=1),
+        "classify_workers": Field(Int, default_value=1),
+        "materialize_scope": Field(
+            Bool,
+            default_value=True,
+            description=(
+                "Copy the scoped pairs and their BAN addresses once into a "
+                "temporary table, instead of querying the scope for every page."
+            ),
+        ),
+        "shard_workers": Field(
+            Int,
+            default_value=0,
+            description=(
+                "Processes running the scope split by department. "
+                "0 runs it as a single shard."
+            ),
+        ),
+        "shards": Field(
+            [String],
+            default_value=[],
+            description=(
+                "Only run these department shards, for example the failed "
+                "shards of a previous sharded run."
+            ),
+        ),
     },
     required_resource_keys={"psycopg2_connection"},
 )
@@ -294,9 +342,15 @@ def lovac_owner_housing_locations(
             allow_full_year=config["allow_full_year"],
             limit=limit,
             force=config["force"],
+            incremental=config["incremental"],
             dry_run=config["dry_run"],
             batch_size=config["batch_size"],
             num_workers=config["num_workers"],
+            classify_workers=config["classify_workers"],
+            country_cache_path=config["country_cache_path"] or None,
+            shard_workers=config["shard_workers"],
+            shards=config["shards"],
+            materialize_scope=config["materialize_scope"],
         )
     except LocationComputationError as error:
         report_dict = error.report.to_dict()
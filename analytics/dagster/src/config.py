@@ -68,6 +68,33 @@ class Config:
     except ValueError:
         raise ValueError("BAN_DAILY_MAX_RECORDS must be an integer.")
 
+    try:
+        BAN_MAX_CONCURRENCY = int(os.environ.get("BAN_MAX_CONCURRENCY", "4"))
+    except ValueError:
+        raise ValueError("BAN_MAX_CONCURRENCY must be an integer.")
+
+    try:
+        BAN_MAX_ATTEMPTS = int(os.environ.get("BAN_MAX_ATTEMPTS", "5"))
+    except ValueError:
+        raise ValueError("BAN_MAX_ATTEMPTS must be an integer.")
+
+    try:
+        BAN_RETRY_MAX_WAIT = int(os.environ.get("BAN_RETRY_MAX_WAIT", "60"))
+    except ValueError:
+        raise ValueError("BAN_RETRY_MAX_WAIT must be an integer.")
+
+    # "api" or "local": geocode against the BAN export in
+    # BAN_LOCAL_ADDRESSES_DIR first, for the comma-separated
+    # BAN_LOCAL_DEPARTMENTS (all files there if empty), the API only for
+    # the rows scored below BAN_LOCAL_MIN_SCORE.
+    BAN_GEOCODER = os.environ.get("BAN_GEOCODER", "api")
+    BAN_LOCAL_ADDRESSES_DIR = os.environ.get("BAN_LOCAL_ADDRESSES_DIR", "")
+    BAN_LOCAL_DEPARTMENTS = os.environ.get("BAN_LOCAL_DEPARTMENTS", "")
+    try:
+        BAN_LOCAL_MIN_SCORE = float(os.environ.get("BAN_LOCAL_MIN_SCORE", "0.8"))
+    except ValueError:
+        raise ValueError("BAN_LOCAL_MIN_SCORE must be a number.")
+
 public_tables = [
     "marts_public_establishments_morphology",
     "marts_public_establishments_morphology_unpivoted",
@@ -9,24 +9,48 @@ used as an unbounded production backfill.
 from __future__ import annotations
 
 import argparse
+import io
 import json
 import logging
 import math
+import multiprocessing
 import os
+import queue
+import sqlite3
 import sys
-from collections import Counter
-from dataclasses import asdict, dataclass, field
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime
 from math import asin, cos, radians, sin, sqrt
 from typing import Optional
 
+import numpy as np
 import psycopg2
-from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 from tqdm import tqdm
 
+from . import geography
+from .country_cache import CountryCache, detect_country
 from .country_detector import CountryDetector
 
 ACTIVE_OWNER_MIN_RANK = 1
 ZERO_KEY = (None, None, None)
+UPDATE_BATCH_SIZE = 10_000
+# Pages fetched with their address data ahead of classification.
+PIPELINE_DEPTH = 2
 MISSING_PAIR_DATA_STAT = {
     (False, False): "missing_both_data",
     (False, True): "missing_owner_data",
@@ -38,6 +62,9 @@ PAIR_COORDINATE_STAT = {
     (False, True): "pairs_with_housing_coords_only",
     (False, False): "pairs_with_no_coords",
 }
+# Country codes of `PairBatch.owner_country` and `PairBatch.housing_country`.
+FRANCE, FOREIGN, UNKNOWN = 0, 1, 2
+COUNTRY_CODES = {"FRANCE": FRANCE, "FOREIGN": FOREIGN, "UNKNOWN": UNKNOWN}
 # A postal code is not a commune code. Older BAN rows predate `city_code`,
 # but their structured identifier starts with the commune code.
 OWNER_CITY_CODE_SQL = """
@@ -50,12 +77,61 @@ CASE
 END
 """
 
+# The scoped candidate pairs of a run and their BAN addresses, materialized
+# once in a temporary table of the read connection.
+SCOPE_TABLE = "owner_housing_location_scope"
+# Location results are copied into a session temporary table, which is
+# unlogged and private to the pooled connection, then applied in one UPDATE.
+LOCATION_STAGING_SQL = """
+SET synchronous_commit = off;
+CREATE TEMP TABLE IF NOT EXISTS owners_housing_location_updates (
+  owner_id uuid NOT NULL,
+  housing_id uuid NOT NULL,
+  housing_geo_code text NOT NULL,
+  distance integer,
+  classification integer NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+# The start of the last complete forced or incremental run of a scope: every
+# pair of the scope was computed from the BAN addresses as of that time. The
+# whole cohort has the scope key "{}". Times are UTC, like
+# ban_addresses.last_updated_at.
+WATERMARK_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS owner_housing_location_watermarks (
+  data_file_year text NOT NULL,
+  scope_key text NOT NULL,
+  computed_at timestamp NOT NULL,
+  PRIMARY KEY (data_file_year, scope_key)
+)
+"""
+LOCATION_UPDATE_SQL = """
+UPDATE owners_housing AS oh
+SET
+  locprop_distance_ban = data.distance,
+  locprop_relative_ban = data.classification
+FROM owners_housing_location_updates AS data
+WHERE oh.owner_id = data.owner_id
+  AND oh.housing_id = data.housing_id
+  AND oh.housing_geo_code = data.housing_geo_code
+"""
+
 
 @dataclass(frozen=True)
 class LocationScope:
     data_file_year: str
     establishment_id: str | None = None
     geo_codes: tuple[str, ...] = ()
+    # Half-open [low, high) bounds on the housing geo code, None unbounded.
+    geo_code_range: tuple[str | None, str | None] = (None, None)
+    # Also select the pairs whose owner or housing BAN address was updated
+    # after this UTC time, on top of the pairs without a classification.
+    changed_since: datetime | None = None
+
+    @property
+    def narrowed(self) -> bool:
+        return bool(
+            self.establishment_id or self.geo_codes or any(self.geo_code_range)
+        )
 
 
 @dataclass
@@ -71,11 +147,55 @@ class LocationComputationReport:
     errors: int = 0
     classification_counts: dict[str, int] = field(default_factory=dict)
     stats: dict[str, int] = field(default_factory=dict)
+    country_cache: dict = field(default_factory=dict)
+    shards: list[dict] = field(default_factory=list)
+    scope_table: dict = field(default_factory=dict)
+    watermark: str | None = None
 
     def to_dict(self) -> dict:
         return asdict(self)
 
 
+@dataclass(frozen=True)
+class PairBatch:
+    """Owner-housing pairs as columns, one element per pair.
+
+    Strings are object arrays holding "" when the value is missing and
+    coordinates are NaN when the address has no usable ones. Countries are
+    `COUNTRY_CODES` of the address alone; `housing_geo_code` is the pair's
+    geo code, which makes the housing French.
+    """
+
+    owner_present: np.ndarray
+    housing_present: np.ndarray
+    owner_lat: np.ndarray
+    owner_lon: np.ndarray
+    housing_lat: np.ndarray
+    housing_lon: np.ndarray
+    owner_postal: np.ndarray
+    housing_postal: np.ndarray
+    owner_geo_code: np.ndarray
+    housing_geo_code: np.ndarray
+    owner_ban_id: np.ndarray
+    housing_ban_id: np.ndarray
+    owner_country: np.ndarray
+    housing_country: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.owner_present)
+
+
+def haversine_distances(
+    lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray
+) -> np.ndarray:
+    """Vectorized `DistanceCalculator.haversine_distance`, in kilometers."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 6371 * 2 * np.arcsin(np.sqrt(a))
+
+
 class LocationComputationError(RuntimeError):
     """Fatal location-computation error with its partial execution report."""
 
@@ -84,14 +204,106 @@ class LocationComputationError(RuntimeError):
         self.report = report
 
 
+def _scope_dict(scope: LocationScope) -> dict:
+    values = {
+        "data_file_year": scope.data_file_year,
+        "establishment_id": scope.establishment_id,
+        "geo_codes": list(scope.geo_codes),
+    }
+    if any(scope.geo_code_range):
+        values["geo_code_range"] = list(scope.geo_code_range)
+    if scope.changed_since is not None:
+        values["changed_since"] = scope.changed_since.isoformat(sep=" ")
+    return values
+
+
+def _candidate_sql(
+    force: bool,
+    changed_since: datetime | None,
+    params: dict,
+    ban_joined: bool = False,
+) -> str | None:
+    """The pair clause of the pairs a run computes, None when forced.
+
+    Pairs without a usable classification, and with `changed_since` the
+    pairs whose owner or housing BAN address was updated after it. With
+    `ban_joined`, the query joins the addresses as `ba` and `bh`.
+    """
+    if force:
+        return None
+    clauses = ["oh.locprop_relative_ban IS NULL", "oh.locprop_relative_ban = 7"]
+    if changed_since is not None:
+        params["changed_since"] = changed_since
+        if ban_joined:
+            clauses += [
+                "ba.last_updated_at > %(changed_since)s",
+                "bh.last_updated_at > %(changed_since)s",
+            ]
+        else:
+            clauses += [
+                f"""EXISTS (
+            SELECT 1
+            FROM ban_addresses ba
+            WHERE ba.ref_id = oh.{ref_column}
+              AND ba.address_kind = '{address_kind}'
+              AND ba.last_updated_at > %(changed_since)s
+          )"""
+                for ref_column, address_kind in (
+                    ("owner_id", "Owner"),
+                    ("housing_id", "Housing"),
+                )
+            ]
+    return "(" + " OR ".join(clauses) + ")"
+
+
+def _update_batches(
+    updates: list[dict], db_url: str, first_batch_id: int = 0
+) -> list[tuple[int, list[dict], str]]:
+    return [
+        (
+            first_batch_id + i // UPDATE_BATCH_SIZE,
+            updates[i : i + UPDATE_BATCH_SIZE],
+            db_url,
+        )
+        for i in range(0, len(updates), UPDATE_BATCH_SIZE)
+    ]
+
+
+def _distance_meters(distance: float | None) -> int | None:
+    if distance is None or (
+        isinstance(distance, float) and (math.isnan(distance) or math.isinf(distance))
+    ):
+        return None
+    return int(round(distance * 1000))
+
+
+def _location_copy_buffer(batch: list[dict]) -> io.StringIO:
+    """Location updates as COPY text rows of the staging table."""
+    buffer = io.StringIO()
+    for update in batch:
+        distance = _distance_meters(update["distance"])
+        buffer.write(
+            "\t".join(
+                (
+                    update["owner_id"],
+                    update["housing_id"],
+                    update["housing_geo_code"],
+                    "\\N" if distance is None else str(distance),
+                    str(update["classification"]),
+                )
+            )
+            + "\n"
+        )
+    buffer.seek(0)
+    return buffer
+
+
 def _execute_update_batches(calculator, batches: list[tuple], num_workers: int):
     if num_workers <= 1:
         for batch in tqdm(batches, desc="Saving to database", unit="batch"):
             yield batch, calculator._update_batch_worker(batch), None
         return
 
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-
     with tqdm(
         total=sum(len(batch[1]) for batch in batches),
         desc="Saving to database",
@@ -107,6 +319,172 @@ def _execute_update_batches(calculator, batches: list[tuple], num_workers: int):
                 yield batch, future.result(), progress
 
 
+_END_OF_PAGES = object()
+
+
+def _produce_pages(
+    pages: Iterator[tuple[list[dict], dict]], out: queue.Queue, stop: threading.Event
+) -> None:
+    """Put every page, then `_END_OF_PAGES` or the fetch error, on `out`.
+
+    Blocks while `out` is full and gives up once `stop` is set.
+    """
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for page in pages:
+            if not put(page):
+                return
+    except BaseException as error:
+        put(error)
+        return
+    put(_END_OF_PAGES)
+
+
+class _UpdateTally:
+    """Update batches being written during a run, and their accounting.
+
+    Failed batches are counted in `stats["errors"]` by row, as in
+    `DistanceCalculator.update_database`.
+    """
+
+    def __init__(self, calculator, report: LocationComputationReport, progress) -> None:
+        self.calculator = calculator
+        self.report = report
+        self.progress = progress
+        self.in_flight: dict[Future, tuple] = {}
+        self.next_batch_id = 0
+        self.updated = 0
+        self.failed = 0
+
+    def submit(
+        self, executor: ThreadPoolExecutor, updates: list[dict], max_in_flight: int
+    ) -> None:
+        for batch in _update_batches(
+            updates, self.calculator.db_url, self.next_batch_id
+        ):
+            self.wait_below(max_in_flight)
+            self.in_flight[
+                executor.submit(self.calculator._update_batch_worker, batch)
+            ] = batch
+            self.next_batch_id += 1
+
+    def wait_below(self, limit: int, raise_errors: bool = True) -> None:
+        """Wait until fewer than `limit` batches are in flight.
+
+        After a failed batch, waits for all of them and raises.
+        """
+        while len(self.in_flight) >= limit or (self.failed and self.in_flight):
+            done, _ = wait(self.in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._record(self.in_flight.pop(future), future)
+        if self.failed and raise_errors:
+            raise RuntimeError(
+                f"{self.failed:,} database update failed after "
+                f"{self.updated:,} successful updates"
+            )
+
+    def _record(self, batch: tuple, future: Future) -> None:
+        try:
+            batch_id, updated_count, error = future.result()
+        except Exception as raised:
+            batch_id, updated_count, error = batch[0], 0, str(raised)
+        if error:
+            failed_count = len(batch[1])
+            self.failed += failed_count
+            self.calculator.stats["errors"] += failed_count
+            logging.error("Error updating batch %s: %s", batch_id + 1, error)
+        else:
+            self.updated += updated_count
+            self.report.updated_pairs = self.updated
+        self.progress.update(len(batch[1]))
+
+
+def _pair_page_sql(
+    clauses: list[str],
+    params: dict,
+    *,
+    last_key: tuple[str | None, str | None, str | None],
+    batch_size: int,
+    force: bool,
+    changed_since: datetime | None = None,
+    walk_primary_key: bool = False,
+    with_count: bool = False,
+) -> str:
+    """One keyset page of scoped pairs in owners_housing primary key order.
+
+    The key is compared as (uuid, uuid, text), like the primary key. With
+    `walk_primary_key` (for a whole-year scope), a page after the first is a
+    range scan of the primary key that stops at the LIMIT, each pair being
+    checked against the housing scope by a primary key probe. As a join on
+    (id, geo_code), PostgreSQL multiplies the selectivities of two
+    correlated keys, expects a few hundred rows and sorts the whole
+    remaining scope instead; OFFSET 0 keeps the EXISTS from being turned
+    back into that join. A narrow scope keeps the join: sorting it is cheap
+    and walking the primary key to find it is not.
+    """
+    pair_clauses = [f"oh.rank >= {ACTIVE_OWNER_MIN_RANK}"]
+    candidate_sql = _candidate_sql(force, changed_since, params)
+    if candidate_sql:
+        pair_clauses.append(candidate_sql)
+    if last_key != ZERO_KEY:
+        pair_clauses.append("""(oh.owner_id, oh.housing_id, oh.housing_geo_code)
+          > (
+            %(last_owner_id)s::uuid,
+            %(last_housing_id)s::uuid,
+            %(last_housing_geo_code)s::text
+          )""")
+        params.update(
+            {
+                "last_owner_id": last_key[0],
+                "last_housing_id": last_key[1],
+                "last_housing_geo_code": last_key[2],
+            }
+        )
+    params["batch_size"] = batch_size
+
+    scope_sql = "\n              AND ".join(clauses)
+    if walk_primary_key:
+        join_sql = ""
+        pair_clauses.append(f"""EXISTS (
+            SELECT 1
+            FROM fast_housing h
+            WHERE h.id = oh.housing_id
+              AND h.geo_code = oh.housing_geo_code
+              AND {scope_sql}
+            OFFSET 0
+          )""")
+    else:
+        join_sql = """
+        JOIN fast_housing h
+          ON h.id = oh.housing_id
+         AND h.geo_code = oh.housing_geo_code"""
+        pair_clauses.extend(clauses)
+
+    where_sql = "\n          AND ".join(pair_clauses)
+    count_sql = ",\n          COUNT(*) OVER () AS candidate_count" if with_count else ""
+    return f"""
+        SELECT
+          oh.owner_id::text AS owner_id,
+          oh.housing_id::text AS housing_id,
+          oh.housing_geo_code,
+          oh.locprop_distance_ban,
+          oh.locprop_relative_ban{count_sql}
+        FROM owners_housing oh{join_sql}
+        WHERE {where_sql}
+        ORDER BY oh.owner_id, oh.housing_id, oh.housing_geo_code
+        LIMIT %(batch_size)s
+    """
+
+
 class DistanceCalculator:
     """
     Calculate distances and relative locations for owner-housing pairs.
@@ -117,15 +495,21 @@ class DistanceCalculator:
     6 owner abroad, 7 missing/other.
     """
 
-    def __init__(self, db_url: str):
+    def __init__(self, db_url: str, country_cache_path: str | None = None):
         self.db_url = db_url
         self.conn = None
         self.cursor = None
+        self.write_pool: ThreadedConnectionPool | None = None
         self.metro_regions = None
         self.overseas_regions = None
         self.country_detector = CountryDetector(model_name="rule-based", use_llm=False)
-        self.country_cache: dict[str, str] = {}
+        self.country_cache = CountryCache(
+            country_cache_path, self.country_detector.get_version()
+        )
         self.stats = self._empty_stats()
+        self._first_page: tuple[tuple, list[dict]] | None = None
+        # Rows of the run's scope table while it exists, None without one.
+        self.scope_table_rows: int | None = None
 
     @staticmethod
     def _empty_stats() -> dict[str, int]:
@@ -161,27 +545,12 @@ class DistanceCalculator:
             self.cursor.close()
         if self.conn:
             self.conn.close()
+        self.scope_table_rows = None
+        self._close_write_pool()
 
     def detect_country_simple(self, address: str | None) -> str:
         """Detect whether an address is French, foreign, or unknown."""
-        if not address or not str(address).strip():
-            return "UNKNOWN"
-        normalized = str(address).strip()
-        if normalized.lower() in ["nan", "null", "none"]:
-            return "UNKNOWN"
-        if normalized in self.country_cache:
-            return self.country_cache[normalized]
-
-        try:
-            result = self.country_detector.detect_country(normalized)
-        except Exception as error:
-            logging.debug("Country detection error for '%s': %s", normalized, error)
-            result = "UNKNOWN"
-        if result not in {"FRANCE", "FOREIGN", "UNKNOWN"}:
-            result = "UNKNOWN"
-
-        self.country_cache[normalized] = result
-        return result
+        return detect_country(address, self.country_detector, self.country_cache)
 
     def _scope_sql(self, scope: LocationScope) -> tuple[list[str], dict]:
         clauses = ["h.data_file_years @> ARRAY[%(data_file_year)s]::text[]"]
@@ -206,16 +575,50 @@ class DistanceCalculator:
             clauses.append("h.geo_code = ANY(%(geo_codes)s::text[])")
             params["geo_codes"] = list(scope.geo_codes)
 
+        low, high = scope.geo_code_range
+        if low is not None:
+            clauses.append("h.geo_code >= %(geo_code_low)s")
+            params["geo_code_low"] = low
+        if high is not None:
+            clauses.append("h.geo_code < %(geo_code_high)s")
+            params["geo_code_high"] = high
+
         return clauses, params
 
     def count_owner_housing_pairs(
-        self, scope: LocationScope, force: bool = False
+        self,
+        scope: LocationScope,
+        force: bool = False,
+        first_page_size: int | None = None,
     ) -> int:
-        clauses, params = self._scope_sql(scope)
-        if not force:
-            clauses.append(
-                "(oh.locprop_relative_ban IS NULL OR oh.locprop_relative_ban = 7)"
+        """Count the scoped candidate pairs.
+
+        With `first_page_size`, the first page is read by the same scan and
+        kept for the next `fetch_owner_housing_pair_batch` from the start.
+        """
+        if first_page_size is not None:
+            clauses, params = self._scope_sql(scope)
+            query = _pair_page_sql(
+                clauses,
+                params,
+                last_key=ZERO_KEY,
+                batch_size=first_page_size,
+                force=force,
+                changed_since=scope.changed_since,
+                with_count=True,
             )
+            self.cursor.execute(query, params)
+            rows = [dict(row) for row in self.cursor.fetchall()]
+            count = rows[0].pop("candidate_count") if rows else 0
+            for row in rows[1:]:
+                del row["candidate_count"]
+            self._first_page = ((scope, force, first_page_size), rows)
+            return int(count)
+
+        clauses, params = self._scope_sql(scope)
+        candidate_sql = _candidate_sql(force, scope.changed_since, params)
+        if candidate_sql:
+            clauses.append(candidate_sql)
 
         where_sql = "\nAND ".join(clauses)
         query = f"""
@@ -238,43 +641,173 @@ class DistanceCalculator:
         force: bool = False,
     ) -> list[dict]:
         clauses, params = self._scope_sql(scope)
-        if not force:
-            clauses.append(
-                "(oh.locprop_relative_ban IS NULL OR oh.locprop_relative_ban = 7)"
-            )
-        if last_key != ZERO_KEY:
-            clauses.append("""
-                (oh.owner_id::text, oh.housing_id::text, oh.housing_geo_code)
-                > (%(last_owner_id)s, %(last_housing_id)s, %(last_housing_geo_code)s)
-                """)
-            params.update(
-                {
-                    "last_owner_id": last_key[0],
-                    "last_housing_id": last_key[1],
-                    "last_housing_geo_code": last_key[2],
-                }
-            )
-        params["batch_size"] = batch_size
+        query = _pair_page_sql(
+            clauses,
+            params,
+            last_key=last_key,
+            batch_size=batch_size,
+            force=force,
+            changed_since=scope.changed_since,
+            walk_primary_key=not scope.narrowed,
+        )
+        self.cursor.execute(query, params)
+        return list(self.cursor.fetchall())
 
-        where_sql = "\nAND ".join(clauses)
-        query = f"""
+    def materialize_scope(self, scope: LocationScope, force: bool = False) -> int:
+        """Copy the scoped candidate pairs into `SCOPE_TABLE` and count them.
+
+        The table is a temporary table of the read connection, keyed like
+        owners_housing, and holds each pair's owner and housing BAN
+        addresses. The scope subqueries and the address lookups are then
+        evaluated once per run: `fetch_scope_table_page` reads the pages
+        from it by primary key range.
+        """
+        clauses, params = self._scope_sql(scope)
+        candidate_sql = _candidate_sql(
+            force, scope.changed_since, params, ban_joined=True
+        )
+        if candidate_sql:
+            clauses.append(candidate_sql)
+        where_sql = "\n              AND ".join(clauses)
+        self.cursor.execute(f"DROP TABLE IF EXISTS {SCOPE_TABLE}")
+        self.cursor.execute(
+            f"""
+            CREATE TEMP TABLE {SCOPE_TABLE} AS
             SELECT
-              oh.owner_id::text AS owner_id,
-              oh.housing_id::text AS housing_id,
+              oh.owner_id,
+              oh.housing_id,
               oh.housing_geo_code,
               oh.locprop_distance_ban,
-              oh.locprop_relative_ban
+              oh.locprop_relative_ban,
+              ba.ref_id IS NOT NULL AS owner_found,
+              ba.postal_code AS owner_postal_code,
+              ba.address AS owner_address,
+              ba.latitude AS owner_latitude,
+              ba.longitude AS owner_longitude,
+              {OWNER_CITY_CODE_SQL} AS owner_geo_code,
+              ba.ban_id AS owner_ban_id,
+              bh.ref_id IS NOT NULL AS housing_found,
+              bh.postal_code AS housing_postal_code,
+              bh.address AS housing_address,
+              bh.latitude AS housing_latitude,
+              bh.longitude AS housing_longitude,
+              bh.ban_id AS housing_ban_id
             FROM owners_housing oh
             JOIN fast_housing h
               ON h.id = oh.housing_id
              AND h.geo_code = oh.housing_geo_code
+            LEFT JOIN ban_addresses ba
+              ON ba.ref_id = oh.owner_id AND ba.address_kind = 'Owner'
+            LEFT JOIN ban_addresses bh
+              ON bh.ref_id = oh.housing_id AND bh.address_kind = 'Housing'
             WHERE oh.rank >= {ACTIVE_OWNER_MIN_RANK}
               AND {where_sql}
-            ORDER BY oh.owner_id, oh.housing_id, oh.housing_geo_code
-            LIMIT %(batch_size)s
-        """
-        self.cursor.execute(query, params)
-        return list(self.cursor.fetchall())
+            """,
+            params,
+        )
+        rows = self.cursor.rowcount
+        self.cursor.execute(
+            f"""
+            ALTER TABLE {SCOPE_TABLE}
+              ADD PRIMARY KEY (owner_id, housing_id, housing_geo_code);
+            ANALYZE {SCOPE_TABLE}
+            """
+        )
+        self.scope_table_rows = rows
+        return rows
+
+    def fetch_scope_table_page(
+        self,
+        last_key: tuple[str | None, str | None, str | None] = ZERO_KEY,
+        batch_size: int = 50_000,
+    ) -> tuple[list[dict], dict]:
+        """The next page of `SCOPE_TABLE` after `last_key`, with its
+        `batch_get_address_data` cache."""
+        key_sql = ""
+        params: dict = {"batch_size": batch_size}
+        if last_key != ZERO_KEY:
+            key_sql = """
+            WHERE (s.owner_id, s.housing_id, s.housing_geo_code)
+              > (
+                %(last_owner_id)s::uuid,
+                %(last_housing_id)s::uuid,
+                %(last_housing_geo_code)s::text
+              )"""
+            params.update(
+                {
+                    "last_owner_id": last_key[0],
+                    "last_housing_id": last_key[1],
+                    "last_housing_geo_code": last_key[2],
+                }
+            )
+        # Tuple rows: a dict per row costs more than the page query itself.
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT
+                  s.owner_id::text AS owner_id,
+                  s.housing_id::text AS housing_id,
+                  s.housing_geo_code,
+                  s.locprop_distance_ban,
+                  s.locprop_relative_ban,
+                  s.owner_found,
+                  s.owner_postal_code,
+                  s.owner_address,
+                  s.owner_latitude,
+                  s.owner_longitude,
+                  s.owner_geo_code,
+                  s.owner_ban_id,
+                  s.housing_found,
+                  s.housing_postal_code,
+                  s.housing_address,
+                  s.housing_latitude,
+                  s.housing_longitude,
+                  s.housing_ban_id
+                FROM {SCOPE_TABLE} s{key_sql}
+                ORDER BY s.owner_id, s.housing_id, s.housing_geo_code
+                LIMIT %(batch_size)s
+                """,
+                params,
+            )
+            rows = cursor.fetchall()
+        pairs = []
+        address_cache = {}
+        for (
+            owner_id,
+            housing_id,
+            housing_geo_code,
+            distance,
+            relative,
+            owner_found,
+            *owner_address,
+            housing_found,
+            housing_postal_code,
+            housing_address,
+            housing_latitude,
+            housing_longitude,
+            housing_ban_id,
+        ) in rows:
+            pairs.append(
+                {
+                    "owner_id": owner_id,
+                    "housing_id": housing_id,
+                    "housing_geo_code": housing_geo_code,
+                    "locprop_distance_ban": distance,
+                    "locprop_relative_ban": relative,
+                }
+            )
+            if owner_found:
+                address_cache[(owner_id, "Owner")] = tuple(owner_address)
+            if housing_found:
+                address_cache[(housing_id, "Housing")] = (
+                    housing_postal_code,
+                    housing_address,
+                    housing_latitude,
+                    housing_longitude,
+                    None,
+                    housing_ban_id,
+                )
+        return pairs, address_cache
 
     def get_address_data(
         self,
@@ -531,6 +1064,189 @@ class DistanceCalculator:
 
         return distance, classification
 
+    def _address_columns(
+        self,
+        ref_ids: list[str],
+        address_kind: str,
+        address_cache: dict,
+        *,
+        country: bool = False,
+    ) -> dict[str, np.ndarray]:
+        """Gather the cached addresses of `ref_ids` into per-pair columns.
+
+        Each distinct address is unpacked (and its country detected) once,
+        then indexed by pair.
+        """
+        positions: dict[str, int] = {}
+        index = np.fromiter(
+            (positions.setdefault(ref_id, len(positions)) for ref_id in ref_ids),
+            dtype=np.intp,
+            count=len(ref_ids),
+        )
+        rows = [address_cache.get((ref_id, address_kind)) for ref_id in positions]
+        has_coordinates = [self._has_coordinates(row) for row in rows]
+        columns = {
+            "present": np.array([bool(row) for row in rows], dtype=bool),
+            "lat": np.array(
+                [row[2] if has else np.nan for row, has in zip(rows, has_coordinates)],
+                dtype=np.float64,
+            ),
+            "lon": np.array(
+                [row[3] if has else np.nan for row, has in zip(rows, has_coordinates)],
+                dtype=np.float64,
+            ),
+        }
+        for name, position in (("postal", 0), ("geo_code", 4), ("ban_id", 5)):
+            columns[name] = np.array(
+                [(row[position] or "") if row else "" for row in rows], dtype=object
+            )
+        if country:
+            columns["country"] = np.array(
+                [COUNTRY_CODES[self._country_from_address_data(row)] for row in rows],
+                dtype=np.int8,
+            )
+        return {name: column[index] for name, column in columns.items()}
+
+    def build_pair_batch(self, pairs: list[dict], address_cache: dict) -> PairBatch:
+        """Columnar view of `pairs` and their `batch_get_address_data` cache."""
+        owner_ids = [pair["owner_id"] for pair in pairs]
+        housing_ids = [pair["housing_id"] for pair in pairs]
+        owner = self._address_columns(owner_ids, "Owner", address_cache, country=True)
+        housing = self._address_columns(housing_ids, "Housing", address_cache)
+        housing_geo_code = np.array(
+            [pair["housing_geo_code"] or "" for pair in pairs], dtype=object
+        )
+
+        # A housing with a geo code is French: only detect the others.
+        housing_country = np.full(len(pairs), FRANCE, dtype=np.int8)
+        for position in np.flatnonzero(housing_geo_code == ""):
+            housing_country[position] = COUNTRY_CODES[
+                self._country_from_address_data(
+                    address_cache.get((housing_ids[position], "Housing"))
+                )
+            ]
+
+        return PairBatch(
+            owner_present=owner["present"],
+            housing_present=housing["present"],
+            owner_lat=owner["lat"],
+            owner_lon=owner["lon"],
+            housing_lat=housing["lat"],
+            housing_lon=housing["lon"],
+            owner_postal=owner["postal"],
+            housing_postal=housing["postal"],
+            owner_geo_code=owner["geo_code"],
+            housing_geo_code=housing_geo_code,
+            owner_ban_id=owner["ban_id"],
+            housing_ban_id=housing["ban_id"],
+            owner_country=owner["country"],
+            housing_country=housing_country,
+        )
+
+    def classify_pair_batch(
+        self, batch: PairBatch
+    ) -> tuple[np.ndarray, np.ndarray, dict[str, int]]:
+        """Vectorized `process_single_pair` over a whole batch.
+
+        Returns the distances (NaN when not computed), the classifications
+        and the increments of `self.stats`, which it leaves untouched.
+        """
+        owner = batch.owner_present
+        housing = batch.housing_present
+        has_geo_code = batch.housing_geo_code != ""
+        # A pair with missing data is still classified from the housing geo
+        # code when the owner address exists.
+        active = owner & (housing | has_geo_code)
+        owner_coords = active & ~np.isnan(batch.owner_lat)
+        housing_coords = active & ~np.isnan(batch.housing_lat)
+        both_coords = owner_coords & housing_coords
+        coordinate_count = int(owner_coords.sum() + housing_coords.sum())
+
+        stats = {
+            "missing_both_data": int((~owner & ~housing).sum()),
+            "missing_owner_data": int((~owner & housing).sum()),
+            "missing_housing_data": int((owner & ~housing).sum()),
+            "pairs_with_both_coords": int(both_coords.sum()),
+            "pairs_with_owner_coords_only": int((owner_coords & ~housing_coords).sum()),
+            "pairs_with_housing_coords_only": int((~owner_coords & housing_coords).sum()),
+            "pairs_with_no_coords": int((active & ~owner_coords & ~housing_coords).sum()),
+            "addresses_with_coords": coordinate_count,
+            "addresses_without_coords": 2 * int(active.sum()) - coordinate_count,
+            "distances_calculated": int(both_coords.sum()),
+        }
+
+        distances = np.full(len(batch), np.nan)
+        distances[both_coords] = haversine_distances(
+            batch.owner_lat[both_coords],
+            batch.owner_lon[both_coords],
+            batch.housing_lat[both_coords],
+            batch.housing_lon[both_coords],
+        )
+
+        classifications = np.full(len(batch), 7, dtype=np.int8)
+        same_ban_id = (
+            active
+            & (batch.owner_ban_id != "")
+            & (batch.owner_ban_id == batch.housing_ban_id)
+        )
+        classifications[same_ban_id] = 0
+
+        located = active & ~same_ban_id
+        housing_country = np.where(has_geo_code, FRANCE, batch.housing_country)
+        foreign = located & (
+            (batch.owner_country == FOREIGN) | (housing_country == FOREIGN)
+        )
+        unknown = located & ~foreign & (
+            (batch.owner_country == UNKNOWN) | (housing_country == UNKNOWN)
+        )
+        france = located & ~foreign & ~unknown
+        classifications[foreign] = 6
+        stats["foreign_detected"] = int(foreign.sum())
+        stats["unknown_detected"] = int(unknown.sum())
+        stats["france_detected"] = int(france.sum())
+
+        by_postal = france & (batch.owner_postal != "") & (batch.housing_postal != "")
+        by_geo_code = (
+            france & ~by_postal & (batch.owner_geo_code != "") & has_geo_code
+        )
+        classifications[by_postal] = self._french_geographic_rules_batch(
+            batch.owner_postal[by_postal], batch.housing_postal[by_postal], postal=True
+        )
+        classifications[by_geo_code] = self._french_geographic_rules_batch(
+            batch.owner_geo_code[by_geo_code],
+            batch.housing_geo_code[by_geo_code],
+            postal=False,
+        )
+        stats["geographic_rules_applied"] = int(by_postal.sum() + by_geo_code.sum())
+
+        return distances, classifications, stats
+
+    def _french_geographic_rules_batch(
+        self, owner_codes: np.ndarray, housing_codes: np.ndarray, *, postal: bool
+    ) -> np.ndarray:
+        """Vectorized `calculate_french_geographic_rules` (postal codes) or
+        `calculate_french_geographic_rules_from_geocode` (geo codes)."""
+        codes = np.concatenate([owner_codes, housing_codes])
+        regions = (
+            geography.regions_of_postal_codes(codes)
+            if postal
+            else geography.regions_of_geo_codes(codes)
+        )
+        departments = geography.departments(codes)
+        owner_region, housing_region = np.split(regions, [len(owner_codes)])
+        owner_department, housing_department = np.split(departments, [len(owner_codes)])
+        return np.select(
+            [
+                owner_codes == housing_codes,
+                owner_department == housing_department,
+                (owner_region >= 0) & (owner_region == housing_region),
+                geography.metro_regions(owner_region),
+                geography.overseas_regions(owner_region),
+            ],
+            [1, 2, 3, 4, 5],
+            default=7,
+        ).astype(np.int8)
+
     def calculate_french_geographic_rules_from_geocode(
         self, owner_geo_code: str, housing_geo_code: str
     ) -> int:
@@ -587,22 +1303,8 @@ class DistanceCalculator:
     def load_regions(self) -> None:
         if self.metro_regions is not None and self.overseas_regions is not None:
             return
-        self.metro_regions = [
-            "11",
-            "24",
-            "27",
-            "28",
-            "32",
-            "44",
-            "52",
-            "53",
-            "75",
-            "76",
-            "84",
-            "93",
-            "94",
-        ]
-        self.overseas_regions = ["01", "02", "03", "04", "06"]
+        self.metro_regions = list(geography.METRO_REGIONS)
+        self.overseas_regions = list(geography.OVERSEAS_REGIONS)
 
     def same_region(self, postal_code1: str, postal_code2: str) -> bool:
         self.load_regions()
@@ -637,124 +1339,10 @@ class DistanceCalculator:
         return region in self.overseas_regions if region else False
 
     def get_region_from_dept(self, dept: str) -> Optional[str]:
-        if not dept:
-            return None
-
-        dept_to_region = {
-            "01": "84",
-            "02": "32",
-            "03": "84",
-            "04": "93",
-            "05": "93",
-            "06": "93",
-            "07": "84",
-            "08": "44",
-            "09": "76",
-            "10": "44",
-            "11": "76",
-            "12": "76",
-            "13": "93",
-            "14": "28",
-            "15": "84",
-            "16": "75",
-            "17": "75",
-            "18": "24",
-            "19": "75",
-            "20": "94",
-            "2A": "94",
-            "2B": "94",
-            "21": "27",
-            "22": "53",
-            "23": "75",
-            "24": "75",
-            "25": "27",
-            "26": "84",
-            "27": "28",
-            "28": "24",
-            "29": "53",
-            "30": "76",
-            "31": "76",
-            "32": "76",
-            "33": "75",
-            "34": "76",
-            "35": "53",
-            "36": "24",
-            "37": "24",
-            "38": "84",
-            "39": "27",
-            "40": "75",
-            "41": "24",
-            "42": "84",
-            "43": "84",
-            "44": "52",
-            "45": "24",
-            "46": "76",
-            "47": "75",
-            "48": "76",
-            "49": "52",
-            "50": "28",
-            "51": "44",
-            "52": "44",
-            "53": "52",
-            "54": "44",
-            "55": "44",
-            "56": "53",
-            "57": "44",
-            "58": "27",
-            "59": "32",
-            "60": "32",
-            "61": "28",
-            "62": "32",
-            "63": "84",
-            "64": "75",
-            "65": "76",
-            "66": "76",
-            "67": "44",
-            "68": "44",
-            "69": "84",
-            "70": "27",
-            "71": "27",
-            "72": "52",
-            "73": "84",
-            "74": "84",
-            "75": "11",
-            "76": "28",
-            "77": "11",
-            "78": "11",
-            "79": "75",
-            "80": "32",
-            "81": "76",
-            "82": "76",
-            "83": "93",
-            "84": "93",
-            "85": "52",
-            "86": "75",
-            "87": "75",
-            "88": "44",
-            "89": "27",
-            "90": "27",
-            "91": "11",
-            "92": "11",
-            "93": "11",
-            "94": "11",
-            "95": "11",
-            "971": "01",
-            "972": "02",
-            "973": "03",
-            "974": "04",
-            "976": "06",
-        }
-        return dept_to_region.get(dept)
+        return geography.region_of_department(dept)
 
     def get_region_from_postal_code(self, postal_code: str) -> Optional[str]:
-        if not postal_code or len(postal_code) < 2:
-            return None
-        if len(postal_code) >= 3:
-            dept3 = postal_code[:3]
-            region = self.get_region_from_dept(dept3)
-            if region:
-                return region
-        return self.get_region_from_dept(postal_code[:2])
+        return geography.region_of_postal_code(postal_code)
 
     def update_database(
         self, updates: list[dict], num_workers: int = 1, dry_run: bool = False
@@ -766,28 +1354,29 @@ class DistanceCalculator:
             return 0
 
         print("\nUpdating database...")
-        batch_size = 10_000
-        batches = [
-            (i // batch_size, updates[i : i + batch_size], self.db_url)
-            for i in range(0, len(updates), batch_size)
-        ]
+        batches = _update_batches(updates, self.db_url)
         total_updates = 0
         total_errors = 0
 
-        for batch, result, progress in _execute_update_batches(
-            self, batches, num_workers
-        ):
-            batch_id, updated_count, error = result
-            if error:
-                failed_count = len(batch[1])
-                total_errors += failed_count
-                logging.error("Error updating batch %s: %s", batch_id + 1, error)
-                if progress is not None:
-                    progress.update(failed_count)
-            else:
-                total_updates += updated_count
-                if progress is not None:
-                    progress.update(updated_count)
+        opened_pool = self._open_write_pool(num_workers)
+        try:
+            for batch, result, progress in _execute_update_batches(
+                self, batches, num_workers
+            ):
+                batch_id, updated_count, error = result
+                if error:
+                    failed_count = len(batch[1])
+                    total_errors += failed_count
+                    logging.error("Error updating batch %s: %s", batch_id + 1, error)
+                    if progress is not None:
+                        progress.update(failed_count)
+                else:
+                    total_updates += updated_count
+                    if progress is not None:
+                        progress.update(updated_count)
+        finally:
+            if opened_pool:
+                self._close_write_pool()
 
         if total_errors:
             self.stats["errors"] += total_errors
@@ -801,74 +1390,55 @@ class DistanceCalculator:
         )
         return total_updates
 
+    def _open_write_pool(self, max_connections: int) -> bool:
+        """Open the update connection pool unless one is open already.
+
+        Returns whether it was opened by this call.
+        """
+        if self.write_pool is not None:
+            return False
+        self.write_pool = ThreadedConnectionPool(0, max_connections, self.db_url)
+        return True
+
+    def _close_write_pool(self) -> None:
+        if self.write_pool is not None:
+            self.write_pool.closeall()
+            self.write_pool = None
+
     def _update_batch_worker(self, batch_data: tuple) -> tuple[int, int, str | None]:
         batch_id, batch, db_url = batch_data
+        pool = self.write_pool
         conn = None
         try:
-            conn = psycopg2.connect(db_url)
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("SET synchronous_commit = off")
-            update_data = []
-            for update in batch:
-                distance = update["distance"]
-                if distance is None or (
-                    isinstance(distance, float)
-                    and (math.isnan(distance) or math.isinf(distance))
-                ):
-                    distance_int = None
-                else:
-                    distance_int = int(round(distance * 1000))
-
-                update_data.append(
-                    (
-                        distance_int,
-                        update["classification"],
-                        update["owner_id"],
-                        update["housing_id"],
-                        update["housing_geo_code"],
-                    )
-                )
-
-            updated_rows = execute_values(
-                cursor,
-                """
-                UPDATE owners_housing AS oh
-                SET
-                  locprop_distance_ban = CASE
-                    WHEN data.distance IS NULL THEN NULL
-                    ELSE data.distance::integer
-                  END,
-                  locprop_relative_ban = data.classification::integer
-                FROM (VALUES %s) AS data(
-                  distance, classification, owner_id, housing_id, housing_geo_code
+            conn = pool.getconn() if pool is not None else psycopg2.connect(db_url)
+            with conn.cursor() as cursor:
+                cursor.execute(LOCATION_STAGING_SQL)
+                cursor.copy_expert(
+                    "COPY owners_housing_location_updates FROM STDIN",
+                    _location_copy_buffer(batch),
                 )
-                WHERE oh.owner_id = data.owner_id::uuid
-                  AND oh.housing_id = data.housing_id::uuid
-                  AND oh.housing_geo_code = data.housing_geo_code::text
-                RETURNING 1
-                """,
-                update_data,
-                page_size=1000,
-                fetch=True,
-            )
-            updated_count = len(updated_rows)
+                cursor.execute(LOCATION_UPDATE_SQL)
+                updated_count = cursor.rowcount
             if updated_count != len(batch):
                 raise RuntimeError(
                     f"Batch {batch_id + 1} expected to update {len(batch):,} "
                     f"row(s), but PostgreSQL updated {updated_count:,}."
                 )
             conn.commit()
-            cursor.close()
-            conn.close()
             return (batch_id, updated_count, None)
         except Exception as error:
             if conn:
                 try:
                     conn.rollback()
-                    conn.close()
                 except Exception:
                     pass
             return (batch_id, 0, str(error))
+        finally:
+            if conn is not None:
+                if pool is not None:
+                    pool.putconn(conn, close=bool(conn.closed))
+                else:
+                    conn.close()
 
     def _print_run_configuration(
         self,
@@ -885,6 +1455,11 @@ class DistanceCalculator:
             print(f"Establishment: {scope.establishment_id}")
         if scope.geo_codes:
             print(f"Geo codes: {', '.join(scope.geo_codes)}")
+        if any(scope.geo_code_range):
+            low, high = scope.geo_code_range
+            print(f"Geo code range: [{low or ''}, {high or ''})")
+        if scope.changed_since is not None:
+            print(f"Incremental: BAN addresses updated after {scope.changed_since}")
         if limit:
             print(f"Limit: {limit:,} pairs")
         if dry_run:
@@ -899,77 +1474,98 @@ class DistanceCalculator:
         classification_counts: Counter[int],
         report: LocationComputationReport | None = None,
     ) -> list[dict]:
-        updates = []
-        for pair in tqdm(pairs, desc="Processing pairs", unit="pair"):
-            try:
-                distance, classification = self.process_single_pair(
-                    pair["owner_id"],
-                    pair["housing_id"],
-                    address_cache,
-                    housing_geo_code=pair["housing_geo_code"],
-                )
-                classification_counts[classification] += 1
-                updates.append(
-                    {
-                        "owner_id": pair["owner_id"],
-                        "housing_id": pair["housing_id"],
-                        "housing_geo_code": pair["housing_geo_code"],
-                        "distance": distance,
-                        "classification": classification,
-                    }
-                )
-                self.stats["processed_pairs"] += 1
-                if report is not None:
-                    report.processed_pairs = self.stats["processed_pairs"]
-                    report.updates_prepared += 1
-                    report.classification_counts = {
-                        str(key): value
-                        for key, value in sorted(classification_counts.items())
-                    }
-                    report.stats = dict(self.stats)
-            except Exception as error:
-                logging.exception(
-                    "Error processing pair %s-%s: %s",
-                    pair["owner_id"],
-                    pair["housing_id"],
-                    error,
-                )
-                self.stats["errors"] += 1
-                raise
+        try:
+            classified = self._classify_page(pairs, address_cache)
+        except Exception as error:
+            self._record_classification_error(pairs, error)
+            raise
+        return self._account_pair_updates(
+            pairs, classified, classification_counts, report
+        )
+
+    def _record_classification_error(
+        self, pairs: list[dict], error: BaseException
+    ) -> None:
+        logging.exception("Error processing %s pairs: %s", len(pairs), error)
+        self.stats["errors"] += 1
+
+    def _account_pair_updates(
+        self,
+        pairs: list[dict],
+        classified: tuple[np.ndarray, np.ndarray, dict[str, int]],
+        classification_counts: Counter[int],
+        report: LocationComputationReport | None = None,
+    ) -> list[dict]:
+        distances, classifications, stats = classified
+        for key, value in stats.items():
+            self.stats[key] += value
+        classifications = classifications.tolist()
+        classification_counts.update(classifications)
+        updates = [
+            {
+                "owner_id": pair["owner_id"],
+                "housing_id": pair["housing_id"],
+                "housing_geo_code": pair["housing_geo_code"],
+                "distance": None if math.isnan(distance) else distance,
+                "classification": classification,
+            }
+            for pair, distance, classification in zip(
+                pairs, distances.tolist(), classifications
+            )
+        ]
+        self.stats["processed_pairs"] += len(updates)
+        if report is not None:
+            report.processed_pairs = self.stats["processed_pairs"]
+            report.updates_prepared += len(updates)
+            report.classification_counts = {
+                str(key): value for key, value in sorted(classification_counts.items())
+            }
+            report.stats = dict(self.stats)
         return updates
 
-    def _calculate_batches(
+    def _fetch_pages(
         self,
         scope: LocationScope,
         *,
         limit: int | None,
         force: bool,
-        dry_run: bool,
         batch_size: int,
-        num_workers: int,
-        report: LocationComputationReport,
-    ) -> tuple[int, int, int, Counter[int]]:
-        classification_counts: Counter[int] = Counter()
-        total_updated = 0
-        processed = 0
-        prepared = 0
+    ) -> Iterator[tuple[list[dict], dict]]:
+        """Yield pages of pairs in key order, each with its address data.
+
+        Pages come from the scope table when one was materialized.
+        """
+        fetched = 0
         last_key = ZERO_KEY
 
         while True:
             current_batch_size = batch_size
             if limit is not None:
-                current_batch_size = min(batch_size, limit - processed)
+                current_batch_size = min(batch_size, limit - fetched)
             if current_batch_size <= 0:
-                break
+                return
 
-            pairs = self.fetch_owner_housing_pair_batch(
-                scope,
-                last_key=last_key,
-                batch_size=current_batch_size,
-                force=force,
-            )
+            address_cache = None
+            first_page, self._first_page = self._first_page, None
+            if self.scope_table_rows is not None:
+                pairs, address_cache = self.fetch_scope_table_page(
+                    last_key, batch_size=current_batch_size
+                )
+            elif (
+                last_key == ZERO_KEY
+                and first_page is not None
+                and first_page[0] == (scope, force, current_batch_size)
+            ):
+                pairs = first_page[1]
+            else:
+                pairs = self.fetch_owner_housing_pair_batch(
+                    scope,
+                    last_key=last_key,
+                    batch_size=current_batch_size,
+                    force=force,
+                )
             if not pairs:
-                break
+                return
 
             last = pairs[-1]
             last_key = (
@@ -977,19 +1573,133 @@ class DistanceCalculator:
                 last["housing_id"],
                 last["housing_geo_code"],
             )
-            address_cache = self.batch_get_address_data(pairs)
-            updates = self._prepare_pair_updates(
-                pairs, address_cache, classification_counts, report
-            )
-            processed += len(updates)
-            prepared += len(updates)
-            total_updated += self.update_database(
-                updates, num_workers=num_workers, dry_run=dry_run
-            )
-            report.updated_pairs = total_updated
-            report.stats = dict(self.stats)
+            fetched += len(pairs)
+            if address_cache is None:
+                address_cache = self.batch_get_address_data(pairs)
+            yield pairs, address_cache
+
+    def _calculate_batches(
+        self,
+        scope: LocationScope,
+        *,
+        limit: int | None,
+        force: bool,
+        dry_run: bool,
+        batch_size: int,
+        num_workers: int,
+        report: LocationComputationReport,
+        classify_workers: int = 1,
+    ) -> tuple[int, int, int, Counter[int]]:
+        """Fetch, classify and write pages of pairs as a pipeline.
+
+        A fetch thread owns the read connection and keeps at most
+        `PIPELINE_DEPTH` pages with their address data ahead of
+        classification. Up to `classify_workers` pages are classified at a
+        time, and up to `num_workers` update batches are written at a time,
+        each on a connection of the write pool. Every stage blocks when the
+        next one is full.
+
+        Pages are accounted in key order, on this thread only. On the first
+        error nothing new is started, the writes in flight are awaited and
+        accounted, and the error is raised.
+        """
+        classification_counts: Counter[int] = Counter()
+        processed = 0
+        prepared = 0
+        pages: queue.Queue = queue.Queue(maxsize=PIPELINE_DEPTH)
+        stop = threading.Event()
+        fetcher = threading.Thread(
+            target=_produce_pages,
+            args=(
+                self._fetch_pages(
+                    scope, limit=limit, force=force, batch_size=batch_size
+                ),
+                pages,
+                stop,
+            ),
+            name="owner-housing-fetch",
+            daemon=True,
+        )
+        classifying: deque[tuple[list[dict], Future]] = deque()
+        total = report.candidate_count
+        if limit is not None:
+            total = min(limit, total)
+
+        with (
+            tqdm(total=total, desc="Locating pairs", unit="pair") as progress,
+            ThreadPoolExecutor(
+                max_workers=classify_workers,
+                thread_name_prefix="owner-housing-classify",
+            ) as classifiers,
+            ThreadPoolExecutor(
+                max_workers=num_workers, thread_name_prefix="owner-housing-write"
+            ) as writers,
+        ):
+            writes = _UpdateTally(self, report, progress)
+            if not dry_run:
+                self._open_write_pool(num_workers)
+            fetcher.start()
+            try:
+                exhausted = False
+                while True:
+                    while not exhausted and len(classifying) < classify_workers:
+                        try:
+                            page = pages.get(block=not classifying)
+                        except queue.Empty:
+                            break
+                        if page is _END_OF_PAGES:
+                            exhausted = True
+                        elif isinstance(page, BaseException):
+                            raise page
+                        else:
+                            pairs, address_cache = page
+                            classifying.append(
+                                (
+                                    pairs,
+                                    classifiers.submit(
+                                        self._classify_page, pairs, address_cache
+                                    ),
+                                )
+                            )
+                    if not classifying:
+                        break
+
+                    pairs, classification = classifying.popleft()
+                    try:
+                        classified = classification.result()
+                    except Exception as error:
+                        self._record_classification_error(pairs, error)
+                        raise
+                    updates = self._account_pair_updates(
+                        pairs, classified, classification_counts, report
+                    )
+                    processed += len(updates)
+                    prepared += len(updates)
+                    if dry_run:
+                        print(f"Dry-run: skipped {len(updates):,} database updates")
+                        progress.update(len(updates))
+                        continue
+                    writes.submit(writers, updates, num_workers)
+                writes.wait_below(1)
+            except BaseException:
+                stop.set()
+                for _, classification in classifying:
+                    classification.cancel()
+                writes.wait_below(1, raise_errors=False)
+                raise
+            finally:
+                stop.set()
+                fetcher.join()
+
+        if not dry_run:
+            print(f"Updated {writes.updated:,} records")
+        report.stats = dict(self.stats)
+        return processed, prepared, writes.updated, classification_counts
 
-        return processed, prepared, total_updated, classification_counts
+    def _classify_page(
+        self, pairs: list[dict], address_cache: dict
+    ) -> tuple[np.ndarray, np.ndarray, dict[str, int]]:
+        return self.classify_pair_batch(self.build_pair_batch(pairs, address_cache))
 
     def run(
         self,
@@ -999,14 +1709,12 @@ class DistanceCalculator:
         dry_run: bool = False,
         batch_size: int = 50_000,
         num_workers: int = 1,
+        classify_workers: int = 1,
+        materialize_scope: bool = True,
     ) -> LocationComputationReport:
         self._print_run_configuration(scope, limit, force, dry_run)
         report = LocationComputationReport(
-            scope={
-                "data_file_year": scope.data_file_year,
-                "establishment_id": scope.establishment_id,
-                "geo_codes": list(scope.geo_codes),
-            },
+            scope=_scope_dict(scope),
             dry_run=dry_run,
             force=force,
             limit=limit,
@@ -1014,8 +1722,27 @@ class DistanceCalculator:
         )
 
         try:
+            self._load_country_cache()
             self.connect()
-            report.candidate_count = self.count_owner_housing_pairs(scope, force=force)
+            # A limited run only reads its first pairs: copying the whole
+            # scope first would cost more than the run itself.
+            if materialize_scope and not limit:
+                started = time.perf_counter()
+                report.candidate_count = self.materialize_scope(scope, force=force)
+                report.scope_table = {
+                    "rows": report.candidate_count,
+                    "seconds": round(time.perf_counter() - started, 3),
+                }
+                print(
+                    f"Scope table: {report.candidate_count:,} pairs materialized "
+                    f"in {report.scope_table['seconds']:.1f}s"
+                )
+            else:
+                report.candidate_count = self.count_owner_housing_pairs(
+                    scope,
+                    force=force,
+                    first_page_size=min(batch_size, limit) if limit else batch_size,
+                )
             print(f"Candidate pairs: {report.candidate_count:,}")
             if report.candidate_count == 0:
                 return report
@@ -1029,6 +1756,7 @@ class DistanceCalculator:
                     batch_size=batch_size,
                     num_workers=num_workers,
                     report=report,
+                    classify_workers=classify_workers,
                 )
             )
 
@@ -1049,8 +1777,29 @@ class DistanceCalculator:
             report.stats = dict(self.stats)
             raise LocationComputationError(report, error) from error
         finally:
+            self._save_country_cache(report)
             self.disconnect()
 
+    def _load_country_cache(self) -> None:
+        try:
+            loaded = self.country_cache.load()
+        except (OSError, sqlite3.Error) as error:
+            logging.warning("Country cache not loaded: %s", error)
+            return
+        if self.country_cache.path is not None:
+            print(
+                f"Country cache: {loaded:,} addresses from {self.country_cache.path}"
+            )
+
+    def _save_country_cache(self, report: LocationComputationReport) -> None:
+        """Persist the new country detections, which stay valid when the run
+        fails, and report the cache statistics."""
+        try:
+            self.country_cache.save()
+        except (OSError, sqlite3.Error) as error:
+            logging.warning("Country cache not saved: %s", error)
+        report.country_cache = self.country_cache.statistics()
+
     def print_final_statistics(self, report: LocationComputationReport) -> None:
         print("\n" + "=" * 80)
         print("SUMMARY")
@@ -1061,6 +1810,8 @@ class DistanceCalculator:
         print(f"Rows updated: {report.updated_pairs:,}")
         print(f"Distances calculated: {self.stats['distances_calculated']:,}")
         print(f"Geographic rules applied: {self.stats['geographic_rules_applied']:,}")
+        if self.country_cache.hit_rate is not None:
+            print(f"Country cache hit rate: {self.country_cache.hit_rate:.1%}")
         print(
             f"Classification counts: {json.dumps(report.classification_counts, sort_keys=True)}"
         )
@@ -1069,6 +1820,257 @@ class DistanceCalculator:
         print("=" * 80)
 
 
+def location_shards(
+    scope: LocationScope, departments: list[str] | tuple[str, ...] = ()
+) -> list[tuple[str, LocationScope]]:
+    """Split `scope` by department, as (department, scope) pairs.
+
+    Explicit geo codes are grouped by department; any other scope gets one
+    `geo_code_range` per department, which together cover every code.
+    `departments` keeps only the named shards, to rerun failed ones.
+    """
+    if scope.geo_codes:
+        by_department: dict[str, list[str]] = {}
+        for geo_code in scope.geo_codes:
+            by_department.setdefault(geography.department_range(geo_code), []).append(
+                geo_code
+            )
+        shards = [
+            (department, replace(scope, geo_codes=tuple(geo_codes)))
+            for department, geo_codes in sorted(by_department.items())
+        ]
+    else:
+        shards = [
+            (department, replace(scope, geo_code_range=(low, high)))
+            for department, low, high in geography.department_ranges()
+        ]
+    if not departments:
+        return shards
+
+    unknown = set(departments) - set(geography.DEPARTMENT_REGIONS)
+    if unknown:
+        raise ValueError(f"Unknown department shards: {', '.join(sorted(unknown))}")
+    return [shard for shard in shards if shard[0] in departments]
+
+
+def _run_location_shard(
+    db_url: str, scope: LocationScope, options: dict
+) -> tuple[dict, str | None]:
+    """Run one shard in a pool process: its report as a dict, and the error
+    if it failed, since a `LocationComputationError` does not pickle."""
+    options = dict(options)
+    calculator = DistanceCalculator(
+        db_url, country_cache_path=options.pop("country_cache_path")
+    )
+    try:
+        report = calculator.run(scope=scope, **options)
+    except LocationComputationError as error:
+        return error.report.to_dict(), str(error)
+    return report.to_dict(), None
+
+
+def merge_location_reports(
+    scope: LocationScope, dry_run: bool, force: bool, reports: list[dict]
+) -> LocationComputationReport:
+    """One report for the shard reports of `scope`."""
+    merged = LocationComputationReport(
+        scope=_scope_dict(scope),
+        dry_run=dry_run,
+        force=force,
+        limit=None,
+        candidate_count=0,
+    )
+    classification_counts: Counter = Counter()
+    stats: Counter = Counter()
+    cache: Counter = Counter()
+    scope_table: Counter = Counter()
+    for report in reports:
+        for name in (
+            "candidate_count",
+            "processed_pairs",
+            "updates_prepared",
+            "updated_pairs",
+            "errors",
+        ):
+            setattr(merged, name, getattr(merged, name) + report[name])
+        classification_counts.update(report["classification_counts"])
+        stats.update(report["stats"])
+        scope_table.update(report.get("scope_table", {}))
+        shard_cache = report["country_cache"]
+        for name in ("loaded", "saved", "hits", "misses"):
+            cache[name] += shard_cache.get(name, 0)
+        for name in ("path", "version"):
+            merged.country_cache.setdefault(name, shard_cache.get(name))
+
+    merged.classification_counts = {
+        key: classification_counts[key] for key in sorted(classification_counts)
+    }
+    merged.stats = dict(stats)
+    if scope_table:
+        merged.scope_table = {
+            "rows": scope_table["rows"],
+            "seconds": round(scope_table["seconds"], 3),
+        }
+    if reports:
+        lookups = cache["hits"] + cache["misses"]
+        merged.country_cache.update(cache)
+        merged.country_cache["hit_rate"] = cache["hits"] / lookups if lookups else None
+    return merged
+
+
+def run_location_shards(
+    db_url: str,
+    scope: LocationScope,
+    *,
+    shard_workers: int = 1,
+    shard_retries: int = 1,
+    departments: list[str] | tuple[str, ...] = (),
+    force: bool = False,
+    dry_run: bool = False,
+    batch_size: int = 50_000,
+    num_workers: int = 1,
+    classify_workers: int = 1,
+    country_cache_path: str | None = None,
+    materialize_scope: bool = True,
+) -> LocationComputationReport:
+    """Run `scope` as department shards in `shard_workers` processes.
+
+    Each shard has its own connection and keyset cursor. A failed shard is
+    run again up to `shard_retries` times; the others are not. Shards still
+    failing are reported in `shards` and raise `LocationComputationError`
+    once the others are done: running their departments alone resumes the
+    run.
+    """
+    shards = dict(location_shards(scope, departments))
+    options = {
+        "force": force,
+        "dry_run": dry_run,
+        "batch_size": batch_size,
+        "num_workers": num_workers,
+        "classify_workers": classify_workers,
+        "country_cache_path": country_cache_path,
+        "materialize_scope": materialize_scope,
+    }
+    print(f"Running {len(shards):,} department shards in {shard_workers} processes")
+    results: dict[str, tuple[dict | None, str | None]] = {}
+    attempts: Counter = Counter()
+    pending = list(shards)
+    # Spawned, not forked: the caller may be a threaded Dagster process
+    # holding connections and locks a forked child would inherit.
+    with ProcessPoolExecutor(
+        max_workers=shard_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        while pending:
+            futures = {
+                executor.submit(_run_location_shard, db_url, shards[name], options): name
+                for name in pending
+            }
+            pending = []
+            for future in as_completed(futures):
+                name = futures[future]
+                attempts[name] += 1
+                try:
+                    results[name] = future.result()
+                except Exception as error:
+                    results[name] = (None, f"{type(error).__name__}: {error}")
+                error = results[name][1]
+                if error is None:
+                    print(f"Shard {name}: completed")
+                elif attempts[name] <= shard_retries:
+                    print(f"Shard {name}: failed ({error}), retrying")
+                    pending.append(name)
+                else:
+                    print(f"Shard {name}: failed ({error})")
+
+    merged = merge_location_reports(
+        scope,
+        dry_run,
+        force,
+        [report for report, _ in results.values() if report is not None],
+    )
+    for name in shards:
+        report, error = results[name]
+        merged.shards.append(
+            {
+                "department": name,
+                "status": "failed" if error else "completed",
+                "attempts": attempts[name],
+                "candidate_count": report["candidate_count"] if report else 0,
+                "processed_pairs": report["processed_pairs"] if report else 0,
+                "updated_pairs": report["updated_pairs"] if report else 0,
+                "error": error,
+            }
+        )
+    failed = [shard["department"] for shard in merged.shards if shard["error"]]
+    if failed:
+        merged.errors = max(merged.errors, len(failed))
+        raise LocationComputationError(
+            merged,
+            RuntimeError(
+                f"{len(failed)} of {len(shards)} shard(s) failed: {', '.join(failed)}"
+            ),
+        )
+    return merged
+
+
+def _watermark_key(scope: LocationScope) -> str:
+    key: dict = {}
+    if scope.establishment_id:
+        key["establishment_id"] = scope.establishment_id
+    if scope.geo_codes:
+        key["geo_codes"] = sorted(scope.geo_codes)
+    return json.dumps(key, sort_keys=True)
+
+
+@contextmanager
+def _watermark_cursor(db_url: str) -> Iterator:
+    """A cursor on the watermark table, committed unless it raises."""
+    connection = psycopg2.connect(db_url)
+    try:
+        with connection, connection.cursor() as cursor:
+            cursor.execute(WATERMARK_TABLE_SQL)
+            yield cursor
+    finally:
+        connection.close()
+
+
+def read_location_watermark(cursor, scope: LocationScope) -> datetime | None:
+    """The latest watermark of `scope` or of its whole cohort."""
+    cursor.execute(
+        """
+        SELECT MAX(computed_at)
+        FROM owner_housing_location_watermarks
+        WHERE data_file_year = %(data_file_year)s
+          AND scope_key IN (%(scope_key)s, '{}')
+        """,
+        {"data_file_year": scope.data_file_year, "scope_key": _watermark_key(scope)},
+    )
+    return cursor.fetchone()[0]
+
+
+def record_location_watermark(
+    cursor, scope: LocationScope, computed_at: datetime
+) -> None:
+    cursor.execute(
+        """
+        INSERT INTO owner_housing_location_watermarks
+          (data_file_year, scope_key, computed_at)
+        VALUES (%(data_file_year)s, %(scope_key)s, %(computed_at)s)
+        ON CONFLICT (data_file_year, scope_key) DO UPDATE
+        SET computed_at = GREATEST(
+          owner_housing_location_watermarks.computed_at,
+          EXCLUDED.computed_at
+        )
+        """,
+        {
+            "data_file_year": scope.data_file_year,
+            "scope_key": _watermark_key(scope),
+            "computed_at": computed_at,
+        },
+    )
+
+
 def calculate_owner_housing_locations(
     db_url: str,
     data_file_year: str,
@@ -1080,7 +2082,25 @@ def calculate_owner_housing_locations(
     dry_run: bool = False,
     batch_size: int = 50_000,
     num_workers: int = 1,
+    classify_workers: int = 1,
+    country_cache_path: str | None = None,
+    shard_workers: int = 0,
+    shards: list[str] | tuple[str, ...] = (),
+    shard_retries: int = 1,
+    materialize_scope: bool = True,
+    incremental: bool = False,
+    changed_since: datetime | None = None,
 ) -> LocationComputationReport:
+    """Run the location calculation on a scope.
+
+    With `shard_workers` or `shards`, the scope is split by department and
+    run by `run_location_shards`.
+
+    An `incremental` run also recomputes the pairs whose owner or housing
+    BAN address changed since the scope's watermark, or since
+    `changed_since` (UTC) when given. A complete forced or incremental run
+    without errors records its start as the scope's new watermark.
+    """
     scope = LocationScope(
         data_file_year=data_file_year,
         establishment_id=establishment_id,
@@ -1090,7 +2110,82 @@ def calculate_owner_housing_locations(
         raise ValueError(
             "Refusing an unscoped LOVAC location run without explicit full-year opt-in."
         )
-    calculator = DistanceCalculator(db_url)
+    incremental = incremental or changed_since is not None
+    if incremental and force:
+        raise ValueError("A forced run already recomputes every pair of its scope.")
+    if (shard_workers or shards) and limit:
+        raise ValueError("A pair limit cannot be split across department shards.")
+
+    records_watermark = (force or incremental) and not (dry_run or limit or shards)
+    started_at = None
+    if incremental or records_watermark:
+        with _watermark_cursor(db_url) as cursor:
+            cursor.execute("SELECT now() AT TIME ZONE 'UTC'")
+            started_at = cursor.fetchone()[0]
+            if incremental and changed_since is None:
+                changed_since = read_location_watermark(cursor, scope)
+                if changed_since is None:
+                    raise ValueError(
+                        f"No location watermark for {_watermark_key(scope)} in "
+                        f"{data_file_year}: run the scope with force first, "
+                        "or give changed_since."
+                    )
+        scope = replace(scope, changed_since=changed_since)
+
+    report = _run_location_scope(
+        db_url,
+        scope,
+        limit=limit,
+        force=force,
+        dry_run=dry_run,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        classify_workers=classify_workers,
+        country_cache_path=country_cache_path,
+        shard_workers=shard_workers,
+        shards=shards,
+        shard_retries=shard_retries,
+        materialize_scope=materialize_scope,
+    )
+    if records_watermark and report.errors == 0:
+        with _watermark_cursor(db_url) as cursor:
+            record_location_watermark(cursor, scope, started_at)
+        report.watermark = started_at.isoformat(sep=" ")
+    return report
+
+
+def _run_location_scope(
+    db_url: str,
+    scope: LocationScope,
+    *,
+    limit: int | None,
+    force: bool,
+    dry_run: bool,
+    batch_size: int,
+    num_workers: int,
+    classify_workers: int,
+    country_cache_path: str | None,
+    shard_workers: int,
+    shards: list[str] | tuple[str, ...],
+    shard_retries: int,
+    materialize_scope: bool,
+) -> LocationComputationReport:
+    if shard_workers or shards:
+        return run_location_shards(
+            db_url,
+            scope,
+            shard_workers=max(shard_workers, 1),
+            shard_retries=shard_retries,
+            departments=shards,
+            force=force,
+            dry_run=dry_run,
+            batch_size=batch_size,
+            num_workers=num_workers,
+            classify_workers=classify_workers,
+            country_cache_path=country_cache_path,
+            materialize_scope=materialize_scope,
+        )
+    calculator = DistanceCalculator(db_url, country_cache_path=country_cache_path)
     return calculator.run(
         scope=scope,
         limit=limit,
@@ -1098,6 +2193,8 @@ def calculate_owner_housing_locations(
         dry_run=dry_run,
         batch_size=batch_size,
         num_workers=num_workers,
+        classify_workers=classify_workers,
+        materialize_scope=materialize_scope,
     )
 
 
@@ -1151,6 +2248,17 @@ def main() -> None:
         action="store_true",
         help="Recalculate existing values inside the selected scope.",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Also recalculate the pairs whose BAN addresses changed since the "
+        "scope's last forced or incremental run.",
+    )
+    parser.add_argument(
+        "--changed-since",
+        type=datetime.fromisoformat,
+        help="Incremental run from this UTC time instead of the scope's watermark.",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -1168,6 +2276,45 @@ def main() -> None:
         default=1,
         help="Parallel update workers. Keep low in production.",
     )
+    parser.add_argument(
+        "--classify-workers",
+        type=positive_int,
+        default=1,
+        help="Pages classified in parallel while others are fetched and written.",
+    )
+    parser.add_argument(
+        "--country-cache",
+        default=os.environ.get("OWNER_COUNTRY_CACHE"),
+        help="SQLite file caching address countries across runs. "
+        "Defaults to OWNER_COUNTRY_CACHE.",
+    )
+    parser.add_argument(
+        "--no-materialize-scope",
+        dest="materialize_scope",
+        action="store_false",
+        help="Query the scope for every page instead of copying it once "
+        "into a temporary table (always the case with --limit).",
+    )
+    parser.add_argument(
+        "--shard-workers",
+        type=int,
+        default=0,
+        help="Split the scope by department and run the shards in N processes.",
+    )
+    parser.add_argument(
+        "--shard",
+        dest="shards",
+        action="append",
+        default=[],
+        help="Only run this department shard, for example a failed one. "
+        "Can be repeated.",
+    )
+    parser.add_argument(
+        "--shard-retries",
+        type=int,
+        default=1,
+        help="Runs again of a failed shard before reporting it.",
+    )
     parser.add_argument("--verbose", action="store_true", help="Enable info logs.")
 
     args = parser.parse_args()
@@ -1188,6 +2335,14 @@ def main() -> None:
             dry_run=args.dry_run,
             batch_size=args.batch_size,
             num_workers=args.num_workers,
+            classify_workers=args.classify_workers,
+            country_cache_path=args.country_cache,
+            shard_workers=args.shard_workers,
+            shards=args.shards,
+            shard_retries=args.shard_retries,
+            materialize_scope=args.materialize_scope,
+            incremental=args.incremental,
+            changed_since=args.changed_since,
         )
         print(json.dumps(report.to_dict(), indent=2, sort_keys=True))
     except KeyboardInterrupt:
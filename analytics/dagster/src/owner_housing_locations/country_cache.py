@@ -0,0 +1,165 @@
+"""Country detections of owner addresses, cached across runs.
+
+`CountryCache` maps an address to its `CountryDetector` result. With a path,
+entries are also stored in a SQLite table keyed by the detector version and
+a hash of the address: `load` reads the entries of the current version and
+deletes the others, so a detector change invalidates the cache, and `save`
+writes the entries added since.
+
+This module does not import the detector, so scripts can load it by path
+without the package.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+COUNTRY_RESULTS = frozenset({"FRANCE", "FOREIGN", "UNKNOWN"})
+EMPTY_ADDRESSES = frozenset({"nan", "null", "none"})
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS country_cache (
+  version TEXT NOT NULL,
+  address_hash BLOB NOT NULL,
+  country TEXT NOT NULL,
+  PRIMARY KEY (version, address_hash)
+) WITHOUT ROWID
+"""
+
+
+def address_key(address: str) -> bytes:
+    return hashlib.blake2b(address.encode(), digest_size=16).digest()
+
+
+class CountryCache:
+    """Address countries in memory, optionally persisted to `path`.
+
+    Lookups are counted, and safe from several threads.
+    """
+
+    def __init__(self, path: str | os.PathLike | None, version: str) -> None:
+        self.path = Path(path) if path else None
+        self.version = version
+        self._entries: dict[bytes, str] = {}
+        self._new: dict[bytes, str] = {}
+        self._lock = threading.Lock()
+        self.loaded = 0
+        self.saved = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, address: str, default: str | None = None) -> str | None:
+        key = address_key(address)
+        with self._lock:
+            country = self._entries.get(key)
+            if country is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return country
+
+    def __setitem__(self, address: str, country: str) -> None:
+        key = address_key(address)
+        with self._lock:
+            self._entries[key] = country
+            self._new[key] = country
+
+    @property
+    def hit_rate(self) -> float | None:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    def statistics(self) -> dict:
+        return {
+            "path": str(self.path) if self.path else None,
+            "version": self.version,
+            "loaded": self.loaded,
+            "saved": self.saved,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def load(self) -> int:
+        """Read the entries of this version, after deleting the others."""
+        if self.path is None:
+            return 0
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM country_cache WHERE version <> ?", (self.version,)
+            )
+            rows = connection.execute(
+                "SELECT address_hash, country FROM country_cache WHERE version = ?",
+                (self.version,),
+            )
+            with self._lock:
+                before = len(self._entries)
+                for key, country in rows:
+                    self._entries.setdefault(bytes(key), country)
+                self.loaded += len(self._entries) - before
+        return self.loaded
+
+    def save(self) -> int:
+        """Write the entries added since the last save."""
+        if self.path is None:
+            return 0
+        with self._lock:
+            new, self._new = self._new, {}
+        if not new:
+            return 0
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO country_cache VALUES (?, ?, ?)",
+                ((self.version, key, country) for key, country in new.items()),
+            )
+        self.saved += len(new)
+        return len(new)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A transaction on the cache file, committed unless it raises."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                connection.execute(SCHEMA_SQL)
+                yield connection
+        finally:
+            connection.close()
+
+
+def detect_country(address, detector, cache) -> str:
+    """Country of `address` through `cache`: a `CountryCache` or a dict.
+
+    Empty addresses are UNKNOWN without a lookup. Detector errors and
+    unexpected results are cached as UNKNOWN.
+    """
+    if not address or not str(address).strip():
+        return "UNKNOWN"
+    normalized = str(address).strip()
+    if normalized.lower() in EMPTY_ADDRESSES:
+        return "UNKNOWN"
+    cached = cache.get(normalized)
+    if cached is not None:
+        return cached
+
+    try:
+        result = detector.detect_country(normalized)
+    except Exception as error:
+        logging.debug("Country detection error for '%s': %s", normalized, error)
+        result = "UNKNOWN"
+    if result not in COUNTRY_RESULTS:
+        result = "UNKNOWN"
+
+    cache[normalized] = result
+    return result
@@ -20,7 +20,9 @@ from __future__ import annotations
 import logging
 import re
 import unicodedata
+from collections.abc import Iterable
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
 COUNTRY_FRANCE = "FRANCE"
@@ -258,65 +260,116 @@ STREET_OR_BUILDING_TERMS = (
 )
 
 
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+_COMPONENT_SEPARATORS = re.compile(r"[,;\n\r|]+")
+_STREET_PREFIX = (
+    r"\b(?:"
+    + "|".join(re.escape(token) for token in STREET_OR_BUILDING_TERMS)
+    + r")\s+(?:(?:de|du|des|d|l|la|le|les)\s+){0,2}"
+)
+
+
 def _normalize(text: str) -> str:
-    without_accents = "".join(
-        char
-        for char in unicodedata.normalize("NFKD", text)
-        if not unicodedata.combining(char)
-    )
-    lowered = without_accents.lower()
-    normalized = re.sub(r"[^a-z0-9]+", " ", lowered)
-    return re.sub(r"\s+", " ", normalized).strip()
+    if not text.isascii():
+        text = "".join(
+            char
+            for char in unicodedata.normalize("NFKD", text)
+            if not unicodedata.combining(char)
+        )
+    return _NON_ALPHANUMERIC.sub(" ", text.lower()).strip()
 
 
-def _split_components(address: str) -> tuple[str, ...]:
-    return tuple(
-        component
-        for component in (_normalize(part) for part in re.split(r"[,;\n\r|]+", address))
-        if component
-    )
+def _last_component(address: str) -> tuple[str, bool]:
+    """The last non-empty component of `address`, and whether another one
+    precedes it."""
+    parts = _COMPONENT_SEPARATORS.split(address)
+    for position in range(len(parts) - 1, -1, -1):
+        last = _normalize(parts[position])
+        if last:
+            return last, any(_normalize(part) for part in parts[:position])
+    return "", False
 
 
 def _contains_digit(text: str) -> bool:
     return any(char.isdigit() for char in text)
 
 
-def _ends_with_term(normalized: str, term: str) -> bool:
-    return normalized == term or normalized.endswith(f" {term}")
+@lru_cache(maxsize=None)
+def _embedded_pattern(term: str) -> re.Pattern:
+    return re.compile(rf"{_STREET_PREFIX}{re.escape(term)}\b")
 
 
 def _embedded_in_french_name(normalized: str, term: str) -> bool:
-    street_terms = "|".join(re.escape(token) for token in STREET_OR_BUILDING_TERMS)
-    pattern = (
-        rf"\b(?:{street_terms})\s+"
-        rf"(?:(?:de|du|des|d|l|la|le|les)\s+){{0,2}}"
-        rf"{re.escape(term)}\b"
-    )
-    return bool(re.search(pattern, normalized))
-
-
-def _has_explicit_country(address: str, terms: tuple[str, ...]) -> Optional[str]:
-    normalized = _normalize(address)
-    if not normalized:
-        return None
-
-    components = _split_components(address)
-    last_component = components[-1] if components else ""
-    has_separator = len(components) > 1
-
-    for term in sorted(terms, key=len, reverse=True):
-        normalized_term = _normalize(term)
-        if not normalized_term:
-            continue
-        if normalized == normalized_term:
-            return term
-        if has_separator and last_component == normalized_term:
-            return term
-        if _embedded_in_french_name(normalized, normalized_term):
-            continue
-        if _contains_digit(normalized) and _ends_with_term(normalized, normalized_term):
-            return term
-    return None
+    return bool(_embedded_pattern(term).search(normalized))
+
+
+class _AddressText:
+    """The forms of an address the term matchers read, computed once."""
+
+    __slots__ = ("address", "normalized", "has_digit", "_last_component")
+
+    def __init__(self, address: str) -> None:
+        self.address = address
+        self.normalized = _normalize(address)
+        self.has_digit = _contains_digit(self.normalized)
+        self._last_component: tuple[str, bool] | None = None
+
+    @property
+    def last_component(self) -> tuple[str, bool]:
+        if self._last_component is None:
+            if _COMPONENT_SEPARATORS.search(self.address):
+                self._last_component = _last_component(self.address)
+            else:
+                self._last_component = (self.normalized, False)
+        return self._last_component
+
+
+class _TermMatcher:
+    """The explicit-country match of one term list, compiled once.
+
+    A term matches when it is the whole address, the last of several
+    components, or, in an address with a digit, its last words outside a
+    French street name. Each case anchors the term at the end of the
+    address, so the candidates are the word suffixes of the address: a
+    table lookup each instead of a scan of the list. When several match,
+    the longest term wins, the first listed among equal lengths, as when
+    the list was tried in that order.
+    """
+
+    def __init__(self, terms: tuple[str, ...]) -> None:
+        self._ranks: dict[str, tuple[int, str]] = {}
+        for rank, term in enumerate(sorted(terms, key=len, reverse=True)):
+            normalized_term = _normalize(term)
+            if normalized_term:
+                self._ranks.setdefault(normalized_term, (rank, term))
+        self._max_words = max(
+            (term.count(" ") + 1 for term in self._ranks), default=0
+        )
+
+    def match(self, text: _AddressText) -> Optional[str]:
+        normalized = text.normalized
+        if not normalized:
+            return None
+
+        candidates = []
+        if normalized in self._ranks:
+            candidates.append(self._ranks[normalized])
+        if text.has_digit:
+            words = normalized.split(" ")
+            for count in range(1, min(len(words), self._max_words) + 1):
+                suffix = " ".join(words[-count:])
+                if suffix in self._ranks and not _embedded_in_french_name(
+                    normalized, suffix
+                ):
+                    candidates.append(self._ranks[suffix])
+        last_component, has_separator = text.last_component
+        if has_separator and last_component in self._ranks:
+            candidates.append(self._ranks[last_component])
+        return min(candidates)[1] if candidates else None
+
+
+_FRANCE_MATCHER = _TermMatcher(FRANCE_TERMS + FRENCH_OVERSEAS_TERMS)
+_FOREIGN_MATCHER = _TermMatcher(FOREIGN_COUNTRY_TERMS)
 
 
 class CountryDetector:
@@ -356,16 +409,13 @@ class CountryDetector:
         if not address or not str(address).strip():
             return self._decision(COUNTRY_UNKNOWN, "empty_address", "low")
 
-        normalized = str(address).strip()
+        text = _AddressText(str(address).strip())
 
-        france_term = _has_explicit_country(
-            normalized,
-            FRANCE_TERMS + FRENCH_OVERSEAS_TERMS,
-        )
+        france_term = _FRANCE_MATCHER.match(text)
         if france_term:
             return self._decision(COUNTRY_FRANCE, f"explicit_france:{france_term}")
 
-        foreign_term = _has_explicit_country(normalized, FOREIGN_COUNTRY_TERMS)
+        foreign_term = _FOREIGN_MATCHER.match(text)
         if foreign_term:
             return self._decision(
                 COUNTRY_FOREIGN,
@@ -374,6 +424,19 @@ class CountryDetector:
 
         return self._decision(COUNTRY_UNKNOWN, "no_explicit_country", "low")
 
+    def classify_many(
+        self, addresses: Iterable[Optional[str]]
+    ) -> list[CountryDetectionResult]:
+        """`classify_address` of each address, classifying repeats once."""
+        results: dict[Optional[str], CountryDetectionResult] = {}
+        classified = []
+        for address in addresses:
+            result = results.get(address)
+            if result is None:
+                result = results[address] = self.classify_address(address)
+            classified.append(result)
+        return classified
+
     def detect_country(self, address: Optional[str]) -> str:
         if not address or not str(address).strip():
             return COUNTRY_UNKNOWN
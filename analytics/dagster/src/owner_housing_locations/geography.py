@@ -0,0 +1,295 @@
+"""Department and region lookups for the owner-housing location rules.
+
+The department-to-region table is frozen at import time into a mapping for
+single codes and into dense arrays for batches: a two-character department
+("01".."95", "2A", "2B") or a three-digit one ("971".."976") is a direct
+index, so an array of codes resolves without a Python call per code.
+
+Regions are INSEE region codes. The batch functions return them as
+integers, -1 meaning no region.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from types import MappingProxyType
+
+import numpy as np
+
+DEPARTMENT_REGIONS = MappingProxyType(
+    {
+        "01": "84",
+        "02": "32",
+        "03": "84",
+        "04": "93",
+        "05": "93",
+        "06": "93",
+        "07": "84",
+        "08": "44",
+        "09": "76",
+        "10": "44",
+        "11": "76",
+        "12": "76",
+        "13": "93",
+        "14": "28",
+        "15": "84",
+        "16": "75",
+        "17": "75",
+        "18": "24",
+        "19": "75",
+        "20": "94",
+        "2A": "94",
+        "2B": "94",
+        "21": "27",
+        "22": "53",
+        "23": "75",
+        "24": "75",
+        "25": "27",
+        "26": "84",
+        "27": "28",
+        "28": "24",
+        "29": "53",
+        "30": "76",
+        "31": "76",
+        "32": "76",
+        "33": "75",
+        "34": "76",
+        "35": "53",
+        "36": "24",
+        "37": "24",
+        "38": "84",
+        "39": "27",
+        "40": "75",
+        "41": "24",
+        "42": "84",
+        "43": "84",
+        "44": "52",
+        "45": "24",
+        "46": "76",
+        "47": "75",
+        "48": "76",
+        "49": "52",
+        "50": "28",
+        "51": "44",
+        "52": "44",
+        "53": "52",
+        "54": "44",
+        "55": "44",
+        "56": "53",
+        "57": "44",
+        "58": "27",
+        "59": "32",
+        "60": "32",
+        "61": "28",
+        "62": "32",
+        "63": "84",
+        "64": "75",
+        "65": "76",
+        "66": "76",
+        "67": "44",
+        "68": "44",
+        "69": "84",
+        "70": "27",
+        "71": "27",
+        "72": "52",
+        "73": "84",
+        "74": "84",
+        "75": "11",
+        "76": "28",
+        "77": "11",
+        "78": "11",
+        "79": "75",
+        "80": "32",
+        "81": "76",
+        "82": "76",
+        "83": "93",
+        "84": "93",
+        "85": "52",
+        "86": "75",
+        "87": "75",
+        "88": "44",
+        "89": "27",
+        "90": "27",
+        "91": "11",
+        "92": "11",
+        "93": "11",
+        "94": "11",
+        "95": "11",
+        "971": "01",
+        "972": "02",
+        "973": "03",
+        "974": "04",
+        "976": "06",
+    }
+)
+METRO_REGIONS = (
+    "11",
+    "24",
+    "27",
+    "28",
+    "32",
+    "44",
+    "52",
+    "53",
+    "75",
+    "76",
+    "84",
+    "93",
+    "94",
+)
+OVERSEAS_REGIONS = ("01", "02", "03", "04", "06")
+
+# Two-character departments: "00".."99" then "2A", "2B".
+_CORSICA = {"A": 100, "B": 101}
+
+
+def _build_tables() -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    by_two = np.full(102, -1, dtype=np.int16)
+    by_three = np.full(1000, -1, dtype=np.int16)
+    for department, region in DEPARTMENT_REGIONS.items():
+        if len(department) == 3:
+            by_three[int(department)] = int(region)
+        elif department[1] in _CORSICA:
+            by_two[_CORSICA[department[1]]] = int(region)
+        else:
+            by_two[int(department)] = int(region)
+    metro = np.zeros(100, dtype=bool)
+    metro[[int(region) for region in METRO_REGIONS]] = True
+    overseas = np.zeros(100, dtype=bool)
+    overseas[[int(region) for region in OVERSEAS_REGIONS]] = True
+    for table in (by_two, by_three, metro, overseas):
+        table.flags.writeable = False
+    return by_two, by_three, metro, overseas
+
+
+_REGION_BY_TWO, _REGION_BY_THREE, _METRO, _OVERSEAS = _build_tables()
+_DEPARTMENTS = tuple(sorted(DEPARTMENT_REGIONS))
+
+
+def department(code: str) -> str:
+    """Department of a postal or geo code: three characters overseas."""
+    return code[:3] if code.startswith(("97", "98")) else code[:2]
+
+
+def department_ranges() -> list[tuple[str, str | None, str | None]]:
+    """Half-open geo code ranges [low, high), one per department, by name.
+
+    The first range has no low bound and the last no high bound, so every
+    code falls in exactly one, codes of no department in a neighbour's.
+    Digits sort before uppercase letters in the C, glibc and ICU
+    collations alike, so PostgreSQL compares codes with the bounds in the
+    same order.
+    """
+    names = _DEPARTMENTS
+    return list(zip(names, [None, *names[1:]], [*names[1:], None]))
+
+
+def department_range(code: str) -> str:
+    """Name of the `department_ranges` range holding `code`."""
+    return _DEPARTMENTS[max(bisect_right(_DEPARTMENTS, code) - 1, 0)]
+
+
+def region_of_department(dept: str | None) -> str | None:
+    if not dept:
+        return None
+    return DEPARTMENT_REGIONS.get(dept)
+
+
+def region_of_postal_code(postal_code: str | None) -> str | None:
+    if not postal_code or len(postal_code) < 2:
+        return None
+    if len(postal_code) >= 3:
+        region = DEPARTMENT_REGIONS.get(postal_code[:3])
+        if region:
+            return region
+    return DEPARTMENT_REGIONS.get(postal_code[:2])
+
+
+def is_metro_region(region: str | None) -> bool:
+    return region in METRO_REGIONS if region else False
+
+
+def is_overseas_region(region: str | None) -> bool:
+    return region in OVERSEAS_REGIONS if region else False
+
+
+def _prefixes(codes) -> np.ndarray:
+    """The first three characters of each code as code points, 0-padded."""
+    return np.asarray(codes, dtype="U3").view(np.uint32).reshape(-1, 3)
+
+
+def _digits(prefixes: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Digit values of the three characters, 10 and above (unsigned
+    wraparound) for non-digits."""
+    digits = prefixes - np.uint32(ord("0"))
+    return digits[:, 0], digits[:, 1], digits[:, 2]
+
+
+def _two_character_keys(prefixes: np.ndarray) -> np.ndarray:
+    first, second, _ = _digits(prefixes)
+    keys = np.where((first < 10) & (second < 10), first * 10 + second, 200)
+    corsica = prefixes[:, 0] == ord("2")
+    for letter, key in _CORSICA.items():
+        keys[corsica & (prefixes[:, 1] == ord(letter))] = key
+    return keys
+
+
+def _three_digit_keys(prefixes: np.ndarray) -> np.ndarray:
+    first, second, third = _digits(prefixes)
+    return np.where(
+        (first < 10) & (second < 10) & (third < 10),
+        first * 100 + second * 10 + third,
+        1000,
+    )
+
+
+def _lookup(table: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """table[keys], -1 for keys outside the table."""
+    padded = np.append(table.astype(np.int16), np.int16(-1))
+    keys = np.asarray(keys)
+    return padded[np.where((keys >= 0) & (keys < len(table)), keys, len(table))]
+
+
+def _overseas(prefixes: np.ndarray) -> np.ndarray:
+    return (prefixes[:, 0] == ord("9")) & (
+        (prefixes[:, 1] == ord("7")) | (prefixes[:, 1] == ord("8"))
+    )
+
+
+def departments(codes) -> np.ndarray:
+    """Batch `department`: one integer per distinct department of `codes`."""
+    prefixes = _prefixes(codes)
+    if len(prefixes) == 0:
+        return np.empty(0, dtype=np.intp)
+    names = np.where(
+        _overseas(prefixes),
+        np.asarray(codes, dtype="U3"),
+        np.asarray(codes, dtype="U2"),
+    )
+    return np.unique(names, return_inverse=True)[1].reshape(-1)
+
+
+def regions_of_geo_codes(codes) -> np.ndarray:
+    """Batch `region_of_department(department(code))` of each geo code."""
+    prefixes = _prefixes(codes)
+    two = _lookup(_REGION_BY_TWO, _two_character_keys(prefixes))
+    three = _lookup(_REGION_BY_THREE, _three_digit_keys(prefixes))
+    return np.where(_overseas(prefixes), three, two)
+
+
+def regions_of_postal_codes(codes) -> np.ndarray:
+    """Batch `region_of_postal_code`."""
+    prefixes = _prefixes(codes)
+    two = _lookup(_REGION_BY_TWO, _two_character_keys(prefixes))
+    three = _lookup(_REGION_BY_THREE, _three_digit_keys(prefixes))
+    return np.where(prefixes[:, 1] == 0, -1, np.where(three >= 0, three, two))
+
+
+def metro_regions(regions: np.ndarray) -> np.ndarray:
+    """Batch `is_metro_region` of integer regions."""
+    return _lookup(_METRO, regions) > 0
+
+
+def overseas_regions(regions: np.ndarray) -> np.ndarray:
+    """Batch `is_overseas_region` of integer regions."""
+    return _lookup(_OVERSEAS, regions) > 0
@@ -1,7 +1,7 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field, field_validator
 import dagster
-from dagster import resource, String, Int, Bool
+from dagster import resource, String, Int, Bool, Float
 from ..config import Config
 
 class BANConfig(BaseSettings):
@@ -15,6 +15,18 @@ class BANConfig(BaseSettings):
     ttl_not_found_days: int = Field(Config.BAN_TTL_NOT_FOUND_DAYS)
     ttl_low_score_days: int = Field(Config.BAN_TTL_LOW_SCORE_DAYS)
     daily_max_records: int = Field(Config.BAN_DAILY_MAX_RECORDS)
+    geocode_cache: bool = Field(True)
+
+    # Upper bound of the adaptive window of concurrent BAN requests.
+    max_concurrency: int = Field(Config.BAN_MAX_CONCURRENCY)
+    max_attempts: int = Field(Config.BAN_MAX_ATTEMPTS)
+    retry_max_wait: int = Field(Config.BAN_RETRY_MAX_WAIT)
+
+    # "local" geocodes against the BAN export first (see _local.py).
+    geocoder: str = Field(Config.BAN_GEOCODER)
+    local_addresses_dir: str = Field(Config.BAN_LOCAL_ADDRESSES_DIR)
+    local_departments: str = Field(Config.BAN_LOCAL_DEPARTMENTS)
+    local_min_score: float = Field(Config.BAN_LOCAL_MIN_SCORE)
 
     @field_validator("chunk_size")
     def chunk_size_positive(cls, v):
@@ -22,6 +34,18 @@ class BANConfig(BaseSettings):
             raise ValueError("chunk_size must be > 0")
         return v
 
+    @field_validator("max_concurrency", "max_attempts")
+    def at_least_one(cls, v, info):
+        if v < 1:
+            raise ValueError(f"{info.field_name} must be >= 1")
+        return v
+
+    @field_validator("geocoder")
+    def known_geocoder(cls, v):
+        if v not in ("api", "local"):
+            raise ValueError("geocoder must be 'api' or 'local'")
+        return v
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -36,6 +60,14 @@ class BANConfig(BaseSettings):
         "ttl_not_found_days": dagster.Field(Int, default_value=Config.BAN_TTL_NOT_FOUND_DAYS),
         "ttl_low_score_days": dagster.Field(Int, default_value=Config.BAN_TTL_LOW_SCORE_DAYS),
         "daily_max_records": dagster.Field(Int, default_value=Config.BAN_DAILY_MAX_RECORDS),
+        "geocode_cache": dagster.Field(Bool, default_value=True),
+        "max_concurrency": dagster.Field(Int, default_value=Config.BAN_MAX_CONCURRENCY),
+        "max_attempts": dagster.Field(Int, default_value=Config.BAN_MAX_ATTEMPTS),
+        "retry_max_wait": dagster.Field(Int, default_value=Config.BAN_RETRY_MAX_WAIT),
+        "geocoder": dagster.Field(String, default_value=Config.BAN_GEOCODER),
+        "local_addresses_dir": dagster.Field(String, default_value=Config.BAN_LOCAL_ADDRESSES_DIR),
+        "local_departments": dagster.Field(String, default_value=Config.BAN_LOCAL_DEPARTMENTS),
+        "local_min_score": dagster.Field(Float, default_value=Config.BAN_LOCAL_MIN_SCORE),
     }
 )
 def ban_config_resource(init_context):
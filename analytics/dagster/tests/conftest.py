@@ -0,0 +1,26 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+STUB_PATH = Path(__file__).parent.parent / "scripts" / "ban_stub_server.py"
+
+
+def _load_stub_module():
+    spec = importlib.util.spec_from_file_location("ban_stub_server", STUB_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["ban_stub_server"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+ban_stub_server = _load_stub_module()
+
+
+@pytest.fixture
+def ban_stub():
+    """A local BAN /search/csv stub: `ban_stub.url`, `.statuses` to answer
+    first, `.requests` and `.connections` served."""
+    with ban_stub_server.BanStubServer() as server:
+        yield server
@@ -1,9 +1,20 @@
+import argparse
 import importlib.util
+import os
 import sys
+import threading
 from pathlib import Path
 from unittest.mock import MagicMock
 
+import pandas as pd
+import psycopg2
+import pytest
+
 PROJECT_ROOT = Path(__file__).parent.parent
+# The backfill test against PostgreSQL runs with TEST_DATABASE_URL, in its
+# own schema, with the BAN stub.
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCHEMA = "test_backfill_ban_owners"
 
 
 def _load_backfill_module():
@@ -58,3 +69,109 @@ def test_housing_lovac_builds_missing_targets_without_forcing_rebuild():
     )
     build_cursor.execute.assert_any_call(expected_query, expected_params)
     connection.commit.assert_called_once_with()
+
+
+def test_country_cache_is_warmed_with_unmatched_addresses(tmp_path):
+    backfill = _load_backfill_module()
+    path = tmp_path / "countries.sqlite"
+    cache = backfill.open_country_cache(str(path))
+    api = pd.DataFrame(
+        {
+            "address_dgfip": [
+                "221B Baker Street London UK",
+                "221B Baker Street London UK",
+                "12 rue de la Paix 75002 Paris",
+                None,
+            ],
+            "result_status": ["not-found", "not-found", "ok", "error"],
+        }
+    )
+
+    assert backfill.warm_country_cache(cache, api) == 1
+    assert backfill.open_country_cache(None) is None
+    reloaded = backfill.open_country_cache(str(path))
+    assert reloaded.get("221B Baker Street London UK") == "FOREIGN"
+    assert reloaded.get("12 rue de la Paix 75002 Paris") is None
+
+
+@pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_owners_are_backfilled_in_stages_and_the_cursor_saved(
+    ban_stub, tmp_path, monkeypatch
+):
+    backfill = _load_backfill_module()
+    monkeypatch.chdir(tmp_path)
+    setup = psycopg2.connect(DATABASE_URL)
+    with setup, setup.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+            CREATE SCHEMA {SCHEMA};
+            CREATE TABLE {SCHEMA}.owners (
+              id UUID PRIMARY KEY, address_dgfip TEXT[], data_source TEXT
+            );
+            CREATE TABLE {SCHEMA}.ban_addresses (
+              ref_id UUID NOT NULL, house_number TEXT, address TEXT, street TEXT,
+              postal_code TEXT, city TEXT, city_code TEXT, latitude FLOAT,
+              longitude FLOAT, score FLOAT, ban_id TEXT, address_kind TEXT NOT NULL,
+              last_updated_at TIMESTAMP, UNIQUE (ref_id, address_kind)
+            );
+            INSERT INTO {SCHEMA}.owners
+            SELECT gen_random_uuid(),
+                   ARRAY[CASE WHEN n % 5 = 0 THEN 'LIEU INCONNU' ELSE n || ' RUE DE LA GARE' END,
+                         '38200 VIENNE'],
+                   'lovac-2026'
+            FROM generate_series(1, 23) AS n;
+            """
+        )
+    args = argparse.Namespace(
+        by="owner-cohort",
+        data_source="lovac-2026",
+        fetch_batch=5,
+        chunk=2,
+        workers=3,
+        prefetch=1,
+        limit=0,
+        geocoder="api",
+        geocode_cache=True,
+        ttl_not_found_days=90,
+        ttl_low_score_days=90,
+    )
+    conn, read_conn = _connect(), _connect()
+    read_conn.autocommit = True
+    try:
+
+        def run():
+            return backfill._run_batches(
+                conn,
+                read_conn,
+                backfill.OWNER_COHORT_CANDIDATES_SQL,
+                args,
+                api_url=ban_stub.url,
+                establishment_id=None,
+                geo_codes=(),
+                last_id=backfill.ZERO_UUID,
+                stop=threading.Event(),
+            )
+
+        totals = run()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*), count(*) FILTER (WHERE ban_id IS NULL), "
+                "(SELECT id::text FROM owners ORDER BY id DESC LIMIT 1) FROM ban_addresses"
+            )
+            rows, not_found, last_id = cursor.fetchone()
+
+        assert (totals["read"], totals["ok"], totals["not_found"]) == (23, 19, 4)
+        assert (rows, not_found) == (23, 4)
+        assert backfill.load_cursor("owner-cohort", "lovac-2026") == last_id
+        assert run()["read"] == 0
+    finally:
+        conn.close()
+        read_conn.close()
+        with setup, setup.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        setup.close()
+
+
+def _connect():
+    return psycopg2.connect(DATABASE_URL, options=f"-c search_path={SCHEMA}")
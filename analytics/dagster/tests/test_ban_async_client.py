@@ -0,0 +1,121 @@
+"""Tests for the BAN clients against the local stub server (conftest.py),
+with _client.py loaded by path like the backfill script."""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+CLIENT_PATH = Path(__file__).parent.parent / "src" / "assets" / "ban" / "_client.py"
+
+
+def _load_client_module():
+    spec = importlib.util.spec_from_file_location("ban_client_async_test", CLIENT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["ban_client_async_test"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+client = _load_client_module()
+
+HOUSINGS = pd.DataFrame(
+    {
+        "address_dgfip": [
+            "12 RUE DE LA GARE",
+            "LIEU INCONNU",
+            'CHEMIN DU "MOULIN", BAT A',
+            "4 PLACE DE L'EGLISE",
+        ],
+        "geo_code": ["01053", "75056", "2A004", "38200"],
+        "geocode_row": [0, 1, 2, 3],
+    }
+)
+
+
+def test_frames_are_geocoded_in_order_over_kept_alive_connections(ban_stub):
+    frames = [HOUSINGS.iloc[start : start + 2] for start in range(0, 4, 2)] * 3
+
+    responses = client.geocode_frames(
+        frames, ban_stub.url, max_connections=2, rows_per_part=1
+    )
+
+    assert [list(api["address_dgfip"]) for api in responses] == [
+        list(frame["address_dgfip"]) for frame in frames
+    ]
+    assert ban_stub.requests == 6
+    assert ban_stub.connections <= 2
+    first = responses[0]
+    assert list(first["result_status"]) == ["ok", "not-found"]
+    assert first.loc[0, "result_citycode"] == "01053"
+    assert first.loc[0, "result_housenumber"] == "12"
+    assert first.loc[0, "result_score"] == 1.0
+    assert list(first["geocode_row"]) == [0, 1]
+
+
+def test_the_async_client_parses_like_the_requests_client(ban_stub):
+    expected = client.call_ban_api(HOUSINGS, ban_stub.url)
+
+    (api,) = client.geocode_frames([HOUSINGS], ban_stub.url, rows_per_part=3)
+
+    assert list(api.columns) == list(expected.columns)
+    for column in ("address_dgfip", "result_status", "result_label", "result_id"):
+        assert api[column].tolist() == expected[column].tolist()
+    for column in ("result_score", "latitude", "longitude"):
+        pd.testing.assert_series_equal(api[column], expected[column])
+
+
+def test_transient_statuses_are_retried_and_fatal_ones_are_not(ban_stub):
+    ban_stub.statuses = [429, 503]
+    (api,) = client.geocode_frames([HOUSINGS], ban_stub.url, max_wait=0)
+    assert len(api) == 4
+    assert ban_stub.requests == 3
+
+    ban_stub.statuses = [400]
+    with pytest.raises(client.BanApiFatalError, match="400"):
+        client.geocode_frames([HOUSINGS], ban_stub.url, max_wait=0)
+    assert ban_stub.requests == 4
+
+    ban_stub.statuses = [502, 502]
+    with pytest.raises(client.BanApiError):
+        client.geocode_frames([HOUSINGS], ban_stub.url, max_attempts=2, max_wait=0)
+
+
+def test_the_requests_client_keeps_its_connection_alive(ban_stub):
+    for _ in range(3):
+        client.call_ban_api(HOUSINGS, ban_stub.url)
+
+    assert (ban_stub.requests, ban_stub.connections) == (3, 1)
+
+
+def test_a_csv_fed_byte_by_byte_parses_like_a_whole_one():
+    body = (
+        "﻿ref_id,address_dgfip,result_score,result_citycode\r\n"
+        'a,"12 rue ""Haute""\nBAT B",0.5,01053\r\n'
+        "b,,1,\r\n"
+        'c,"rue, Basse",,2A004'
+    ).encode()
+    parser = client.CsvStreamParser()
+    for index in range(len(body)):
+        parser.feed(body[index : index + 1])
+
+    api = parser.finish()
+
+    assert api.astype(object).where(api.notna(), None).to_dict("list") == {
+        "ref_id": ["a", "b", "c"],
+        "address_dgfip": ['12 rue "Haute"\nBAT B', None, "rue, Basse"],
+        "result_score": [0.5, 1.0, None],
+        "result_citycode": ["01053", None, "2A004"],
+    }
+
+
+def test_a_header_only_response_is_an_empty_frame_with_its_columns():
+    parser = client.CsvStreamParser()
+    parser.feed(b"address_dgfip,result_score\n")
+
+    api = parser.finish()
+
+    assert api.empty
+    assert list(api.columns) == ["address_dgfip", "result_score"]
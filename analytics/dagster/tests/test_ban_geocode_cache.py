@@ -0,0 +1,236 @@
+"""Tests for the BAN geocode cache, loaded by path like the backfill script.
+
+The PostgreSQL test runs with TEST_DATABASE_URL in its own schema.
+"""
+
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import psycopg2
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCHEMA = "ban_geocode_cache_test"
+
+
+def _load_cache_module():
+    module_name = "ban_geocode_cache_test"
+    spec = importlib.util.spec_from_file_location(
+        module_name, PROJECT_ROOT / "src" / "assets" / "ban" / "_cache.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+cache_module = _load_cache_module()
+
+
+def _ban(requests):
+    """A BAN stub answering in reverse order, scoring each address by length."""
+
+    def geocode(request):
+        requests.append(request.copy())
+        response = request.iloc[::-1].copy()
+        response["result_status"] = [
+            "not-found" if "INCONNU" in address.upper() else "ok"
+            for address in response["address_dgfip"]
+        ]
+        response["result_label"] = response["address_dgfip"].str.title()
+        response["result_score"] = 0.5 + response["address_dgfip"].str.len() / 100
+        response["result_id"] = "ban_" + response["geocode_row"].astype(str)
+        response["latitude"] = 48.8
+        response["longitude"] = 2.3
+        return response
+
+    return geocode
+
+
+class _MemoryCache:
+    def __init__(self, results=()):
+        self.results = pd.DataFrame(
+            list(results),
+            columns=cache_module.KEY_COLUMNS + cache_module.RESULT_COLUMNS,
+        )
+        self.stored = []
+
+    def lookup(self, keys):
+        return self.results.merge(keys, on=cache_module.KEY_COLUMNS)
+
+    def store(self, results):
+        self.stored.append(results)
+
+
+def test_each_distinct_address_is_geocoded_once_and_fanned_out():
+    requests = []
+    df = pd.DataFrame(
+        {
+            "ref_id": ["a", "b", "c", "d", "e"],
+            "address_dgfip": [
+                "12 RUE DE PARIS 75001 PARIS",
+                "12  rue de Paris 75001 Paris",
+                "LIEU INCONNU",
+                "12 RUE DE PARIS 75001 PARIS ",
+                "3 AVENUE FOCH 69006 LYON",
+            ],
+        }
+    )
+
+    api, stats = cache_module.geocode_deduplicated(df, _ban(requests))
+
+    assert len(requests) == 1
+    assert requests[0]["address_dgfip"].tolist() == [
+        "12 RUE DE PARIS 75001 PARIS",
+        "LIEU INCONNU",
+        "3 AVENUE FOCH 69006 LYON",
+    ]
+    assert api["ref_id"].tolist() == ["a", "b", "c", "d", "e"]
+    assert api["address_dgfip"].tolist() == df["address_dgfip"].tolist()
+    assert api["result_id"].tolist() == ["ban_0", "ban_0", "ban_1", "ban_0", "ban_2"]
+    assert api["result_status"].tolist() == ["ok", "ok", "not-found", "ok", "ok"]
+    assert stats == {
+        "rows": 5,
+        "addresses": 3,
+        "cache_hits": 0,
+        "geocoded": 3,
+        "api_rows_saved": 2,
+        "dedup_ratio": pytest.approx(0.4),
+    }
+
+
+def test_cached_addresses_are_not_sent_and_new_results_are_stored():
+    requests = []
+    cached = [
+        "12 RUE DE PARIS",
+        "",
+        "ok",
+        "12",
+        "12 Rue de Paris",
+        "Rue de Paris",
+        "75001",
+        "Paris",
+        "75101",
+        0.9,
+        "cached",
+        48.86,
+        2.35,
+    ]
+    cache = _MemoryCache([cached])
+    df = pd.DataFrame(
+        {
+            "ref_id": ["a", "b", "c"],
+            "address_dgfip": ["12 rue de Paris", "3 avenue Foch", "12 RUE DE PARIS"],
+        }
+    )
+
+    api, stats = cache_module.geocode_deduplicated(df, _ban(requests), cache)
+
+    assert requests[0]["address_dgfip"].tolist() == ["3 avenue Foch"]
+    assert api.set_index("ref_id")["result_id"].to_dict() == {
+        "a": "cached",
+        "b": "ban_0",
+        "c": "cached",
+    }
+    assert api.set_index("ref_id").loc["a", "result_citycode"] == "75101"
+    assert cache.stored[0][cache_module.KEY_COLUMNS].values.tolist() == [
+        ["3 AVENUE FOCH", ""]
+    ]
+    assert (stats["cache_hits"], stats["geocoded"], stats["api_rows_saved"]) == (
+        1,
+        1,
+        2,
+    )
+
+
+def test_a_fully_cached_batch_does_not_call_ban():
+    cache = _MemoryCache([["3 AVENUE FOCH", "", "not-found"] + [None] * 10])
+    df = pd.DataFrame({"ref_id": ["a"], "address_dgfip": ["3 avenue Foch"]})
+
+    def geocode(request):
+        raise AssertionError("BAN called for a cached address")
+
+    api, stats = cache_module.geocode_deduplicated(df, geocode, cache)
+
+    assert api["result_status"].tolist() == ["not-found"]
+    assert stats["geocoded"] == 0
+    assert cache.stored == []
+
+
+def test_housing_addresses_are_keyed_by_their_citycode():
+    requests = []
+    df = pd.DataFrame(
+        {
+            "ref_id": ["a", "b", "c"],
+            "address_dgfip": ["1 GRANDE RUE", "1 GRANDE RUE", "1 GRANDE RUE"],
+            "geo_code": ["38200", "25056", "38200"],
+        }
+    )
+
+    api, stats = cache_module.geocode_deduplicated(df, _ban(requests))
+
+    assert requests[0]["geo_code"].tolist() == ["38200", "25056"]
+    assert api["result_id"].tolist() == ["ban_0", "ban_1", "ban_0"]
+    assert stats["addresses"] == 2
+
+
+def test_an_empty_batch_has_no_results():
+    df = pd.DataFrame(columns=["ref_id", "address_dgfip"])
+
+    api, stats = cache_module.geocode_deduplicated(df, _ban([]))
+
+    assert api.empty
+    assert stats["rows"] == 0
+    assert stats["dedup_ratio"] == 0.0
+
+
+@pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_cached_results_expire_like_the_daily_sync_predicates():
+    connection = psycopg2.connect(DATABASE_URL)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; "
+            f"SET search_path = {SCHEMA}"
+        )
+        cache = cache_module.GeocodeCache(
+            cursor, ttl_not_found_days=30, ttl_low_score_days=90
+        )
+        cache.create_table()
+        rows = [
+            [key, "", status] + [None] * 6 + [score] + [None] * 3
+            for key, status, score in (
+                ("EXACT", "ok", 1.0),
+                ("LOW SCORE", "ok", 0.8),
+                ("NOT FOUND", "not-found", 0.0),
+                ("FAILED", "error", None),
+            )
+        ]
+        stored = cache.store(
+            pd.DataFrame(
+                rows, columns=cache_module.KEY_COLUMNS + cache_module.RESULT_COLUMNS
+            )
+        )
+        keys = pd.DataFrame(
+            {"address_key": ["EXACT", "LOW SCORE", "NOT FOUND", "FAILED"]}
+        ).assign(citycode="")
+
+        def fresh_keys(age_days):
+            cursor.execute(
+                "UPDATE ban_geocode_cache SET geocoded_at = "
+                "now() AT TIME ZONE 'UTC' - make_interval(days => %s)",
+                (age_days,),
+            )
+            return sorted(cache.lookup(keys)["address_key"])
+
+        assert stored == 3
+        assert fresh_keys(0) == ["EXACT", "LOW SCORE", "NOT FOUND"]
+        assert fresh_keys(60) == ["EXACT", "LOW SCORE"]
+        assert fresh_keys(120) == ["EXACT"]
+    finally:
+        connection.rollback()
+        connection.close()
@@ -0,0 +1,226 @@
+"""Tests for the offline BAN geocoder, on a small export written like the
+BAN ones (adresses-<department>.csv.gz), with _local.py loaded by path."""
+
+import gzip
+import importlib.util
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+LOCAL_PATH = Path(__file__).parent.parent / "src" / "assets" / "ban" / "_local.py"
+
+
+def _load_local_module():
+    spec = importlib.util.spec_from_file_location("ban_local_test", LOCAL_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["ban_local_test"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+local = _load_local_module()
+
+HEADER = (
+    "id;id_fantoir;numero;rep;nom_voie;code_postal;code_insee;nom_commune;"
+    "code_insee_ancienne_commune;nom_ancienne_commune;x;y;lon;lat;type_position;"
+    "alias;nom_ld;libelle_acheminement;nom_afnor;source_position;source_nom_voie;"
+    "certification_commune;cad_parcelles"
+)
+ROWS = {
+    "38": [
+        ("38544_0100_00012", "12", "", "Rue de la Gare", "38200", "38544", "Vienne", 4.870, 45.520),
+        ("38544_0100_00012_bis", "12", "bis", "Rue de la Gare", "38200", "38544", "Vienne", 4.871, 45.521),
+        ("38544_0100_00014", "14", "", "Rue de la Gare", "38200", "38544", "Vienne", 4.874, 45.524),
+        ("38544_0200_00003", "3", "", "Avenue du Général de Gaulle", "38200", "38544", "Vienne", 4.880, 45.530),
+        ("38544_0300_99999", "99999", "", "Les Champs", "38200", "38544", "Vienne", 4.900, 45.500),
+        ("38053_0100_00001", "1", "", "Grande Rue", "38300", "38053", "Bourgoin-Jallieu", 5.270, 45.590),
+    ],
+    "69": [
+        ("69123_0400_00007", "7", "", "Place Bellecour", "69002", "69382", "Lyon 2e Arrondissement", 4.832, 45.757),
+        ("69123_0500_00001", "1", "", "Place de l'Église", "69002", "69382", "Lyon 2e Arrondissement", 4.830, 45.750),
+    ],
+}
+
+
+def _write_export(directory, department, rows):
+    path = directory / f"adresses-{department}.csv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as export:
+        export.write(HEADER + "\n")
+        for id_, numero, rep, voie, postcode, insee, commune, lon, lat in rows:
+            export.write(
+                f"{id_};;{numero};{rep};{voie};{postcode};{insee};{commune};;;0;0;"
+                f"{lon};{lat};entrée;;;{commune.upper()};;;;1;\n"
+            )
+    return path
+
+
+@pytest.fixture
+def export_dir(tmp_path):
+    for department, rows in ROWS.items():
+        _write_export(tmp_path, department, rows)
+    return tmp_path
+
+
+@pytest.fixture
+def geocoder(export_dir):
+    return local.LocalGeocoder.load(export_dir)
+
+
+def test_housings_are_geocoded_against_their_commune(geocoder):
+    request = pd.DataFrame(
+        {
+            "address_dgfip": [
+                "0012 RUE DE LA GARE",
+                "12 B R DE LA GARE",
+                "3 AV DU GAL DE GAULLE",
+                "99 RUE DE LA GARE",
+                "LIEU DIT LES CHAMPS",
+                "14 RUE DE LA GAR",
+                "5 RUE INCONNUE",
+                "12 RUE DE LA GARE",
+            ],
+            "geo_code": ["38544"] * 7 + ["38053"],
+            "geocode_row": range(8),
+        }
+    )
+
+    api = geocoder(request)
+
+    assert list(api.columns) == list(request.columns) + local.RESULT_COLUMNS
+    assert api["geocode_row"].tolist() == list(range(8))
+    assert api["result_status"].tolist() == ["ok"] * 6 + ["not-found"] * 2
+    assert api["result_id"].tolist()[:6] == [
+        "38544_0100_00012",
+        "38544_0100_00012_bis",
+        "38544_0200_00003",
+        "38544_0100",
+        "38544_0300",
+        "38544_0100_00014",
+    ]
+    assert api["result_type"].tolist()[:6] == [
+        "housenumber",
+        "housenumber",
+        "housenumber",
+        "street",
+        "street",
+        "housenumber",
+    ]
+    scores = api["result_score"].tolist()
+    assert scores[:3] == [1.0, 1.0, 1.0]
+    assert scores[3] == scores[4] == local.STREET_SCORE
+    assert local.MIN_SIMILARITY <= scores[5] < 1.0
+    first = api.iloc[0]
+    assert first["result_label"] == "12 Rue de la Gare 38200 Vienne"
+    assert (first["result_citycode"], first["result_postcode"]) == ("38544", "38200")
+    assert (first["latitude"], first["longitude"]) == (45.520, 4.870)
+    assert api.loc[1, "result_housenumber"] == "12bis"
+    assert api.loc[3, "latitude"] == pytest.approx((45.520 + 45.521 + 45.524) / 3)
+
+
+def test_owners_are_geocoded_through_the_postcode_of_their_address(geocoder):
+    request = pd.DataFrame(
+        {
+            "address_dgfip": [
+                "APPT 4 14 RUE DE LA GARE 38200 VIENNE",
+                "7 PL BELLECOUR 69002 LYON",
+                "1 PL DE L EGLISE 69002 LYON",
+                "221B BAKER STREET LONDON",
+                "7 PL BELLECOUR 75002 PARIS",
+            ]
+        }
+    )
+
+    api = geocoder(request)
+
+    assert api["result_id"].tolist()[:3] == [
+        "38544_0100_00014",
+        "69123_0400_00007",
+        "69123_0500_00001",
+    ]
+    assert api["result_citycode"].tolist()[:2] == ["38544", "69382"]
+    assert api.loc[2, "result_street"] == "Place de l'Église"
+    assert api["result_status"].tolist() == ["ok"] * 3 + ["not-found"] * 2
+
+
+def test_parquet_exports_load_like_csv_ones(export_dir, tmp_path_factory):
+    parquet_dir = tmp_path_factory.mktemp("parquet")
+    local.read_export([export_dir / "adresses-38.csv.gz"]).to_parquet(
+        parquet_dir / "adresses-38.parquet"
+    )
+    request = pd.DataFrame(
+        {"address_dgfip": ["12 RUE DE LA GARE", "1 GRANDE RUE"], "geo_code": ["38544", "38053"]}
+    )
+
+    from_csv = local.LocalGeocoder.load(export_dir, ["38"])(request)
+    from_parquet = local.LocalGeocoder.load(parquet_dir, ["38"])(request)
+
+    pd.testing.assert_frame_equal(from_parquet, from_csv)
+    assert from_csv["result_status"].tolist() == ["ok", "ok"]
+
+
+def test_only_the_requested_departments_are_loaded(export_dir):
+    geocoder = local.LocalGeocoder.load(export_dir, ["69"])
+
+    assert set(geocoder.streets["citycode"]) == {"69382"}
+    assert len(geocoder.numbers) == 2
+    assert local.parse_departments(" 38, 2A,,") == ["38", "2A"]
+    assert local.parse_departments("") is None
+    with pytest.raises(FileNotFoundError, match=r"\['2A'\]"):
+        local.export_paths(export_dir, ["2A"])
+
+
+def test_unresolved_and_low_score_rows_go_to_the_api(geocoder):
+    sent = []
+
+    def api(request):
+        sent.append(request.copy())
+        return request.assign(
+            result_status="ok", result_score=0.93, result_id="api", result_type="api"
+        )
+
+    geocode = local.LocalThenApi(geocoder, api, min_score=0.8)
+    request = pd.DataFrame(
+        {
+            "address_dgfip": ["12 RUE DE LA GARE", "99 RUE DE LA GARE", "5 RUE INCONNUE"],
+            "geo_code": ["38544", "38544", "38544"],
+            "geocode_row": [0, 1, 2],
+        },
+        index=[10, 11, 12],
+    )
+
+    out = geocode(request)
+
+    assert sent[0]["geocode_row"].tolist() == [1, 2]
+    assert out.index.tolist() == [10, 11, 12]
+    assert out["result_id"].tolist() == ["38544_0100_00012", "api", "api"]
+    assert out["geocode_row"].tolist() == [0, 1, 2]
+    assert geocode.counts == {"local": 1, "api": 2}
+
+
+def test_a_fully_local_batch_does_not_call_the_api(geocoder):
+    def api(request):
+        raise AssertionError("API called for resolved rows")
+
+    geocode = local.LocalThenApi(geocoder, api)
+    out = geocode(pd.DataFrame({"address_dgfip": ["12 RUE DE LA GARE"], "geo_code": ["38544"]}))
+
+    assert out["result_status"].tolist() == ["ok"]
+
+
+@pytest.mark.parametrize(
+    ("address", "parsed"),
+    [
+        ("12 RUE DE LA GARE 38200 VIENNE", ("12", "RUE GARE", "38200")),
+        ("12B BD ST MICHEL", ("12 BIS", "BOULEVARD SAINT MICHEL", None)),
+        ("12 B AV DU GAL DE GAULLE", ("12 BIS", "AVENUE GENERAL GAULLE", None)),
+        ("APPT 3 BAT A 4 RUE DU 8 MAI 1945 75011 PARIS", ("4", "RUE 8 MAI 1945", "75011")),
+        ("RUE DU 11 NOVEMBRE", (None, "RUE 11 NOVEMBRE", None)),
+        ("LIEU DIT LES CHAMPS 38200 VIENNE", (None, "CHAMPS", "38200")),
+        ("Chemin de l'Église", (None, "CHEMIN EGLISE", None)),
+        ("", (None, "", None)),
+    ],
+)
+def test_dgfip_addresses_are_parsed_into_keys(address, parsed):
+    assert local.parse_address(address) == parsed
@@ -0,0 +1,342 @@
+"""Tests for the concurrent BAN sync pipeline and its adaptive client,
+loaded by path like the backfill script."""
+
+import importlib.util
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+BAN_ROOT = Path(__file__).parent.parent / "src" / "assets" / "ban"
+
+
+def _load(module_name, filename):
+    spec = importlib.util.spec_from_file_location(module_name, BAN_ROOT / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+client = _load("ban_client_pipeline_test", "_client.py")
+pipeline = _load("ban_pipeline_test", "_pipeline.py")
+
+IDS = [f"00000000-0000-0000-0000-{index:012d}" for index in range(1, 11)]
+
+
+class _Candidates:
+    """The candidates query: every id of IDS after `after`, by id."""
+
+    def __init__(self, ids=IDS):
+        self.ids = ids
+        self.reads = []
+
+    def __call__(self, after, limit):
+        self.reads.append((after, limit))
+        ids = [ref_id for ref_id in self.ids if ref_id > after][:limit]
+        return pd.DataFrame({"ref_id": ids, "address_dgfip": ids})
+
+
+class _Writer:
+    def __init__(self):
+        self.written = []
+
+    def prepare(self, chunk):
+        def write(api):
+            self.written.extend(api["ref_id"])
+            return {"ok": len(api)}
+
+        return chunk, write
+
+
+def _echo(request):
+    return request
+
+
+def test_chunks_are_read_by_keyset_and_all_written():
+    read, writer = _Candidates(), _Writer()
+
+    totals = pipeline.run_pipeline(
+        read, writer.prepare, _echo, window=2, chunk_size=4, cap=100
+    )
+
+    assert read.reads == [
+        (pipeline.KEYSET_START, 4),
+        (IDS[3], 4),
+        (IDS[7], 4),
+        (IDS[9], 4),
+    ]
+    assert sorted(writer.written) == IDS
+    assert (totals["read"], totals["ok"], totals["batches"], totals["failed"]) == (
+        10,
+        10,
+        3,
+        0,
+    )
+
+
+def test_the_cap_bounds_the_candidates_read():
+    read, writer = _Candidates(), _Writer()
+
+    totals = pipeline.run_pipeline(
+        read, writer.prepare, _echo, window=4, chunk_size=4, cap=6
+    )
+
+    assert [limit for _, limit in read.reads] == [4, 2]
+    assert sorted(writer.written) == IDS[:6]
+    assert totals["read"] == 6
+
+
+def test_no_more_than_window_requests_are_in_flight():
+    in_flight = peak = 0
+    lock = threading.Lock()
+
+    def geocode(request):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return request
+
+    writer = _Writer()
+    pipeline.run_pipeline(
+        _Candidates(), writer.prepare, geocode, window=3, chunk_size=1, cap=100
+    )
+
+    assert peak == 3
+    assert sorted(writer.written) == IDS
+
+
+def test_a_failed_chunk_is_counted_and_stepped_over():
+    errors = []
+
+    def geocode(request):
+        if IDS[4] in set(request["ref_id"]):
+            raise client.BanApiError("BAN transient status 503")
+        return request
+
+    writer = _Writer()
+    totals = pipeline.run_pipeline(
+        _Candidates(),
+        writer.prepare,
+        geocode,
+        window=2,
+        chunk_size=3,
+        cap=100,
+        on_error=lambda number, chunk, error: errors.append((number, len(chunk))),
+    )
+
+    assert errors == [(2, 3)]
+    assert sorted(writer.written) == IDS[:3] + IDS[6:]
+    assert (totals["failed"], totals["ok"], totals["batches"]) == (3, 7, 3)
+
+
+def test_an_error_raised_by_on_error_stops_the_run():
+    read = _Candidates()
+
+    def geocode(request):
+        raise client.BanApiFatalError("BAN non-retryable status 400")
+
+    def on_error(number, chunk, error):
+        raise error
+
+    with pytest.raises(client.BanApiFatalError):
+        pipeline.run_pipeline(
+            read,
+            _Writer().prepare,
+            geocode,
+            window=1,
+            chunk_size=2,
+            cap=100,
+            on_error=on_error,
+        )
+    assert len(read.reads) == 1
+
+
+def test_an_empty_request_is_written_without_calling_ban():
+    written = []
+
+    def prepare(chunk):
+        return chunk.iloc[:0], lambda api: written.append(api) or {"ok": 0}
+
+    def geocode(request):
+        raise AssertionError("BAN called without addresses")
+
+    totals = pipeline.run_pipeline(
+        _Candidates(), prepare, geocode, window=2, chunk_size=5, cap=100
+    )
+
+    assert len(written) == 2 and all(api.empty for api in written)
+    assert totals["batches"] == 2
+
+
+def _slices(size):
+    def prepare(batch):
+        written = []
+
+        def write(api):
+            written.extend(api["ref_id"])
+            return {"ok": len(api)}
+
+        return [batch.iloc[i : i + size] for i in range(0, len(batch), size)], write
+
+    return prepare
+
+
+def test_stages_write_slices_as_they_complete_and_checkpoint_in_order():
+    written, checkpoints = [], []
+
+    def geocode(request):
+        # The first slice of the first batch answers last.
+        if IDS[0] in set(request["ref_id"]):
+            time.sleep(0.2)
+        return request
+
+    def prepare(batch):
+        requests, _ = _slices(2)(batch)
+
+        def write(api):
+            written.extend(api["ref_id"])
+            return {"ok": len(api)}
+
+        return requests, write
+
+    totals = pipeline.run_stages(
+        _Candidates(),
+        prepare,
+        geocode,
+        workers=4,
+        fetch_size=4,
+        checkpoint=checkpoints.append,
+    )
+
+    # Batch 2 written before the end of batch 1, checkpointed after it.
+    assert written.index(IDS[0]) > max(written.index(ref_id) for ref_id in IDS[2:8])
+    assert sorted(written) == IDS
+    assert checkpoints == [IDS[3], IDS[7], IDS[9]]
+    assert (totals["read"], totals["ok"], totals["batches"], totals["slices"]) == (
+        10,
+        10,
+        3,
+        5,
+    )
+
+
+def test_the_next_batch_is_fetched_while_the_current_one_is_geocoded():
+    events = []
+    read = _Candidates()
+
+    def fetch(after, limit):
+        events.append(("fetch", after))
+        return read(after, limit)
+
+    def geocode(request):
+        time.sleep(0.05)
+        events.append(("geocoded", request["ref_id"].iloc[0]))
+        return request
+
+    pipeline.run_stages(
+        fetch, _slices(5), geocode, workers=1, fetch_size=5, window=1
+    )
+
+    assert events.index(("fetch", IDS[4])) < events.index(("geocoded", IDS[0]))
+
+
+def test_a_stop_finishes_the_batches_taken_and_fetches_no_more():
+    stop = threading.Event()
+    read, checkpoints = _Candidates(), []
+
+    def on_batch(number, batch, totals):
+        stop.set()
+
+    totals = pipeline.run_stages(
+        read,
+        _slices(1),
+        _echo,
+        workers=2,
+        fetch_size=2,
+        window=1,
+        checkpoint=checkpoints.append,
+        on_batch=on_batch,
+        stop=stop,
+    )
+
+    assert checkpoints == [IDS[1]]
+    assert totals["read"] == 2
+    assert len(read.reads) <= 3
+
+
+def test_a_failed_fetch_stops_the_stages():
+    def fetch(after, limit):
+        raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError, match="connection lost"):
+        pipeline.run_stages(fetch, _slices(1), _echo, workers=1, fetch_size=2)
+
+
+def test_concurrency_halves_on_backoff_and_widens_after_a_full_window():
+    concurrency = client.AdaptiveConcurrency(4)
+
+    concurrency.backoff()
+    concurrency.backoff()
+    concurrency.backoff()
+    assert concurrency.limit == 1
+    assert concurrency.throttled == 3
+
+    concurrency.succeeded()
+    assert concurrency.limit == 2
+    concurrency.succeeded()
+    assert concurrency.limit == 2
+    concurrency.succeeded()
+    assert concurrency.limit == 3
+    for _ in range(10):
+        concurrency.succeeded()
+    assert concurrency.limit == 4
+
+
+def test_adaptive_call_retries_transient_statuses_and_backs_off(monkeypatch):
+    responses = [client.BanApiError("429"), client.BanApiError("502"), "response"]
+    monkeypatch.setattr(
+        client, "post_ban_csv", lambda df, api_url, timeout: _raise_or_return(responses)
+    )
+    concurrency = client.AdaptiveConcurrency(8)
+
+    api = client.call_ban_api_adaptive(
+        pd.DataFrame(), "unused", concurrency, max_attempts=3, max_wait=0
+    )
+
+    assert api == "response"
+    assert (concurrency.limit, concurrency.throttled) == (2, 2)
+
+
+def test_adaptive_call_gives_up_after_max_attempts_and_on_fatal_errors(monkeypatch):
+    concurrency = client.AdaptiveConcurrency(2)
+    responses = [client.BanApiError("503")] * 2
+    monkeypatch.setattr(
+        client, "post_ban_csv", lambda df, api_url, timeout: _raise_or_return(responses)
+    )
+    with pytest.raises(client.BanApiError):
+        client.call_ban_api_adaptive(
+            pd.DataFrame(), "unused", concurrency, max_attempts=2, max_wait=0
+        )
+
+    responses = [client.BanApiFatalError("400"), "unreached"]
+    with pytest.raises(client.BanApiFatalError):
+        client.call_ban_api_adaptive(
+            pd.DataFrame(), "unused", concurrency, max_attempts=2, max_wait=0
+        )
+    assert responses == ["unreached"]
+    assert concurrency.throttled == 2
+
+
+def _raise_or_return(responses):
+    response = responses.pop(0)
+    if isinstance(response, Exception):
+        raise response
+    return response
@@ -0,0 +1,205 @@
+import random
+import re
+import unicodedata
+from functools import lru_cache
+
+import pytest
+
+from src.owner_housing_locations.country_detector import (
+    FOREIGN_COUNTRY_TERMS,
+    FRANCE_TERMS,
+    FRENCH_OVERSEAS_TERMS,
+    STREET_OR_BUILDING_TERMS,
+    CountryDetector,
+)
+
+
+# The term-by-term detection the compiled matchers replaced.
+def _reference_normalize(text):
+    without_accents = "".join(
+        char
+        for char in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(char)
+    )
+    normalized = re.sub(r"[^a-z0-9]+", " ", without_accents.lower())
+    return re.sub(r"\s+", " ", normalized).strip()
+
+
+# Compiled once per term, only so that the reference runs in seconds.
+@lru_cache(maxsize=None)
+def _reference_embedded(term):
+    street_terms = "|".join(re.escape(token) for token in STREET_OR_BUILDING_TERMS)
+    return re.compile(
+        rf"\b(?:{street_terms})\s+"
+        rf"(?:(?:de|du|des|d|l|la|le|les)\s+){{0,2}}"
+        rf"{re.escape(term)}\b"
+    )
+
+
+def _reference_term(address, terms):
+    normalized = _reference_normalize(address)
+    if not normalized:
+        return None
+    components = tuple(
+        component
+        for component in (
+            _reference_normalize(part) for part in re.split(r"[,;\n\r|]+", address)
+        )
+        if component
+    )
+    last_component = components[-1] if components else ""
+    has_separator = len(components) > 1
+
+    for term in sorted(terms, key=len, reverse=True):
+        normalized_term = _reference_normalize(term)
+        if not normalized_term:
+            continue
+        if normalized == normalized_term:
+            return term
+        if has_separator and last_component == normalized_term:
+            return term
+        if _reference_embedded(normalized_term).search(normalized):
+            continue
+        if any(char.isdigit() for char in normalized) and (
+            normalized == normalized_term or normalized.endswith(f" {normalized_term}")
+        ):
+            return term
+    return None
+
+
+def _reference_reason(address):
+    if not address or not str(address).strip():
+        return "empty_address"
+    address = str(address).strip()
+    term = _reference_term(address, FRANCE_TERMS + FRENCH_OVERSEAS_TERMS)
+    if term:
+        return f"explicit_france:{term}"
+    term = _reference_term(address, FOREIGN_COUNTRY_TERMS)
+    if term:
+        return f"explicit_foreign_country:{term}"
+    return "no_explicit_country"
+
+
+TERMS = FRANCE_TERMS + FRENCH_OVERSEAS_TERMS + FOREIGN_COUNTRY_TERMS
+TEMPLATES = (
+    "{term}",
+    "{TERM}",
+    "12 {term}",
+    "Paris, {term}",
+    "12 rue {term}",
+    "12 rue de la {term}",
+    "1 avenue de l'{term} 75000 Paris",
+    "{term} 12",
+    "{term}, 12 rue Haute",
+    "12 rue de {term}, {term}",
+    "BP 4 | {term}",
+    "{term};",
+    "12 rue Haute\n{term}",
+    "Rue de {term}, 9 {term}",
+    "7 quai des {term} {term}",
+    "{term} {term} 3",
+)
+WORDS = (
+    "12",
+    "75002",
+    "bp",
+    "Paris",
+    "Saint",
+    "de",
+    "la",
+    "l'",
+    "d'",
+    "et",
+    "du",
+    "rue",
+    "Avenue",
+    "quai",
+    "Tour",
+    "République",
+    "Française",
+    "Réunion",
+    "États-Unis",
+    "royaume",
+    "uni",
+    "new",
+    "york",
+    "sri",
+    "lanka",
+    "ＦＲＡＮＣＥ",
+    "guyane",
+    "française",
+)
+SEPARATORS = (" ", " ", " ", ", ", ";", " - ", "|", "\n", "  ", "'", ",,")
+
+
+def _addresses(count, seed):
+    rng = random.Random(seed)
+    addresses = [
+        template.format(term=term, TERM=term.upper())
+        for term in TERMS
+        for template in TEMPLATES
+    ]
+    vocabulary = WORDS + TERMS
+    for _ in range(count):
+        parts = [rng.choice(vocabulary) for _ in range(rng.randint(1, 7))]
+        address = parts[0]
+        for part in parts[1:]:
+            address += rng.choice(SEPARATORS) + part
+        addresses.append(address)
+    return addresses + ["", "   ", ",", "12", "; ;", None]
+
+
+def test_compiled_matchers_agree_with_term_by_term_detection():
+    addresses = _addresses(2_000, seed=17)
+    detector = CountryDetector()
+
+    results = detector.classify_many(addresses)
+
+    assert [result.reason for result in results] == [
+        _reference_reason(address) for address in addresses
+    ]
+    reasons = {result.reason.split(":")[0] for result in results}
+    assert reasons == {
+        "empty_address",
+        "explicit_france",
+        "explicit_foreign_country",
+        "no_explicit_country",
+    }
+
+
+def test_classify_many_classifies_each_distinct_address_once(monkeypatch):
+    detector = CountryDetector()
+    classify = detector.classify_address
+    calls = []
+
+    def counting(address):
+        calls.append(address)
+        return classify(address)
+
+    monkeypatch.setattr(detector, "classify_address", counting)
+    addresses = ["Paris, France", "10115 Berlin Allemagne", "Paris, France", None]
+
+    results = detector.classify_many(addresses)
+
+    assert [result.value for result in results] == [
+        "FRANCE",
+        "FOREIGN",
+        "FRANCE",
+        "UNKNOWN",
+    ]
+    assert calls == ["Paris, France", "10115 Berlin Allemagne", None]
+    assert detector.classify_many([]) == []
+
+
+@pytest.mark.parametrize(
+    ("address", "reason"),
+    [
+        ("1 rue d'Italie", "no_explicit_country"),
+        ("1 rue d'Italie, Italie", "explicit_foreign_country:italie"),
+        ("12 Guyane Française", "explicit_france:guyane francaise"),
+        ("Colombo, Sri Lanka 3", "no_explicit_country"),
+        ("3 Colombo Sri Lanka", "explicit_foreign_country:sri lanka"),
+    ],
+)
+def test_longest_term_wins(address, reason):
+    assert CountryDetector().classify_address(address).reason == reason
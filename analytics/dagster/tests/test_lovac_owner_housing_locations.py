@@ -1,9 +1,16 @@
 import importlib.util
+import itertools
+import random
 import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
 from pathlib import Path
 from types import ModuleType, SimpleNamespace
 from unittest.mock import MagicMock, Mock
 
+import numpy as np
 import pytest
 from psycopg2.extensions import parse_dsn
 
@@ -40,9 +47,13 @@ def _load_asset_module():
 
 
 asset_module = _load_asset_module()
-from src.owner_housing_locations import LocationScope  # noqa: E402
+from src.owner_housing_locations import LocationScope, geography  # noqa: E402
+from src.owner_housing_locations import calculator as calculator_module  # noqa: E402
 from src.owner_housing_locations.calculator import (  # noqa: E402
+    CountryCache,
+    DistanceCalculator,
     LocationComputationError,
+    LocationComputationReport,
 )
 
 
@@ -73,6 +84,12 @@ def _location_context(*, dry_run: bool = False):
             "limit": 0,
             "batch_size": 100,
             "num_workers": 1,
+            "classify_workers": 1,
+            "country_cache_path": "",
+            "shard_workers": 0,
+            "shards": [],
+            "materialize_scope": True,
+            "incremental": False,
         },
         log=SimpleNamespace(info=Mock()),
         resources=SimpleNamespace(
@@ -96,6 +113,7 @@ def _backfill_context(**overrides):
         "workers": 2,
         "chunk": 100,
         "fetch_batch": 500,
+        "country_cache_path": "",
     }
     config.update(overrides)
     return SimpleNamespace(
@@ -146,6 +164,401 @@ def _backfill_report():
     return {"scope": _report().to_dict()["scope"]}
 
 
+def _random_address(rng, kind):
+    postal = rng.choice(
+        ["75002", "75011", "59000", "59800", "62100", "13001", "2A004", "20000",
+         "97100", "97200", "97400", "98800", "1", "", None]
+    )
+    address = rng.choice(
+        ["12 rue de la Paix 75002 Paris France", "221B Baker Street London United Kingdom",
+         "BP 12 Casablanca MAROC", "Lot 5", "   ", "null", None]
+    )
+    latitude, longitude = rng.choice(
+        [(48.86, 2.33), (50.63, 3.06), (43.3, 5.37), (16.24, -61.53), (-21.1, 55.5),
+         (95.0, 2.0), (48.0, 200.0), (float("nan"), 2.0), (True, 2.0), (None, None)]
+    )
+    geo_code = rng.choice(["75102", "59350", "2A004", "97105", "98818", None])
+    ban_id = rng.choice(["75102_1234_00012", "59350_0001_00001", "", None])
+    return (postal, address, latitude, longitude, geo_code if kind == "Owner" else None, ban_id)
+
+
+def _random_pairs(count, seed):
+    rng = random.Random(seed)
+    owner_ids = [f"owner-{index}" for index in range(count // 4)]
+    housing_ids = [f"housing-{index}" for index in range(count // 2)]
+    address_cache = {}
+    for ref_ids, kind in ((owner_ids, "Owner"), (housing_ids, "Housing")):
+        for ref_id in ref_ids:
+            if rng.random() < 0.9:
+                address_cache[(ref_id, kind)] = _random_address(rng, kind)
+    pairs = [
+        {
+            "owner_id": rng.choice(owner_ids),
+            "housing_id": rng.choice(housing_ids),
+            "housing_geo_code": rng.choice(["75102", "59350", "2A004", "97105", "", None]),
+        }
+        for _ in range(count)
+    ]
+    return pairs, address_cache
+
+
+def test_batch_classification_matches_single_pair_reference():
+    pairs, address_cache = _random_pairs(5_000, seed=11)
+
+    reference = DistanceCalculator("postgresql://unused")
+    expected = [
+        reference.process_single_pair(
+            pair["owner_id"], pair["housing_id"], address_cache, pair["housing_geo_code"]
+        )
+        for pair in pairs
+    ]
+    calculator = DistanceCalculator("postgresql://unused")
+    classification_counts = Counter()
+    updates = calculator._prepare_pair_updates(pairs, address_cache, classification_counts)
+
+    assert [update["classification"] for update in updates] == [
+        classification for _, classification in expected
+    ]
+    assert [update["distance"] for update in updates] == [
+        pytest.approx(distance, rel=1e-12) if distance is not None else None
+        for distance, _ in expected
+    ]
+    assert classification_counts == Counter(classification for _, classification in expected)
+    assert calculator.stats == reference.stats | {"processed_pairs": len(pairs)}
+    assert len(classification_counts) == 8
+
+
+def test_batch_classification_handles_an_empty_batch():
+    calculator = DistanceCalculator("postgresql://unused")
+
+    assert calculator._prepare_pair_updates([], {}, Counter()) == []
+    assert calculator.stats == DistanceCalculator._empty_stats()
+
+
+def test_country_detections_persist_across_runs(tmp_path, monkeypatch):
+    path = tmp_path / "countries.sqlite"
+    addresses = ["12 RUE DE LA PAIX, 75002 PARIS, FRANCE", "221B Baker Street London UK", "  "]
+    first = DistanceCalculator("postgresql://unused", country_cache_path=path)
+    first._load_country_cache()
+    countries = [first.detect_country_simple(address) for address in addresses]
+    report = SimpleNamespace()
+    first._save_country_cache(report)
+
+    second = DistanceCalculator("postgresql://unused", country_cache_path=path)
+    second._load_country_cache()
+    monkeypatch.setattr(
+        second.country_detector, "detect_country", Mock(side_effect=AssertionError)
+    )
+
+    assert countries == ["FRANCE", "FOREIGN", "UNKNOWN"]
+    assert [second.detect_country_simple(address) for address in addresses] == countries
+    assert report.country_cache | {"path": None, "version": None} == {
+        "path": None,
+        "version": None,
+        "loaded": 0,
+        "saved": 2,
+        "hits": 0,
+        "misses": 2,
+        "hit_rate": 0.0,
+    }
+    assert second.country_cache.statistics()["hit_rate"] == 1.0
+
+
+def test_country_cache_drops_detections_of_other_detector_versions(tmp_path):
+    path = tmp_path / "countries.sqlite"
+    old = CountryCache(path, "1")
+    old["1 Main Street New York USA"] = "FRANCE"
+    old.save()
+
+    cache = CountryCache(path, "2")
+
+    assert cache.load() == 0
+    assert cache.get("1 Main Street New York USA") is None
+    assert CountryCache(path, "1").load() == 0
+
+
+def _geography_codes():
+    alphabet = ["", "0", "2", "7", "8", "9", "A", "B", "a", "x", "é"]
+    codes = ["".join(chars) for chars in itertools.product(alphabet, repeat=3)]
+    codes += [code + "01" for code in codes] + list(geography.DEPARTMENT_REGIONS)
+    rng = random.Random(12)
+    codes += [f"{rng.randrange(100_000):05}" for _ in range(5_000)]
+    return sorted(set(codes))
+
+
+def test_geography_batch_lookups_match_single_lookups():
+    codes = _geography_codes()
+
+    def region_number(region):
+        return int(region) if region else -1
+
+    assert geography.regions_of_postal_codes(codes).tolist() == [
+        region_number(geography.region_of_postal_code(code)) for code in codes
+    ]
+    assert geography.regions_of_geo_codes(codes).tolist() == [
+        region_number(geography.region_of_department(geography.department(code)))
+        for code in codes
+    ]
+    # Same integer exactly when same department name
+    pairs = set(zip(geography.departments(codes).tolist(), map(geography.department, codes)))
+    assert len(pairs) == len({key for key, _ in pairs}) == len({name for _, name in pairs})
+
+    regions = [f"{number:02}" for number in range(100)]
+    numbers = np.arange(-1, 100)
+    assert geography.metro_regions(numbers).tolist() == [False] + [
+        geography.is_metro_region(region) for region in regions
+    ]
+    assert geography.overseas_regions(numbers).tolist() == [False] + [
+        geography.is_overseas_region(region) for region in regions
+    ]
+
+
+def test_geography_tables_are_frozen():
+    with pytest.raises(TypeError):
+        geography.DEPARTMENT_REGIONS["99"] = "11"
+    with pytest.raises(ValueError):
+        geography._REGION_BY_TWO[0] = 11
+
+
+def test_department_ranges_hold_every_geo_code_once():
+    ranges = geography.department_ranges()
+
+    for code in _geography_codes():
+        holding = [
+            name
+            for name, low, high in ranges
+            if (low is None or low <= code) and (high is None or code < high)
+        ]
+        assert holding == [geography.department_range(code)]
+    assert {name for name, _, _ in ranges} == set(geography.DEPARTMENT_REGIONS)
+
+
+def test_location_shards_split_geo_codes_by_department():
+    scope = LocationScope(
+        data_file_year="lovac-2026", geo_codes=("59350", "97105", "2A004", "59512")
+    )
+
+    shards = calculator_module.location_shards(scope)
+
+    assert [(name, shard.geo_codes) for name, shard in shards] == [
+        ("2A", ("2A004",)),
+        ("59", ("59350", "59512")),
+        ("971", ("97105",)),
+    ]
+    assert all(shard.geo_code_range == (None, None) for _, shard in shards)
+    assert calculator_module.location_shards(scope, ["971"]) == shards[2:]
+    with pytest.raises(ValueError, match="Unknown department shards: 99"):
+        calculator_module.location_shards(scope, ["99"])
+
+
+def test_location_shards_bound_other_scopes_by_geo_code_range():
+    scope = LocationScope(data_file_year="lovac-2026", establishment_id=ESTABLISHMENT_ID)
+
+    shards = dict(calculator_module.location_shards(scope, ["2B", "59", "976"]))
+
+    assert {name: shard.geo_code_range for name, shard in shards.items()} == {
+        "2B": ("2B", "30"),
+        "59": ("59", "60"),
+        "976": ("976", None),
+    }
+    assert all(shard.establishment_id == ESTABLISHMENT_ID for shard in shards.values())
+    clauses, params = DistanceCalculator("postgresql://unused")._scope_sql(shards["59"])
+    assert clauses[-2:] == ["h.geo_code >= %(geo_code_low)s", "h.geo_code < %(geo_code_high)s"]
+    assert (params["geo_code_low"], params["geo_code_high"]) == ("59", "60")
+
+
+def _shard_report(scope, **values):
+    return {
+        "scope": {"geo_code_range": list(scope.geo_code_range)},
+        "candidate_count": 10,
+        "processed_pairs": 10,
+        "updates_prepared": 10,
+        "updated_pairs": 10,
+        "errors": 0,
+        "classification_counts": {"1": 6, "7": 4},
+        "stats": {"processed_pairs": 10, "errors": 0},
+        "country_cache": {"path": None, "version": "v", "hits": 3, "misses": 1},
+    } | values
+
+
+def _thread_pool(start_methods):
+    """Stands for the shard process pool, recording its start method; the
+    stubbed shards run in threads."""
+
+    def pool(max_workers, mp_context):
+        start_methods.append(mp_context.get_start_method())
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+    return pool
+
+
+def test_sharded_run_retries_only_failed_shards(monkeypatch):
+    attempts = Counter()
+    start_methods = []
+
+    def run_shard(db_url, scope, options):
+        department = scope.geo_code_range[0]
+        attempts[department] += 1
+        if department == "59" and attempts[department] == 1:
+            return _shard_report(scope, processed_pairs=4, errors=1), "lost connection"
+        return _shard_report(scope), None
+
+    monkeypatch.setattr(
+        calculator_module, "ProcessPoolExecutor", _thread_pool(start_methods)
+    )
+    monkeypatch.setattr(calculator_module, "_run_location_shard", run_shard)
+
+    report = calculator_module.calculate_owner_housing_locations(
+        "postgresql://unused",
+        "lovac-2026",
+        allow_full_year=True,
+        shard_workers=2,
+        shards=["59", "62"],
+    )
+
+    assert attempts == {"59": 2, "62": 1}
+    assert start_methods == ["spawn"]
+    assert report.scope == {
+        "data_file_year": "lovac-2026",
+        "establishment_id": None,
+        "geo_codes": [],
+    }
+    assert (report.candidate_count, report.updated_pairs, report.errors) == (20, 20, 0)
+    assert report.classification_counts == {"1": 12, "7": 8}
+    assert report.stats == {"processed_pairs": 20, "errors": 0}
+    assert report.country_cache == {
+        "path": None,
+        "version": "v",
+        "loaded": 0,
+        "saved": 0,
+        "hits": 6,
+        "misses": 2,
+        "hit_rate": 0.75,
+    }
+    assert [(shard["department"], shard["attempts"]) for shard in report.shards] == [
+        ("59", 2),
+        ("62", 1),
+    ]
+
+
+def test_sharded_run_reports_shards_failing_after_retries(monkeypatch):
+    def run_shard(db_url, scope, options):
+        if scope.geo_code_range[0] == "62":
+            raise OSError("worker died")
+        return _shard_report(scope), None
+
+    monkeypatch.setattr(calculator_module, "ProcessPoolExecutor", _thread_pool([]))
+    monkeypatch.setattr(calculator_module, "_run_location_shard", run_shard)
+
+    with pytest.raises(LocationComputationError, match="1 of 2 shard") as error:
+        calculator_module.run_location_shards(
+            "postgresql://unused",
+            LocationScope(data_file_year="lovac-2026"),
+            shard_retries=0,
+            departments=["59", "62"],
+        )
+
+    report = error.value.report
+    assert report.processed_pairs == 10
+    assert report.errors == 1
+    assert report.shards[1] == {
+        "department": "62",
+        "status": "failed",
+        "attempts": 1,
+        "candidate_count": 0,
+        "processed_pairs": 0,
+        "updated_pairs": 0,
+        "error": "OSError: worker died",
+    }
+
+
+def test_sharded_run_rejects_a_pair_limit():
+    with pytest.raises(ValueError, match="limit"):
+        calculator_module.calculate_owner_housing_locations(
+            "postgresql://unused", "lovac-2026", allow_full_year=True,
+            limit=10, shard_workers=2,
+        )
+
+
+def _watermarked_run(monkeypatch, *, errors=0):
+    """Stub the watermark table, at a run starting on 2026-03-01, and the run."""
+    started_at = datetime(2026, 3, 1)
+    cursor = Mock(fetchone=Mock(return_value=(started_at,)))
+    recorded = []
+    runs = []
+
+    def run(db_url, scope, **options):
+        runs.append(scope)
+        return LocationComputationReport(
+            scope={}, dry_run=options["dry_run"], force=options["force"],
+            limit=None, candidate_count=0, errors=errors,
+        )
+
+    monkeypatch.setattr(
+        calculator_module, "_watermark_cursor", lambda db_url: nullcontext(cursor)
+    )
+    monkeypatch.setattr(
+        calculator_module,
+        "read_location_watermark",
+        lambda cursor, scope: datetime(2026, 2, 1),
+    )
+    monkeypatch.setattr(
+        calculator_module,
+        "record_location_watermark",
+        lambda cursor, scope, computed_at: recorded.append((scope, computed_at)),
+    )
+    monkeypatch.setattr(calculator_module, "_run_location_scope", run)
+    return runs, recorded
+
+
+def test_incremental_run_starts_from_the_watermark_and_records_a_new_one(monkeypatch):
+    runs, recorded = _watermarked_run(monkeypatch)
+
+    report = calculator_module.calculate_owner_housing_locations(
+        "postgresql://unused", "lovac-2026", geo_codes=["59001"], incremental=True
+    )
+
+    assert runs == [
+        LocationScope(
+            data_file_year="lovac-2026",
+            geo_codes=("59001",),
+            changed_since=datetime(2026, 2, 1),
+        )
+    ]
+    assert recorded == [(runs[0], datetime(2026, 3, 1))]
+    assert report.watermark == "2026-03-01 00:00:00"
+
+
+@pytest.mark.parametrize(
+    ("options", "errors"),
+    [
+        ({"incremental": True, "dry_run": True}, 0),
+        ({"incremental": True, "limit": 10}, 0),
+        ({"incremental": True}, 1),
+        ({"force": True, "shard_workers": 2, "shards": ["59"]}, 0),
+        ({}, 0),
+    ],
+)
+def test_partial_runs_keep_the_previous_watermark(monkeypatch, options, errors):
+    runs, recorded = _watermarked_run(monkeypatch, errors=errors)
+
+    report = calculator_module.calculate_owner_housing_locations(
+        "postgresql://unused", "lovac-2026", geo_codes=["59001"], **options
+    )
+
+    assert len(runs) == 1
+    assert recorded == []
+    assert report.watermark is None
+
+
+def test_forced_runs_cannot_be_incremental():
+    with pytest.raises(ValueError, match="forced run"):
+        calculator_module.calculate_owner_housing_locations(
+            "postgresql://unused", "lovac-2026", geo_codes=["59001"],
+            force=True, incremental=True,
+        )
+
+
 def test_owner_housing_location_module_is_importable():
     assert LocationScope(data_file_year="lovac-2026").geo_codes == ()
 
@@ -404,22 +817,42 @@ def test_quality_check_uses_the_configured_database_resource():
 
 def test_backfill_fetch_limit_never_exceeds_remaining_global_limit():
     backfill = _load_backfill_module()
+    limits = []
+
+    def fetch(after, limit):
+        limits.append(limit)
+        return backfill.pd.DataFrame({"ref_id": [f"{after}-{index}" for index in range(limit)]})
+
+    totals = backfill.run_stages(
+        fetch,
+        lambda batch: ([], lambda api: {}),
+        lambda request: request,
+        workers=1,
+        fetch_size=2_000,
+        limit=5_000,
+    )
 
-    assert backfill.next_fetch_limit(20_000, limit=5_000, processed=0) == 5_000
-    assert backfill.next_fetch_limit(20_000, limit=5_000, processed=4_750) == 250
+    assert limits == [2_000, 2_000, 1_000]
+    assert totals["read"] == 5_000
 
 
-def test_backfill_slice_error_aborts_batch_before_cursor_can_advance(monkeypatch):
+def test_backfill_slice_error_aborts_batch_before_cursor_can_advance():
     backfill = _load_backfill_module()
     frame = backfill.pd.DataFrame([{"ref_id": "owner-1"}, {"ref_id": "owner-2"}])
-    monkeypatch.setattr(
-        backfill,
-        "call_ban_api",
-        Mock(side_effect=[frame.iloc[:1], RuntimeError("BAN unavailable")]),
-    )
+    checkpoints = []
+    geocode = Mock(side_effect=[frame.iloc[:1], RuntimeError("BAN unavailable")])
 
     with pytest.raises(RuntimeError, match="BAN unavailable"):
-        backfill.geocode_parallel(frame, chunk=1, workers=1, api_url="unused")
+        backfill.run_stages(
+            lambda after, limit: frame if after == "" else frame.iloc[:0],
+            lambda batch: ([batch.iloc[:1], batch.iloc[1:]], lambda api: {}),
+            geocode,
+            workers=1,
+            fetch_size=2,
+            after="",
+            checkpoint=checkpoints.append,
+        )
+    assert checkpoints == []
 
 
 def test_backfill_targets_and_cursor_are_isolated_by_scope(tmp_path, monkeypatch):
@@ -0,0 +1,341 @@
+"""Keyset pagination of owner-housing pairs against a real PostgreSQL.
+
+Set TEST_DATABASE_URL to run these tests. They create and drop their own
+schema.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import psycopg2
+import pytest
+from psycopg2.extensions import make_dsn
+
+from src.owner_housing_locations.calculator import (
+    DistanceCalculator,
+    LocationScope,
+    _pair_page_sql,
+    _watermark_cursor,
+    calculate_owner_housing_locations,
+    location_shards,
+    read_location_watermark,
+    record_location_watermark,
+    run_location_shards,
+)
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCHEMA = "owner_housing_pagination_test"
+PAIRS = 200_000
+PAGE = 1_000
+
+pytestmark = pytest.mark.skipif(
+    not DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path = {SCHEMA};
+CREATE TABLE fast_housing (
+  id uuid NOT NULL,
+  geo_code text NOT NULL,
+  data_file_years text[],
+  PRIMARY KEY (geo_code, id)
+);
+CREATE TABLE owners_housing (
+  owner_id uuid NOT NULL,
+  housing_id uuid NOT NULL,
+  housing_geo_code text NOT NULL,
+  rank integer NOT NULL,
+  locprop_distance_ban integer,
+  locprop_relative_ban integer,
+  PRIMARY KEY (owner_id, housing_id, housing_geo_code)
+);
+CREATE TABLE establishments (id uuid PRIMARY KEY, localities_geo_code text[]);
+CREATE TABLE ban_addresses (
+  ref_id uuid, address_kind text, postal_code text, address text,
+  latitude double precision, longitude double precision, city_code text, ban_id text,
+  last_updated_at timestamp,
+  PRIMARY KEY (ref_id, address_kind)
+);
+INSERT INTO fast_housing
+SELECT md5('housing' || i)::uuid, lpad((i % 90 + 1)::text, 2, '0') || '001',
+       CASE WHEN i % 4 = 0 THEN ARRAY['lovac-2025'] ELSE ARRAY['lovac-2025', 'lovac-2026'] END
+FROM generate_series(1, {PAIRS // 2}) i;
+INSERT INTO owners_housing
+SELECT md5('owner' || (i % {PAIRS // 3}))::uuid, h.id, h.geo_code, 1 + i % 3, NULL,
+       CASE WHEN i % 5 = 0 THEN 1 END
+FROM generate_series(1, {PAIRS}) i
+JOIN fast_housing h ON h.id = md5('housing' || (i % {PAIRS // 2} + 1))::uuid
+ON CONFLICT DO NOTHING;
+INSERT INTO ban_addresses
+SELECT md5('owner' || i)::uuid, 'Owner', '59000', 'Rue ' || i,
+       CASE WHEN i % 3 > 0 THEN 50.6 END, 3.0, CASE WHEN i % 2 = 0 THEN '59350' END,
+       '59350_' || i,
+       CASE WHEN i % 4 = 0 THEN timestamp '2026-03-01' ELSE timestamp '2026-01-01' END
+FROM generate_series(0, {PAIRS // 3}, 7) i;
+INSERT INTO ban_addresses
+SELECT md5('housing' || i)::uuid, 'Housing', '62000', NULL, 50.3, 2.8, '62041',
+       NULL,
+       CASE WHEN i % 5 = 0 THEN timestamp '2026-03-01' ELSE timestamp '2026-01-01' END
+FROM generate_series(1, {PAIRS // 2}, 3) i;
+CREATE INDEX ON fast_housing USING gin (data_file_years);
+CREATE INDEX ON owners_housing (housing_id, rank);
+ANALYZE;
+"""
+
+
+@pytest.fixture(scope="module")
+def db_url():
+    with psycopg2.connect(DATABASE_URL) as connection:
+        connection.cursor().execute(SCHEMA_SQL)
+    yield make_dsn(DATABASE_URL, options=f"-c search_path={SCHEMA}")
+    with psycopg2.connect(DATABASE_URL) as connection:
+        connection.cursor().execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+
+
+@pytest.fixture
+def calculator(db_url):
+    calculator = DistanceCalculator(db_url)
+    calculator.connect()
+    yield calculator
+    calculator.disconnect()
+
+
+def _expected_keys(calculator, geo_codes=None):
+    calculator.cursor.execute(
+        """
+        SELECT oh.owner_id::text, oh.housing_id::text, oh.housing_geo_code
+        FROM owners_housing oh
+        JOIN fast_housing h ON h.id = oh.housing_id AND h.geo_code = oh.housing_geo_code
+        WHERE oh.rank >= 1
+          AND 'lovac-2026' = ANY(h.data_file_years)
+          AND (oh.locprop_relative_ban IS NULL OR oh.locprop_relative_ban = 7)
+          AND (%(geo_codes)s::text[] IS NULL OR h.geo_code = ANY(%(geo_codes)s))
+        ORDER BY 1, 2, 3
+        """,
+        {"geo_codes": geo_codes},
+    )
+    return [tuple(row.values()) for row in calculator.cursor.fetchall()]
+
+
+def _plan(calculator, last_key, analyze=False):
+    clauses, params = calculator._scope_sql(LocationScope(data_file_year="lovac-2026"))
+    query = _pair_page_sql(
+        clauses,
+        params,
+        last_key=last_key,
+        batch_size=PAGE,
+        force=False,
+        walk_primary_key=True,
+    )
+    options = "ANALYZE, BUFFERS, " if analyze else ""
+    calculator.cursor.execute(f"EXPLAIN ({options}FORMAT JSON) {query}", params)
+    return calculator.cursor.fetchone()["QUERY PLAN"][0]
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def _buffers(plan):
+    return plan["Shared Hit Blocks"] + plan["Shared Read Blocks"]
+
+
+@pytest.mark.parametrize("geo_codes", [(), ("59001", "62001")])
+def test_pages_walk_every_candidate_once_in_primary_key_order(calculator, geo_codes):
+    scope = LocationScope(data_file_year="lovac-2026", geo_codes=geo_codes)
+    expected = _expected_keys(calculator, list(geo_codes) or None)
+
+    count = calculator.count_owner_housing_pairs(scope, first_page_size=PAGE)
+    _, first_page = calculator._first_page
+    keys = [tuple(pair.values())[:3] for pair in first_page]
+    while True:
+        pairs = calculator.fetch_owner_housing_pair_batch(
+            scope, last_key=keys[-1], batch_size=PAGE
+        )
+        if not pairs:
+            break
+        keys += [tuple(pair.values())[:3] for pair in pairs]
+
+    assert count == len(expected)
+    assert "candidate_count" not in first_page[0]
+    assert keys == expected
+
+
+def test_later_pages_are_primary_key_range_scans_without_sort(calculator):
+    middle = _expected_keys(calculator)[PAIRS // 4]
+
+    plan = _plan(calculator, middle)["Plan"]
+    nodes = list(_nodes(plan))
+
+    assert not [node for node in nodes if node["Node Type"] in ("Sort", "Incremental Sort")]
+    scans = [node for node in nodes if node.get("Index Name") == "owners_housing_pkey"]
+    assert scans, json.dumps(plan, indent=2)
+    assert "owner_id" in scans[0]["Index Cond"]
+
+
+def test_page_cost_stays_flat_across_the_run(calculator):
+    keys = _expected_keys(calculator)
+
+    early = _plan(calculator, keys[PAGE], analyze=True)["Plan"]
+    late = _plan(calculator, keys[-3 * PAGE], analyze=True)["Plan"]
+
+    assert early["Actual Rows"] == late["Actual Rows"] == PAGE
+    assert _buffers(late) < 2 * _buffers(early)
+    # A page visits the pairs up to its last key, not the rest of the scope.
+    scan = next(
+        node for node in _nodes(late) if node.get("Index Name") == "owners_housing_pkey"
+    )
+    assert scan["Actual Rows"] + scan.get("Rows Removed by Filter", 0) < 5 * PAGE
+
+
+def test_department_shards_partition_the_scope(calculator):
+    scope = LocationScope(data_file_year="lovac-2026")
+    expected = _expected_keys(calculator)
+
+    keys = []
+    for _, shard in location_shards(scope):
+        calculator.count_owner_housing_pairs(shard, first_page_size=PAIRS)
+        _, rows = calculator._first_page
+        keys += [tuple(row.values())[:3] for row in rows]
+
+    assert sorted(keys) == expected
+
+
+def test_sharded_dry_run_counts_each_department_in_its_own_process(db_url, calculator):
+    departments = ("59", "62")
+    expected = _expected_keys(calculator, [f"{code}001" for code in departments])
+
+    report = run_location_shards(
+        db_url,
+        LocationScope(data_file_year="lovac-2026"),
+        shard_workers=2,
+        departments=departments,
+        dry_run=True,
+    )
+
+    assert report.candidate_count == report.processed_pairs == len(expected)
+    assert [shard["department"] for shard in report.shards] == list(departments)
+    assert all(shard["status"] == "completed" for shard in report.shards)
+
+
+@pytest.mark.parametrize("force", [False, True])
+def test_scope_table_pages_match_scope_queries(calculator, force):
+    scope = LocationScope(data_file_year="lovac-2026", geo_codes=("59001", "62001"))
+    expected_pairs = []
+    last_key = (None, None, None)
+    while pairs := calculator.fetch_owner_housing_pair_batch(
+        scope, last_key=last_key, batch_size=PAGE, force=force
+    ):
+        expected_pairs += [dict(pair) for pair in pairs]
+        last_key = tuple(pairs[-1].values())[:3]
+    expected_addresses = calculator.batch_get_address_data(expected_pairs)
+
+    rows = calculator.materialize_scope(scope, force=force)
+    pairs, addresses = [], {}
+    last_key = (None, None, None)
+    while page := calculator.fetch_scope_table_page(last_key, batch_size=PAGE):
+        page_pairs, page_addresses = page
+        if not page_pairs:
+            break
+        pairs += page_pairs
+        addresses |= page_addresses
+        last_key = tuple(page_pairs[-1].values())[:3]
+
+    assert rows == calculator.scope_table_rows == len(expected_pairs)
+    assert pairs == expected_pairs
+    assert addresses == expected_addresses
+    assert {kind for _, kind in addresses} == {"Owner", "Housing"}
+
+
+def test_limited_run_queries_the_scope_instead_of_materializing_it(
+    db_url, calculator
+):
+    report = DistanceCalculator(db_url).run(
+        LocationScope(data_file_year="lovac-2026"), limit=PAGE, dry_run=True
+    )
+
+    assert report.scope_table == {}
+    assert report.candidate_count == len(_expected_keys(calculator))
+    assert report.processed_pairs == PAGE
+
+
+@pytest.mark.parametrize("materialize", [False, True])
+def test_incremental_scope_adds_pairs_with_updated_ban_addresses(
+    calculator, materialize
+):
+    changed_since = datetime(2026, 2, 1)
+    scope = LocationScope(
+        data_file_year="lovac-2026",
+        geo_codes=("59001", "62001"),
+        changed_since=changed_since,
+    )
+    calculator.cursor.execute(
+        """
+        SELECT oh.owner_id::text, oh.housing_id::text, oh.housing_geo_code
+        FROM owners_housing oh
+        JOIN fast_housing h ON h.id = oh.housing_id AND h.geo_code = oh.housing_geo_code
+        LEFT JOIN ban_addresses ba
+          ON ba.ref_id = oh.owner_id AND ba.address_kind = 'Owner'
+        LEFT JOIN ban_addresses bh
+          ON bh.ref_id = oh.housing_id AND bh.address_kind = 'Housing'
+        WHERE oh.rank >= 1
+          AND 'lovac-2026' = ANY(h.data_file_years)
+          AND h.geo_code IN ('59001', '62001')
+          AND (
+            oh.locprop_relative_ban IS NULL
+            OR oh.locprop_relative_ban = 7
+            OR ba.last_updated_at > %(changed_since)s
+            OR bh.last_updated_at > %(changed_since)s
+          )
+        ORDER BY 1, 2, 3
+        """,
+        {"changed_since": changed_since},
+    )
+    expected = [tuple(row.values()) for row in calculator.cursor.fetchall()]
+
+    if materialize:
+        count = calculator.materialize_scope(scope)
+    else:
+        count = calculator.count_owner_housing_pairs(scope)
+    keys = [
+        (pair["owner_id"], pair["housing_id"], pair["housing_geo_code"])
+        for pairs, _ in calculator._fetch_pages(
+            scope, limit=None, force=False, batch_size=PAGE
+        )
+        for pair in pairs
+    ]
+
+    assert count == len(keys) == len(expected)
+    assert keys == expected
+    assert len(expected) > len(_expected_keys(calculator, ["59001", "62001"]))
+
+
+def test_location_watermark_is_the_latest_of_the_scope_and_its_cohort(db_url):
+    scope = LocationScope(data_file_year="lovac-2025", geo_codes=("62001", "59001"))
+    with pytest.raises(ValueError, match="No location watermark"):
+        calculate_owner_housing_locations(
+            db_url, "lovac-2025", geo_codes=["59001"], incremental=True
+        )
+
+    with _watermark_cursor(db_url) as cursor:
+        record_location_watermark(cursor, scope, datetime(2026, 2, 1))
+        record_location_watermark(cursor, scope, datetime(2026, 1, 1))
+        scoped = read_location_watermark(cursor, scope)
+        record_location_watermark(
+            cursor, LocationScope(data_file_year="lovac-2025"), datetime(2026, 3, 1)
+        )
+        cohort = read_location_watermark(
+            cursor, LocationScope("lovac-2025", geo_codes=("59001", "62001"))
+        )
+        other_cohort = read_location_watermark(
+            cursor, LocationScope(data_file_year="lovac-2026")
+        )
+
+    assert scoped == datetime(2026, 2, 1)
+    assert cohort == datetime(2026, 3, 1)
+    assert other_cohort is None
@@ -0,0 +1,81 @@
+"""Benchmark the per-department reads of housing-owners over all partitions.
+
+Writes a synthetic national housing-owners.jsonl spread over every
+department of DEPARTMENT_CODES, then times a full 101-partition read:
+
+- jsonl: previous path, every partition scans and validates the whole file;
+- split: one validating pass to hive Parquet, then per-department reads.
+
+Usage: python -m benchmarks.housing_owners_split [--rows 1000000]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import polars as pl
+
+from src.housing_owners.read import (
+    PROPERTY_RIGHT_VALUES,
+    read_source_housing_owners,
+    read_split_source_housing_owners,
+    split_source_housing_owners,
+    validate_source_housing_owners,
+)
+from src.partitions import DEPARTMENT_CODES
+
+
+def synthetic_housing_owners(rows: int) -> pl.DataFrame:
+    departments = pl.Series(DEPARTMENT_CODES)
+    return pl.DataFrame({"n": pl.int_range(rows, eager=True)}).select(
+        pl.format("owner-{}", pl.col("n")).alias("owner_uid"),
+        (
+            pl.lit(departments).gather(pl.col("n") % len(DEPARTMENT_CODES))
+            + (pl.col("n") % 1000).cast(pl.Utf8).str.zfill(5 - 2)
+        ).str.slice(0, 5).alias("geo_code"),
+        pl.col("n").cast(pl.Utf8).str.zfill(12).alias("local_id"),
+        pl.lit("ABCDEFGH").alias("idpersonne"),
+        pl.lit("12345678901").alias("idprocpte"),
+        pl.lit("1234567890123").alias("idprodroit"),
+        pl.lit(1).alias("locprop_source"),
+        pl.lit(PROPERTY_RIGHT_VALUES[0]).alias("property_right"),
+        (pl.col("n") % 6 + 1).alias("rank"),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = str(Path(directory) / "housing-owners.jsonl")
+        destination = str(Path(directory) / "housing-owners")
+        synthetic_housing_owners(args.rows).write_ndjson(source)
+        size = Path(source).stat().st_size / 2**20
+        print(f"{args.rows} rows, {size:,.0f} MiB JSONL, {len(DEPARTMENT_CODES)} partitions")
+
+        started = time.perf_counter()
+        total = sum(
+            validate_source_housing_owners(read_source_housing_owners(source, department))
+            .collect()
+            .height
+            for department in DEPARTMENT_CODES
+        )
+        elapsed = time.perf_counter() - started
+        print(f"jsonl: {total} rows in {elapsed:6.2f}s")
+
+        started = time.perf_counter()
+        split_source_housing_owners(source, destination)
+        split = time.perf_counter() - started
+        total = sum(
+            read_split_source_housing_owners(destination, department).collect().height
+            for department in DEPARTMENT_CODES
+        )
+        elapsed = time.perf_counter() - started
+        print(f"split: {total} rows in {elapsed:6.2f}s (split pass {split:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark transform_housing_owners from 10k to 1M housing-owner links.
+
+Usage: python -m benchmarks.housing_owners_transform [--links 10000 100000 1000000]
+"""
+
+import argparse
+import time
+from datetime import date
+
+import polars as pl
+
+from src.housing_owners.read import SOURCE_HOUSING_OWNER_SCHEMA
+from src.housing_owners.transform import transform_housing_owners
+
+ADMIN_USER_ID = "admin-user-id-000"
+YEAR = "lovac-2026"
+OWNERS_PER_HOUSING = 2
+
+
+def synthetic_links(links: int):
+    """Return transform inputs for ``links`` source links.
+
+    Each housing has two source owners. Existing links keep the first owner
+    (a third of them with another rank), replace the second one and carry
+    one inactive previous owner.
+    """
+    housings = links // OWNERS_PER_HOUSING
+    index = pl.col("index")
+    base = pl.DataFrame({"index": pl.int_range(0, housings, eager=True)})
+
+    existing_housings = base.select(
+        ("housing-" + index.cast(pl.Utf8)).alias("id"),
+        index.cast(pl.Utf8).str.zfill(12).alias("local_id"),
+        (59000 + index % 650).cast(pl.Utf8).alias("geo_code"),
+    )
+
+    source = pl.concat(
+        [
+            existing_housings.select(
+                ("owner-" + pl.col("id") + f"-{slot}").alias("owner_uid"),
+                pl.col("geo_code"),
+                pl.col("local_id"),
+                pl.lit("P0000000").alias("idpersonne"),
+                pl.lit("PROC0000000").alias("idprocpte"),
+                pl.lit("DROIT00000000").alias("idprodroit"),
+                pl.lit(1).alias("locprop_source"),
+                pl.lit("proprietaire-entier").alias("property_right"),
+                pl.lit(slot + 1).alias("rank"),
+            )
+            for slot in range(OWNERS_PER_HOUSING)
+        ]
+    ).cast(SOURCE_HOUSING_OWNER_SCHEMA)
+
+    existing_owners = pl.concat(
+        [
+            source.select(pl.col("owner_uid").alias("id")),
+            existing_housings.select(("owner-" + pl.col("id") + "-old").alias("id")),
+        ]
+    ).with_columns(("Owner " + pl.col("id")).alias("full_name"))
+
+    existing_links = pl.concat(
+        [
+            existing_housings.select(
+                pl.col("id").alias("housing_id"),
+                ("owner-" + pl.col("id") + "-0").alias("owner_id"),
+                pl.when(pl.int_range(pl.len()) % 3 == 0)
+                .then(2)
+                .otherwise(1)
+                .alias("rank"),
+            ),
+            existing_housings.select(
+                pl.col("id").alias("housing_id"),
+                ("owner-" + pl.col("id") + "-old").alias("owner_id"),
+                pl.lit(2).alias("rank"),
+            ),
+            existing_housings.select(
+                pl.col("id").alias("housing_id"),
+                ("owner-" + pl.col("id") + "-previous").alias("owner_id"),
+                pl.lit(-1).alias("rank"),
+            ),
+        ]
+    ).with_columns(
+        pl.col("rank").cast(pl.Int32),
+        pl.lit(date(2020, 1, 1)).alias("start_date"),
+        pl.lit(None, dtype=pl.Date).alias("end_date"),
+    )
+
+    return source.lazy(), existing_housings, existing_owners, existing_links
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--links", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    args = parser.parse_args()
+
+    for links in args.links:
+        source, housings, owners, existing_links = synthetic_links(links)
+        started = time.perf_counter()
+        rows, events, _ = transform_housing_owners(
+            source, housings, owners, existing_links,
+            year=YEAR, admin_user_id=ADMIN_USER_ID,
+        )
+        elapsed = time.perf_counter() - started
+        print(
+            f"{links:>9} links: {elapsed:6.2f}s "
+            f"({links / elapsed:,.0f} links/s, {rows.height} rows, {events.height} events)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark transform_housings on a synthetic department.
+
+Usage: python -m benchmarks.housings_transform [--rows 500000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import polars as pl
+
+from src.housings.transform import transform_housings
+
+ADMIN_USER_ID = "admin-user-id-000"
+YEAR = "lovac-2026"
+
+
+def synthetic_department(rows: int, matched_ratio: float = 0.8):
+    """Return (source, existing_housings, existing_events) for ``rows`` housings."""
+    index = pl.col("index")
+    base = pl.DataFrame({"index": pl.int_range(0, rows, eager=True)})
+
+    source = base.select(
+        ("INV" + index.cast(pl.Utf8)).alias("invariant"),
+        index.cast(pl.Utf8).str.zfill(12).alias("local_id"),
+        ("BLD" + (index // 8).cast(pl.Utf8)).alias("building_id"),
+        (index.cast(pl.Utf8) + " rue de la Paix").alias("dgfip_address"),
+        (59000 + index % 650).cast(pl.Utf8).alias("geo_code"),
+        (3.0 + (index % 1000) / 10_000).alias("longitude_dgfip"),
+        (50.6 + (index % 1000) / 10_000).alias("latitude_dgfip"),
+        (index % 8).alias("cadastral_classification"),
+        (index % 17 == 0).alias("uncomfortable"),
+        (2010 + index % 14).alias("vacancy_start_year"),
+        pl.when(index % 2 == 0).then(pl.lit("APPART")).otherwise(pl.lit("MAISON"))
+        .alias("housing_kind"),
+        (1 + index % 6).alias("rooms_count"),
+        (20 + index % 120).alias("living_area"),
+        pl.when(index % 11 == 0).then(0).otherwise(1900 + index % 125)
+        .alias("building_year"),
+        pl.lit(None, dtype=pl.Date).alias("mutation_date"),
+        ("PLOT" + (index // 4).cast(pl.Utf8)).alias("plot_id"),
+        pl.lit([YEAR]).alias("data_file_years"),
+        pl.lit("59").alias("dept"),
+    )
+
+    existing = source.head(int(rows * matched_ratio)).select(
+        ("housing-" + pl.col("local_id")).alias("id"),
+        pl.col("local_id"),
+        pl.col("geo_code"),
+        pl.when(pl.col("rooms_count") % 2 == 0)
+        .then(pl.lit("V"))
+        .otherwise(pl.lit("L"))
+        .alias("occupancy"),
+        (pl.col("rooms_count") - 1).alias("status"),
+        pl.lit(None, dtype=pl.Utf8).alias("sub_status"),
+        pl.lit(["lovac-2024", "lovac-2025"]).alias("data_file_years"),
+    )
+
+    # Two events for every non-vacant housing; the latest one alternates
+    # between the admin account and a real user
+    non_vacant = existing.filter(pl.col("occupancy") != "V").select(
+        pl.col("id").alias("housing_id")
+    )
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    events = pl.concat(
+        [
+            non_vacant.with_columns(
+                pl.lit("housing:occupancy-updated").alias("type"),
+                pl.lit("real-user-id").alias("created_by"),
+                pl.lit(start).alias("created_at"),
+            ),
+            non_vacant.with_columns(
+                pl.lit("housing:status-updated").alias("type"),
+                pl.when(pl.int_range(pl.len()) % 2 == 0)
+                .then(pl.lit(ADMIN_USER_ID))
+                .otherwise(pl.lit("real-user-id"))
+                .alias("created_by"),
+                pl.lit(start + timedelta(days=30)).alias("created_at"),
+            ),
+        ]
+    )
+
+    return source.lazy(), existing, events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--matched-ratio", type=float, default=0.8)
+    args = parser.parse_args()
+
+    source, existing, events = synthetic_department(args.rows, args.matched_ratio)
+    print(
+        f"{args.rows} source rows, {existing.height} existing housings, "
+        f"{events.height} existing events"
+    )
+
+    started = time.perf_counter()
+    to_create, to_update, new_events, housing_events = transform_housings(
+        source, existing, events, year=YEAR, admin_user_id=ADMIN_USER_ID
+    )
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"to_create={to_create.height} to_update={to_update.height} "
+        f"events={new_events.height} housing_events={housing_events.height}"
+    )
+    print(f"transform_housings: {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
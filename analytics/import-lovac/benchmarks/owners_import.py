@@ -0,0 +1,124 @@
+"""Benchmark the owners import in one frame versus in idpersonne chunks.
+
+Writes a synthetic owners.jsonl, half of whose owners already exist in
+``lovac_bench.owners``, then runs each mode in its own process against that
+schema (through the connection ``search_path``) and reports the time and
+peak RSS. The schema is dropped at the end.
+
+Usage: python -m benchmarks.owners_import --dsn postgresql://... [--owners 500000]
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import polars as pl
+import psycopg
+
+from benchmarks.pg_read import _with_search_path
+from src.owners.read import read_existing_owners, read_source_owners, validate_source_owners
+from src.owners.stream import import_owners_in_chunks
+from src.owners.transform import transform_owners
+from src.owners.write import write_owners
+from src.pg_copy import copy_frame
+
+SCHEMA = "lovac_bench"
+YEAR = "lovac-2026"
+MODES = ["frame", "chunks"]
+
+DDL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.owners (
+    id uuid PRIMARY KEY, idpersonne text UNIQUE, full_name text, username text,
+    address_dgfip text[], birth_date date, siren text, kind_class text,
+    data_source text, email text, phone text, administrator text,
+    additional_address text, created_at timestamptz, updated_at timestamptz
+);
+"""
+
+
+def synthetic_owners(owners: int) -> pl.DataFrame:
+    index = pl.col("index")
+    return pl.DataFrame({"index": pl.int_range(owners, eager=True)}).select(
+        pl.Series("owner_uid", [str(uuid.uuid4()) for _ in range(owners)]),
+        # Shuffled idpersonne so the chunked mode has to sort
+        ((index * 7_919) % owners).cast(pl.Utf8).str.zfill(8).alias("idpersonne"),
+        ("Owner " + index.cast(pl.Utf8)).alias("full_name"),
+        pl.lit(None, dtype=pl.Utf8).alias("username"),
+        (index.cast(pl.Utf8) + " rue de la Paix 59000 Lille").alias("dgfip_address"),
+        pl.lit("Particulier").alias("ownership_type"),
+        pl.lit("1970-01-01").alias("birth_date"),
+        pl.lit(None, dtype=pl.Utf8).alias("siren"),
+        pl.lit(None, dtype=pl.Utf8).alias("entity"),
+    )
+
+
+def run(mode: str, dsn: str, source_path: str, work_dir: str) -> None:
+    source = validate_source_owners(read_source_owners(source_path))
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if mode == "frame":
+        existing = read_existing_owners(dsn)
+        to_create, to_update = transform_owners(source, existing, YEAR)
+        created, updated = write_owners(to_create, to_update, dsn)
+    else:
+        _, created, updated = import_owners_in_chunks(
+            source, dsn, YEAR, work_dir, source_file=source_path
+        )
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        f"{mode:>6}: {created} created, {updated} updated in {elapsed:6.2f}s, "
+        f"peak RSS +{(peak - baseline) / 1024:,.0f} MiB"
+    )
+
+
+def _reset(dsn: str, existing: pl.DataFrame) -> None:
+    with psycopg.connect(dsn) as connection, connection.cursor() as cursor:
+        cursor.execute(DDL)
+        copy_frame(cursor, existing, f"{SCHEMA}.owners")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("IMPORT_LOVAC_PG_URL"))
+    parser.add_argument("--owners", type=int, default=500_000)
+    parser.add_argument("--mode", choices=MODES)
+    parser.add_argument("--source")
+    parser.add_argument("--work-dir")
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.mode, _with_search_path(args.dsn), args.source, args.work_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = str(Path(directory) / "owners.jsonl")
+        owners = synthetic_owners(args.owners)
+        owners.write_ndjson(source_path)
+        existing = owners.head(args.owners // 2).select(
+            pl.col("owner_uid").alias("id"), "idpersonne", "full_name", pl.lit("lovac-2025").alias("data_source")
+        )
+        print(f"{args.owners} source owners, {existing.height} existing")
+        try:
+            for mode in MODES:
+                _reset(args.dsn, existing)
+                subprocess.run(
+                    [sys.executable, "-m", "benchmarks.owners_import", "--dsn", args.dsn,
+                     "--mode", mode, "--source", source_path, "--work-dir", directory],
+                    check=True,
+                )
+        finally:
+            with psycopg.connect(args.dsn) as connection:
+                connection.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == "__main__":
+    main()
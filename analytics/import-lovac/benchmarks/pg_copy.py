@@ -0,0 +1,124 @@
+"""Benchmark copy_frame against the previous row-wise and CSV COPY paths.
+
+Copies the ``to_create`` frame of a synthetic department (see
+benchmarks.housings_transform) into a temp table shaped like fast_housing.
+Each method runs in its own process so peak RSS can be compared.
+
+Usage: python -m benchmarks.pg_copy --dsn postgresql://... [--rows 200000]
+"""
+
+import argparse
+import io
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import polars as pl
+import psycopg
+
+from benchmarks.housings_transform import ADMIN_USER_ID, YEAR, synthetic_department
+from src.housings.transform import transform_housings
+from src.housings.write import HOUSING_COLUMNS
+from src.pg_copy import copy_frame
+
+METHODS = ["row", "csv", "binary"]
+
+# Column types of fast_housing for HOUSING_COLUMNS
+STAGING_DDL = """
+CREATE TEMP TABLE stg_housings_create (
+    id uuid, invariant text, local_id text, building_id text,
+    building_group_id uuid, address_dgfip text[], geo_code text,
+    longitude_dgfip float8, latitude_dgfip float8,
+    cadastral_classification int4, uncomfortable boolean,
+    vacancy_start_year int4, housing_kind text, rooms_count int4,
+    living_area int4, cadastral_reference text, building_year int4,
+    mutation_date date, taxed boolean, data_years int4[],
+    beneficiary_count int4, building_location text, rental_value int4,
+    condominium text, status int4, sub_status text, actual_dpe text,
+    energy_consumption_bdnb text, energy_consumption_at_bdnb timestamptz,
+    occupancy_source text, occupancy text, occupancy_intended text,
+    plot_id text, data_source text, data_file_years text[],
+    geolocation text, geolocation_source text, last_mutation_date date,
+    last_transaction_date date, last_transaction_value int4
+)
+"""
+
+
+def _copy_rows(cursor, dataframe: pl.DataFrame, table: str) -> None:
+    """Previous housings/write.py path: one write_row per row."""
+    columns = ", ".join(dataframe.columns)
+    with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+        for row in dataframe.iter_rows():
+            copy.write_row(row)
+
+
+def _copy_csv(cursor, dataframe: pl.DataFrame, table: str) -> None:
+    """Previous owners/write.py path: whole frame as CSV in memory.
+
+    Lists are turned into array literals, which write_csv cannot do.
+    """
+    literal = dataframe.with_columns(
+        ("{" + pl.col(column).cast(pl.List(pl.Utf8)).list.join(",") + "}").alias(column)
+        for column, dtype in dataframe.schema.items()
+        if isinstance(dtype, pl.List)
+    )
+    buffer = io.BytesIO()
+    literal.write_csv(buffer)
+    buffer.seek(0)
+    columns = ", ".join(dataframe.columns)
+    with cursor.copy(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER true)") as copy:
+        copy.write(buffer.read())
+
+
+def run(method: str, dsn: str, rows: int) -> None:
+    source, existing, events = synthetic_department(rows, matched_ratio=0.0)
+    to_create, _, _, _ = transform_housings(
+        source, existing.clear(), events.clear(), year=YEAR, admin_user_id=ADMIN_USER_ID
+    )
+    # Synthetic ids are valid uuids only for created housings
+    frame = to_create.select(HOUSING_COLUMNS)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with psycopg.connect(dsn) as connection, connection.cursor() as cursor:
+        cursor.execute(STAGING_DDL)
+        started = time.perf_counter()
+        if method == "row":
+            _copy_rows(cursor, frame, "stg_housings_create")
+        elif method == "csv":
+            _copy_csv(cursor, frame, "stg_housings_create")
+        else:
+            copy_frame(cursor, frame, "stg_housings_create")
+        elapsed = time.perf_counter() - started
+        cursor.execute("SELECT count(*) FROM stg_housings_create")
+        (copied,) = cursor.fetchone()
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        f"{method:>6}: {copied} rows in {elapsed:6.2f}s "
+        f"({copied / elapsed:,.0f} rows/s), peak RSS +{(peak - baseline) / 1024:,.0f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("IMPORT_LOVAC_PG_URL"))
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--method", choices=METHODS)
+    args = parser.parse_args()
+
+    if args.method:
+        run(args.method, args.dsn, args.rows)
+        return
+
+    for method in METHODS:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.pg_copy", "--dsn", args.dsn,
+             "--rows", str(args.rows), "--method", method],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
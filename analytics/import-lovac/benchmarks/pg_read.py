@@ -0,0 +1,95 @@
+"""Benchmark read_existing_housing_owners against the previous IN-literal read.
+
+Fills ``lovac_bench.owners_housing`` with two links per housing, then reads
+the links of a department-sized list of housing ids:
+
+- literal: previous path, ids interpolated as ``IN ('...', ...)`` and read
+  with connectorx;
+- any: ids bound as one ``uuid[]`` parameter through ADBC.
+
+The schema is dropped at the end. The production function is pointed at
+it through the connection ``search_path``.
+
+Usage: python -m benchmarks.pg_read --dsn postgresql://... [--housings 300000]
+"""
+
+import argparse
+import os
+import time
+import uuid
+from urllib.parse import quote
+
+import polars as pl
+import psycopg
+
+from src.housing_owners.read import read_existing_housing_owners
+from src.pg_copy import copy_frame
+
+SCHEMA = "lovac_bench"
+
+DDL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE UNLOGGED TABLE {SCHEMA}.owners_housing (
+    owner_id uuid, housing_id uuid, rank int4, start_date date, end_date date
+);
+"""
+
+
+def _read_literal(dsn: str, housing_ids: list[str]) -> pl.DataFrame:
+    """Previous housing_owners/read.py path."""
+    ids_literal = ", ".join(f"'{id}'" for id in housing_ids)
+    return pl.read_database_uri(
+        f"""
+        SELECT housing_id, owner_id, rank, start_date, end_date
+        FROM {SCHEMA}.owners_housing
+        WHERE housing_id IN ({ids_literal})
+        """,
+        dsn,
+    )
+
+
+def _with_search_path(dsn: str) -> str:
+    separator = "&" if "?" in dsn else "?"
+    return f"{dsn}{separator}options={quote(f'-csearch_path={SCHEMA}')}"
+
+
+def _timed(label: str, read) -> None:
+    started = time.perf_counter()
+    result = read()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>8}: {result.height} links in {elapsed:6.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("IMPORT_LOVAC_PG_URL"))
+    parser.add_argument("--housings", type=int, default=300_000)
+    args = parser.parse_args()
+
+    housing_ids = [str(uuid.uuid4()) for _ in range(args.housings * 2)]
+    links = pl.DataFrame({
+        "owner_id": [str(uuid.uuid4()) for _ in housing_ids] * 2,
+        "housing_id": housing_ids * 2,
+        "rank": [1] * len(housing_ids) + [2] * len(housing_ids),
+    })
+
+    with psycopg.connect(args.dsn) as connection, connection.cursor() as cursor:
+        cursor.execute(DDL)
+        copy_frame(cursor, links, f"{SCHEMA}.owners_housing")
+        cursor.execute(f"CREATE INDEX ON {SCHEMA}.owners_housing (housing_id)")
+        cursor.execute(f"ANALYZE {SCHEMA}.owners_housing")
+
+    # Half of the table's housings belong to the benchmarked department
+    department = housing_ids[: args.housings]
+    print(f"{len(department)} housing ids, {links.height} links in table")
+    try:
+        _timed("literal", lambda: _read_literal(args.dsn, department))
+        _timed("any", lambda: read_existing_housing_owners(_with_search_path(args.dsn), department))
+    finally:
+        with psycopg.connect(args.dsn) as connection:
+            connection.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,36 @@
-from dagster import asset, MaterializeResult, MetadataValue
+from pathlib import Path
+
+import polars as pl
+from dagster import asset, AssetKey, MaterializeResult, MetadataValue
 
 from .config import ImportLovacConfig
-from .partitions import departments_partitions
+from .partitions import DEPARTMENT_CODES, departments_partitions
 
 from .owners.read import read_source_owners, validate_source_owners, read_existing_owners
 from .owners.transform import transform_owners
 from .owners.write import write_owners
-
-from .housings.read import (
-    read_source_housings,
-    read_existing_housings,
-    read_existing_housing_events,
-    read_admin_user_id,
-)
-from .housings.transform import transform_housings
-from .housings.write import write_housings
-
-from .housing_owners.read import (
-    read_source_housing_owners,
-    validate_source_housing_owners,
-    read_existing_housings_for_join,
-    read_existing_owners_for_join,
-    read_existing_housing_owners,
+from .owners.stream import import_owners_in_chunks
+from .owners.snapshot import write_owner_snapshot, read_owner_snapshot_metadata
+
+from .housings.read import read_admin_user_id
+from .housing_owners.read import split_source_housing_owners, read_existing_owners_for_join
+
+from .departments import (
+    housing_owners_split_path,
+    import_housings,
+    import_housing_owners,
+    reset_existing_housings,
+    import_departments,
 )
-from .housing_owners.transform import transform_housing_owners
-from .housing_owners.write import write_housing_owners
-
-from .existing_housings.read import read_housings_missing_from_year
-from .existing_housings.transform import transform_existing_housings
-from .existing_housings.write import write_existing_housing_updates
 
 from .buildings.read import read_source_buildings, count_existing_buildings
 from .buildings.triggers import disable_building_triggers, enable_building_triggers
-from .buildings.write import write_source_buildings, update_building_counts
+from .buildings.write import (
+    write_source_buildings,
+    create_touched_buildings_table,
+    update_building_counts,
+    diff_building_counts,
+)
 
 
 @asset(group_name="import_lovac")
@@ -42,32 +40,68 @@ def source_owners(
 ) -> MaterializeResult:
     """Import owners from LOVAC JSONL. Single asset, no partitions."""
     context.log.info("Reading source owners...")
-    source = read_source_owners(f"{config.source_path}/owners.jsonl")
+    source_file = f"{config.source_path}/owners.jsonl"
+    source = read_source_owners(source_file)
     source = validate_source_owners(source)
 
-    context.log.info("Reading existing owners from PostgreSQL...")
-    existing = read_existing_owners(config.connection_string)
-    context.log.info(f"Loaded {existing.height} existing owners")
-
-    context.log.info("Transforming owners (enrich + create/update split)...")
-    to_create, to_update = transform_owners(source, existing, config.year)
-    context.log.info(f"To create: {to_create.height}, to update: {to_update.height}")
+    if config.owners_chunk_rows is not None:
+        context.log.info(f"Importing owners in chunks of {config.owners_chunk_rows}...")
+        rows, created, updated = import_owners_in_chunks(
+            source, config.connection_string, config.year,
+            f"{config.cache_path}/{config.year}", source_file=source_file,
+            chunk_rows=config.owners_chunk_rows, dry_run=config.dry_run, log=context.log,
+        )
+    else:
+        context.log.info("Reading existing owners from PostgreSQL...")
+        existing = read_existing_owners(config.connection_string)
+        context.log.info(f"Loaded {existing.height} existing owners")
+
+        context.log.info("Transforming owners (enrich + create/update split)...")
+        to_create, to_update = transform_owners(source, existing, config.year)
+        context.log.info(f"To create: {to_create.height}, to update: {to_update.height}")
+
+        context.log.info("Writing owners to PostgreSQL...")
+        created, updated = write_owners(
+            to_create, to_update, config.connection_string, config.dry_run
+        )
+        rows = to_create.height + to_update.height
+    context.log.info(f"Done: {created} created, {updated} updated")
 
-    context.log.info("Writing owners to PostgreSQL...")
-    created, updated = write_owners(
-        to_create, to_update, config.connection_string, config.dry_run
+    context.log.info("Writing owner snapshot for housing-owner partitions...")
+    owners = read_existing_owners_for_join(config.connection_string)
+    admin_user_id = read_admin_user_id(
+        config.connection_string, config.system_account_email
     )
-    context.log.info(f"Done: {created} created, {updated} updated")
+    snapshot = write_owner_snapshot(
+        owners, config.cache_path,
+        year=config.year, version=context.run_id, admin_user_id=admin_user_id,
+    )
+    context.log.info(f"Wrote {owners.height} owners to {snapshot}")
 
     return MaterializeResult(
         metadata={
-            "dagster/row_count": to_create.height + to_update.height,
+            "dagster/row_count": rows,
             "rows_created": MetadataValue.int(created),
             "rows_updated": MetadataValue.int(updated),
+            "owner_snapshot": MetadataValue.path(snapshot),
+            "owner_snapshot_rows": MetadataValue.int(owners.height),
         }
     )
 
 
+def _latest_owner_snapshot(context, config: ImportLovacConfig) -> str | None:
+    """Snapshot written by the latest `source_owners` run for this year, if any."""
+    event = context.instance.get_latest_materialization_event(AssetKey("source_owners"))
+    if event is None or event.asset_materialization is None:
+        return None
+    snapshot = event.asset_materialization.metadata.get("owner_snapshot")
+    if snapshot is None or not Path(snapshot.value).exists():
+        return None
+    if read_owner_snapshot_metadata(snapshot.value).get("year") != config.year:
+        return None
+    return snapshot.value
+
+
 @asset(
     group_name="import_lovac",
     deps=["source_owners"],
@@ -109,6 +143,7 @@ def building_triggers_disabled(
     """Disable building count triggers on fast_housing for bulk import performance."""
     context.log.info("Disabling building triggers...")
     disable_building_triggers(config.connection_string)
+    create_touched_buildings_table(config.connection_string)
     context.log.info("Building triggers disabled.")
 
     return MaterializeResult(
@@ -116,6 +151,14 @@ def building_triggers_disabled(
     )
 
 
+def _owner_lookup(context, config: ImportLovacConfig) -> tuple[str | None, str]:
+    """Latest owner snapshot (if any) and the admin user id."""
+    snapshot = _latest_owner_snapshot(context, config)
+    if snapshot is not None:
+        return snapshot, read_owner_snapshot_metadata(snapshot)["admin_user_id"]
+    return None, read_admin_user_id(config.connection_string, config.system_account_email)
+
+
 @asset(
     group_name="import_lovac",
     deps=["building_triggers_disabled"],
@@ -133,50 +176,50 @@ def source_housings(
         config.connection_string, config.system_account_email
     )
 
-    context.log.info(f"[{department}] Reading source housings...")
-    source = read_source_housings(f"{config.source_path}/housings", department)
+    result = import_housings(config, department, admin_user_id, context.log)
 
-    context.log.info(f"[{department}] Reading existing housings from PostgreSQL...")
-    existing = read_existing_housings(config.connection_string, department)
-    context.log.info(f"[{department}] Loaded {existing.height} existing housings")
-
-    housing_ids = existing["id"].to_list()
-    context.log.info(f"[{department}] Reading {len(housing_ids)} housing events...")
-    existing_events = read_existing_housing_events(
-        config.connection_string, housing_ids
+    return MaterializeResult(
+        metadata={
+            "department": department,
+            "dagster/row_count": result["row_count"],
+            "rows_created": MetadataValue.int(result["rows_created"]),
+            "rows_updated": MetadataValue.int(result["rows_updated"]),
+            "rows_unchanged": MetadataValue.int(result["rows_unchanged"]),
+            "events_created": MetadataValue.int(result["events_created"]),
+        }
     )
-    context.log.info(f"[{department}] Loaded {existing_events.height} events")
 
-    context.log.info(f"[{department}] Transforming housings...")
-    to_create, to_update, events, housing_events = transform_housings(
-        source, existing, existing_events,
-        year=config.year, admin_user_id=admin_user_id,
-    )
-    context.log.info(
-        f"[{department}] To create: {to_create.height}, to update: {to_update.height}, events: {events.height}"
-    )
 
-    context.log.info(f"[{department}] Writing housings to PostgreSQL...")
-    created, updated, events_count = write_housings(
-        to_create, to_update, events, housing_events,
-        config.connection_string, config.dry_run
+@asset(group_name="import_lovac")
+def source_housing_owners_split(
+    context,
+    config: ImportLovacConfig,
+) -> MaterializeResult:
+    """Validate housing-owners JSONL once and split it into Parquet by department."""
+    destination = housing_owners_split_path(config)
+    context.log.info(f"Splitting source housing-owners into {destination}...")
+    split_source_housing_owners(f"{config.source_path}/housing-owners.jsonl", destination)
+
+    counts = (
+        pl.scan_parquet(f"{destination}/**/*.parquet", hive_partitioning=True)
+        .group_by("dept")
+        .len()
+        .collect()
     )
-    context.log.info(f"[{department}] Done: {created} created, {updated} updated, {events_count} events")
+    context.log.info(f"Done: {counts['len'].sum()} rows in {counts.height} departments")
 
     return MaterializeResult(
         metadata={
-            "department": department,
-            "dagster/row_count": to_create.height + to_update.height,
-            "rows_created": MetadataValue.int(created),
-            "rows_updated": MetadataValue.int(updated),
-            "events_created": MetadataValue.int(events_count),
+            "dagster/row_count": int(counts["len"].sum()),
+            "departments": MetadataValue.int(counts.height),
+            "path": MetadataValue.path(destination),
         }
     )
 
 
 @asset(
     group_name="import_lovac",
-    deps=["source_owners", "source_housings"],
+    deps=["source_owners", "source_housings", "source_housing_owners_split"],
     partitions_def=departments_partitions,
 )
 def source_housing_owners(
@@ -185,55 +228,18 @@ def source_housing_owners(
 ) -> MaterializeResult:
     """Import housing-owner links from LOVAC JSONL. Partitioned by department."""
     department = context.partition_key
-    context.log.info(f"[{department}] Reading source housing-owners...")
-    source = read_source_housing_owners(
-        f"{config.source_path}/housing-owners.jsonl", department
-    )
-    source = validate_source_housing_owners(source)
-
-    context.log.info(f"[{department}] Reading existing housings for join...")
-    existing_housings = read_existing_housings_for_join(
-        config.connection_string, department
-    )
-    context.log.info(f"[{department}] Loaded {existing_housings.height} existing housings")
-
-    context.log.info(f"[{department}] Reading existing owners for join...")
-    existing_owners = read_existing_owners_for_join(config.connection_string)
-    context.log.info(f"[{department}] Loaded {existing_owners.height} existing owners")
+    owner_snapshot, admin_user_id = _owner_lookup(context, config)
 
-    housing_ids = existing_housings["id"].to_list()
-    context.log.info(f"[{department}] Reading {len(housing_ids)} existing housing-owner links...")
-    existing_housing_owner_links = read_existing_housing_owners(
-        config.connection_string, housing_ids
+    result = import_housing_owners(
+        config, department, admin_user_id, owner_snapshot, context.log
     )
-    context.log.info(f"[{department}] Loaded {existing_housing_owner_links.height} existing links")
-
-    admin_user_id = read_admin_user_id(
-        config.connection_string, config.system_account_email
-    )
-
-    context.log.info(f"[{department}] Transforming housing-owners...")
-    housing_owner_rows, events, housing_owner_events = transform_housing_owners(
-        source, existing_housings, existing_owners, existing_housing_owner_links,
-        year=config.year, admin_user_id=admin_user_id,
-    )
-    context.log.info(
-        f"[{department}] Links: {housing_owner_rows.height}, events: {events.height}"
-    )
-
-    context.log.info(f"[{department}] Writing housing-owners to PostgreSQL...")
-    links_written, events_count = write_housing_owners(
-        housing_owner_rows, events, housing_owner_events,
-        config.connection_string, config.dry_run,
-    )
-    context.log.info(f"[{department}] Done: {links_written} links written, {events_count} events")
 
     return MaterializeResult(
         metadata={
             "department": department,
-            "dagster/row_count": housing_owner_rows.height,
-            "links_written": MetadataValue.int(links_written),
-            "events_created": MetadataValue.int(events_count),
+            "dagster/row_count": result["row_count"],
+            "links_written": MetadataValue.int(result["links_written"]),
+            "events_created": MetadataValue.int(result["events_created"]),
         }
     )
 
@@ -250,51 +256,103 @@ def existing_housings(
     """Verify existing housings against current LOVAC year. Partitioned by department."""
     department = context.partition_key
 
-    context.log.info(f"[{department}] Querying housings missing from {config.year}...")
-    housings_missing = read_housings_missing_from_year(
-        config.connection_string, config.year, department
-    )
-    context.log.info(f"[{department}] Found {housings_missing.height} housings to reset")
-
     admin_user_id = read_admin_user_id(
         config.connection_string, config.system_account_email
     )
 
-    context.log.info(f"[{department}] Transforming existing housings...")
-    to_update, events, housing_events = transform_existing_housings(
-        housings_missing, year=config.year, admin_user_id=admin_user_id
+    result = reset_existing_housings(config, department, admin_user_id, context.log)
+
+    return MaterializeResult(
+        metadata={
+            "department": department,
+            "dagster/row_count": result["row_count"],
+            "rows_updated": MetadataValue.int(result["rows_updated"]),
+            "events_created": MetadataValue.int(result["events_created"]),
+        }
     )
-    context.log.info(f"[{department}] To update: {to_update.height}, events: {events.height}")
 
-    context.log.info(f"[{department}] Writing updates to PostgreSQL...")
-    updated, events_count = write_existing_housing_updates(
-        to_update, events, housing_events, config.connection_string, config.dry_run
+
+@asset(
+    group_name="import_lovac",
+    deps=["source_owners", "building_triggers_disabled", "source_housing_owners_split"],
+)
+def departments_import(
+    context,
+    config: ImportLovacConfig,
+) -> MaterializeResult:
+    """Import housings, housing-owners and existing housings of many departments.
+
+    Alternative to the department-partitioned assets: one run processes
+    `config.departments` (all departments by default) on a process pool,
+    largest departments first.
+    """
+    departments = config.departments or DEPARTMENT_CODES
+    owner_snapshot, admin_user_id = _owner_lookup(context, config)
+
+    context.log.info(
+        f"Importing {len(departments)} departments with {config.max_workers} workers, "
+        f"{config.max_connections} connections, {config.max_fast_housing_writers} fast_housing writers..."
+    )
+    results = import_departments(
+        config, departments,
+        admin_user_id=admin_user_id, owner_snapshot=owner_snapshot, log=context.log,
     )
-    context.log.info(f"[{department}] Done: {updated} updated, {events_count} events")
 
+    timings = {
+        department: {stage: counts["seconds"] for stage, counts in stages.items()}
+        for department, stages in results.items()
+    }
     return MaterializeResult(
         metadata={
-            "department": department,
-            "dagster/row_count": housings_missing.height,
-            "rows_updated": MetadataValue.int(updated),
-            "events_created": MetadataValue.int(events_count),
+            "dagster/row_count": sum(stages["housings"]["row_count"] for stages in results.values()),
+            "departments": MetadataValue.int(len(results)),
+            "rows_created": MetadataValue.int(
+                sum(stages["housings"]["rows_created"] for stages in results.values())
+            ),
+            "rows_updated": MetadataValue.int(
+                sum(stages["housings"]["rows_updated"] for stages in results.values())
+            ),
+            "rows_unchanged": MetadataValue.int(
+                sum(stages["housings"]["rows_unchanged"] for stages in results.values())
+            ),
+            "links_written": MetadataValue.int(
+                sum(stages["housing_owners"]["links_written"] for stages in results.values())
+            ),
+            "housings_reset": MetadataValue.int(
+                sum(stages["existing_housings"]["rows_updated"] for stages in results.values())
+            ),
+            "department_seconds": MetadataValue.json(timings),
         }
     )
 
 
 @asset(
     group_name="import_lovac",
-    deps=["source_housings", "existing_housings"],
+    deps=["source_housings", "existing_housings", "departments_import"],
 )
 def buildings(
     context,
     config: ImportLovacConfig,
 ) -> MaterializeResult:
     """Update building counts and re-enable triggers after housing import."""
-    context.log.info("Updating building counts...")
-    updated = update_building_counts(config.connection_string, config.dry_run)
+    mode = "incremental" if config.incremental_building_counts else "full"
+    context.log.info(f"Updating building counts ({mode})...")
+    updated = update_building_counts(
+        config.connection_string, config.dry_run,
+        incremental=config.incremental_building_counts,
+    )
     context.log.info(f"Updated {updated} buildings.")
 
+    metadata = {}
+    if config.verify_building_counts:
+        context.log.info("Verifying building counts against a full recompute...")
+        mismatches = diff_building_counts(config.connection_string)
+        if mismatches.height > 0:
+            context.log.warning(
+                f"{mismatches.height} buildings differ from a full recompute:\n{mismatches.head(20)}"
+            )
+        metadata["building_count_mismatches"] = MetadataValue.int(mismatches.height)
+
     context.log.info("Re-enabling building triggers...")
     enable_building_triggers(config.connection_string)
     context.log.info("Building triggers re-enabled.")
@@ -303,5 +361,7 @@ def buildings(
         metadata={
             "dagster/row_count": updated,
             "buildings_updated": MetadataValue.int(updated),
+            "building_counts_mode": mode,
+            **metadata,
         }
     )
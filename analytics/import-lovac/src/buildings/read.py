@@ -1,5 +1,7 @@
 import polars as pl
 
+from src.pg_read import read_database
+
 
 SOURCE_BUILDINGS_SCHEMA = {
     "building_id": pl.Utf8,
@@ -16,7 +18,7 @@ def read_source_buildings(path: str) -> pl.DataFrame:
 
 def count_existing_buildings(connection_string: str) -> int:
     """Count existing buildings in PostgreSQL (for reporting)."""
-    result = pl.read_database_uri(
+    result = read_database(
         "SELECT COUNT(*)::BIGINT AS n FROM buildings",
         connection_string,
     )
@@ -1,25 +1,18 @@
-import io
-
 import polars as pl
 import psycopg
 
+from src.pg_copy import copy_frame
+from src.pg_read import read_database
+
 
 STAGING_COLUMNS = ["id", "rnb_id", "rnb_id_score", "rnb_footprint", "housing_count", "vacant_housing_count"]
 
+# Buildings whose housings were written during the import, consumed by the
+# incremental update_building_counts. Logged: an unlogged table is emptied
+# by crash recovery, and the incremental update would then skip them.
+TOUCHED_BUILDINGS_TABLE = "import_lovac_touched_buildings"
 
-def _copy_to_staging(
-    dataframe: pl.DataFrame,
-    staging_table: str,
-    columns: list[str],
-    cursor: psycopg.Cursor,
-) -> None:
-    """COPY a DataFrame into a staging table using psycopg's COPY protocol."""
-    buffer = io.BytesIO()
-    dataframe.select(columns).write_csv(buffer)
-    buffer.seek(0)
-    columns_clause = ", ".join(f'"{column}"' for column in columns)
-    with cursor.copy(f"COPY {staging_table} ({columns_clause}) FROM STDIN WITH (FORMAT csv, HEADER true)") as copy:
-        copy.write(buffer.read())
+BATCH_SIZE = 10_000
 
 
 def write_source_buildings(
@@ -52,7 +45,7 @@ def write_source_buildings(
             cursor.execute(
                 "CREATE TEMP TABLE stg_buildings (LIKE buildings INCLUDING DEFAULTS)"
             )
-            _copy_to_staging(to_insert, "stg_buildings", STAGING_COLUMNS, cursor)
+            copy_frame(cursor, to_insert.select(STAGING_COLUMNS), "stg_buildings")
             columns = ", ".join(STAGING_COLUMNS)
             cursor.execute(f"""
                 INSERT INTO buildings ({columns})
@@ -66,28 +59,57 @@ def write_source_buildings(
     return inserted
 
 
-def update_building_counts(connection_string: str, dry_run: bool = False) -> int:
-    """Recompute rent and vacant housing counts for all buildings.
+CREATE_TOUCHED_BUILDINGS_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {TOUCHED_BUILDINGS_TABLE} (
+        building_id text PRIMARY KEY
+    )
+"""
+
+
+def create_touched_buildings_table(connection_string: str) -> None:
+    """Create the table recording buildings touched by the housing writers."""
+    with psycopg.connect(connection_string) as connection:
+        connection.execute(CREATE_TOUCHED_BUILDINGS_SQL)
+        # Created unlogged by earlier versions
+        connection.execute(f"ALTER TABLE {TOUCHED_BUILDINGS_TABLE} SET LOGGED")
+
+
+def record_touched_buildings(cursor: psycopg.Cursor, query: str) -> None:
+    """Record the building_id values returned by ``query`` as touched.
+
+    Creates the table if needed, so a writer asset can run on its own.
+    """
+    cursor.execute(CREATE_TOUCHED_BUILDINGS_SQL)
+    cursor.execute(f"""
+        INSERT INTO {TOUCHED_BUILDINGS_TABLE} (building_id)
+        SELECT DISTINCT building_id FROM ({query}) touched
+        WHERE building_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
 
-    Mirrors the TypeScript source-housing-command.ts bulk UPDATE.
+
+def update_building_counts(
+    connection_string: str, dry_run: bool = False, *, incremental: bool = False
+) -> int:
+    """Recompute rent and vacant housing counts of buildings.
+
+    The full recompute mirrors the TypeScript source-housing-command.ts bulk
+    UPDATE over all buildings. The incremental one only recomputes the
+    buildings recorded by the housing writers, BATCH_SIZE building ids at a
+    time; each batch is removed from the touched set in the transaction that
+    updates it. The full recompute empties the touched set.
 
     Returns the number of buildings updated.
     """
     if dry_run:
         return 0
+    if incremental:
+        return _update_touched_building_counts(connection_string)
 
     with psycopg.connect(connection_string) as connection:
         with connection.cursor() as cursor:
-            cursor.execute("""
-                WITH building_counts AS (
-                    SELECT
-                        building_id,
-                        COUNT(*) FILTER (WHERE occupancy = 'L') AS rent_count,
-                        COUNT(*) FILTER (WHERE occupancy = 'V') AS vacant_count
-                    FROM fast_housing
-                    WHERE building_id IS NOT NULL
-                    GROUP BY building_id
-                )
+            cursor.execute(f"""
+                WITH building_counts AS ({_building_counts_query()})
                 UPDATE buildings b
                 SET
                     rent_housing_count = COALESCE(bc.rent_count, 0),
@@ -96,6 +118,83 @@ def update_building_counts(connection_string: str, dry_run: bool = False) -> int
                 WHERE b.id = bc.building_id
             """)
             updated = cursor.rowcount
+            cursor.execute(CREATE_TOUCHED_BUILDINGS_SQL)
+            cursor.execute(f"TRUNCATE {TOUCHED_BUILDINGS_TABLE}")
         connection.commit()
 
     return updated
+
+
+def _building_counts_query(where: str = "TRUE") -> str:
+    return f"""
+        SELECT
+            building_id,
+            COUNT(*) FILTER (WHERE occupancy = 'L') AS rent_count,
+            COUNT(*) FILTER (WHERE occupancy = 'V') AS vacant_count
+        FROM fast_housing
+        WHERE building_id IS NOT NULL AND {where}
+        GROUP BY building_id
+    """
+
+
+def _update_touched_building_counts(connection_string: str) -> int:
+    updated = 0
+    with psycopg.connect(connection_string) as connection:
+        connection.execute(CREATE_TOUCHED_BUILDINGS_SQL)
+        connection.commit()
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT min(building_id), max(building_id)
+                    FROM (
+                        SELECT building_id FROM {TOUCHED_BUILDINGS_TABLE}
+                        ORDER BY building_id
+                        LIMIT %s
+                    ) batch
+                """, (BATCH_SIZE,))
+                lower, upper = cursor.fetchone()
+                if lower is None:
+                    break
+                cursor.execute(f"""
+                    WITH building_counts AS ({_building_counts_query(
+                        f"building_id IN (SELECT building_id FROM {TOUCHED_BUILDINGS_TABLE}"
+                        " WHERE building_id BETWEEN %(lower)s AND %(upper)s)"
+                    )})
+                    UPDATE buildings b
+                    SET
+                        rent_housing_count = COALESCE(bc.rent_count, 0),
+                        vacant_housing_count = COALESCE(bc.vacant_count, 0)
+                    FROM building_counts bc
+                    WHERE b.id = bc.building_id
+                """, {"lower": lower, "upper": upper})
+                updated += cursor.rowcount
+                cursor.execute(f"""
+                    DELETE FROM {TOUCHED_BUILDINGS_TABLE}
+                    WHERE building_id BETWEEN %s AND %s
+                """, (lower, upper))
+            connection.commit()
+    return updated
+
+
+def diff_building_counts(connection_string: str) -> pl.DataFrame:
+    """Buildings whose stored counts differ from a full recompute.
+
+    Read-only; used to verify the incremental update.
+    """
+    return read_database(
+        f"""
+        WITH building_counts AS ({_building_counts_query()})
+        SELECT
+            b.id,
+            b.rent_housing_count,
+            bc.rent_count AS expected_rent_housing_count,
+            b.vacant_housing_count,
+            bc.vacant_count AS expected_vacant_housing_count
+        FROM buildings b
+        JOIN building_counts bc ON bc.building_id = b.id
+        WHERE b.rent_housing_count IS DISTINCT FROM bc.rent_count
+           OR b.vacant_housing_count IS DISTINCT FROM bc.vacant_count
+        ORDER BY b.id
+        """,
+        connection_string,
+    )
@@ -0,0 +1,61 @@
+import json
+from typing import Callable
+
+import polars as pl
+
+
+def optional_column(frame: pl.DataFrame, column: str, dtype: pl.DataType) -> pl.Expr:
+    """Column if present, typed nulls otherwise (mirrors ``row.get``)."""
+    if column in frame.columns:
+        return pl.col(column)
+    return pl.lit(None, dtype=dtype).alias(column)
+
+
+def encode_json(
+    frame: pl.DataFrame,
+    columns: list[str],
+    build: Callable[..., dict],
+    alias: str,
+) -> pl.DataFrame:
+    """Attach ``json.dumps(build(*values))`` for each row of ``columns``.
+
+    Only distinct value combinations go through ``json.dumps``, which keeps
+    the exact Python encoding (separators, ASCII escapes) at columnar cost.
+    """
+    distinct = frame.select(columns).unique(maintain_order=True)
+    encoded = distinct.with_columns(
+        pl.Series(
+            alias,
+            [json.dumps(build(*values)) for values in distinct.iter_rows()],
+            dtype=pl.Utf8,
+        )
+    )
+    return frame.join(
+        encoded, on=columns, how="left", nulls_equal=True, maintain_order="left"
+    )
+
+
+# Characters json.dumps writes verbatim: printable ASCII except '"' and '\'
+_NEEDS_ESCAPE = r'[^\x20\x21\x23-\x5b\x5d-\x7e]'
+
+
+def json_quote(values: pl.Series) -> pl.Series:
+    """``json.dumps`` of each string (``null`` for nulls), without a Python loop.
+
+    Only the distinct characters that need escaping go through ``json.dumps``;
+    they are then substituted in one ``replace_many`` pass.
+    """
+    escaped = values.filter(values.str.contains(_NEEDS_ESCAPE))
+    characters = escaped.str.split("").explode().drop_nulls().unique().to_list()
+    escapes = {
+        character: json.dumps(character)[1:-1]
+        for character in characters
+        if character and json.dumps(character)[1:-1] != character
+    }
+    body = values.str.replace_many(escapes) if escapes else values
+    return (
+        pl.select(pl.concat_str([pl.lit('"'), pl.lit(body), pl.lit('"')]))
+        .to_series()
+        .fill_null("null")
+        .alias(values.name)
+    )
@@ -0,0 +1,48 @@
+"""Process-wide limits on PostgreSQL connections and fast_housing writers.
+
+There is no limit by default. The parallel department import installs
+semaphores shared by all of its worker processes with `set_limits`, so the
+connection budget and the number of concurrent fast_housing writers hold
+across the whole pool.
+"""
+
+import contextlib
+from collections.abc import Iterator
+
+import psycopg
+
+_connections = None
+_fast_housing_writers = None
+
+
+def set_limits(connections, fast_housing_writers) -> None:
+    """Install the semaphores bounding connections and fast_housing writers."""
+    global _connections, _fast_housing_writers
+    _connections = connections
+    _fast_housing_writers = fast_housing_writers
+
+
+@contextlib.contextmanager
+def _acquire(semaphore) -> Iterator[None]:
+    if semaphore is None:
+        yield
+        return
+    with semaphore:
+        yield
+
+
+def connection_slot() -> contextlib.AbstractContextManager[None]:
+    """Hold one unit of the connection budget."""
+    return _acquire(_connections)
+
+
+def fast_housing_writer() -> contextlib.AbstractContextManager[None]:
+    """Hold one of the fast_housing writer slots."""
+    return _acquire(_fast_housing_writers)
+
+
+@contextlib.contextmanager
+def connect(connection_string: str) -> Iterator[psycopg.Connection]:
+    """psycopg connection counted against the connection budget."""
+    with connection_slot(), psycopg.connect(connection_string) as connection:
+        yield connection
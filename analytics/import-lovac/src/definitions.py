@@ -12,8 +12,21 @@ source_housings_job = define_asset_job(
     selection="source_housings",
 )
 
+# Whole import in one run, departments processed by departments_import
+parallel_import_job = define_asset_job(
+    name="parallel_import_job",
+    selection=[
+        "source_owners",
+        "source_buildings",
+        "building_triggers_disabled",
+        "source_housing_owners_split",
+        "departments_import",
+        "buildings",
+    ],
+)
+
 defs = Definitions(
     assets=load_assets_from_modules([import_lovac_assets]),
-    jobs=[source_housings_job],
+    jobs=[source_housings_job, parallel_import_job],
     executor=multiprocess_executor.configured({"max_concurrent": 4}),
 )
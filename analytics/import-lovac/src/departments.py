@@ -0,0 +1,256 @@
+"""Per-department import stages and the parallel department import.
+
+The department-partitioned assets each run one stage for their partition.
+`import_departments` runs all stages of many departments in one Dagster
+run instead, on a process pool sharing a connection budget and a limit on
+concurrent fast_housing writers (see src.connections).
+"""
+
+import logging
+import multiprocessing
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+
+from .config import ImportLovacConfig
+from .connections import set_limits
+
+from .owners.snapshot import read_owner_snapshot
+
+from .housings.read import (
+    read_source_housings,
+    read_existing_housings,
+    read_existing_housing_events,
+    count_source_housings_by_department,
+)
+from .housings.transform import transform_housings
+from .housings.write import write_housings
+
+from .housing_owners.read import (
+    read_split_source_housing_owners,
+    read_existing_housings_for_join,
+    read_existing_owners_for_join,
+    read_existing_housing_owners,
+)
+from .housing_owners.transform import transform_housing_owners
+from .housing_owners.write import write_housing_owners
+
+from .existing_housings.read import read_housings_missing_from_year
+from .existing_housings.transform import transform_existing_housings
+from .existing_housings.write import write_existing_housing_updates
+
+logger = logging.getLogger(__name__)
+
+
+def housing_owners_split_path(config: ImportLovacConfig) -> str:
+    return f"{config.cache_path}/{config.year}/housing-owners"
+
+
+def import_housings(
+    config: ImportLovacConfig, department: str, admin_user_id: str, log=logger
+) -> dict[str, int]:
+    """Create/update the housings of a department and record their events."""
+    log.info(f"[{department}] Reading source housings...")
+    source = read_source_housings(f"{config.source_path}/housings", department)
+
+    log.info(f"[{department}] Reading existing housings from PostgreSQL...")
+    existing = read_existing_housings(config.connection_string, department)
+    log.info(f"[{department}] Loaded {existing.height} existing housings")
+
+    housing_ids = existing["id"].to_list()
+    log.info(f"[{department}] Reading {len(housing_ids)} housing events...")
+    existing_events = read_existing_housing_events(
+        config.connection_string, housing_ids
+    )
+    log.info(f"[{department}] Loaded {existing_events.height} events")
+
+    log.info(f"[{department}] Transforming housings...")
+    to_create, to_update, events, housing_events = transform_housings(
+        source, existing, existing_events,
+        year=config.year, admin_user_id=admin_user_id,
+    )
+    log.info(
+        f"[{department}] To create: {to_create.height}, to update: {to_update.height}, events: {events.height}"
+    )
+
+    log.info(f"[{department}] Writing housings to PostgreSQL...")
+    created, updated, events_count, unchanged = write_housings(
+        to_create, to_update, events, housing_events,
+        config.connection_string, config.dry_run
+    )
+    log.info(
+        f"[{department}] Done: {created} created, {updated} updated, "
+        f"{unchanged} unchanged, {events_count} events"
+    )
+
+    return {
+        "row_count": to_create.height + to_update.height,
+        "rows_created": created,
+        "rows_updated": updated,
+        "rows_unchanged": unchanged,
+        "events_created": events_count,
+    }
+
+
+def import_housing_owners(
+    config: ImportLovacConfig,
+    department: str,
+    admin_user_id: str,
+    owner_snapshot: str | None,
+    log=logger,
+) -> dict[str, int]:
+    """Replace the housing-owner links of a department and record their events."""
+    log.info(f"[{department}] Reading source housing-owners...")
+    source = read_split_source_housing_owners(
+        housing_owners_split_path(config), department
+    ).collect()
+
+    log.info(f"[{department}] Reading existing housings for join...")
+    existing_housings = read_existing_housings_for_join(
+        config.connection_string, department
+    )
+    log.info(f"[{department}] Loaded {existing_housings.height} existing housings")
+
+    if owner_snapshot is not None:
+        log.info(f"[{department}] Reading existing owners from {owner_snapshot}...")
+        existing_owners = read_owner_snapshot(owner_snapshot, source["owner_uid"])
+    else:
+        log.warning(
+            f"[{department}] No owner snapshot for {config.year}, reading owners from PostgreSQL..."
+        )
+        existing_owners = read_existing_owners_for_join(config.connection_string)
+    log.info(f"[{department}] Loaded {existing_owners.height} existing owners")
+
+    housing_ids = existing_housings["id"].to_list()
+    log.info(f"[{department}] Reading {len(housing_ids)} existing housing-owner links...")
+    existing_housing_owner_links = read_existing_housing_owners(
+        config.connection_string, housing_ids
+    )
+    log.info(f"[{department}] Loaded {existing_housing_owner_links.height} existing links")
+
+    log.info(f"[{department}] Transforming housing-owners...")
+    housing_owner_rows, events, housing_owner_events = transform_housing_owners(
+        source.lazy(), existing_housings, existing_owners, existing_housing_owner_links,
+        year=config.year, admin_user_id=admin_user_id,
+    )
+    log.info(
+        f"[{department}] Links: {housing_owner_rows.height}, events: {events.height}"
+    )
+
+    log.info(f"[{department}] Writing housing-owners to PostgreSQL...")
+    links_written, events_count = write_housing_owners(
+        housing_owner_rows, events, housing_owner_events,
+        config.connection_string, config.dry_run,
+    )
+    log.info(f"[{department}] Done: {links_written} links written, {events_count} events")
+
+    return {
+        "row_count": housing_owner_rows.height,
+        "links_written": links_written,
+        "events_created": events_count,
+    }
+
+
+def reset_existing_housings(
+    config: ImportLovacConfig, department: str, admin_user_id: str, log=logger
+) -> dict[str, int]:
+    """Reset vacant housings of a department missing from the current year."""
+    log.info(f"[{department}] Querying housings missing from {config.year}...")
+    housings_missing = read_housings_missing_from_year(
+        config.connection_string, config.year, department
+    )
+    log.info(f"[{department}] Found {housings_missing.height} housings to reset")
+
+    log.info(f"[{department}] Transforming existing housings...")
+    to_update, events, housing_events = transform_existing_housings(
+        housings_missing, year=config.year, admin_user_id=admin_user_id
+    )
+    log.info(f"[{department}] To update: {to_update.height}, events: {events.height}")
+
+    log.info(f"[{department}] Writing updates to PostgreSQL...")
+    updated, events_count = write_existing_housing_updates(
+        to_update, events, housing_events, config.connection_string, config.dry_run
+    )
+    log.info(f"[{department}] Done: {updated} updated, {events_count} events")
+
+    return {
+        "row_count": housings_missing.height,
+        "rows_updated": updated,
+        "events_created": events_count,
+    }
+
+
+def import_department(
+    config: ImportLovacConfig,
+    department: str,
+    admin_user_id: str,
+    owner_snapshot: str | None,
+) -> dict[str, dict]:
+    """Run every stage for one department, in dependency order.
+
+    Returns the counts of each stage and its duration in seconds.
+    """
+    stages = {
+        "housings": lambda: import_housings(config, department, admin_user_id),
+        "housing_owners": lambda: import_housing_owners(
+            config, department, admin_user_id, owner_snapshot
+        ),
+        "existing_housings": lambda: reset_existing_housings(config, department, admin_user_id),
+    }
+    result = {}
+    for stage, run in stages.items():
+        started = time.perf_counter()
+        result[stage] = run()
+        result[stage]["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def order_by_size(config: ImportLovacConfig, departments: list[str]) -> list[str]:
+    """Largest departments first, so the longest ones do not start last."""
+    sizes = count_source_housings_by_department(f"{config.source_path}/housings")
+    return sorted(departments, key=lambda department: sizes.get(department, 0), reverse=True)
+
+
+def import_departments(
+    config: ImportLovacConfig,
+    departments: list[str],
+    *,
+    admin_user_id: str,
+    owner_snapshot: str | None,
+    log=logger,
+) -> dict[str, dict]:
+    """Import departments concurrently on a process pool.
+
+    At most ``config.max_workers`` departments run at once, with at most
+    ``config.max_connections`` open connections and
+    ``config.max_fast_housing_writers`` writers to fast_housing across the
+    pool. The first failing department cancels the ones not yet started.
+    """
+    context = multiprocessing.get_context("spawn")
+    connections = context.BoundedSemaphore(config.max_connections)
+    fast_housing_writers = context.BoundedSemaphore(config.max_fast_housing_writers)
+
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=config.max_workers,
+        mp_context=context,
+        initializer=set_limits,
+        initargs=(connections, fast_housing_writers),
+    ) as pool:
+        pending = {
+            pool.submit(import_department, config, department, admin_user_id, owner_snapshot): department
+            for department in order_by_size(config, departments)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_EXCEPTION)
+            for future in done:
+                department = pending.pop(future)
+                if future.exception() is not None:
+                    pool.shutdown(cancel_futures=True)
+                    raise RuntimeError(f"Import of department {department} failed") from future.exception()
+                results[department] = future.result()
+                seconds = sum(stage["seconds"] for stage in results[department].values())
+                log.info(
+                    f"[{department}] Imported in {seconds:.1f}s "
+                    f"({len(results)}/{len(results) + len(pending)})"
+                )
+    return results
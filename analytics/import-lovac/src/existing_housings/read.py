@@ -1,5 +1,7 @@
 import polars as pl
 
+from src.pg_read import read_database
+
 
 def read_housings_missing_from_year(
     connection_string: str, year: str, department: str
@@ -8,14 +10,15 @@ def read_housings_missing_from_year(
 
     These housings may have left vacancy and need their status reset.
     """
-    return pl.read_database_uri(
-        f"""
-        SELECT id, local_id, geo_code, occupancy, status, sub_status, data_file_years
+    return read_database(
+        """
+        SELECT id::text, local_id, geo_code, occupancy, status, sub_status, data_file_years
         FROM fast_housing
-        WHERE geo_code LIKE '{department}%'
+        WHERE geo_code LIKE $1 || '%'
           AND occupancy = 'V'
           AND status IN (0, 1)
-          AND NOT ('{year}' = ANY(data_file_years))
+          AND NOT ($2 = ANY(data_file_years))
         """,
         connection_string,
+        [department, year],
     )
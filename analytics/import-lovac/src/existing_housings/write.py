@@ -1,16 +1,11 @@
 import polars as pl
-import psycopg
 
-
-BATCH_SIZE = 10_000
+from src.buildings.write import record_touched_buildings
+from src.connections import connect, fast_housing_writer
+from src.pg_copy import copy_frame
 
 
-def _copy_dataframe(cursor, dataframe: pl.DataFrame, table: str) -> None:
-    """COPY a Polars DataFrame into a table via psycopg's COPY protocol."""
-    columns = ", ".join(dataframe.columns)
-    with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
-        for row in dataframe.iter_rows():
-            copy.write_row(row)
+BATCH_SIZE = 10_000
 
 
 def write_existing_housing_updates(
@@ -36,14 +31,17 @@ def write_existing_housing_updates(
     updated = 0
     events_inserted = 0
 
-    with psycopg.connect(connection_string) as connection:
+    with fast_housing_writer(), connect(connection_string) as connection:
         if to_update.height > 0:
             identifiers = to_update["id"].to_list()
             with connection.cursor() as cursor:
                 cursor.execute(
                     "CREATE TEMP TABLE stg_existing_housings (LIKE fast_housing INCLUDING DEFAULTS)"
                 )
-                _copy_dataframe(cursor, to_update, "stg_existing_housings")
+                copy_frame(cursor, to_update, "stg_existing_housings")
+                record_touched_buildings(cursor, """
+                    SELECT h.building_id FROM fast_housing h JOIN stg_existing_housings s ON h.id = s.id
+                """)
             for offset in range(0, len(identifiers), BATCH_SIZE):
                 batch = identifiers[offset : offset + BATCH_SIZE]
                 with connection.cursor() as cursor:
@@ -69,7 +67,7 @@ def write_existing_housing_updates(
                 cursor.execute(
                     "CREATE TEMP TABLE stg_eh_events (LIKE events INCLUDING DEFAULTS)"
                 )
-                _copy_dataframe(cursor, events, "stg_eh_events")
+                copy_frame(cursor, events, "stg_eh_events")
                 cursor.execute("""
                     INSERT INTO events
                     SELECT * FROM stg_eh_events
@@ -81,7 +79,7 @@ def write_existing_housing_updates(
                 cursor.execute(
                     "CREATE TEMP TABLE stg_eh_housing_events (LIKE housing_events INCLUDING DEFAULTS)"
                 )
-                _copy_dataframe(cursor, housing_events, "stg_eh_housing_events")
+                copy_frame(cursor, housing_events, "stg_eh_housing_events")
                 cursor.execute("""
                     INSERT INTO housing_events
                     SELECT * FROM stg_eh_housing_events
@@ -1,5 +1,9 @@
+import shutil
+
 import polars as pl
 
+from src.pg_read import read_database
+
 # Mirrors PropertyRight from @zerologementvacant/models
 PROPERTY_RIGHT_VALUES = [
     "proprietaire-entier",
@@ -56,17 +60,50 @@ def validate_source_housing_owners(lazy_frame: pl.LazyFrame) -> pl.LazyFrame:
     )
 
 
+def department_code(geo_code: pl.Expr) -> pl.Expr:
+    """Department of a geo code: 3 characters overseas (97x), 2 otherwise."""
+    return (
+        pl.when(geo_code.str.starts_with("97"))
+        .then(geo_code.str.slice(0, 3))
+        .otherwise(geo_code.str.slice(0, 2))
+    )
+
+
+def split_source_housing_owners(path: str, destination: str) -> None:
+    """Convert the national housing-owner JSONL into Parquet by department.
+
+    Single streaming pass: rows are validated, then written under
+    ``destination/dept=XX/`` (hive layout, like the housings parquet).
+    Any previous split at ``destination`` is removed first.
+    """
+    shutil.rmtree(destination, ignore_errors=True)
+    lazy_frame = validate_source_housing_owners(
+        pl.scan_ndjson(path, schema=SOURCE_HOUSING_OWNER_SCHEMA)
+    ).with_columns(department_code(pl.col("geo_code")).alias("dept"))
+    lazy_frame.sink_parquet(pl.PartitionBy(destination, key="dept"), mkdir=True)
+
+
+def read_split_source_housing_owners(path: str, department: str) -> pl.LazyFrame:
+    """Read the validated housing-owner Parquet of a single department."""
+    return (
+        pl.scan_parquet(f"{path}/**/*.parquet", hive_partitioning=True)
+        .filter(pl.col("dept") == department)
+        .drop("dept")
+    )
+
+
 def read_existing_housings_for_join(
     connection_string: str, department: str
 ) -> pl.DataFrame:
     """Read existing housings (id + local_id + geo_code) for the department."""
-    return pl.read_database_uri(
-        f"""
-        SELECT id, local_id, geo_code
+    return read_database(
+        """
+        SELECT id::text, local_id, geo_code
         FROM fast_housing
-        WHERE geo_code LIKE '{department}%'
+        WHERE geo_code LIKE $1 || '%'
         """,
         connection_string,
+        [department],
     )
 
 
@@ -77,8 +114,8 @@ def read_existing_owners_for_join(connection_string: str) -> pl.DataFrame:
     properties across departments. We read all owners but only the id
     column needed for the join.
     """
-    return pl.read_database_uri(
-        "SELECT id, full_name FROM owners",
+    return read_database(
+        "SELECT id::text, full_name FROM owners",
         connection_string,
     )
 
@@ -95,12 +132,12 @@ def read_existing_housing_owners(
             "start_date": pl.Date,
             "end_date": pl.Date,
         })
-    ids_literal = ", ".join(f"'{id}'" for id in housing_ids)
-    return pl.read_database_uri(
-        f"""
-        SELECT housing_id, owner_id, rank, start_date, end_date
+    return read_database(
+        """
+        SELECT housing_id::text, owner_id::text, rank, start_date, end_date
         FROM owners_housing
-        WHERE housing_id IN ({ids_literal})
+        WHERE housing_id = ANY($1::uuid[])
         """,
         connection_string,
+        [housing_ids],
     )
@@ -1,10 +1,10 @@
-import json
-import uuid
 from datetime import datetime, date, timezone
 
 import polars as pl
 
-from src.constants import LOVAC_NAMESPACE, PREVIOUS_OWNER_RANK
+from src.columns import json_quote, optional_column
+from src.constants import PREVIOUS_OWNER_RANK
+from src.identifiers import lovac_uuid5
 
 ACTIVE_OWNER_RANKS = [1, 2, 3, 4, 5, 6]
 
@@ -58,6 +58,9 @@ def transform_housing_owners(
 ) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
     """Enrich source housing-owners and compute replacements + events.
 
+    Reconciliation is set-based: anti-joins give added and removed owners,
+    an inner join gives rank changes, all keyed on (housing_id, owner_id).
+
     Returns (housing_owner_rows, events, housing_owner_events).
     """
     source_dataframe = source.collect()
@@ -84,179 +87,155 @@ def transform_housing_owners(
             pl.DataFrame(schema=_housing_owner_events_schema()),
         )
 
-    # Build owner name lookup from existing_owners
-    owner_names = dict(zip(
-        existing_owners["id"].to_list(),
-        existing_owners["full_name"].to_list(),
-    ))
-
     now = datetime.now(timezone.utc)
     today = date.today()
-
-    all_ho_rows: list[dict] = []
-    all_events: list[dict] = []
-    all_ho_events: list[dict] = []
-
-    # Process per housing
-    housing_ids = with_owner["housing_id"].unique().to_list()
-    for housing_id in housing_ids:
-        housing_source = with_owner.filter(pl.col("housing_id") == housing_id)
-        housing_geo_code = housing_source["geo_code"][0]
-
-        # Build new active owners from source
-        active_owners: dict[str, dict] = {}
-        for row in housing_source.iter_rows(named=True):
-            owner_id = row["owner_id"]
-            active_owners[owner_id] = {
-                "owner_id": owner_id,
-                "housing_id": housing_id,
-                "housing_geo_code": housing_geo_code,
-                "rank": row["rank"],
-                "start_date": today,
-                "end_date": None,
-                "origin": None,
-                "idprocpte": row.get("idprocpte"),
-                "idprodroit": row.get("idprodroit"),
-                "locprop_source": str(row.get("locprop_source")) if row.get("locprop_source") is not None else None,
-                "property_right": row.get("property_right"),
-                "locprop_relative_ban": None,
-                "locprop_distance_ban": None,
-            }
-
-        # Get existing housing owners for this housing
-        existing_for_housing = existing_housing_owners.filter(
-            pl.col("housing_id") == housing_id
+    keys = ["housing_id", "owner_id"]
+    schema = _housing_owner_row_schema()
+
+    with_owner = with_owner.with_columns(
+        pl.col("geo_code").first().over("housing_id").alias("housing_geo_code")
+    )
+    housings = with_owner.select("housing_id", "housing_geo_code").unique(
+        "housing_id", maintain_order=True
+    )
+
+    # New active owners from source, one per (housing, owner): last row wins
+    active = with_owner.unique(keys, keep="last", maintain_order=True)
+
+    # Existing links, only for housings present in the source
+    existing = existing_housing_owners.join(
+        housings, on="housing_id", how="inner", maintain_order="left"
+    )
+    is_active = pl.col("rank").is_in(ACTIVE_OWNER_RANKS).fill_null(False)
+    existing_active = existing.filter(is_active).unique(
+        keys, keep="last", maintain_order=True
+    )
+    existing_inactive = existing.filter(~is_active).unique(
+        keys, keep="last", maintain_order=True
+    )
+
+    # Compute diffs
+    added = active.join(existing_active, on=keys, how="anti", maintain_order="left")
+    removed = existing_active.join(active, on=keys, how="anti", maintain_order="left")
+    rank_changed = active.join(
+        existing_active.select(*keys, pl.col("rank").alias("rank_existing")),
+        on=keys,
+        how="inner",
+        maintain_order="left",
+    ).filter(pl.col("rank").ne_missing(pl.col("rank_existing")))
+    # Preserve inactive owners not in new active set
+    preserved = existing_inactive.join(
+        active, on=keys, how="anti", maintain_order="left"
+    )
+
+    def existing_column(frame: pl.DataFrame, column: str) -> pl.Expr:
+        return optional_column(frame, column, schema[column])
+
+    def existing_link(frame: pl.DataFrame, rank: pl.Expr, end_date: pl.Expr) -> pl.DataFrame:
+        return frame.select(
+            pl.col("owner_id"),
+            pl.col("housing_id"),
+            pl.col("housing_geo_code"),
+            rank.alias("rank"),
+            existing_column(frame, "start_date"),
+            end_date.alias("end_date"),
+            # origin .. locprop_distance_ban, when the existing frame has them
+            *(existing_column(frame, column) for column in list(schema)[6:]),
+        ).cast(schema)
+
+    active_rows = active.select(
+        pl.col("owner_id"),
+        pl.col("housing_id"),
+        pl.col("housing_geo_code"),
+        pl.col("rank"),
+        pl.lit(today).alias("start_date"),
+        pl.lit(None, dtype=pl.Date).alias("end_date"),
+        pl.lit(None, dtype=pl.Utf8).alias("origin"),
+        optional_column(active, "idprocpte", pl.Utf8),
+        optional_column(active, "idprodroit", pl.Utf8),
+        optional_column(active, "locprop_source", pl.Utf8).cast(pl.Utf8),
+        optional_column(active, "property_right", pl.Utf8).cast(pl.Utf8),
+        pl.lit(None, dtype=pl.Utf8).alias("locprop_relative_ban"),
+        pl.lit(None, dtype=pl.Float64).alias("locprop_distance_ban"),
+    ).cast(schema)
+    archived_rows = existing_link(
+        removed, pl.lit(PREVIOUS_OWNER_RANK), pl.lit(today)
+    )
+    preserved_rows = existing_link(preserved, pl.col("rank"), pl.col("end_date"))
+
+    ho_rows_df = pl.concat([active_rows, archived_rows, preserved_rows])
+
+    # Owner names; owners missing from existing_owners are named ""
+    owner_names = existing_owners.select(
+        pl.col("id").alias("owner_id"),
+        pl.col("full_name").alias("_name"),
+        pl.lit(True).alias("_known"),
+    ).unique("owner_id", keep="last", maintain_order=True)
+
+    def owner_event(
+        frame: pl.DataFrame,
+        event_type: str,
+        next_old_rank: str | None,
+        next_new_rank: str | None,
+    ) -> pl.DataFrame:
+        ranks = [rank for rank in (next_old_rank, next_new_rank) if rank]
+        named = (
+            frame.select(*keys, "housing_geo_code", *ranks)
+            .join(owner_names, on="owner_id", how="left", maintain_order="left")
+            .with_columns(
+                pl.when(pl.col("_known"))
+                .then(pl.col("_name"))
+                .otherwise(pl.lit(""))
+                .alias("_name")
+            )
+        )
+        named = named.with_columns(json_quote(named["_name"]))
+
+        def payload(rank: str | None) -> pl.Expr:
+            # Same text as json.dumps({"name": name, "rank": rank})
+            if rank is None:
+                return pl.lit(None, dtype=pl.Utf8)
+            return pl.concat_str([
+                pl.lit('{"name": '),
+                pl.col("_name"),
+                pl.lit(', "rank": '),
+                pl.col(rank).cast(pl.Utf8).fill_null("null"),
+                pl.lit("}"),
+            ])
+
+        return named.select(
+            lovac_uuid5(
+                pl.concat_str([
+                    pl.col("housing_id"),
+                    pl.lit(f":{event_type}:"),
+                    pl.col("owner_id"),
+                    pl.lit(f":{year}"),
+                ])
+            ).alias("id"),
+            pl.lit(event_type).alias("type"),
+            payload(next_old_rank).alias("next_old"),
+            payload(next_new_rank).alias("next_new"),
+            pl.lit(admin_user_id).alias("created_by"),
+            pl.lit(now).cast(pl.Datetime).alias("created_at"),
+            *keys,
+            "housing_geo_code",
         )
-        existing_active: dict[str, dict] = {}
-        existing_inactive: dict[str, dict] = {}
-        for row in existing_for_housing.iter_rows(named=True):
-            owner_id = row["owner_id"]
-            if row["rank"] in ACTIVE_OWNER_RANKS:
-                existing_active[owner_id] = row
-            else:
-                existing_inactive[owner_id] = row
-
-        # Compute diffs
-        added_ids = set(active_owners.keys()) - set(existing_active.keys())
-        removed_ids = set(existing_active.keys()) - set(active_owners.keys())
-        common_ids = set(active_owners.keys()) & set(existing_active.keys())
-        rank_changed_ids = {
-            owner_id for owner_id in common_ids
-            if active_owners[owner_id]["rank"] != existing_active[owner_id]["rank"]
-        }
-
-        # Add active owners
-        for owner_id, ho_row in active_owners.items():
-            all_ho_rows.append(ho_row)
-
-        # Archive removed active owners
-        for owner_id in removed_ids:
-            existing_row = existing_active[owner_id]
-            all_ho_rows.append({
-                "owner_id": owner_id,
-                "housing_id": housing_id,
-                "housing_geo_code": housing_geo_code,
-                "rank": PREVIOUS_OWNER_RANK,
-                "start_date": existing_row.get("start_date"),
-                "end_date": today,
-                "origin": existing_row.get("origin"),
-                "idprocpte": existing_row.get("idprocpte"),
-                "idprodroit": existing_row.get("idprodroit"),
-                "locprop_source": existing_row.get("locprop_source"),
-                "property_right": existing_row.get("property_right"),
-                "locprop_relative_ban": existing_row.get("locprop_relative_ban"),
-                "locprop_distance_ban": existing_row.get("locprop_distance_ban"),
-            })
-
-        # Preserve inactive owners not in new active set
-        for owner_id, existing_row in existing_inactive.items():
-            if owner_id not in active_owners:
-                all_ho_rows.append({
-                    "owner_id": owner_id,
-                    "housing_id": housing_id,
-                    "housing_geo_code": housing_geo_code,
-                    "rank": existing_row["rank"],
-                    "start_date": existing_row.get("start_date"),
-                    "end_date": existing_row.get("end_date"),
-                    "origin": existing_row.get("origin"),
-                    "idprocpte": existing_row.get("idprocpte"),
-                    "idprodroit": existing_row.get("idprodroit"),
-                    "locprop_source": existing_row.get("locprop_source"),
-                    "property_right": existing_row.get("property_right"),
-                    "locprop_relative_ban": existing_row.get("locprop_relative_ban"),
-                    "locprop_distance_ban": existing_row.get("locprop_distance_ban"),
-                })
-
-        # Generate events
-        for owner_id in added_ids:
-            event_id = str(uuid.uuid5(
-                LOVAC_NAMESPACE,
-                f"{housing_id}:housing:owner-attached:{owner_id}:{year}",
-            ))
-            name = owner_names.get(owner_id, "")
-            rank = active_owners[owner_id]["rank"]
-            all_events.append({
-                "id": event_id,
-                "type": "housing:owner-attached",
-                "next_old": None,
-                "next_new": json.dumps({"name": name, "rank": rank}),
-                "created_by": admin_user_id,
-                "created_at": now,
-            })
-            all_ho_events.append({
-                "event_id": event_id,
-                "housing_geo_code": housing_geo_code,
-                "housing_id": housing_id,
-                "owner_id": owner_id,
-            })
-
-        for owner_id in removed_ids:
-            event_id = str(uuid.uuid5(
-                LOVAC_NAMESPACE,
-                f"{housing_id}:housing:owner-detached:{owner_id}:{year}",
-            ))
-            name = owner_names.get(owner_id, "")
-            rank = existing_active[owner_id]["rank"]
-            all_events.append({
-                "id": event_id,
-                "type": "housing:owner-detached",
-                "next_old": json.dumps({"name": name, "rank": rank}),
-                "next_new": None,
-                "created_by": admin_user_id,
-                "created_at": now,
-            })
-            all_ho_events.append({
-                "event_id": event_id,
-                "housing_geo_code": housing_geo_code,
-                "housing_id": housing_id,
-                "owner_id": owner_id,
-            })
-
-        for owner_id in rank_changed_ids:
-            event_id = str(uuid.uuid5(
-                LOVAC_NAMESPACE,
-                f"{housing_id}:housing:owner-updated:{owner_id}:{year}",
-            ))
-            name = owner_names.get(owner_id, "")
-            old_rank = existing_active[owner_id]["rank"]
-            new_rank = active_owners[owner_id]["rank"]
-            all_events.append({
-                "id": event_id,
-                "type": "housing:owner-updated",
-                "next_old": json.dumps({"name": name, "rank": old_rank}),
-                "next_new": json.dumps({"name": name, "rank": new_rank}),
-                "created_by": admin_user_id,
-                "created_at": now,
-            })
-            all_ho_events.append({
-                "event_id": event_id,
-                "housing_geo_code": housing_geo_code,
-                "housing_id": housing_id,
-                "owner_id": owner_id,
-            })
-
-    ho_rows_df = pl.DataFrame(all_ho_rows, schema=_housing_owner_row_schema()) if all_ho_rows else pl.DataFrame(schema=_housing_owner_row_schema())
-    events_df = pl.DataFrame(all_events, schema=_events_schema()) if all_events else pl.DataFrame(schema=_events_schema())
-    ho_events_df = pl.DataFrame(all_ho_events, schema=_housing_owner_events_schema()) if all_ho_events else pl.DataFrame(schema=_housing_owner_events_schema())
+
+    # Generate events
+    events = pl.concat([
+        owner_event(added, "housing:owner-attached", None, "rank"),
+        owner_event(removed, "housing:owner-detached", "rank", None),
+        owner_event(rank_changed, "housing:owner-updated", "rank_existing", "rank"),
+    ], how="vertical_relaxed")
+
+    events_df = events.select(
+        pl.col(column).cast(dtype) for column, dtype in _events_schema().items()
+    )
+    ho_events_df = events.select(
+        pl.col("id").alias("event_id"),
+        "housing_geo_code",
+        "housing_id",
+        "owner_id",
+    ).cast(_housing_owner_events_schema())
 
     return ho_rows_df, events_df, ho_events_df
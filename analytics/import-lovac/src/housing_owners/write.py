@@ -1,13 +1,7 @@
 import polars as pl
-import psycopg
 
-
-def _copy_dataframe(cursor, dataframe: pl.DataFrame, table: str) -> None:
-    """COPY a Polars DataFrame into a table via psycopg's COPY protocol."""
-    columns = ", ".join(dataframe.columns)
-    with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
-        for row in dataframe.iter_rows():
-            copy.write_row(row)
+from src.connections import connect
+from src.pg_copy import copy_frame
 
 
 def write_housing_owners(
@@ -31,7 +25,7 @@ def write_housing_owners(
     links_written = 0
     events_inserted = 0
 
-    with psycopg.connect(connection_string) as connection:
+    with connect(connection_string) as connection:
         if housing_owner_rows.height > 0:
             housing_ids = housing_owner_rows["housing_id"].unique().to_list()
 
@@ -43,7 +37,7 @@ def write_housing_owners(
                 cursor.execute(
                     "CREATE TEMP TABLE stg_housing_owners (LIKE owners_housing INCLUDING DEFAULTS) ON COMMIT DROP"
                 )
-                _copy_dataframe(cursor, housing_owner_rows, "stg_housing_owners")
+                copy_frame(cursor, housing_owner_rows, "stg_housing_owners")
                 cursor.execute("""
                     INSERT INTO owners_housing
                     SELECT * FROM stg_housing_owners
@@ -56,7 +50,7 @@ def write_housing_owners(
                 cursor.execute(
                     "CREATE TEMP TABLE stg_ho_events (LIKE events INCLUDING DEFAULTS)"
                 )
-                _copy_dataframe(cursor, events, "stg_ho_events")
+                copy_frame(cursor, events, "stg_ho_events")
                 cursor.execute("""
                     INSERT INTO events
                     SELECT * FROM stg_ho_events
@@ -68,7 +62,7 @@ def write_housing_owners(
                 cursor.execute(
                     "CREATE TEMP TABLE stg_ho_join_events (LIKE housing_owner_events INCLUDING DEFAULTS)"
                 )
-                _copy_dataframe(cursor, housing_owner_events, "stg_ho_join_events")
+                copy_frame(cursor, housing_owner_events, "stg_ho_join_events")
                 cursor.execute("""
                     INSERT INTO housing_owner_events
                     SELECT * FROM stg_ho_join_events
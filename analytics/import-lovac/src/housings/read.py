@@ -1,5 +1,7 @@
 import polars as pl
 
+from src.pg_read import read_database
+
 
 def read_source_housings(path: str, department: str) -> pl.LazyFrame:
     """Read LOVAC housing parquet files for a single department."""
@@ -9,15 +11,27 @@ def read_source_housings(path: str, department: str) -> pl.LazyFrame:
     ).filter(pl.col("dept") == department)
 
 
+def count_source_housings_by_department(path: str) -> dict[str, int]:
+    """Number of source housings per department (hive ``dept`` key)."""
+    counts = (
+        pl.scan_parquet(f"{path}/**/*.parquet", hive_partitioning=True)
+        .group_by("dept")
+        .len()
+        .collect()
+    )
+    return dict(zip(counts["dept"], counts["len"]))
+
+
 def read_existing_housings(connection_string: str, department: str) -> pl.DataFrame:
     """Read existing housings for a department from PostgreSQL."""
-    return pl.read_database_uri(
-        f"""
-        SELECT id, local_id, geo_code, occupancy, status, sub_status, data_file_years
+    return read_database(
+        """
+        SELECT id::text, local_id, geo_code, occupancy, status, sub_status, data_file_years
         FROM fast_housing
-        WHERE geo_code LIKE '{department}%'
+        WHERE geo_code LIKE $1 || '%'
         """,
         connection_string,
+        [department],
     )
 
 
@@ -32,24 +46,25 @@ def read_existing_housing_events(
             "created_by": pl.Utf8,
             "created_at": pl.Datetime,
         })
-    ids_literal = ", ".join(f"'{id}'" for id in housing_ids)
-    return pl.read_database_uri(
-        f"""
-        SELECT he.housing_id, e.type, e.created_by, e.created_at
+    return read_database(
+        """
+        SELECT he.housing_id::text, e.type, e.created_by::text, e.created_at
         FROM housing_events he
         JOIN events e ON e.id = he.event_id
-        WHERE he.housing_id IN ({ids_literal})
+        WHERE he.housing_id = ANY($1::uuid[])
           AND e.type IN ('housing:occupancy-updated', 'housing:status-updated')
         """,
         connection_string,
+        [housing_ids],
     )
 
 
 def read_admin_user_id(connection_string: str, email: str) -> str:
     """Look up the admin user id by email."""
-    result = pl.read_database_uri(
-        f"SELECT id FROM users WHERE email = '{email}' LIMIT 1",
+    result = read_database(
+        "SELECT id::text FROM users WHERE email = $1 LIMIT 1",
         connection_string,
+        [email],
     )
     if result.height == 0:
         raise ValueError(f"No user found with email: {email}")
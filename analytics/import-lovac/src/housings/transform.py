@@ -1,10 +1,13 @@
 import json
-import uuid
 from datetime import datetime, timezone
 
 import polars as pl
 
-from src.constants import LOVAC_NAMESPACE, OCCUPANCY_LABELS, HOUSING_STATUS_LABELS
+from src.columns import encode_json, optional_column
+from src.constants import OCCUPANCY_LABELS, HOUSING_STATUS_LABELS
+from src.identifiers import lovac_uuid5
+
+RELEVANT_EVENT_TYPES = ["housing:occupancy-updated", "housing:status-updated"]
 
 
 def _housing_schema() -> dict:
@@ -111,110 +114,152 @@ def transform_housings(
     return to_create, to_update, events, housing_events
 
 
+def _housing_columns(
+    frame: pl.DataFrame,
+    *,
+    data_file_years: pl.Expr,
+    mutation_date: pl.Expr,
+    occupancy: pl.Expr,
+    status: pl.Expr,
+    sub_status: pl.Expr,
+) -> list[pl.Expr]:
+    """Project source columns onto the housing schema, in schema order."""
+    schema = _housing_schema()
+
+    def null(column: str) -> pl.Expr:
+        return pl.lit(None, dtype=schema[column]).alias(column)
+
+    def optional(column: str) -> pl.Expr:
+        return optional_column(frame, column, schema[column])
+
+    building_year = optional("building_year")
+
+    return [
+        pl.col("id"),
+        pl.col("invariant"),
+        pl.col("local_id"),
+        optional("building_id"),
+        null("building_group_id"),
+        pl.concat_list(pl.col("dgfip_address")).alias("address_dgfip"),
+        pl.col("geo_code"),
+        optional("longitude_dgfip"),
+        optional("latitude_dgfip"),
+        optional("cadastral_classification"),
+        null("cadastral_reference"),
+        optional("uncomfortable"),
+        optional("vacancy_start_year"),
+        optional("housing_kind"),
+        optional("rooms_count"),
+        optional("living_area").cast(pl.Int64),
+        pl.when(building_year == 0)
+        .then(None)
+        .otherwise(building_year)
+        .alias("building_year"),
+        mutation_date.alias("mutation_date"),
+        optional("taxed"),
+        optional("rental_value"),
+        null("beneficiary_count"),
+        optional("building_location"),
+        optional("condominium"),
+        optional("plot_id"),
+        occupancy.alias("occupancy"),
+        pl.lit("V").alias("occupancy_source"),
+        null("occupancy_intended"),
+        status.alias("status"),
+        sub_status.alias("sub_status"),
+        data_file_years.alias("data_file_years"),
+        pl.lit([2024], dtype=pl.List(pl.Int64)).alias("data_years"),
+        pl.lit("lovac").alias("data_source"),
+        null("actual_dpe"),
+        null("energy_consumption_bdnb"),
+        null("energy_consumption_at_bdnb"),
+        null("geolocation"),
+        optional("geolocation_source"),
+        optional("plot_area"),
+        optional("last_mutation_date"),
+        optional("last_transaction_date"),
+        optional("last_transaction_value"),
+        optional("occupancy_history"),
+        optional("last_mutation_type"),
+        optional("dept"),
+    ]
+
+
+def _event_id(housing_id: pl.Expr, event_type: str, year: str) -> pl.Expr:
+    return lovac_uuid5(pl.concat_str([housing_id, pl.lit(f":{event_type}:{year}")]))
+
+
+def _event_frames(events: pl.DataFrame) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Split rows carrying event + housing columns into the two output tables."""
+    events_df = events.select(
+        pl.col(column).cast(dtype) for column, dtype in _events_schema().items()
+    )
+    housing_events_df = events.select(
+        pl.col("id").alias("event_id"),
+        pl.col("geo_code").alias("housing_geo_code"),
+        pl.col("housing_id"),
+    ).cast(_housing_events_schema())
+    return events_df, housing_events_df
+
+
 def _build_creates(
     unmatched: pl.DataFrame,
     year: str,
     admin_user_id: str,
 ) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
     """Build create rows, housing:created events, and housing_events join records."""
-    rows = []
-    events = []
-    housing_events = []
     now = datetime.now(timezone.utc)
 
-    for row in unmatched.iter_rows(named=True):
-        housing_id = str(
-            uuid.uuid5(LOVAC_NAMESPACE, f"{row['local_id']}:{row['geo_code']}")
-        )
-        event_id = str(
-            uuid.uuid5(LOVAC_NAMESPACE, f"{housing_id}:housing:created:{year}")
-        )
-        building_year = row.get("building_year")
-        if building_year == 0:
-            building_year = None
-        living_area = row.get("living_area")
-        if living_area is not None:
-            living_area = int(living_area)
-
-        rows.append(
-            {
-                "id": housing_id,
-                "invariant": row["invariant"],
-                "local_id": row["local_id"],
-                "building_id": row.get("building_id"),
-                "building_group_id": None,
-                "address_dgfip": [row["dgfip_address"]],
-                "geo_code": row["geo_code"],
-                "longitude_dgfip": row.get("longitude_dgfip"),
-                "latitude_dgfip": row.get("latitude_dgfip"),
-                "cadastral_classification": row.get("cadastral_classification"),
-                "cadastral_reference": None,
-                "uncomfortable": row.get("uncomfortable"),
-                "vacancy_start_year": row.get("vacancy_start_year"),
-                "housing_kind": row.get("housing_kind"),
-                "rooms_count": row.get("rooms_count"),
-                "living_area": living_area,
-                "building_year": building_year,
-                "mutation_date": None,
-                "taxed": row.get("taxed"),
-                "rental_value": row.get("rental_value"),
-                "beneficiary_count": None,
-                "building_location": row.get("building_location"),
-                "condominium": row.get("condominium"),
-                "plot_id": row.get("plot_id"),
-                "occupancy": "V",
-                "occupancy_source": "V",
-                "occupancy_intended": None,
-                "status": 0,
-                "sub_status": None,
-                "data_file_years": [year],
-                "data_years": [2024],
-                "data_source": "lovac",
-                "actual_dpe": None,
-                "energy_consumption_bdnb": None,
-                "energy_consumption_at_bdnb": None,
-                "geolocation": None,
-                "geolocation_source": row.get("geolocation_source"),
-                "plot_area": row.get("plot_area"),
-                "last_mutation_date": row.get("last_mutation_date"),
-                "last_transaction_date": row.get("last_transaction_date"),
-                "last_transaction_value": row.get("last_transaction_value"),
-                "occupancy_history": row.get("occupancy_history"),
-                "last_mutation_type": row.get("last_mutation_type"),
-                "dept": row.get("dept"),
-            }
-        )
-
-        events.append(
-            {
-                "id": event_id,
-                "type": "housing:created",
-                "next_old": None,
-                "next_new": json.dumps({"source": year, "occupancy": "Vacant"}),
-                "created_by": admin_user_id,
-                "created_at": now,
-            }
-        )
-
-        housing_events.append(
-            {
-                "event_id": event_id,
-                "housing_geo_code": row["geo_code"],
-                "housing_id": housing_id,
-            }
-        )
+    with_ids = unmatched.with_columns(
+        lovac_uuid5(
+            pl.concat_str([pl.col("local_id"), pl.lit(":"), pl.col("geo_code")])
+        ).alias("id")
+    )
 
-    events_df = pl.DataFrame(events, schema=_events_schema())
-    housing_events_df = pl.DataFrame(housing_events, schema=_housing_events_schema())
+    events = with_ids.select(
+        _event_id(pl.col("id"), "housing:created", year).alias("id"),
+        pl.lit("housing:created").alias("type"),
+        pl.lit(None, dtype=pl.Utf8).alias("next_old"),
+        pl.lit(json.dumps({"source": year, "occupancy": "Vacant"})).alias("next_new"),
+        pl.lit(admin_user_id).alias("created_by"),
+        pl.lit(now).cast(pl.Datetime).alias("created_at"),
+        pl.col("geo_code"),
+        pl.col("id").alias("housing_id"),
+    )
+    events_df, housing_events_df = _event_frames(events)
 
-    if not rows:
+    if with_ids.height == 0:
         creates_df = pl.DataFrame(schema=_housing_schema())
     else:
-        creates_df = pl.DataFrame(rows)
+        creates_df = with_ids.select(
+            _housing_columns(
+                with_ids,
+                data_file_years=pl.lit([year], dtype=pl.List(pl.Utf8)),
+                mutation_date=pl.lit(None, dtype=pl.Date),
+                occupancy=pl.lit("V"),
+                status=pl.lit(0, dtype=pl.Int64),
+                sub_status=pl.lit(None, dtype=pl.Utf8),
+            )
+        )
 
     return creates_df, events_df, housing_events_df
 
 
+def _last_relevant_events(existing_events: pl.DataFrame) -> pl.DataFrame:
+    """One row per housing: its relevant event count and latest author."""
+    return (
+        existing_events.filter(pl.col("type").is_in(RELEVANT_EVENT_TYPES))
+        .group_by("housing_id")
+        .agg(
+            pl.len().alias("_relevant_events"),
+            pl.col("created_by")
+            .sort_by("created_at", descending=True, maintain_order=True)
+            .first()
+            .alias("_last_event_by"),
+        )
+    )
+
+
 def _build_updates(
     matched: pl.DataFrame,
     existing_events: pl.DataFrame,
@@ -222,183 +267,120 @@ def _build_updates(
     admin_user_id: str,
 ) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
     """Build update rows and change events."""
-    rows = []
-    events = []
-    housing_events = []
     now = datetime.now(timezone.utc)
 
-    for row in matched.iter_rows(named=True):
-        housing_id = row["id"]
-        existing_occupancy = row["occupancy"]
-        existing_status = row["status"]
-        existing_sub_status = row["sub_status"]
+    # Reset to vacant unless already vacant or the last relevant event was
+    # made by a real user (see _last_relevant_events).
+    reset = pl.col("occupancy").ne_missing("V") & (
+        pl.col("_relevant_events").is_null()
+        | (pl.col("_last_event_by") == admin_user_id).fill_null(False)
+    )
 
-        # Merge data_file_years: existing column gets _existing suffix
-        # because source also has data_file_years
-        existing_years = row.get("data_file_years_existing") or []
-        merged_years = sorted(set(existing_years) | {year})
+    # Merge data_file_years: existing column gets _existing suffix
+    # because source also has data_file_years
+    existing_years = optional_column(matched, "data_file_years_existing", pl.List(pl.Utf8))
+    merged_years = (
+        pl.concat_list([existing_years.fill_null([]), pl.lit([year])])
+        .list.unique()
+        .list.sort()
+    )
 
-        # Determine occupancy/status changes
-        housing_events_subset = existing_events.filter(
-            pl.col("housing_id") == housing_id
+    patched = (
+        matched.with_row_index("_row")
+        .join(
+            _last_relevant_events(existing_events),
+            left_on="id",
+            right_on="housing_id",
+            how="left",
+            maintain_order="left",
         )
-        patch = _apply_changes(
-            housing_events_subset, existing_occupancy, admin_user_id
+        .with_columns(
+            pl.when(reset).then(pl.lit("V")).otherwise(pl.col("occupancy"))
+            .alias("_occupancy"),
+            pl.when(reset).then(pl.lit(0)).otherwise(pl.col("status"))
+            .alias("_status"),
+            pl.when(reset).then(None).otherwise(pl.col("sub_status"))
+            .alias("_sub_status"),
         )
+    )
 
-        occupancy = patch.get("occupancy", existing_occupancy)
-        status = patch.get("status", existing_status)
-        sub_status = patch.get("sub_status", existing_sub_status)
-
-        building_year = row.get("building_year")
-        if building_year == 0:
-            building_year = None
-        living_area = row.get("living_area")
-        if living_area is not None:
-            living_area = int(living_area)
-
-        rows.append(
-            {
-                "id": housing_id,
-                "invariant": row["invariant"],
-                "local_id": row["local_id"],
-                "building_id": row.get("building_id"),
-                "building_group_id": None,
-                "address_dgfip": [row["dgfip_address"]],
-                "geo_code": row["geo_code"],
-                "longitude_dgfip": row.get("longitude_dgfip"),
-                "latitude_dgfip": row.get("latitude_dgfip"),
-                "cadastral_classification": row.get("cadastral_classification"),
-                "cadastral_reference": None,
-                "uncomfortable": row.get("uncomfortable"),
-                "vacancy_start_year": row.get("vacancy_start_year"),
-                "housing_kind": row.get("housing_kind"),
-                "rooms_count": row.get("rooms_count"),
-                "living_area": living_area,
-                "building_year": building_year,
-                "mutation_date": row.get("mutation_date"),
-                "taxed": row.get("taxed"),
-                "rental_value": row.get("rental_value"),
-                "beneficiary_count": None,
-                "building_location": row.get("building_location"),
-                "condominium": row.get("condominium"),
-                "plot_id": row.get("plot_id"),
-                "occupancy": occupancy,
-                "occupancy_source": "V",
-                "occupancy_intended": None,
-                "status": status,
-                "sub_status": sub_status,
-                "data_file_years": merged_years,
-                "data_years": [2024],
-                "data_source": "lovac",
-                "actual_dpe": None,
-                "energy_consumption_bdnb": None,
-                "energy_consumption_at_bdnb": None,
-                "geolocation": None,
-                "geolocation_source": row.get("geolocation_source"),
-                "plot_area": row.get("plot_area"),
-                "last_mutation_date": row.get("last_mutation_date"),
-                "last_transaction_date": row.get("last_transaction_date"),
-                "last_transaction_value": row.get("last_transaction_value"),
-                "occupancy_history": row.get("occupancy_history"),
-                "last_mutation_type": row.get("last_mutation_type"),
-                "dept": row.get("dept"),
-            }
-        )
-
-        # Generate events only when values actually change
-        if occupancy != existing_occupancy:
-            event_id = str(
-                uuid.uuid5(
-                    LOVAC_NAMESPACE,
-                    f"{housing_id}:housing:occupancy-updated:{year}",
-                )
-            )
-            events.append(
-                {
-                    "id": event_id,
-                    "type": "housing:occupancy-updated",
-                    "next_old": json.dumps({"occupancy": OCCUPANCY_LABELS.get(str(existing_occupancy), str(existing_occupancy))}),
-                    "next_new": json.dumps({"occupancy": OCCUPANCY_LABELS.get(str(occupancy), str(occupancy))}),
-                    "created_by": admin_user_id,
-                    "created_at": now,
-                }
-            )
-            housing_events.append(
-                {
-                    "event_id": event_id,
-                    "housing_geo_code": row["geo_code"],
-                    "housing_id": housing_id,
-                }
-            )
-
-        if status != existing_status:
-            event_id = str(
-                uuid.uuid5(
-                    LOVAC_NAMESPACE,
-                    f"{housing_id}:housing:status-updated:{year}",
-                )
-            )
-            events.append(
-                {
-                    "id": event_id,
-                    "type": "housing:status-updated",
-                    "next_old": json.dumps({"status": HOUSING_STATUS_LABELS.get(existing_status, str(existing_status)), "subStatus": existing_sub_status}),
-                    "next_new": json.dumps({"status": HOUSING_STATUS_LABELS.get(status, str(status)), "subStatus": sub_status}),
-                    "created_by": admin_user_id,
-                    "created_at": now,
-                }
-            )
-            housing_events.append(
-                {
-                    "event_id": event_id,
-                    "housing_geo_code": row["geo_code"],
-                    "housing_id": housing_id,
-                }
-            )
-
-    events_df = pl.DataFrame(events, schema=_events_schema())
-    housing_events_df = pl.DataFrame(housing_events, schema=_housing_events_schema())
-
-    if not rows:
+    if patched.height == 0:
         updates_df = pl.DataFrame(schema=_housing_schema())
     else:
-        updates_df = pl.DataFrame(rows)
-
-    return updates_df, events_df, housing_events_df
-
-
-def _apply_changes(
-    events: pl.DataFrame,
-    existing_occupancy: str,
-    admin_user_id: str,
-) -> dict:
-    """Decide whether to reset a housing to vacant based on event history.
-
-    Returns a patch dict: empty means no change, otherwise contains
-    occupancy/status/sub_status overrides.
-    """
-    # Already vacant — nothing to do
-    if existing_occupancy == "V":
-        return {}
-
-    # Filter to relevant event types
-    relevant = events.filter(
-        pl.col("type").is_in(
-            ["housing:occupancy-updated", "housing:status-updated"]
+        updates_df = patched.select(
+            _housing_columns(
+                patched,
+                data_file_years=merged_years,
+                mutation_date=optional_column(patched, "mutation_date", pl.Date),
+                occupancy=pl.col("_occupancy"),
+                status=pl.col("_status"),
+                sub_status=pl.col("_sub_status"),
+            )
         )
-    )
 
-    # No relevant events — reset to vacant
-    if relevant.height == 0:
-        return {"occupancy": "V", "status": 0, "sub_status": None}
+    # Generate events only when values actually change
+    event_columns = [
+        pl.lit(admin_user_id).alias("created_by"),
+        pl.lit(now).cast(pl.Datetime).alias("created_at"),
+        pl.col("geo_code"),
+        pl.col("id").alias("housing_id"),
+        pl.col("_row"),
+    ]
+
+    occupancy_changed = patched.filter(
+        pl.col("_occupancy").ne_missing(pl.col("occupancy"))
+    )
+    occupancy_changed = encode_json(
+        occupancy_changed,
+        ["occupancy"],
+        lambda occupancy: {"occupancy": OCCUPANCY_LABELS.get(str(occupancy), str(occupancy))},
+        "next_old",
+    )
+    occupancy_changed = encode_json(
+        occupancy_changed,
+        ["_occupancy"],
+        lambda occupancy: {"occupancy": OCCUPANCY_LABELS.get(str(occupancy), str(occupancy))},
+        "next_new",
+    )
+    occupancy_events = occupancy_changed.select(
+        _event_id(pl.col("id"), "housing:occupancy-updated", year).alias("id"),
+        pl.lit("housing:occupancy-updated").alias("type"),
+        pl.col("next_old"),
+        pl.col("next_new"),
+        *event_columns,
+    )
 
-    # Sort by created_at descending, take the last event
-    last_event = relevant.sort("created_at", descending=True).row(0, named=True)
+    status_changed = patched.filter(pl.col("_status").ne_missing(pl.col("status")))
+    status_changed = encode_json(
+        status_changed,
+        ["status", "sub_status"],
+        lambda status, sub_status: {
+            "status": HOUSING_STATUS_LABELS.get(status, str(status)),
+            "subStatus": sub_status,
+        },
+        "next_old",
+    )
+    status_changed = encode_json(
+        status_changed,
+        ["_status", "_sub_status"],
+        lambda status, sub_status: {
+            "status": HOUSING_STATUS_LABELS.get(status, str(status)),
+            "subStatus": sub_status,
+        },
+        "next_new",
+    )
+    status_events = status_changed.select(
+        _event_id(pl.col("id"), "housing:status-updated", year).alias("id"),
+        pl.lit("housing:status-updated").alias("type"),
+        pl.col("next_old"),
+        pl.col("next_new"),
+        *event_columns,
+    )
 
-    # If last event was by admin — reset to vacant
-    if last_event["created_by"] == admin_user_id:
-        return {"occupancy": "V", "status": 0, "sub_status": None}
+    # Keep the per-housing ordering: occupancy event, then status event
+    events = pl.concat([occupancy_events, status_events], how="vertical_relaxed").sort(
+        "_row", maintain_order=True
+    )
+    events_df, housing_events_df = _event_frames(events)
 
-    # Last event was by a real user — preserve current values
-    return {}
+    return updates_df, events_df, housing_events_df
@@ -1,5 +1,8 @@
 import polars as pl
-import psycopg
+
+from src.buildings.write import record_touched_buildings
+from src.connections import connect, fast_housing_writer
+from src.pg_copy import copy_frame
 
 
 BATCH_SIZE = 10_000
@@ -35,14 +38,6 @@ UPDATE_COLUMNS = [
 ]
 
 
-def _copy_dataframe(cursor, dataframe: pl.DataFrame, table: str) -> None:
-    """COPY a Polars DataFrame into a table via psycopg's COPY protocol."""
-    columns = ", ".join(dataframe.columns)
-    with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
-        for row in dataframe.iter_rows():
-            copy.write_row(row)
-
-
 def write_housings(
     to_create: pl.DataFrame,
     to_update: pl.DataFrame,
@@ -50,22 +45,26 @@ def write_housings(
     housing_events: pl.DataFrame,
     connection_string: str,
     dry_run: bool = False,
-) -> tuple[int, int, int]:
+) -> tuple[int, int, int, int]:
     """Write housings and events to PostgreSQL.
 
-    Returns (created_count, updated_count, events_count).
+    Housings of to_update whose UPDATE_COLUMNS already hold the same values
+    in fast_housing are skipped.
+
+    Returns (created_count, updated_count, events_count, unchanged_count).
     """
     if dry_run:
         to_create.write_ndjson("dry-run-housings-create.jsonl")
         to_update.write_ndjson("dry-run-housings-update.jsonl")
         events.write_ndjson("dry-run-housings-events.jsonl")
-        return to_create.height, to_update.height, events.height
+        return to_create.height, to_update.height, events.height, 0
 
     created = 0
     updated = 0
+    unchanged = 0
     events_inserted = 0
 
-    with psycopg.connect(connection_string) as connection:
+    with fast_housing_writer(), connect(connection_string) as connection:
         # Insert new housings
         if to_create.height > 0:
             create_subset = to_create.select(HOUSING_COLUMNS)
@@ -73,7 +72,7 @@ def write_housings(
                 cursor.execute(
                     "CREATE TEMP TABLE stg_housings_create (LIKE fast_housing INCLUDING DEFAULTS) ON COMMIT DROP"
                 )
-                _copy_dataframe(cursor, create_subset, "stg_housings_create")
+                copy_frame(cursor, create_subset, "stg_housings_create")
                 columns = ", ".join(HOUSING_COLUMNS)
                 cursor.execute(f"""
                     INSERT INTO fast_housing ({columns})
@@ -81,17 +80,40 @@ def write_housings(
                     ON CONFLICT (local_id, geo_code) DO NOTHING
                 """)
                 created = cursor.rowcount
+                record_touched_buildings(cursor, "SELECT building_id FROM stg_housings_create")
             connection.commit()
 
         # Update existing housings in batches
         if to_update.height > 0:
-            identifiers = to_update["id"].to_list()
             update_subset = to_update.select(["id", "geo_code"] + UPDATE_COLUMNS)
             with connection.cursor() as cursor:
                 cursor.execute(
                     "CREATE TEMP TABLE stg_housings_update (LIKE fast_housing INCLUDING DEFAULTS)"
                 )
-                _copy_dataframe(cursor, update_subset, "stg_housings_update")
+                copy_frame(cursor, update_subset, "stg_housings_update")
+                cursor.execute("CREATE INDEX ON stg_housings_update (id)")
+                cursor.execute("ANALYZE stg_housings_update")
+
+                # Change detection: drop the rows identical to the current ones
+                cursor.execute(f"""
+                    DELETE FROM stg_housings_update s
+                    USING fast_housing h
+                    WHERE h.id = s.id
+                      AND ({", ".join(f"h.{col}" for col in UPDATE_COLUMNS)})
+                          IS NOT DISTINCT FROM
+                          ({", ".join(f"s.{col}" for col in UPDATE_COLUMNS)})
+                """)
+                unchanged = cursor.rowcount
+                # Previous and new building of every updated housing
+                record_touched_buildings(cursor, """
+                    SELECT h.building_id FROM fast_housing h JOIN stg_housings_update s ON h.id = s.id
+                    UNION ALL
+                    SELECT building_id FROM stg_housings_update
+                """)
+                cursor.execute("SELECT id FROM stg_housings_update ORDER BY id")
+                identifiers = [row[0] for row in cursor.fetchall()]
+            connection.commit()
+
             set_clause = ", ".join(f"{col} = s.{col}" for col in UPDATE_COLUMNS)
             for offset in range(0, len(identifiers), BATCH_SIZE):
                 batch = identifiers[offset : offset + BATCH_SIZE]
@@ -117,7 +139,7 @@ def write_housings(
                 cursor.execute(
                     "CREATE TEMP TABLE stg_events (LIKE events INCLUDING DEFAULTS)"
                 )
-                _copy_dataframe(cursor, events, "stg_events")
+                copy_frame(cursor, events, "stg_events")
                 cursor.execute("""
                     INSERT INTO events
                     SELECT * FROM stg_events
@@ -129,7 +151,7 @@ def write_housings(
                 cursor.execute(
                     "CREATE TEMP TABLE stg_housing_events (LIKE housing_events INCLUDING DEFAULTS)"
                 )
-                _copy_dataframe(cursor, housing_events, "stg_housing_events")
+                copy_frame(cursor, housing_events, "stg_housing_events")
                 cursor.execute("""
                     INSERT INTO housing_events
                     SELECT * FROM stg_housing_events
@@ -138,4 +160,4 @@ def write_housings(
                 cursor.execute("DROP TABLE stg_housing_events")
             connection.commit()
 
-    return created, updated, events_inserted
+    return created, updated, events_inserted, unchanged
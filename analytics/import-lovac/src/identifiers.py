@@ -0,0 +1,53 @@
+import hashlib
+
+import polars as pl
+
+from src.constants import LOVAC_NAMESPACE
+
+# RFC 4122 variant bits (10xx) applied to the first hex digit of clock_seq
+_VARIANT_DIGITS = {digit: "89ab"[int(digit, 16) & 0b11] for digit in "0123456789abcdef"}
+
+_NAMESPACE_SHA1 = hashlib.sha1(LOVAC_NAMESPACE.bytes)
+
+
+def _sha1_hex(name: str | None) -> str | None:
+    if name is None:
+        return None
+    digest = _NAMESPACE_SHA1.copy()
+    digest.update(name.encode())
+    return digest.hexdigest()
+
+
+def _uuid5_batch(names: pl.Series) -> pl.Series:
+    digest = pl.Series("digest", [_sha1_hex(name) for name in names], dtype=pl.Utf8)
+    hexa = pl.col("digest")
+    return (
+        digest.to_frame()
+        .select(
+            pl.concat_str(
+                [
+                    hexa.str.slice(0, 8),
+                    pl.lit("-"),
+                    hexa.str.slice(8, 4),
+                    pl.lit("-5"),
+                    hexa.str.slice(13, 3),
+                    pl.lit("-"),
+                    hexa.str.slice(16, 1).replace_strict(_VARIANT_DIGITS),
+                    hexa.str.slice(17, 3),
+                    pl.lit("-"),
+                    hexa.str.slice(20, 12),
+                ]
+            )
+        )
+        .to_series()
+    )
+
+
+def lovac_uuid5(name: pl.Expr) -> pl.Expr:
+    """UUIDv5 of a string expression in the LOVAC namespace.
+
+    Same value as ``str(uuid.uuid5(LOVAC_NAMESPACE, name))``. Polars has no
+    SHA-1 kernel, so only the digest runs in a Python pass over the column;
+    version/variant bits and formatting are applied as string expressions.
+    """
+    return name.map_batches(_uuid5_batch, return_dtype=pl.Utf8)
@@ -1,5 +1,7 @@
 import polars as pl
 
+from src.pg_read import read_database
+
 SOURCE_OWNER_SCHEMA = {
     "owner_uid": pl.Utf8,
     "idpersonne": pl.Utf8,
@@ -47,7 +49,22 @@ def validate_source_owners(lazy_frame: pl.LazyFrame) -> pl.LazyFrame:
 
 def read_existing_owners(connection_string: str) -> pl.DataFrame:
     """Read existing owners from PostgreSQL (only columns needed for join)."""
-    return pl.read_database_uri(
-        "SELECT id, idpersonne, data_source, email, phone, administrator, additional_address FROM owners",
+    return read_database(
+        "SELECT id::text, idpersonne, data_source, email, phone, administrator, additional_address FROM owners",
+        connection_string,
+    )
+
+
+def read_existing_owners_by_idpersonne(
+    connection_string: str, idpersonnes: list[str]
+) -> pl.DataFrame:
+    """Read the existing owners (same columns as read_existing_owners) with these idpersonne."""
+    return read_database(
+        """
+        SELECT id::text, idpersonne, data_source, email, phone, administrator, additional_address
+        FROM owners
+        WHERE idpersonne = ANY($1::text[])
+        """,
         connection_string,
+        [idpersonnes],
     )
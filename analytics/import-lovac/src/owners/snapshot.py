@@ -0,0 +1,59 @@
+import os
+from pathlib import Path
+
+import polars as pl
+
+# Row groups are sorted by id, so min/max statistics let an `is_in` filter
+# skip most of the file when a department only needs a few owners.
+ROW_GROUP_SIZE = 100_000
+
+
+def snapshot_path(cache_path: str, year: str, version: str) -> str:
+    """Location of the owner snapshot for an import year and version."""
+    return str(Path(cache_path) / year / f"owners-{version}.parquet")
+
+
+def write_owner_snapshot(
+    owners: pl.DataFrame,
+    cache_path: str,
+    *,
+    year: str,
+    version: str,
+    admin_user_id: str,
+) -> str:
+    """Write the owner lookup (id, full_name) used by housing-owner partitions.
+
+    Snapshots of previous versions for the same year are removed, so a
+    re-run of `source_owners` invalidates whatever partitions read before.
+
+    Returns the snapshot path.
+    """
+    path = Path(snapshot_path(cache_path, year, version))
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    temporary = path.with_suffix(".parquet.tmp")
+    owners.select("id", "full_name").sort("id").write_parquet(
+        temporary,
+        row_group_size=ROW_GROUP_SIZE,
+        metadata={"year": year, "version": version, "admin_user_id": admin_user_id},
+    )
+    os.replace(temporary, path)
+
+    for stale in path.parent.glob("owners-*.parquet"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return str(path)
+
+
+def read_owner_snapshot_metadata(path: str) -> dict[str, str]:
+    """Key-value metadata written with the snapshot (year, version, admin_user_id)."""
+    return pl.read_parquet_metadata(path)
+
+
+def read_owner_snapshot(path: str, owner_uids: pl.Series) -> pl.DataFrame:
+    """Read the snapshot rows for the given owner ids only."""
+    return (
+        pl.scan_parquet(path)
+        .filter(pl.col("id").is_in(owner_uids.drop_nulls().unique().implode()))
+        .collect()
+    )
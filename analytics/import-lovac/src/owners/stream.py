@@ -0,0 +1,130 @@
+"""Chunked owners import with bounded memory.
+
+The validated source is sorted by idpersonne once, with the streaming
+engine, into a Parquet file whose row groups are one chunk each. Every
+chunk is then merged against the existing owners with the same
+idpersonne values only, transformed and written, and a checkpoint
+records the chunks committed. A failed run resumes after the last
+committed chunk on the next run with the same work directory, which
+still holds the sorted file, as long as the source file and the year
+are the ones the checkpoint was written for.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+
+import polars as pl
+import pyarrow.parquet as pq
+
+from src.owners.read import read_existing_owners_by_idpersonne
+from src.owners.transform import transform_owners
+from src.owners.write import write_owners
+
+CHUNK_ROWS = 100_000
+
+logger = logging.getLogger(__name__)
+
+
+def _read_checkpoint(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _source_identity(source_file: str, year: str) -> dict:
+    """What a checkpoint must match to be resumed.
+
+    Size and modification time are only known for local files.
+    """
+    identity = {"path": source_file, "size": None, "mtime": None, "year": year}
+    if os.path.exists(source_file):
+        stat = os.stat(source_file)
+        identity.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+    return identity
+
+
+def _write_checkpoint(path: Path, checkpoint: dict) -> None:
+    temporary = path.with_suffix(".tmp")
+    temporary.write_text(json.dumps(checkpoint))
+    temporary.replace(path)
+
+
+def import_owners_in_chunks(
+    source: pl.LazyFrame,
+    connection_string: str,
+    year: str,
+    work_dir: str,
+    *,
+    source_file: str,
+    chunk_rows: int = CHUNK_ROWS,
+    dry_run: bool = False,
+    log=logger,
+) -> tuple[int, int, int]:
+    """Transform and write owners chunk by chunk, in idpersonne order.
+
+    `source_file` is the file `source` reads, recorded in the checkpoint.
+    In dry run nothing is written, the transformed counts of the whole
+    source are returned, and the checkpoint of a failed run is left as is.
+
+    Returns (rows_read, created_count, updated_count).
+    """
+    directory = Path(work_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    if dry_run:
+        sorted_path = directory / "owners-sorted.dry-run.parquet"
+    else:
+        sorted_path = directory / "owners-sorted.parquet"
+    checkpoint_path = directory / "owners-checkpoint.json"
+    identity = _source_identity(source_file, year)
+
+    checkpoint = None if dry_run else _read_checkpoint(checkpoint_path)
+    if checkpoint is not None and checkpoint.get("source") != identity:
+        log.info("Discarding the owners checkpoint of another source file or year")
+        checkpoint = None
+    if checkpoint is not None and sorted_path.exists():
+        log.info(f"Resuming owners import after chunk {checkpoint['chunks']}")
+    else:
+        if not dry_run:
+            checkpoint_path.unlink(missing_ok=True)
+        log.info(f"Sorting source owners by idpersonne into {sorted_path}...")
+        source.sort("idpersonne").sink_parquet(sorted_path, row_group_size=chunk_rows)
+        checkpoint = {
+            "source": identity, "chunks": 0, "rows": 0, "created": 0, "updated": 0,
+        }
+
+    parquet = pq.ParquetFile(sorted_path)
+    chunks = parquet.metadata.num_row_groups
+
+    # A duplicated idpersonne may span two chunks: the second one then finds
+    # the owner created by the first and updates it.
+    for index in range(checkpoint["chunks"], chunks):
+        chunk = pl.DataFrame(parquet.read_row_group(index))
+        existing = read_existing_owners_by_idpersonne(
+            connection_string, chunk["idpersonne"].unique().to_list()
+        )
+        to_create, to_update = transform_owners(chunk.lazy(), existing, year)
+        if dry_run:
+            created, updated = to_create.height, to_update.height
+        else:
+            created, updated = write_owners(to_create, to_update, connection_string)
+
+        checkpoint = {
+            "source": identity,
+            "chunks": index + 1,
+            "rows": checkpoint["rows"] + chunk.height,
+            "created": checkpoint["created"] + created,
+            "updated": checkpoint["updated"] + updated,
+        }
+        if not dry_run:
+            _write_checkpoint(checkpoint_path, checkpoint)
+        log.info(
+            f"Owners chunk {index + 1}/{chunks} up to {chunk['idpersonne'][-1]}: "
+            f"{created} created, {updated} updated"
+        )
+
+    if not dry_run:
+        checkpoint_path.unlink(missing_ok=True)
+    sorted_path.unlink(missing_ok=True)
+    return checkpoint["rows"], checkpoint["created"], checkpoint["updated"]
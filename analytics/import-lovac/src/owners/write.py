@@ -1,8 +1,8 @@
-import io
-
 import polars as pl
 import psycopg
 
+from src.pg_copy import copy_frame
+
 
 BATCH_SIZE = 10_000
 
@@ -24,21 +24,6 @@ def _rename_to_db_columns(dataframe: pl.DataFrame) -> pl.DataFrame:
     return dataframe.rename(COLUMN_RENAMES)
 
 
-def _copy_to_staging(
-    dataframe: pl.DataFrame,
-    staging_table: str,
-    columns: list[str],
-    cursor: psycopg.Cursor,
-) -> None:
-    """COPY a DataFrame into a staging table using psycopg's COPY protocol."""
-    buffer = io.BytesIO()
-    dataframe.select(columns).write_csv(buffer)
-    buffer.seek(0)
-    columns_clause = ", ".join(f'"{column}"' for column in columns)
-    with cursor.copy(f"COPY {staging_table} ({columns_clause}) FROM STDIN WITH (FORMAT csv, HEADER true)") as copy:
-        copy.write(buffer.read())
-
-
 def write_owners(
     to_create: pl.DataFrame,
     to_update: pl.DataFrame,
@@ -65,7 +50,7 @@ def write_owners(
             renamed = _rename_to_db_columns(to_create)
             with connection.cursor() as cursor:
                 cursor.execute("CREATE TEMP TABLE stg_owners_create (LIKE owners INCLUDING DEFAULTS)")
-                _copy_to_staging(renamed, "stg_owners_create", STAGING_COLUMNS, cursor)
+                copy_frame(cursor, renamed.select(STAGING_COLUMNS), "stg_owners_create")
                 cursor.execute("""
                     INSERT INTO owners (id, idpersonne, full_name, username, address_dgfip, birth_date, siren, kind_class, data_source, created_at, updated_at)
                     SELECT id, idpersonne, full_name, username, address_dgfip, birth_date, siren, kind_class, data_source, now(), now()
@@ -80,7 +65,7 @@ def write_owners(
             renamed = _rename_to_db_columns(to_update)
             with connection.cursor() as cursor:
                 cursor.execute("CREATE TEMP TABLE stg_owners_update (LIKE owners INCLUDING DEFAULTS)")
-                _copy_to_staging(renamed, "stg_owners_update", STAGING_COLUMNS, cursor)
+                copy_frame(cursor, renamed.select(STAGING_COLUMNS), "stg_owners_update")
 
             identifiers = to_update["idpersonne"].to_list()
             for offset in range(0, len(identifiers), BATCH_SIZE):
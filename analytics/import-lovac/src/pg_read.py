@@ -0,0 +1,30 @@
+"""Parameterized reads from PostgreSQL into Polars.
+
+Queries go through the ADBC PostgreSQL driver: values are bound as
+parameters (``$1``, ``$2``, ...) instead of being interpolated into the SQL
+text, and results arrive as Arrow record batches that Polars adopts
+without a row-by-row conversion. A list of ids is bound as a single array
+parameter, so ``WHERE id = ANY($1::uuid[])`` keeps the statement small
+however many ids a department has.
+
+ADBC returns ``uuid`` columns as opaque binary: select them as ``::text``.
+"""
+
+from collections.abc import Sequence
+
+import adbc_driver_postgresql.dbapi
+import polars as pl
+
+from src.connections import connection_slot
+
+
+def read_database(
+    query: str,
+    connection_string: str,
+    parameters: Sequence | None = None,
+) -> pl.DataFrame:
+    """Run ``query`` with bound ``parameters`` and return the result."""
+    with connection_slot(), adbc_driver_postgresql.dbapi.connect(connection_string) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(query, parameters=parameters)
+            return pl.DataFrame(cursor.fetch_record_batch().read_all())
@@ -0,0 +1,118 @@
+"""Building counts against a real PostgreSQL.
+
+Set TEST_DATABASE_URL to run these tests. They create and drop their own
+schema.
+"""
+
+import os
+from urllib.parse import quote
+
+import psycopg
+import pytest
+
+from src.buildings import write
+from src.buildings.write import (
+    TOUCHED_BUILDINGS_TABLE,
+    create_touched_buildings_table,
+    diff_building_counts,
+    record_touched_buildings,
+    update_building_counts,
+)
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+SCHEMA = "import_lovac_building_counts_test"
+
+pytestmark = pytest.mark.skipif(
+    not DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path = {SCHEMA};
+CREATE TABLE buildings (
+  id text PRIMARY KEY,
+  rent_housing_count integer,
+  vacant_housing_count integer
+);
+CREATE TABLE fast_housing (id integer PRIMARY KEY, building_id text, occupancy text);
+INSERT INTO buildings
+SELECT 'b' || i, 0, 0 FROM generate_series(1, 50) i;
+INSERT INTO fast_housing
+SELECT i, 'b' || (i % 50 + 1), CASE WHEN i % 3 = 0 THEN 'V' ELSE 'L' END
+FROM generate_series(1, 500) i;
+"""
+
+
+@pytest.fixture
+def db_url():
+    with psycopg.connect(DATABASE_URL) as connection:
+        connection.execute(SCHEMA_SQL)
+    separator = "&" if "?" in DATABASE_URL else "?"
+    yield f"{DATABASE_URL}{separator}options={quote(f'-csearch_path={SCHEMA}')}"
+    with psycopg.connect(DATABASE_URL) as connection:
+        connection.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+
+
+def _write_housings(db_url, sql):
+    """Change fast_housing and record the touched buildings, as the writers do."""
+    with psycopg.connect(db_url) as connection, connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE written AS {sql}")
+        record_touched_buildings(cursor, """
+            SELECT h.building_id FROM fast_housing h JOIN written w USING (id)
+            UNION ALL
+            SELECT building_id FROM written
+        """)
+        cursor.execute("""
+            UPDATE fast_housing h
+            SET building_id = w.building_id, occupancy = w.occupancy
+            FROM written w WHERE h.id = w.id
+        """)
+
+
+def _touched(db_url):
+    with psycopg.connect(db_url) as connection:
+        return connection.execute(
+            f"SELECT count(*) FROM {TOUCHED_BUILDINGS_TABLE}"
+        ).fetchone()[0]
+
+
+def test_incremental_update_matches_a_full_recompute(db_url, monkeypatch):
+    monkeypatch.setattr(write, "BATCH_SIZE", 7)
+    update_building_counts(db_url)
+    create_touched_buildings_table(db_url)
+    _write_housings(db_url, """
+        SELECT id, 'b' || (id % 20 + 1) AS building_id, 'V' AS occupancy
+        FROM fast_housing WHERE id % 4 = 0
+    """)
+
+    updated = update_building_counts(db_url, incremental=True)
+
+    assert 0 < updated < 50
+    assert diff_building_counts(db_url).height == 0
+    assert _touched(db_url) == 0
+
+
+def test_writers_create_the_table_and_a_full_recompute_empties_it(db_url):
+    _write_housings(db_url, """
+        SELECT id, building_id, 'V' AS occupancy FROM fast_housing WHERE id = 1
+    """)
+    assert _touched(db_url) == 1
+
+    assert update_building_counts(db_url) == 50
+    assert _touched(db_url) == 0
+    assert diff_building_counts(db_url).height == 0
+
+
+def test_touched_buildings_table_survives_crash_recovery(db_url):
+    with psycopg.connect(db_url) as connection:
+        connection.execute(f"CREATE UNLOGGED TABLE {TOUCHED_BUILDINGS_TABLE} (building_id text)")
+
+    create_touched_buildings_table(db_url)
+
+    with psycopg.connect(db_url) as connection:
+        persistence = connection.execute(
+            "SELECT relpersistence FROM pg_class WHERE oid = %s::regclass",
+            (TOUCHED_BUILDINGS_TABLE,),
+        ).fetchone()[0]
+    assert persistence == "p"
@@ -0,0 +1,84 @@
+import contextlib
+import threading
+import time
+
+import pytest
+
+from src import connections
+from src.connections import connect, connection_slot, fast_housing_writer, set_limits
+
+THREADS = 8
+
+
+class Concurrency:
+    """Highest number of threads inside `enter()` at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    @contextlib.contextmanager
+    def enter(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(0.02)
+        yield
+        with self.lock:
+            self.current -= 1
+
+
+def _run_threads(slot, concurrency):
+    def work():
+        with slot(), concurrency.enter():
+            pass
+
+    threads = [threading.Thread(target=work) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@pytest.fixture(autouse=True)
+def no_limits():
+    yield
+    set_limits(None, None)
+
+
+class TestLimits:
+    def test_unbounded_by_default(self):
+        concurrency = Concurrency()
+
+        _run_threads(connection_slot, concurrency)
+
+        assert concurrency.peak == THREADS
+
+    @pytest.mark.parametrize(
+        ("slot", "connections_limit", "writers_limit", "expected"),
+        [(connection_slot, 2, 5, 2), (fast_housing_writer, 5, 3, 3)],
+    )
+    def test_slots_are_bounded_by_their_semaphore(
+        self, slot, connections_limit, writers_limit, expected
+    ):
+        set_limits(
+            threading.BoundedSemaphore(connections_limit),
+            threading.BoundedSemaphore(writers_limit),
+        )
+        concurrency = Concurrency()
+
+        _run_threads(slot, concurrency)
+
+        assert concurrency.peak == expected
+
+    def test_connect_holds_a_connection_slot(self, monkeypatch):
+        opened = Concurrency()
+        monkeypatch.setattr(
+            connections.psycopg, "connect", lambda connection_string: opened.enter()
+        )
+        set_limits(threading.BoundedSemaphore(2), threading.BoundedSemaphore(1))
+
+        _run_threads(lambda: connect("postgresql://unused"), Concurrency())
+
+        assert opened.peak == 2
@@ -0,0 +1,64 @@
+import time
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from src import connections, departments
+from src.config import ImportLovacConfig
+from src.departments import import_departments, order_by_size
+
+
+def _stub_import_department(config, department, admin_user_id, owner_snapshot):
+    """Stands for import_department in the worker processes.
+
+    Leaves a marker in cache_path; department "01" fails, the others take
+    a moment.
+    """
+    (Path(config.cache_path) / department).touch()
+    if department == "01":
+        raise ValueError("broken source")
+    time.sleep(0.2)
+    limits = connections._connections is not None and connections._fast_housing_writers is not None
+    return {"housings": {"seconds": 0.0, "limits": limits}}
+
+
+class TestOrderBySize:
+    def test_largest_departments_first(self, tmp_path):
+        pl.DataFrame({
+            "local_id": [str(i) for i in range(6)],
+            "dept": ["01", "2A", "2A", "971", "971", "971"],
+        }).write_parquet(tmp_path / "housings", partition_by="dept")
+        config = ImportLovacConfig(source_path=str(tmp_path))
+
+        assert order_by_size(config, ["01", "971", "75", "2A"]) == ["971", "2A", "01", "75"]
+
+
+class TestImportDepartments:
+    @pytest.fixture
+    def config(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(departments, "import_department", _stub_import_department)
+        monkeypatch.setattr(departments, "order_by_size", lambda config, codes: codes)
+        return ImportLovacConfig(cache_path=str(tmp_path), max_workers=1)
+
+    def test_workers_run_with_the_shared_limits(self, config):
+        results = import_departments(
+            config, ["02", "03"], admin_user_id="admin", owner_snapshot=None
+        )
+
+        assert results == {
+            department: {"housings": {"seconds": 0.0, "limits": True}}
+            for department in ("02", "03")
+        }
+
+    def test_failure_names_the_department_and_cancels_the_rest(self, config, tmp_path):
+        codes = ["01", "02", "03", "04", "05", "06", "07", "08"]
+
+        with pytest.raises(RuntimeError, match="department 01") as raised:
+            import_departments(config, codes, admin_user_id="admin", owner_snapshot=None)
+
+        assert isinstance(raised.value.__cause__, ValueError)
+        started = sorted(path.name for path in tmp_path.iterdir())
+        # Calls already queued for the worker still run, the others do not
+        assert started == codes[: len(started)]
+        assert len(started) <= 4
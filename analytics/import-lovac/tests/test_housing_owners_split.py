@@ -0,0 +1,74 @@
+import json
+
+import polars as pl
+
+from src.housing_owners.read import (
+    SOURCE_HOUSING_OWNER_SCHEMA,
+    read_source_housing_owners,
+    read_split_source_housing_owners,
+    split_source_housing_owners,
+    validate_source_housing_owners,
+)
+
+
+def _row(geo_code: str, **overrides) -> dict:
+    return {
+        "owner_uid": f"owner-{geo_code}",
+        "geo_code": geo_code,
+        "local_id": f"{geo_code}0000001",
+        "idpersonne": "ABCDEFGH",
+        "idprocpte": "12345678901",
+        "idprodroit": "1234567890123",
+        "locprop_source": 1,
+        "property_right": "usufruitier",
+        "rank": 1,
+        **overrides,
+    }
+
+
+def _write_jsonl(path, rows: list[dict]) -> str:
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return str(path)
+
+
+class TestSplitSourceHousingOwners:
+    def test_matches_jsonl_read_per_department(self, tmp_path):
+        rows = [
+            _row("01001"), _row("01002"), _row("2A004"),
+            _row("97101"), _row("97411"), _row("75056"),
+        ]
+        source = _write_jsonl(tmp_path / "housing-owners.jsonl", rows)
+        destination = str(tmp_path / "split")
+
+        split_source_housing_owners(source, destination)
+
+        for department in ["01", "2A", "971", "974", "75", "13"]:
+            expected = validate_source_housing_owners(
+                read_source_housing_owners(source, department)
+            ).collect()
+            actual = read_split_source_housing_owners(destination, department).collect()
+            assert actual.schema == pl.Schema(SOURCE_HOUSING_OWNER_SCHEMA)
+            assert actual.sort("geo_code").equals(expected.sort("geo_code"))
+
+    def test_drops_invalid_rows(self, tmp_path):
+        rows = [_row("01001"), _row("01002", rank=9), _row("01003", idpersonne="short")]
+        source = _write_jsonl(tmp_path / "housing-owners.jsonl", rows)
+        destination = str(tmp_path / "split")
+
+        split_source_housing_owners(source, destination)
+
+        result = read_split_source_housing_owners(destination, "01").collect()
+        assert result["geo_code"].to_list() == ["01001"]
+
+    def test_replaces_previous_split(self, tmp_path):
+        destination = str(tmp_path / "split")
+        split_source_housing_owners(
+            _write_jsonl(tmp_path / "first.jsonl", [_row("01001")]), destination
+        )
+
+        split_source_housing_owners(
+            _write_jsonl(tmp_path / "second.jsonl", [_row("02001")]), destination
+        )
+
+        assert read_split_source_housing_owners(destination, "01").collect().height == 0
+        assert read_split_source_housing_owners(destination, "02").collect().height == 1
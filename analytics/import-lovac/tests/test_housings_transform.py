@@ -328,3 +328,62 @@ class TestUpdateHousings:
         )
         assert to_update["occupancy"][0] == "V"
         assert to_update["status"][0] == 0
+
+
+# ─── Several housings at once ─────────────────────────────────────────────────
+
+
+class TestSeveralHousings:
+    def test_events_are_attributed_to_their_own_housing(self):
+        source = pl.concat([
+            _source_frame(local_id="000000000001"),
+            _source_frame(local_id="000000000002"),
+            _source_frame(local_id="000000000003"),
+        ])
+        existing = pl.concat([
+            _existing_housing(housing_id="h1", local_id="000000000001", occupancy="RS", status=3),
+            _existing_housing(housing_id="h2", local_id="000000000002", occupancy="RS", status=3),
+        ])
+        existing_events = pl.DataFrame(
+            [
+                {
+                    "housing_id": "h1",
+                    "type": "housing:occupancy-updated",
+                    "created_by": "real-user-id",
+                    "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+                },
+                {
+                    "housing_id": "h2",
+                    "type": "housing:occupancy-updated",
+                    "created_by": ADMIN_USER_ID,
+                    "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+                },
+            ]
+        )
+        to_create, to_update, events, housing_events = transform_housings(
+            source, existing, existing_events,
+            year=YEAR, admin_user_id=ADMIN_USER_ID,
+        )
+        assert to_create["local_id"].to_list() == ["000000000003"]
+        assert to_update["id"].to_list() == ["h1", "h2"]
+        assert to_update["occupancy"].to_list() == ["RS", "V"]
+        assert to_update["status"].to_list() == [3, 0]
+        assert housing_events["housing_id"].to_list() == [
+            to_create["id"][0], "h2", "h2",
+        ]
+        assert events["type"].to_list() == [
+            "housing:created",
+            "housing:occupancy-updated",
+            "housing:status-updated",
+        ]
+
+    def test_event_ids_match_uuidv5_of_housing_and_year(self):
+        existing = _existing_housing(occupancy="RS", status=3)
+        _, _, events, _ = transform_housings(
+            _source_frame(), existing, _empty_events(),
+            year=YEAR, admin_user_id=ADMIN_USER_ID,
+        )
+        assert events["id"].to_list() == [
+            str(uuid.uuid5(LOVAC_NAMESPACE, f"existing-uuid:housing:occupancy-updated:{YEAR}")),
+            str(uuid.uuid5(LOVAC_NAMESPACE, f"existing-uuid:housing:status-updated:{YEAR}")),
+        ]
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import polars as pl
+
+from src.owners.snapshot import (
+    read_owner_snapshot,
+    read_owner_snapshot_metadata,
+    write_owner_snapshot,
+)
+
+YEAR = "lovac-2026"
+ADMIN_USER_ID = "admin-user-id-000"
+
+
+def _owners() -> pl.DataFrame:
+    return pl.DataFrame({
+        "id": ["owner-3", "owner-1", "owner-2"],
+        "full_name": ["Charlie", "Alice", "Bob"],
+    })
+
+
+class TestOwnerSnapshot:
+    def test_reads_requested_owners_only(self, tmp_path):
+        path = write_owner_snapshot(
+            _owners(), str(tmp_path), year=YEAR, version="run-1", admin_user_id=ADMIN_USER_ID
+        )
+
+        result = read_owner_snapshot(path, pl.Series(["owner-2", "owner-3", "owner-2", None, "unknown"]))
+
+        assert result.sort("id").to_dicts() == [
+            {"id": "owner-2", "full_name": "Bob"},
+            {"id": "owner-3", "full_name": "Charlie"},
+        ]
+
+    def test_metadata(self, tmp_path):
+        path = write_owner_snapshot(
+            _owners(), str(tmp_path), year=YEAR, version="run-1", admin_user_id=ADMIN_USER_ID
+        )
+
+        metadata = read_owner_snapshot_metadata(path)
+
+        assert metadata["year"] == YEAR
+        assert metadata["version"] == "run-1"
+        assert metadata["admin_user_id"] == ADMIN_USER_ID
+
+    def test_new_version_replaces_previous(self, tmp_path):
+        first = write_owner_snapshot(
+            _owners(), str(tmp_path), year=YEAR, version="run-1", admin_user_id=ADMIN_USER_ID
+        )
+        second = write_owner_snapshot(
+            _owners().head(1), str(tmp_path), year=YEAR, version="run-2", admin_user_id=ADMIN_USER_ID
+        )
+
+        assert not Path(first).exists()
+        assert sorted(p.name for p in (tmp_path / YEAR).iterdir()) == ["owners-run-2.parquet"]
+        assert read_owner_snapshot(second, pl.Series(["owner-1", "owner-3"])).height == 1
+
+    def test_years_are_kept_apart(self, tmp_path):
+        previous = write_owner_snapshot(
+            _owners(), str(tmp_path), year="lovac-2025", version="run-1", admin_user_id=ADMIN_USER_ID
+        )
+        write_owner_snapshot(
+            _owners(), str(tmp_path), year=YEAR, version="run-2", admin_user_id=ADMIN_USER_ID
+        )
+
+        assert Path(previous).exists()
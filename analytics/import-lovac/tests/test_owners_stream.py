@@ -0,0 +1,170 @@
+import json
+
+import polars as pl
+import pytest
+
+from src.owners import stream
+from src.owners.read import read_source_owners, validate_source_owners
+
+YEAR = "lovac-2026"
+
+EXISTING_SCHEMA = {
+    "id": pl.Utf8,
+    "idpersonne": pl.Utf8,
+    "data_source": pl.Utf8,
+    "email": pl.Utf8,
+    "phone": pl.Utf8,
+    "administrator": pl.Utf8,
+    "additional_address": pl.Utf8,
+}
+
+
+class FakeOwners:
+    """Owners table read and written by the stream, in memory.
+
+    `fail_on_write` makes that write call (1-based) raise.
+    """
+
+    def __init__(self, fail_on_write: int | None = None):
+        self.owners: dict[str, str] = {}
+        self.writes: list[tuple[list[str], list[str]]] = []
+        self.fail_on_write = fail_on_write
+
+    def read(self, connection_string, idpersonnes):
+        return pl.DataFrame(
+            [
+                {"id": self.owners[idpersonne], "idpersonne": idpersonne}
+                for idpersonne in idpersonnes
+                if idpersonne in self.owners
+            ],
+            schema=EXISTING_SCHEMA,
+        )
+
+    def write(self, to_create, to_update, connection_string):
+        if len(self.writes) + 1 == self.fail_on_write:
+            raise RuntimeError("connection lost")
+        self.writes.append(
+            (to_create["idpersonne"].to_list(), to_update["idpersonne"].to_list())
+        )
+        for row in to_create.iter_rows(named=True):
+            self.owners[row["idpersonne"]] = row["id"]
+        return to_create.height, to_update.height
+
+
+@pytest.fixture
+def owners(monkeypatch):
+    fake = FakeOwners()
+    monkeypatch.setattr(stream, "read_existing_owners_by_idpersonne", fake.read)
+    monkeypatch.setattr(stream, "write_owners", fake.write)
+    return fake
+
+
+def _write_source(path, idpersonnes):
+    with open(path, "w") as source:
+        for index, idpersonne in enumerate(idpersonnes):
+            source.write(json.dumps({
+                "owner_uid": f"uid-{idpersonne}-{index}",
+                "idpersonne": idpersonne,
+                "full_name": f"Owner {idpersonne}",
+                "username": None,
+                "dgfip_address": "1 rue de la Paix",
+                "ownership_type": "Particulier",
+                "birth_date": "1980-01-01",
+                "siren": None,
+                "entity": None,
+            }) + "\n")
+    return str(path)
+
+
+def _import(source_file, work_dir, *, year=YEAR, dry_run=False):
+    return stream.import_owners_in_chunks(
+        validate_source_owners(read_source_owners(source_file)),
+        "postgresql://unused",
+        year,
+        str(work_dir),
+        source_file=source_file,
+        chunk_rows=2,
+        dry_run=dry_run,
+    )
+
+
+class TestChunks:
+    def test_writes_every_chunk_in_idpersonne_order(self, tmp_path, owners):
+        source_file = _write_source(tmp_path / "owners.jsonl", ["E", "C", "A", "D", "B"])
+
+        result = _import(source_file, tmp_path / "work")
+
+        assert result == (5, 5, 0)
+        assert owners.writes == [(["A", "B"], []), (["C", "D"], []), (["E"], [])]
+        assert list((tmp_path / "work").iterdir()) == []
+
+    def test_idpersonne_spanning_two_chunks_is_updated_by_the_second(
+        self, tmp_path, owners
+    ):
+        source_file = _write_source(tmp_path / "owners.jsonl", ["C", "B", "A", "B"])
+
+        result = _import(source_file, tmp_path / "work")
+
+        assert result == (4, 3, 1)
+        assert owners.writes == [(["A", "B"], []), (["C"], ["B"])]
+
+    def test_dry_run_counts_without_writing(self, tmp_path, owners):
+        source_file = _write_source(tmp_path / "owners.jsonl", ["C", "B", "A"])
+
+        result = _import(source_file, tmp_path / "work", dry_run=True)
+
+        assert result == (3, 3, 0)
+        assert owners.writes == []
+
+
+class TestResume:
+    def _fail_after_first_chunk(self, source_file, work_dir, owners):
+        owners.fail_on_write = 2
+        with pytest.raises(RuntimeError):
+            _import(source_file, work_dir)
+        owners.fail_on_write = None
+
+    def test_resumes_after_the_last_committed_chunk(self, tmp_path, owners):
+        work_dir = tmp_path / "work"
+        source_file = _write_source(tmp_path / "owners.jsonl", ["E", "C", "A", "D", "B"])
+        self._fail_after_first_chunk(source_file, work_dir, owners)
+
+        result = _import(source_file, work_dir)
+
+        assert result == (5, 5, 0)
+        assert owners.writes == [(["A", "B"], []), (["C", "D"], []), (["E"], [])]
+        assert list(work_dir.iterdir()) == []
+
+    def test_changed_source_is_sorted_again(self, tmp_path, owners):
+        work_dir = tmp_path / "work"
+        source_file = _write_source(tmp_path / "owners.jsonl", ["E", "C", "A", "D", "B"])
+        self._fail_after_first_chunk(source_file, work_dir, owners)
+        _write_source(tmp_path / "owners.jsonl", ["A", "B", "F"])
+
+        result = _import(source_file, work_dir)
+
+        assert result == (3, 1, 2)
+        assert owners.writes[1:] == [([], ["A", "B"]), (["F"], [])]
+
+    def test_other_year_is_sorted_again(self, tmp_path, owners):
+        work_dir = tmp_path / "work"
+        source_file = _write_source(tmp_path / "owners.jsonl", ["E", "C", "A", "D", "B"])
+        self._fail_after_first_chunk(source_file, work_dir, owners)
+
+        result = _import(source_file, work_dir, year="lovac-2027")
+
+        assert result[0] == 5
+        assert owners.writes[1][1] == ["A", "B"]
+
+    def test_dry_run_keeps_the_checkpoint_of_a_failed_run(self, tmp_path, owners):
+        work_dir = tmp_path / "work"
+        source_file = _write_source(tmp_path / "owners.jsonl", ["E", "C", "A", "D", "B"])
+        self._fail_after_first_chunk(source_file, work_dir, owners)
+        checkpoint = (work_dir / "owners-checkpoint.json").read_text()
+
+        dry_run = _import(source_file, work_dir, dry_run=True)
+
+        assert dry_run == (5, 3, 2)
+        assert (work_dir / "owners-checkpoint.json").read_text() == checkpoint
+        assert (work_dir / "owners-sorted.parquet").exists()
+        assert _import(source_file, work_dir) == (5, 5, 0)
@@ -0,0 +1,102 @@
+import datetime
+import struct
+import uuid
+
+import polars as pl
+import pytest
+
+from src.pg_copy import PostgresType, encode_chunk
+
+INT4 = PostgresType("int4", "b", oid=23)
+TEXT = PostgresType("text", "b", oid=25)
+
+
+def _field(payload: bytes) -> bytes:
+    return struct.pack(">i", len(payload)) + payload
+
+
+def _tuple(*fields: bytes) -> bytes:
+    return struct.pack(">h", len(fields)) + b"".join(fields)
+
+
+class TestScalars:
+    def test_int_and_null(self):
+        chunk = pl.DataFrame({"value": [1, None]})
+
+        encoded = encode_chunk(chunk, {"value": INT4}).to_pybytes()
+
+        assert encoded == _tuple(_field(struct.pack(">i", 1))) + _tuple(b"\xff\xff\xff\xff")
+
+    def test_text_uuid_date(self):
+        identifier = uuid.uuid4()
+        chunk = pl.DataFrame({
+            "name": ["Élise"],
+            "id": [str(identifier)],
+            "day": [datetime.date(2000, 1, 3)],
+        })
+        types = {
+            "name": TEXT,
+            "id": PostgresType("uuid", "b", oid=2950),
+            "day": PostgresType("date", "b", oid=1082),
+        }
+
+        encoded = encode_chunk(chunk, types).to_pybytes()
+
+        assert encoded == _tuple(
+            _field("Élise".encode()),
+            _field(identifier.bytes),
+            _field(struct.pack(">i", 2)),
+        )
+
+    def test_jsonb_has_version_byte(self):
+        chunk = pl.DataFrame({"payload": ['{"a": 1}']})
+
+        encoded = encode_chunk(chunk, {"payload": PostgresType("jsonb", "b", oid=3802)})
+
+        assert encoded.to_pybytes() == _tuple(_field(b'\x01{"a": 1}'))
+
+    def test_unsupported_type(self):
+        chunk = pl.DataFrame({"value": [1.5]})
+
+        with pytest.raises(TypeError):
+            encode_chunk(chunk, {"value": PostgresType("numeric", "b", oid=1700)})
+
+    def test_integral_floats_are_cast(self):
+        chunk = pl.DataFrame({"value": [2.0, None]})
+
+        encoded = encode_chunk(chunk, {"value": INT4}).to_pybytes()
+
+        assert encoded == _tuple(_field(struct.pack(">i", 2))) + _tuple(b"\xff\xff\xff\xff")
+
+    @pytest.mark.parametrize("values", [[1.7], [float("nan")], [2.0**40]])
+    def test_lossy_integer_cast(self, values):
+        chunk = pl.DataFrame({"value": values})
+
+        with pytest.raises(TypeError, match="'value'"):
+            encode_chunk(chunk, {"value": INT4})
+
+
+class TestArrays:
+    TEXT_ARRAY = PostgresType("_text", "b", element=TEXT)
+
+    def test_list_column(self):
+        chunk = pl.DataFrame({"values": [["a", None], [], None]})
+
+        encoded = encode_chunk(chunk, {"values": self.TEXT_ARRAY}).to_pybytes()
+
+        elements = _field(b"a") + b"\xff\xff\xff\xff"
+        assert encoded == (
+            _tuple(_field(struct.pack(">iiIii", 1, 1, 25, 2, 1) + elements))
+            + _tuple(_field(struct.pack(">iiI", 0, 0, 25)))
+            + _tuple(b"\xff\xff\xff\xff")
+        )
+
+    def test_scalar_is_wrapped(self):
+        chunk = pl.DataFrame({"values": ["a", None]})
+
+        encoded = encode_chunk(chunk, {"values": self.TEXT_ARRAY}).to_pybytes()
+
+        assert encoded == (
+            _tuple(_field(struct.pack(">iiIii", 1, 0, 25, 1, 1) + _field(b"a")))
+            + _tuple(b"\xff\xff\xff\xff")
+        )
@@ -0,0 +1,26 @@
+"""Compatibility import for the Dagster geography index."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+_DAGSTER_ROOT = Path(__file__).resolve().parents[4] / "analytics" / "dagster"
+if str(_DAGSTER_ROOT) not in sys.path:
+    sys.path.insert(0, str(_DAGSTER_ROOT))
+
+from src.owner_housing_locations.geography import (  # noqa: E402
+    department,
+    is_metro_region,
+    is_overseas_region,
+    region_of_department,
+    region_of_postal_code,
+)
+
+__all__ = [
+    "department",
+    "is_metro_region",
+    "is_overseas_region",
+    "region_of_department",
+    "region_of_postal_code",
+]
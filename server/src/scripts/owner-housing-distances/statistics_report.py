@@ -28,6 +28,8 @@ from psycopg2.extras import RealDictCursor
 # Add the project root to Python path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
+from geography import department, region_of_department
+
 class StatisticsReporter:
     """Generates statistics reports for owner-housing distance and classification data."""
 
@@ -149,6 +151,28 @@ class StatisticsReporter:
             logging.error(f"Error getting classification distribution: {e}")
             return []
 
+    def get_classification_by_region(self) -> Dict[str, Dict[int, int]]:
+        """Get classification counts per housing region."""
+        try:
+            self.cursor.execute("""
+                SELECT
+                    LEFT(housing_geo_code, 3) as prefix,
+                    locprop_relative_ban as classification,
+                    COUNT(*) as count
+                FROM owners_housing
+                WHERE locprop_relative_ban IS NOT NULL
+                GROUP BY 1, 2
+            """)
+            by_region: Dict[str, Dict[int, int]] = {}
+            for row in self.cursor.fetchall():
+                region = region_of_department(department(row['prefix'] or '')) or 'unknown'
+                counts = by_region.setdefault(region, {})
+                counts[row['classification']] = counts.get(row['classification'], 0) + row['count']
+            return dict(sorted(by_region.items()))
+        except Exception as e:
+            logging.error(f"Error getting classification by region: {e}")
+            return {}
+
     def get_distance_statistics(self) -> Dict:
         """Get statistics for distance values."""
         try:
@@ -341,6 +365,15 @@ class StatisticsReporter:
             print(f"      Count: {count:,} ({percentage}%)")
         print()
 
+        # Classification by housing region
+        print("🗺️  CLASSIFICATION BY HOUSING REGION")
+        print("-" * 40)
+        for region, counts in self.get_classification_by_region().items():
+            total = sum(counts.values())
+            detail = ", ".join(f"{key}: {value:,}" for key, value in sorted(counts.items()))
+            print(f"  Region {region}: {total:,} ({detail})")
+        print()
+
         # Distance statistics
         print("📏 DISTANCE STATISTICS")
         print("-" * 40)
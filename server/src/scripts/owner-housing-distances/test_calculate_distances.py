@@ -16,10 +16,13 @@ Run tests with:
 
 import json
 import math
+import threading
 from collections import Counter
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import MagicMock, Mock, patch
 
+import numpy as np
 import pytest
 from calculate_distances import (
     DistanceCalculator,
@@ -28,7 +31,10 @@ from calculate_distances import (
     main,
 )
 from country_detector import CountryDetector
-from src.owner_housing_locations.calculator import LocationComputationError
+from src.owner_housing_locations.calculator import (
+    PIPELINE_DEPTH,
+    LocationComputationError,
+)
 
 DISTANCE_CONTRACT_CASES = json.loads(
     (
@@ -1233,21 +1239,21 @@ class TestRunFailurePropagation:
         calc.batch_get_address_data = Mock(
             side_effect=RuntimeError("Address batch query failed")
         )
-        calc.process_single_pair = Mock()
-        calc.update_database = Mock()
+        calc.classify_pair_batch = Mock()
+        calc._update_batch_worker = Mock()
         scope = LocationScope(data_file_year="lovac-2026")
 
         with pytest.raises(
             LocationComputationError, match="Address batch query failed"
         ) as raised:
-            calc.run(scope, batch_size=1)
+            calc.run(scope, batch_size=1, materialize_scope=False)
 
         assert isinstance(raised.value.__cause__, RuntimeError)
         assert raised.value.report.candidate_count == 1
         assert raised.value.report.errors == 1
         assert raised.value.report.stats["errors"] == 1
-        calc.process_single_pair.assert_not_called()
-        calc.update_database.assert_not_called()
+        calc.classify_pair_batch.assert_not_called()
+        calc._update_batch_worker.assert_not_called()
         calc.disconnect.assert_called_once_with()
 
     def test_candidate_count_failure_has_a_structured_empty_report(self):
@@ -1261,7 +1267,7 @@ class TestRunFailurePropagation:
         with pytest.raises(
             LocationComputationError, match="candidate count failed"
         ) as raised:
-            calc.run(LocationScope(data_file_year="lovac-2026"))
+            calc.run(LocationScope(data_file_year="lovac-2026"), materialize_scope=False)
 
         assert raised.value.report.candidate_count == 0
         assert raised.value.report.processed_pairs == 0
@@ -1275,28 +1281,33 @@ class TestRunFailurePropagation:
         calc.disconnect = Mock()
         calc.count_owner_housing_pairs = Mock(return_value=1)
         calc.fetch_owner_housing_pair_batch = Mock(
-            return_value=[
-                {
-                    "owner_id": "owner-1",
-                    "housing_id": "housing-1",
-                    "housing_geo_code": "75001",
-                }
+            side_effect=[
+                [
+                    {
+                        "owner_id": "owner-1",
+                        "housing_id": "housing-1",
+                        "housing_geo_code": "75001",
+                    }
+                ],
+                [],
             ]
         )
         calc.batch_get_address_data = Mock(return_value={})
-        calc.process_single_pair = Mock(return_value=(None, 7))
-        calc.update_database = Mock(
-            side_effect=RuntimeError("1 database update failed")
+        calc.classify_pair_batch = Mock(
+            return_value=(np.array([np.nan]), np.array([7]), {})
         )
+        calc._update_batch_worker = Mock(return_value=(0, 0, "connection lost"))
         scope = LocationScope(data_file_year="lovac-2026")
 
-        with pytest.raises(RuntimeError, match="database update failed"):
-            calc.run(scope, batch_size=1)
+        with pytest.raises(RuntimeError, match="database update failed") as raised:
+            calc.run(scope, batch_size=1, materialize_scope=False)
 
-        calc.process_single_pair.assert_called_once_with(
-            "owner-1", "housing-1", {}, housing_geo_code="75001"
-        )
-        calc.update_database.assert_called_once()
+        calc.classify_pair_batch.assert_called_once()
+        batch = calc.classify_pair_batch.call_args.args[0]
+        assert batch.housing_geo_code.tolist() == ["75001"]
+        calc._update_batch_worker.assert_called_once()
+        assert raised.value.report.updated_pairs == 0
+        assert raised.value.report.errors == 1
         calc.disconnect.assert_called_once_with()
 
     def test_pair_processing_error_aborts_run_before_writing(self):
@@ -1314,14 +1325,14 @@ class TestRunFailurePropagation:
             ]
         )
         calc.batch_get_address_data = Mock(return_value={})
-        calc.process_single_pair = Mock(side_effect=RuntimeError("invalid pair"))
-        calc.update_database = Mock()
+        calc.classify_pair_batch = Mock(side_effect=RuntimeError("invalid pair"))
+        calc._update_batch_worker = Mock()
         scope = LocationScope(data_file_year="lovac-2026")
 
         with pytest.raises(RuntimeError, match="invalid pair"):
-            calc.run(scope, batch_size=1)
+            calc.run(scope, batch_size=1, materialize_scope=False)
 
-        calc.update_database.assert_not_called()
+        calc._update_batch_worker.assert_not_called()
         calc.disconnect.assert_called_once_with()
 
     def test_failure_reports_completed_batches_and_classifications(self):
@@ -1348,13 +1359,22 @@ class TestRunFailurePropagation:
             ]
         )
         calc.batch_get_address_data = Mock(return_value={})
-        calc.process_single_pair = Mock(
-            side_effect=[(1.2, 1), RuntimeError("invalid second pair")]
+        calc.classify_pair_batch = Mock(
+            side_effect=[
+                (np.array([1.2]), np.array([1]), {}),
+                RuntimeError("invalid second pair"),
+            ]
+        )
+        calc._update_batch_worker = Mock(
+            side_effect=lambda batch: (batch[0], len(batch[1]), None)
         )
-        calc.update_database = Mock(return_value=1)
 
         with pytest.raises(LocationComputationError) as raised:
-            calc.run(LocationScope(data_file_year="lovac-2026"), batch_size=1)
+            calc.run(
+                LocationScope(data_file_year="lovac-2026"),
+                batch_size=1,
+                materialize_scope=False,
+            )
 
         report = raised.value.report
         assert report.candidate_count == 2
@@ -1366,6 +1386,162 @@ class TestRunFailurePropagation:
         assert report.stats["processed_pairs"] == 1
 
 
+def _page(index, size=2):
+    return [
+        {
+            "owner_id": f"owner-{index}-{pair}",
+            "housing_id": f"housing-{index}-{pair}",
+            "housing_geo_code": "75001",
+        }
+        for pair in range(size)
+    ]
+
+
+def _classified(batch):
+    return np.full(len(batch), 1.5), np.full(len(batch), 1), {}
+
+
+def _pipelined_calculator(pages):
+    calc = DistanceCalculator("postgresql://example")
+    calc.connect = Mock()
+    calc.disconnect = Mock()
+    calc.count_owner_housing_pairs = Mock(return_value=sum(map(len, pages)))
+    calc.fetch_owner_housing_pair_batch = Mock(side_effect=[*pages, []])
+    calc.batch_get_address_data = Mock(return_value={})
+    calc.classify_pair_batch = Mock(side_effect=_classified)
+    calc._update_batch_worker = Mock(
+        side_effect=lambda batch: (batch[0], len(batch[1]), None)
+    )
+    return calc
+
+
+class TestPipelinedRun:
+    """Test the fetch, classification and write stages of a run."""
+
+    def test_every_page_is_classified_written_and_accounted(self):
+        pages = [_page(index) for index in range(5)]
+        calc = _pipelined_calculator(pages)
+
+        report = calc.run(
+            LocationScope(data_file_year="lovac-2026"),
+            batch_size=2,
+            num_workers=2,
+            classify_workers=2,
+            materialize_scope=False,
+        )
+
+        assert report.processed_pairs == report.updates_prepared == 10
+        assert report.updated_pairs == 10
+        assert report.classification_counts == {"1": 10}
+        assert report.errors == 0
+        written = sorted(
+            update["owner_id"]
+            for call in calc._update_batch_worker.call_args_list
+            for update in call.args[0][1]
+        )
+        assert written == sorted(pair["owner_id"] for page in pages for pair in page)
+        last_keys = [
+            call.kwargs["last_key"]
+            for call in calc.fetch_owner_housing_pair_batch.call_args_list
+        ]
+        assert last_keys[1:] == [
+            (f"owner-{index}-1", f"housing-{index}-1", "75001")
+            for index in range(5)
+        ]
+
+    def test_materialized_scope_pages_carry_their_addresses(self):
+        pages = [_page(index) for index in range(3)]
+        addresses = [
+            {(page[0]["owner_id"], "Owner"): ("75001", "1 rue", 48.8, 2.3, "75101", "b")}
+            for page in pages
+        ]
+        calc = _pipelined_calculator(pages)
+
+        def materialize(scope, force=False):
+            calc.scope_table_rows = 6
+            return 6
+
+        calc.materialize_scope = Mock(side_effect=materialize)
+        calc.fetch_scope_table_page = Mock(
+            side_effect=[*zip(pages, addresses), ([], {})]
+        )
+        calc._classify_page = Mock(side_effect=lambda pairs, cache: _classified(pairs))
+
+        report = calc.run(LocationScope(data_file_year="lovac-2026"), batch_size=2)
+
+        assert report.candidate_count == report.processed_pairs == 6
+        assert report.scope_table["rows"] == 6
+        assert report.scope_table["seconds"] >= 0
+        assert [call.args[1] for call in calc._classify_page.call_args_list] == addresses
+        assert [call.args[0] for call in calc.fetch_scope_table_page.call_args_list] == [
+            (None, None, None),
+            *[
+                (page[-1]["owner_id"], page[-1]["housing_id"], "75001")
+                for page in pages
+            ],
+        ]
+        calc.count_owner_housing_pairs.assert_not_called()
+        calc.fetch_owner_housing_pair_batch.assert_not_called()
+        calc.batch_get_address_data.assert_not_called()
+
+    def test_fetching_waits_for_classification(self):
+        pages = [_page(index) for index in range(20)]
+        calc = _pipelined_calculator(pages)
+        release = threading.Event()
+
+        def classify(batch):
+            release.wait(timeout=10)
+            return _classified(batch)
+
+        calc.classify_pair_batch = Mock(side_effect=classify)
+        run = threading.Thread(
+            target=calc.run,
+            args=(LocationScope(data_file_year="lovac-2026"),),
+            kwargs={"batch_size": 2, "materialize_scope": False},
+        )
+        run.start()
+        try:
+            threading.Event().wait(0.5)
+            # One page being classified, the queued pages and the one
+            # waiting to be queued.
+            assert calc.fetch_owner_housing_pair_batch.call_count <= PIPELINE_DEPTH + 2
+        finally:
+            release.set()
+            run.join(timeout=10)
+
+        assert calc.fetch_owner_housing_pair_batch.call_count == 21
+
+    def test_write_failure_waits_for_writes_in_flight(self):
+        pages = [_page(index, size=1) for index in range(6)]
+        calc = _pipelined_calculator(pages)
+        first_write = threading.Event()
+
+        def write(batch):
+            if batch[1][0]["owner_id"] == "owner-0-0":
+                first_write.wait(timeout=1)
+                return batch[0], 0, "connection lost"
+            first_write.set()
+            return batch[0], len(batch[1]), None
+
+        calc._update_batch_worker = Mock(side_effect=write)
+
+        with pytest.raises(LocationComputationError) as raised:
+            calc.run(
+                LocationScope(data_file_year="lovac-2026"),
+                batch_size=1,
+                num_workers=2,
+                materialize_scope=False,
+            )
+
+        report = raised.value.report
+        successful = calc._update_batch_worker.call_count - 1
+        assert successful >= 1
+        assert report.updated_pairs == successful
+        assert report.errors == 1
+        assert report.updates_prepared >= report.updated_pairs + 1
+        calc.disconnect.assert_called_once_with()
+
+
 class TestDatabaseUpdates:
     """Test guarded persistence behavior."""
 
@@ -1417,57 +1593,60 @@ class TestDatabaseUpdates:
         assert calc.stats["errors"] == 1
         assert calc._update_batch_worker.call_count == 2
 
-    def test_update_batch_filters_on_housing_geo_code(self):
+    @staticmethod
+    def _pooled_worker(rowcount):
         calc = Mock(spec=DistanceCalculator)
         calc._update_batch_worker = DistanceCalculator._update_batch_worker.__get__(
             calc
         )
+        cursor = Mock(rowcount=rowcount)
+        conn = MagicMock(closed=0)
+        conn.cursor.return_value.__enter__.return_value = cursor
+        calc.write_pool = Mock()
+        calc.write_pool.getconn.return_value = conn
+        return calc, conn, cursor
+
+    def test_update_batch_copies_results_and_joins_on_the_full_key(self):
+        calc, conn, cursor = self._pooled_worker(rowcount=2)
+        updates = [
+            {
+                "owner_id": "00000000-0000-0000-0000-000000000001",
+                "housing_id": "00000000-0000-0000-0000-000000000002",
+                "housing_geo_code": "38200",
+                "distance": 0.1234,
+                "classification": 1,
+            },
+            {
+                "owner_id": "00000000-0000-0000-0000-000000000003",
+                "housing_id": "00000000-0000-0000-0000-000000000004",
+                "housing_geo_code": "2A004",
+                "distance": None,
+                "classification": 6,
+            },
+        ]
 
-        cursor = Mock()
-        conn = Mock()
-        conn.cursor.return_value = cursor
-
-        with patch(
-            "src.owner_housing_locations.calculator.psycopg2.connect",
-            return_value=conn,
-        ), patch(
-            "src.owner_housing_locations.calculator.execute_values",
-            return_value=[(1,)],
-        ) as execute_values:
-            _, updated, error = calc._update_batch_worker(
-                (
-                    0,
-                    [
-                        {
-                            "owner_id": "00000000-0000-0000-0000-000000000001",
-                            "housing_id": "00000000-0000-0000-0000-000000000002",
-                            "housing_geo_code": "38200",
-                            "distance": 0.123,
-                            "classification": 1,
-                        }
-                    ],
-                    "postgresql://example",
-                )
-            )
+        _, updated, error = calc._update_batch_worker(
+            (0, updates, "postgresql://example")
+        )
 
         assert error is None
-        assert updated == 1
-        query = execute_values.call_args.args[1]
-        values = execute_values.call_args.args[2]
-        assert "oh.housing_geo_code = data.housing_geo_code::text" in query
-        assert "RETURNING 1" in query
-        assert execute_values.call_args.kwargs["fetch"] is True
-        assert values[0][-1] == "38200"
+        assert updated == 2
+        copy_sql, buffer = cursor.copy_expert.call_args.args
+        assert copy_sql == "COPY owners_housing_location_updates FROM STDIN"
+        assert buffer.getvalue().splitlines() == [
+            "00000000-0000-0000-0000-000000000001\t"
+            "00000000-0000-0000-0000-000000000002\t38200\t123\t1",
+            "00000000-0000-0000-0000-000000000003\t"
+            "00000000-0000-0000-0000-000000000004\t2A004\t\\N\t6",
+        ]
+        query = cursor.execute.call_args.args[0]
+        assert "oh.housing_geo_code = data.housing_geo_code" in query
+        assert "RETURNING" not in query
+        conn.commit.assert_called_once_with()
+        calc.write_pool.putconn.assert_called_once_with(conn, close=False)
 
     def test_update_batch_rolls_back_when_a_target_row_is_missing(self):
-        calc = Mock(spec=DistanceCalculator)
-        calc._update_batch_worker = DistanceCalculator._update_batch_worker.__get__(
-            calc
-        )
-
-        cursor = Mock()
-        conn = Mock()
-        conn.cursor.return_value = cursor
+        calc, conn, _ = self._pooled_worker(rowcount=0)
         update = {
             "owner_id": "00000000-0000-0000-0000-000000000001",
             "housing_id": "00000000-0000-0000-0000-000000000002",
@@ -1476,20 +1655,15 @@ class TestDatabaseUpdates:
             "classification": 1,
         }
 
-        with patch(
-            "src.owner_housing_locations.calculator.psycopg2.connect",
-            return_value=conn,
-        ), patch(
-            "src.owner_housing_locations.calculator.execute_values", return_value=[]
-        ):
-            _, updated, error = calc._update_batch_worker(
-                (0, [update], "postgresql://example")
-            )
+        _, updated, error = calc._update_batch_worker(
+            (0, [update], "postgresql://example")
+        )
 
         assert updated == 0
         assert "expected to update 1 row" in error
         conn.commit.assert_not_called()
         conn.rollback.assert_called_once_with()
+        calc.write_pool.putconn.assert_called_once_with(conn, close=False)
 
 
 class TestCandidateScope:
@@ -1578,6 +1752,28 @@ class TestCandidateScope:
         query = calc.cursor.execute.call_args.args[0]
         assert "locprop_relative_ban IS NULL" not in query
 
+    def test_incremental_candidates_include_updated_ban_addresses(self):
+        calc = Mock(spec=DistanceCalculator)
+        calc.cursor = Mock()
+        calc.cursor.fetchone.return_value = {"count": 3}
+        calc._scope_sql = DistanceCalculator._scope_sql.__get__(calc)
+        calc.count_owner_housing_pairs = (
+            DistanceCalculator.count_owner_housing_pairs.__get__(calc)
+        )
+        changed_since = datetime(2026, 2, 1)
+
+        calc.count_owner_housing_pairs(
+            LocationScope(data_file_year="lovac-2026", changed_since=changed_since)
+        )
+
+        query = calc.cursor.execute.call_args.args[0]
+        params = calc.cursor.execute.call_args.args[1]
+        assert "oh.locprop_relative_ban = 7 OR EXISTS" in query
+        assert "ba.ref_id = oh.owner_id" in query
+        assert "ba.ref_id = oh.housing_id" in query
+        assert "ba.last_updated_at > %(changed_since)s" in query
+        assert params["changed_since"] == changed_since
+
     def test_default_candidate_batch_includes_other_classification(self):
         calc = Mock(spec=DistanceCalculator)
         calc.cursor = Mock()